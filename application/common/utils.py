@@ -1,3 +1,4 @@
+import unicodedata
 from datetime import datetime, date
 from typing import Optional, List
 
@@ -21,6 +22,20 @@ def parse_created_at_str(date_str: Optional[str]) -> Optional[date]:
         return None
 
 
+def normalize_title(title: Optional[str]) -> str:
+    """Tytuł do porównań: NFC, bez rozróżniania wielkości liter i nadmiarowych spacji."""
+    if not title:
+        return ""
+    return " ".join(unicodedata.normalize("NFC", title).casefold().split())
+
+
+def normalize_tags(tags: Optional[List[str]]) -> List[str]:
+    """Tagi w postaci zapisywanej w `note_tags`: bez spacji na brzegach, małymi literami, bez powtórzeń."""
+    if not tags:
+        return []
+    return list(dict.fromkeys(t.strip().lower() for t in tags if t and t.strip()))
+
+
 def tags_to_list(tags: Optional[str]) -> List[str]:
     if not tags:
         return []
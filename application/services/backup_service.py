@@ -0,0 +1,336 @@
+import asyncio
+import base64
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from domain.entities import Note, NoteChunk, Trash, User, UserKeys
+from domain.interfaces import (
+    AccountRestoreRepository, AccountVersionRepository, NoteChunkRepository, NoteRepository, TrashRepository,
+    UserKeyRepository, UserRepository,
+)
+from application.services.encryption_service import EncryptionService
+from application.services.server_cipher import ServerCipher
+
+
+BACKUP_FORMAT = "encrypted-notepad-backup"
+BACKUP_VERSION = 1
+# rekordy przepisywane (i ładowane COPY) jedną partią
+BACKUP_BATCH = 500
+# kawałki treści notatek strumieniowych czytane jednym zapytaniem
+CHUNK_BATCH = 64
+
+
+class BackupStats(BaseModel):
+    """Liczniki i przepustowość kopii lub odtwarzania (bajty archiwum)."""
+    records: Dict[str, int] = {}
+    bytes_total: int = 0
+    seconds: float = 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes_total / 1_000_000 / self.seconds if self.seconds else 0.0
+
+
+def _b64(value: Optional[bytes]) -> Optional[str]:
+    return base64.b64encode(value).decode() if value is not None else None
+
+
+def _unb64(value: Optional[str]) -> Optional[bytes]:
+    return base64.b64decode(value) if value is not None else None
+
+
+def _time(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class AccountBackupService:
+    """Kopia zapasowa konta bez odszyfrowywania notatek.
+
+    Archiwum to nagłówek JSON (jedna linia), a po nim ramki `długość (4 B) +
+    rekord zaszyfrowany kluczem kopii`. Rekordy niosą szyfrogram notatek
+    z warstwą serwerową zamienioną na warstwę klucza kopii - szyfrowanie
+    end-to-end użytkownika nie jest dotykane, więc kopia nie wymaga kluczy
+    użytkownika, a odtworzenie działa w innym wdrożeniu (z innym kluczem
+    serwera), o ile zna BACKUP_KEY. Ostatni rekord `end` z licznikami
+    wykrywa ucięte archiwum.
+
+    Archiwum czytane i pisane jest strumieniowo; odtwarzanie ładuje partie
+    po BACKUP_BATCH przez COPY w jednej transakcji. `title_hash` i ślepy
+    indeks wyszukiwania są kluczowane kluczem wdrożenia - po odtworzeniu
+    uzupełnia je scripts/backfill_search_index.py.
+    """
+
+    def __init__(
+        self,
+        encryption: EncryptionService,
+        backup_cipher: ServerCipher,
+        *,
+        users: UserRepository,
+        user_keys: UserKeyRepository,
+        note_repo: NoteRepository,
+        trash_repo: TrashRepository,
+        chunks: NoteChunkRepository,
+        restore_repo: AccountRestoreRepository,
+        versions: Optional[AccountVersionRepository] = None,
+    ):
+        """
+        Args:
+            encryption: Service holding the server key(s) of this deployment
+            backup_cipher: Cipher built from BACKUP_KEY (the same on every deployment)
+            users: Repository of user accounts
+            user_keys: Repository of user master keys
+            note_repo: Repository of notes (read with a server-side cursor)
+            trash_repo: Repository of trashed notes
+            chunks: Repository of streamed note content chunks
+            restore_repo: Repository bulk-loading the archive
+            versions: Account version counter, bumped after a restore
+        """
+        self.encryption = encryption
+        self.backup_cipher = backup_cipher
+        self.users = users
+        self.user_keys = user_keys
+        self.note_repo = note_repo
+        self.trash_repo = trash_repo
+        self.chunks = chunks
+        self.restore_repo = restore_repo
+        self.versions = versions
+
+    # --- kopia ---
+
+    def _frame(self, record: dict) -> bytes:
+        payload = self.backup_cipher.encrypt(json.dumps(record, separators=(",", ":")).encode())
+        return len(payload).to_bytes(4, "big") + payload
+
+    def _rewrap(self, value: bytes) -> str:
+        """Szyfrogram bez warstwy serwera (paczka klienta / kawałek strumienia) jako base64."""
+        return base64.b64encode(self.encryption.decrypt_server_bytes(value)).decode()
+
+    def _row_frames(self, scope: str, rows: List[Union[Note, Trash]]) -> bytes:
+        out = bytearray()
+        for row in rows:
+            try:
+                record = {
+                    "type": scope,
+                    "title": self._rewrap(row.title),
+                    "content": self._rewrap(row.content),
+                    "tags": row.tags,
+                    "created_at": _time(row.created_at),
+                    "trashed_at": _time(getattr(row, "trashed_at", None)),
+                    "key_private_b64": row.key_private_b64,
+                    "public_key_b64": row.public_key_b64,
+                    "stream_id": str(row.stream_id) if row.stream_id else None,
+                }
+            except Exception as e:
+                # niepełna kopia wyglądałaby na poprawną - przerywamy
+                raise ValueError(f"Nie można odczytać wiersza {scope} {row.id}: {e}")
+            out += self._frame(record)
+        return bytes(out)
+
+    def _chunk_frames(self, chunks: List[NoteChunk]) -> bytes:
+        out = bytearray()
+        for chunk in chunks:
+            out += self._frame({"type": "chunks", "stream_id": str(chunk.stream_id), "seq": chunk.seq,
+                                "data": self._rewrap(chunk.data)})
+        return bytes(out)
+
+    async def backup(self, user_uuid: UUID, stats: Optional[BackupStats] = None) -> AsyncIterator[bytes]:
+        """Strumień bajtów archiwum konta.
+
+        Notatki czytane są kursorem po stronie serwera i przepisywane partiami
+        w wątku; kawałki notatek strumieniowych dopisywane są po zamknięciu
+        kursora danego zakresu (wymagają osobnych zapytań).
+
+        Raises:
+            ValueError: użytkownik nie istnieje albo wiersza nie da się odczytać kluczem serwera
+        """
+        stats = stats if stats is not None else BackupStats()
+        started = time.perf_counter()
+        counts: Dict[str, int] = {"notes": 0, "trash": 0, "chunks": 0}
+
+        def _out(data: bytes) -> bytes:
+            stats.bytes_total += len(data)
+            stats.seconds = time.perf_counter() - started
+            return data
+
+        user = await self.users.get_by_uuid(user_uuid)
+        if user is None:
+            raise ValueError(f"Użytkownik {user_uuid} nie istnieje")
+        header = {
+            "format": BACKUP_FORMAT,
+            "version": BACKUP_VERSION,
+            "user_uuid": str(user_uuid),
+            "created_at": datetime.utcnow().isoformat(),
+            "key_id": self.backup_cipher.primary_key_id.hex(),
+        }
+        yield _out((json.dumps(header) + "\n").encode())
+        yield _out(self._frame({"type": "user", "email": user.email, "password_hash": user.password_hash,
+                                "created_at": _time(user.created_at)}))
+
+        keys = await self.user_keys.get_by_user(user_uuid)
+        if keys is not None:
+            yield _out(self._frame({"type": "user_keys", "public_key_b64": keys.public_key_b64,
+                                    "private_key_enc": self._rewrap(keys.private_key_enc),
+                                    "sealed_kek": _b64(keys.sealed_kek), "created_at": _time(keys.created_at)}))
+
+        for scope, repo in (("notes", self.note_repo), ("trash", self.trash_repo)):
+            streamed: List[UUID] = []
+            batch: List[Union[Note, Trash]] = []
+            async for row in repo.iterate_all(user_uuid=user_uuid):
+                if row.stream_id is not None:
+                    streamed.append(row.stream_id)
+                batch.append(row)
+                if len(batch) >= BACKUP_BATCH:
+                    yield _out(await asyncio.to_thread(self._row_frames, scope, batch))
+                    counts[scope] += len(batch)
+                    batch = []
+            if batch:
+                yield _out(await asyncio.to_thread(self._row_frames, scope, batch))
+                counts[scope] += len(batch)
+            for stream_id in streamed:
+                after_seq = -1
+                while True:
+                    chunks = await self.chunks.get_batch(stream_id=stream_id, user_uuid=user_uuid,
+                                                         after_seq=after_seq, limit=CHUNK_BATCH)
+                    if not chunks:
+                        break
+                    yield _out(await asyncio.to_thread(self._chunk_frames, chunks))
+                    counts["chunks"] += len(chunks)
+                    after_seq = chunks[-1].seq
+
+        yield _out(self._frame({"type": "end", "counts": counts}))
+        stats.records = counts
+
+    # --- odtwarzanie ---
+
+    async def _frames(self, data: AsyncIterator[bytes], stats: BackupStats) -> AsyncIterator[bytes]:
+        """Nagłówek (pierwsza linia), potem kolejne ramki - bez wczytywania całego archiwum."""
+        buffer = bytearray()
+        header_done = False
+        async for piece in data:
+            stats.bytes_total += len(piece)
+            buffer += piece
+            if not header_done:
+                end = buffer.find(b"\n")
+                if end < 0:
+                    continue
+                yield bytes(buffer[:end])
+                del buffer[:end + 1]
+                header_done = True
+            while len(buffer) >= 4:
+                size = int.from_bytes(buffer[:4], "big")
+                if len(buffer) < 4 + size:
+                    break
+                yield bytes(buffer[4:4 + size])
+                del buffer[:4 + size]
+        if buffer or not header_done:
+            raise ValueError("Archiwum kopii jest ucięte")
+
+    def _open(self, frame: bytes) -> dict:
+        try:
+            return json.loads(self.backup_cipher.decrypt(frame))
+        except Exception:
+            raise ValueError("Nie można odszyfrować archiwum - inny BACKUP_KEY albo uszkodzony plik")
+
+    def _entities(self, user_uuid: UUID, scope: str, records: List[dict], streams: Dict[str, UUID]) -> list:
+        """Rekordy archiwum jako encje z warstwą serwera tego wdrożenia (wywoływane w wątku).
+
+        Strumienie dostają nowe identyfikatory (`streams`), więc ponowne
+        odtworzenie tej samej kopii nie koliduje z istniejącymi kawałkami.
+        """
+        wrap = self.encryption.encrypt_server_bytes
+        if scope == "chunks":
+            return [NoteChunk(stream_id=streams.setdefault(r["stream_id"], uuid.uuid4()), seq=r["seq"],
+                              data=wrap(_unb64(r["data"]))) for r in records]
+        rows = []
+        for r in records:
+            fields = dict(
+                id=0, user_uuid=user_uuid, title=wrap(_unb64(r["title"])), content=wrap(_unb64(r["content"])),
+                tags=r["tags"], created_at=_parse_time(r["created_at"]), key_private_b64=r["key_private_b64"],
+                public_key_b64=r["public_key_b64"],
+                stream_id=streams.setdefault(r["stream_id"], uuid.uuid4()) if r["stream_id"] else None,
+            )
+            rows.append(Note(**fields) if scope == "notes" else Trash(**fields, trashed_at=_parse_time(r["trashed_at"])))
+        return rows
+
+    async def _batches(self, user_uuid: UUID, first: Optional[dict], records: AsyncIterator[dict],
+                       stats: BackupStats) -> AsyncIterator[Tuple[str, list]]:
+        counts: Dict[str, int] = {"notes": 0, "trash": 0, "chunks": 0}
+        streams: Dict[str, UUID] = {}
+        scope, pending = None, []
+        record = first
+        while record is not None and record["type"] != "end":
+            if record["type"] not in counts:
+                raise ValueError(f"Nieznany rekord archiwum: {record['type']}")
+            if pending and (record["type"] != scope or len(pending) >= BACKUP_BATCH):
+                yield scope, await asyncio.to_thread(self._entities, user_uuid, scope, pending, streams)
+                pending = []
+            scope = record["type"]
+            pending.append(record)
+            counts[scope] += 1
+            record = await anext(records, None)
+        if record is None:
+            raise ValueError("Archiwum kopii jest ucięte (brak rekordu końcowego)")
+        if record["counts"] != counts:
+            raise ValueError(f"Liczba rekordów archiwum się nie zgadza: {counts} zamiast {record['counts']}")
+        if pending:
+            yield scope, await asyncio.to_thread(self._entities, user_uuid, scope, pending, streams)
+        stats.records = counts
+
+    async def restore(self, data: AsyncIterator[bytes], *, user_uuid: Optional[UUID] = None, replace: bool = False,
+                      stats: Optional[BackupStats] = None) -> BackupStats:
+        """Odtwarza konto z archiwum (domyślnie pod UUID z nagłówka).
+
+        Całość ładowana jest w jednej transakcji - uszkodzone lub ucięte
+        archiwum niczego nie zmienia.
+
+        Raises:
+            ValueError: nieznany format, inny klucz kopii, uszkodzone archiwum
+                albo konflikt kluczy użytkownika
+        """
+        stats = stats if stats is not None else BackupStats()
+        started = time.perf_counter()
+        frames = self._frames(data, stats)
+        try:
+            header = json.loads(await anext(frames))
+        except (StopAsyncIteration, json.JSONDecodeError):
+            raise ValueError("To nie jest archiwum kopii konta")
+        if header.get("format") != BACKUP_FORMAT or header.get("version") != BACKUP_VERSION:
+            raise ValueError(f"Nieobsługiwany format kopii: {header.get('format')} v{header.get('version')}")
+
+        async def _records() -> AsyncIterator[dict]:
+            async for frame in frames:
+                yield await asyncio.to_thread(self._open, frame)
+
+        records = _records()
+        target = user_uuid or UUID(header["user_uuid"])
+        record = await anext(records, None)
+        if record is None or record["type"] != "user":
+            raise ValueError("Archiwum kopii nie zaczyna się od rekordu użytkownika")
+        user = User(id=0, uuid=target, email=record["email"], password_hash=record["password_hash"],
+                    created_at=_parse_time(record["created_at"]))
+
+        keys = None
+        record = await anext(records, None)
+        if record is not None and record["type"] == "user_keys":
+            keys = UserKeys(user_uuid=target, public_key_b64=record["public_key_b64"],
+                            private_key_enc=self.encryption.encrypt_server_bytes(_unb64(record["private_key_enc"])),
+                            sealed_kek=_unb64(record["sealed_kek"]), created_at=_parse_time(record["created_at"]))
+            record = await anext(records, None)
+
+        await self.restore_repo.restore(user=user, keys=keys, batches=self._batches(target, record, records, stats),
+                                        replace=replace)
+        if self.versions is not None:
+            # nowe notatki - unieważnia cache wyników wyszukiwania
+            await self.versions.bump(target)
+        stats.seconds = time.perf_counter() - started
+        return stats
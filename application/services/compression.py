@@ -0,0 +1,128 @@
+"""Kompresja plaintextu przed szyfrowaniem.
+
+Szyfrogram jest nieściśliwy, więc treść notatki trzeba skompresować zanim
+trafi do Ferneta. Algorytm zapisywany jest w paczce (`"compression"`),
+dzięki czemu odczyt jest przezroczysty, a stare paczki bez tego pola
+odczytywane są bez zmian.
+
+zstd jest używany, gdy zainstalowano opcjonalny pakiet `zstandard`;
+w przeciwnym razie zlib z biblioteki standardowej.
+
+Dekompresja produkuje najwyżej `max_size` bajtów (limit rozmiaru notatki),
+więc mała paczka nie może rozwinąć się w gigabajty w pamięci serwera.
+Treść większa od limitu jest zapisywana bez kompresji.
+"""
+
+import zlib
+from typing import Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zależność opcjonalna
+    zstandard = None
+
+
+ZLIB = "zlib"
+ZSTD = "zstd"
+
+# poniżej tego rozmiaru (bajty) narzut nagłówka zjada zysk z kompresji
+DEFAULT_THRESHOLD = 512
+# domyślny limit rozmiaru plaintextu notatki (bajty) przy dekompresji
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+# porcja odczytu strumienia zstd
+_READ_SIZE = 1024 * 1024
+
+
+def available_algorithms() -> Tuple[str, ...]:
+    return (ZSTD, ZLIB) if zstandard is not None else (ZLIB,)
+
+
+def default_algorithm() -> str:
+    return available_algorithms()[0]
+
+
+class Compressor:
+    """Kompresuje dane powyżej progu, jeśli to faktycznie zmniejsza rozmiar."""
+
+    def __init__(self, algorithm: Optional[str] = None, threshold: int = DEFAULT_THRESHOLD, level: Optional[int] = None,
+                 max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Args:
+            algorithm: "zstd" | "zlib" | "none"; None wybiera najlepszy dostępny
+            threshold: minimalny rozmiar plaintextu (bajty), od którego próbujemy kompresji
+            level: poziom kompresji (domyślny dla algorytmu, jeśli None)
+            max_size: limit rozmiaru notatki - większe dane nie są kompresowane
+                (dekompresja odrzuca wynik powyżej tego limitu)
+        """
+        algorithm = (algorithm or default_algorithm()).lower()
+        if algorithm not in (ZSTD, ZLIB, "none"):
+            raise ValueError(f"unsupported compression algorithm: {algorithm}")
+        if algorithm == ZSTD and zstandard is None:
+            # brak pakietu - degradacja do zlib zamiast błędu przy starcie
+            algorithm = ZLIB
+        self.algorithm = None if algorithm == "none" else algorithm
+        self.threshold = max(0, threshold)
+        self.level = level
+        self.max_size = max_size
+        self._zstd = zstandard.ZstdCompressor(level=level or 3) if self.algorithm == ZSTD else None
+
+    def compress(self, data: bytes) -> Tuple[bytes, Optional[str]]:
+        """Zwraca (dane, algorytm) albo (dane bez zmian, None), gdy kompresja się nie opłaca."""
+        if self.algorithm is None or len(data) < self.threshold or len(data) > self.max_size:
+            return data, None
+        if self.algorithm == ZSTD:
+            packed = self._zstd.compress(data)
+        else:
+            packed = zlib.compress(data, self.level if self.level is not None else 6)
+        if len(packed) >= len(data):
+            return data, None
+        return packed, self.algorithm
+
+
+def _too_large(max_size: int) -> ValueError:
+    return ValueError(f"decompressed payload exceeds the note size limit ({max_size} bytes)")
+
+
+def _zlib_decompress(data: bytes, max_size: int) -> bytes:
+    stream = zlib.decompressobj()
+    out = stream.decompress(data, max_size + 1)
+    if len(out) > max_size:
+        raise _too_large(max_size)
+    if not stream.eof:
+        raise ValueError("incomplete or truncated zlib stream")
+    return out
+
+
+def _zstd_decompress(data: bytes, max_size: int) -> bytes:
+    # rozmiar z nagłówka ramki (jeśli zapisany) odrzuca paczkę bez dekompresji
+    declared = zstandard.frame_content_size(data)
+    if declared > max_size:
+        raise _too_large(max_size)
+    parts = []
+    size = 0
+    with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+        while True:
+            part = reader.read(min(_READ_SIZE, max_size + 1 - size))
+            if not part:
+                break
+            size += len(part)
+            if size > max_size:
+                raise _too_large(max_size)
+            parts.append(part)
+    return b"".join(parts)
+
+
+def decompress(data: bytes, algorithm: Optional[str], max_size: int = DEFAULT_MAX_SIZE) -> bytes:
+    """Odwrotność `Compressor.compress` na podstawie flagi z paczki.
+
+    Raises ValueError, gdy wynik przekroczyłby `max_size` bajtów.
+    """
+    if algorithm is None:
+        return data
+    if algorithm == ZLIB:
+        return _zlib_decompress(data, max_size)
+    if algorithm == ZSTD:
+        if zstandard is None:
+            raise ValueError("package is zstd-compressed but zstandard is not installed")
+        return _zstd_decompress(data, max_size)
+    raise ValueError(f"unsupported compression algorithm: {algorithm}")
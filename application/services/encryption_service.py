@@ -1,8 +1,15 @@
 from cryptography.fernet import Fernet
 from nacl.public import PrivateKey, PublicKey, SealedBox
+from nacl.secret import SecretBox
+from nacl.utils import random as nacl_random
 import base64
 import json
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Sequence, Union
+
+from application.services.server_cipher import ServerCipher, is_fernet_token
+from application.services.compression import Compressor, DEFAULT_MAX_SIZE, decompress
+from application.services.stream_encryption import StreamEncryptor, StreamDecryptor, STREAM_CHUNK_SIZE
+from nacl.bindings import crypto_secretstream_xchacha20poly1305_keygen
 
 
 class EncryptionService:
@@ -12,22 +19,45 @@ class EncryptionService:
     - Szyfrowanie klucza sesyjnego: SealedBox (PyNaCl)
     
     Zawiera też zachowanie kompatybilne z poprzednim API: jeśli podano
-    `server_key` (Fernet key), dostępne są `encrypt_server` i `decrypt_server`
+    `server_key` (Fernet key), dostępne są `encrypt_server` i `decrypt_server`.
+    Warstwa serwerowa zapisuje w formacie `server_cipher` (fernet / aesgcm / xchacha20),
+    a odczytuje każdy z nich - patrz `server_cipher.py`.
     Format paczki (bytes): UTF-8 encoded JSON z polami:
       {"version":"v1","enc_key":"<base64>","ciphertext":"<base64>"}
+
+    Opcjonalne pole `"compression":"zlib"|"zstd"` oznacza, że plaintext został
+    skompresowany przed szyfrowaniem (tylko powyżej progu `compressor.threshold`);
+    odczyt dekompresuje przezroczyście, paczki bez tego pola są czytane jak dawniej.
+    Dekompresja odrzuca (ValueError) wynik większy od `compressor.max_size`.
+
+    Paczka "s1" opisuje treść zapisaną strumieniowo w kawałkach (`note_chunks`):
+      {"version":"s1","enc_key":"<base64>","header":"<base64>","chunk_size":N}
+
+    Paczka "v2" zawiera dodatkowo `kek_key` - ten sam klucz sesyjny opakowany
+    symetrycznie (SecretBox) kluczem KEK użytkownika. Dzięki temu listowanie
+    N notatek wymaga jednej operacji asymetrycznej (odpieczętowanie KEK)
+    i N tanich rozpakowań symetrycznych.
     """
 
-    def __init__(self, server_key: Optional[bytes] = None):
-        self.server_fernet = Fernet(server_key) if server_key is not None else None
+    def __init__(
+        self,
+        server_key: Optional[Union[bytes, Sequence[bytes]]] = None,
+        server_cipher: str = "fernet",
+        compressor: Optional[Compressor] = None,
+    ):
+        self.server_cipher = ServerCipher(server_key, server_cipher) if server_key is not None else None
+        self.compressor = compressor
+        # limit dekompresji - jak przy zapisie, domyślny bez kompresora
+        self.max_plaintext_size = compressor.max_size if compressor is not None else DEFAULT_MAX_SIZE
 
     # --- Server-side (backwards compatible) ---
     def encrypt_server(self, data: str) -> bytes:
-        """Szyfruje tekst przy użyciu serwerowego klucza Fernet
+        """Szyfruje tekst przy użyciu serwerowego klucza (format wg `server_cipher`)
         Raises ValueError jeśli `server_key` nie został dostarczony przy inicjalizacji.
         """
-        if self.server_fernet is None:
+        if self.server_cipher is None:
             raise ValueError("nie ma klucza_server do szyfrowania po stronie serwera")
-        return self.server_fernet.encrypt(data.encode())
+        return self.server_cipher.encrypt(data.encode())
 
     # Legacy compatibility methods (old code used camelCase names)
     def encryptserver(self, data: str) -> bytes:
@@ -36,14 +66,42 @@ class EncryptionService:
 
     def decrypt_server(self, data: bytes) -> str:
         """Deszyfruje dane zaszyfrowane przez `encrypt_server`"""
-        if self.server_fernet is None:
+        if self.server_cipher is None:
             raise ValueError("nie skonfigurowano klucza_server do deszyfrowania po stronie serwera")
-        return self.server_fernet.decrypt(data).decode()
+        return self.server_cipher.decrypt(data).decode()
 
     def decryptserver(self, data: bytes) -> str:
         """wsteczna kompatybilność dla `decrypt_server`"""
         return self.decrypt_server(data)
 
+    def encrypt_server_bytes(self, data: bytes) -> bytes:
+        """Jak `encrypt_server`, ale dla surowych bajtów (kawałki strumienia)."""
+        if self.server_cipher is None:
+            raise ValueError("nie ma klucza_server do szyfrowania po stronie serwera")
+        return self.server_cipher.encrypt(data)
+
+    def decrypt_server_bytes(self, data: bytes) -> bytes:
+        """Odwrotność `encrypt_server_bytes`."""
+        if self.server_cipher is None:
+            raise ValueError("nie skonfigurowano klucza_server do deszyfrowania po stronie serwera")
+        return self.server_cipher.decrypt(data)
+
+    def rotate_server(self, data: bytes) -> Optional[bytes]:
+        """Przepisuje szyfrogram serwera na klucz główny; None jeśli nie trzeba."""
+        if self.server_cipher is None:
+            raise ValueError("nie skonfigurowano klucza_server do rotacji")
+        return self.server_cipher.rotate(data)
+
+    @staticmethod
+    def server_token_to_str(data: bytes) -> str:
+        """Tekstowa postać szyfrogramu serwera do odpowiedzi API.
+
+        Tokeny Fernet są już base64, surowe szyfrogramy AEAD są kodowane base64.
+        """
+        if is_fernet_token(data):
+            return data.decode()
+        return base64.urlsafe_b64encode(data).decode()
+
     # --- NaCl key helpers ---
     @staticmethod
     def generate_nacl_keypair() -> Tuple[bytes, bytes]:
@@ -62,15 +120,45 @@ class EncryptionService:
     def public_key_from_bytes(pub_bytes: bytes) -> PublicKey:
         return PublicKey(pub_bytes)
 
+    # --- User key hierarchy (KEK) ---
+    @staticmethod
+    def generate_kek() -> bytes:
+        """Generuje losowy 32-bajtowy klucz KEK użytkownika."""
+        return nacl_random(SecretBox.KEY_SIZE)
+
+    def seal_kek(self, kek: bytes, master_public_key: bytes) -> bytes:
+        """Pieczętuje KEK do publicznego klucza głównego użytkownika."""
+        return SealedBox(self.public_key_from_bytes(master_public_key)).encrypt(kek)
+
+    def unseal_kek(self, sealed_kek: bytes, master_private_key: bytes) -> bytes:
+        """Odpieczętowuje KEK - jedyna operacja asymetryczna na żądanie."""
+        try:
+            return SealedBox(self.private_key_from_bytes(master_private_key)).decrypt(sealed_kek)
+        except Exception as e:
+            raise ValueError(f"unsealing kek failed: {e}")
+
     # --- Hybrid encryption API ---
-    def encrypt_for_recipient(self, plaintext: str, recipient_public_key: bytes) -> bytes:
+    @staticmethod
+    def _load_package(package_bytes: bytes) -> dict:
+        package = json.loads(package_bytes.decode())
+        if package.get("version") not in ("v1", "v2"):
+            raise ValueError("unsupported package version")
+        return package
+
+    @staticmethod
+    def _dump_package(package: dict) -> bytes:
+        return json.dumps(package).encode()
+
+    def encrypt_for_recipient(self, plaintext: str, recipient_public_key: bytes, kek: Optional[bytes] = None) -> bytes:
         """Hybrydowo szyfruje `plaintext` dla odbiorcy o podanym publicznym kluczu NaCl
-        Zwraca JSON-ową paczkę (bytes) z zaszyfrowanym kluczem sesyjnym i ciphertext
+        Zwraca JSON-ową paczkę (bytes) z zaszyfrowanym kluczem sesyjnym i ciphertext.
+        Jeśli podano `kek`, klucz sesyjny jest dodatkowo opakowany KEK-iem użytkownika (paczka v2).
         """
         # wygeneruj klucz sesyjny Fernet
         session_key = Fernet.generate_key()  # bytes
         f = Fernet(session_key)
-        ciphertext = f.encrypt(plaintext.encode())
+        data, compression = self.compressor.compress(plaintext.encode()) if self.compressor else (plaintext.encode(), None)
+        ciphertext = f.encrypt(data)
 
         # zaszyfruj klucz sesyjny SealedBox-em do publicznego klucza odbiorcy
         pub = self.public_key_from_bytes(recipient_public_key)
@@ -81,28 +169,119 @@ class EncryptionService:
             "enc_key": base64.b64encode(sealed).decode(),
             "ciphertext": base64.b64encode(ciphertext).decode(),
         }
-        return json.dumps(package).encode()
+        if compression:
+            package["compression"] = compression
+        if kek is not None:
+            package["version"] = "v2"
+            package["kek_key"] = base64.b64encode(SecretBox(kek).encrypt(session_key)).decode()
+        return self._dump_package(package)
+
+    def _open_ciphertext(self, package: dict, session_key: bytes) -> str:
+        data = Fernet(session_key).decrypt(base64.b64decode(package["ciphertext"]))
+        return decompress(data, package.get("compression"), self.max_plaintext_size).decode()
+
+    def _open_with_private(self, package: dict, recipient_private_key: bytes) -> str:
+        sealed = base64.b64decode(package["enc_key"])
+
+        priv = self.private_key_from_bytes(recipient_private_key)
+        session_key = SealedBox(priv).decrypt(sealed)
+
+        return self._open_ciphertext(package, session_key)
+
+    def _open_with_kek(self, package: dict, kek: bytes) -> str:
+        if "kek_key" not in package:
+            raise ValueError("package has no kek_key")
+        session_key = SecretBox(kek).decrypt(base64.b64decode(package["kek_key"]))
+        return self._open_ciphertext(package, session_key)
 
     def decrypt_with_private(self, package_bytes: bytes, recipient_private_key: bytes) -> str:
         """Deszyfruje paczkę wygenerowaną przez `encrypt_for_recipient`
         `recipient_private_key` to surowe 32-bajtowe bytes wygenerowane przez `generate_nacl_keypair`
         """
         try:
-            package = json.loads(package_bytes.decode())
-            if package.get("version") != "v1":
-                raise ValueError("unsupported package version")
+            return self._open_with_private(self._load_package(package_bytes), recipient_private_key)
+        except Exception as e:
+            raise ValueError(f"decryption failed: {e}")
 
-            sealed = base64.b64decode(package["enc_key"])
-            ciphertext = base64.b64decode(package["ciphertext"])
+    def decrypt_with_kek(self, package_bytes: bytes, kek: bytes) -> str:
+        """Deszyfruje paczkę v2 przy użyciu KEK użytkownika (bez operacji asymetrycznej)."""
+        try:
+            return self._open_with_kek(self._load_package(package_bytes), kek)
+        except Exception as e:
+            raise ValueError(f"decryption failed: {e}")
 
-            priv = self.private_key_from_bytes(recipient_private_key)
-            session_key = SealedBox(priv).decrypt(sealed)
+    def decrypt_package(
+        self,
+        package_bytes: bytes,
+        *,
+        private_key: Optional[bytes] = None,
+        kek: Optional[bytes] = None,
+    ) -> str:
+        """Deszyfruje paczkę tańszą dostępną ścieżką.
 
-            f = Fernet(session_key)
-            plaintext = f.decrypt(ciphertext).decode()
-            return plaintext
+        Gdy podano `kek` i paczka ma `kek_key` - rozpakowanie symetryczne,
+        w przeciwnym razie SealedBox z `private_key`.
+        """
+        try:
+            package = self._load_package(package_bytes)
+            if kek is not None and "kek_key" in package:
+                return self._open_with_kek(package, kek)
+            if private_key is None:
+                raise ValueError("no private key or kek")
+            return self._open_with_private(package, private_key)
         except Exception as e:
             raise ValueError(f"decryption failed: {e}")
 
-    
-    
\ No newline at end of file
+    def rewrap_with_kek(self, package_bytes: bytes, recipient_private_key: bytes, kek: bytes) -> bytes:
+        """Dodaje `kek_key` do istniejącej paczki bez ponownego szyfrowania treści (migracja v1 -> v2)."""
+        try:
+            package = self._load_package(package_bytes)
+            sealed = base64.b64decode(package["enc_key"])
+            session_key = SealedBox(self.private_key_from_bytes(recipient_private_key)).decrypt(sealed)
+        except Exception as e:
+            raise ValueError(f"rewrap failed: {e}")
+
+        package["version"] = "v2"
+        package["kek_key"] = base64.b64encode(SecretBox(kek).encrypt(session_key)).decode()
+        return self._dump_package(package)
+
+    # --- Streaming (chunked) API ---
+    def stream_encryptor(self, recipient_public_key: bytes, kek: Optional[bytes] = None) -> Tuple[bytes, StreamEncryptor]:
+        """Rozpoczyna strumień dla odbiorcy.
+
+        Zwraca (paczka nagłówka "s1", encryptor). Klucz strumienia jest zapieczętowany
+        do klucza publicznego odbiorcy (i opcjonalnie opakowany KEK użytkownika).
+        """
+        stream_key = crypto_secretstream_xchacha20poly1305_keygen()
+        encryptor = StreamEncryptor(stream_key)
+        package = {
+            "version": "s1",
+            "enc_key": base64.b64encode(SealedBox(self.public_key_from_bytes(recipient_public_key)).encrypt(stream_key)).decode(),
+            "header": base64.b64encode(encryptor.header).decode(),
+            "chunk_size": STREAM_CHUNK_SIZE,
+        }
+        if kek is not None:
+            package["kek_key"] = base64.b64encode(SecretBox(kek).encrypt(stream_key)).decode()
+        return self._dump_package(package), encryptor
+
+    def stream_decryptor(
+        self,
+        package_bytes: bytes,
+        *,
+        private_key: Optional[bytes] = None,
+        kek: Optional[bytes] = None,
+    ) -> StreamDecryptor:
+        """Otwiera strumień opisany paczką "s1"."""
+        try:
+            package = json.loads(package_bytes.decode())
+            if package.get("version") != "s1":
+                raise ValueError("not a stream package")
+            if kek is not None and "kek_key" in package:
+                stream_key = SecretBox(kek).decrypt(base64.b64decode(package["kek_key"]))
+            elif private_key is not None:
+                stream_key = SealedBox(self.private_key_from_bytes(private_key)).decrypt(base64.b64decode(package["enc_key"]))
+            else:
+                raise ValueError("no private key or kek")
+            return StreamDecryptor(stream_key, base64.b64decode(package["header"]))
+        except Exception as e:
+            raise ValueError(f"decryption failed: {e}")
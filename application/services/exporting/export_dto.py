@@ -1,5 +1,5 @@
-from typing import Optional
-from pydantic import BaseModel,validator
+from typing import Any, Optional
+from pydantic import BaseModel, ConfigDict, validator
 from uuid import UUID
 class NotesExport(BaseModel):
     """DTO dla exportowania notes
@@ -27,4 +27,21 @@ class NotesExport(BaseModel):
         return value
     class Config:
         str_strip_whitespace = True
-        validate_assignment = True
\ No newline at end of file
+        validate_assignment = True
+
+
+class ExportedNote(BaseModel):
+    """Wynik eksportu pojedynczej notatki.
+
+    - `etag`: skrót szyfrogramu notatki - zmienia się tylko przy zmianie notatki
+    - `body`: strumień bajtów pliku (AsyncIterator[bytes]); None, gdy klient ma aktualną wersję (304)
+    """
+    filename: str
+    etag: str
+    body: Optional[Any] = None
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def not_modified(self) -> bool:
+        return self.body is None
@@ -0,0 +1,179 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
+from uuid import UUID
+
+from domain.entities import ExportJob
+from domain.interfaces import ExportJobRepository
+from application.services.encryption_service import EncryptionService
+from application.services.exporting.export_service import ExportingService
+from application.services.exporting.formats import EXPORT_FORMATS
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+EXPIRED = "expired"
+
+# rozmiar kawałka wyniku zapisywanego w export_job_chunks
+JOB_CHUNK = 1024 * 1024
+# ile kawałków pobierania czytać jednym zapytaniem
+DOWNLOAD_BATCH = 4
+# ile kawałków może czekać na zapis - eksport zwalnia, gdy baza nie nadąża
+WRITE_QUEUE = 4
+# postęp (i heartbeat) zapisywany co tyle notatek albo sekund, niezależnie od kawałków wyniku
+PROGRESS_NOTES = 100
+PROGRESS_SECONDS = 5.0
+
+
+class ExportJobCancelled(Exception):
+    """Zlecenie zostało usunięte w trakcie wykonywania."""
+
+
+class ExportJobService:
+    """Eksport całego konta jako zlecenie w tle: start, postęp, pobranie, wygaśnięcie.
+
+    API tylko zapisuje zlecenie w kolejce; wykonuje je `run` w osobnym
+    procesie (scripts/export_worker.py), więc długi eksport nie zajmuje
+    workera żądań ani nie trafia na timeouty proxy. Wynik (ten sam strumień
+    co GET /export/all) zapisywany jest kawałkami zaszyfrowanymi kluczem
+    serwera i usuwany po `ttl_seconds`.
+    """
+
+    def __init__(self, jobs: ExportJobRepository, exporting: ExportingService, encryption: EncryptionService, *,
+                 max_active: int = 3, ttl_seconds: int = 86400):
+        """Initialize export job service.
+
+        Args:
+            jobs: Repository of export jobs and their output
+            exporting: Service producing the export stream
+            encryption: Service encrypting stored output with the server key
+            max_active: Queued or running jobs allowed per user
+            ttl_seconds: How long a finished export can be downloaded
+        """
+        self.jobs = jobs
+        self.exporting = exporting
+        self.encryption = encryption
+        self.max_active = max_active
+        self.ttl_seconds = ttl_seconds
+
+    async def start(self, *, user_uuid: UUID, fmt: str = "zip", include_trash: bool = False) -> ExportJob:
+        """Dodaje zlecenie do kolejki.
+
+        Raises:
+            ValueError: nieznany format
+            OverflowError: użytkownik ma już `max_active` zleceń w kolejce lub w trakcie
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Nieznany format eksportu: {fmt}")
+        if await self.jobs.count_active(user_uuid=user_uuid) >= self.max_active:
+            raise OverflowError(f"Można mieć najwyżej {self.max_active} trwające eksporty")
+        job = ExportJob(id=uuid.uuid4(), user_uuid=user_uuid, format=fmt, include_trash=include_trash, status=QUEUED)
+        return await self.jobs.add(job)
+
+    async def get(self, *, job_id: UUID, user_uuid: UUID) -> Optional[ExportJob]:
+        return await self.jobs.get(job_id=job_id, user_uuid=user_uuid)
+
+    async def get_all(self, *, user_uuid: UUID) -> List[ExportJob]:
+        return await self.jobs.get_all(user_uuid=user_uuid)
+
+    async def delete(self, *, job_id: UUID, user_uuid: UUID) -> bool:
+        """Usuwa zlecenie i wynik; trwające zlecenie worker przerywa przy najbliższym zapisie."""
+        return await self.jobs.delete(job_id=job_id, user_uuid=user_uuid)
+
+    async def download(self, job: ExportJob) -> AsyncIterator[bytes]:
+        """Odszyfrowane kawałki wyniku zakończonego zlecenia, czytane partiami."""
+        after_seq = -1
+        while True:
+            batch = await self.jobs.get_chunks(job_id=job.id, after_seq=after_seq, limit=DOWNLOAD_BATCH)
+            if not batch:
+                break
+            for data in batch:
+                yield self.encryption.decrypt_server_bytes(data)
+            after_seq += len(batch)
+
+    async def run(self, job: ExportJob) -> ExportJob:
+        """Wykonuje przejęte zlecenie (worker) i zapisuje jego stan końcowy.
+
+        Eksport czyta notatki kursorem, który trzyma połączenie zadania, więc
+        kawałki wyniku i postęp zapisuje osobne zadanie (własne połączenie).
+        Kolejka między nimi jest krótka - pamięć nie rośnie z rozmiarem konta.
+        Postęp zapisywany jest też co PROGRESS_NOTES notatek lub PROGRESS_SECONDS,
+        więc zdrowy eksport nie jest uznawany za porzucony przed zapełnieniem kawałka.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=WRITE_QUEUE)
+        done = [0]
+
+        def _progress(count: int) -> None:
+            done[0] += count
+
+        async def _produce() -> None:
+            buffer = bytearray()
+            reported, reported_at = 0, time.monotonic()
+            async for data in self.exporting.export_all(job.user_uuid, job.format, job.include_trash, progress=_progress):
+                buffer += data
+                flushed = len(buffer) >= JOB_CHUNK
+                while len(buffer) >= JOB_CHUNK:
+                    await queue.put(bytes(buffer[:JOB_CHUNK]))
+                    del buffer[:JOB_CHUNK]
+                if not flushed and (done[0] - reported >= PROGRESS_NOTES
+                                    or time.monotonic() - reported_at >= PROGRESS_SECONDS):
+                    # sam postęp - wiele małych albo wolnych notatek długo nie zapełnia kawałka
+                    await queue.put(b"")
+                    flushed = True
+                if flushed:
+                    reported, reported_at = done[0], time.monotonic()
+            if buffer:
+                await queue.put(bytes(buffer))
+            await queue.put(None)
+
+        async def _store() -> None:
+            seq = 0
+            written = 0
+            while True:
+                data = await queue.get()
+                if data:
+                    await self.jobs.add_chunk(job_id=job.id, seq=seq, data=self.encryption.encrypt_server_bytes(data))
+                    seq += 1
+                    written += len(data)
+                if not await self.jobs.update_progress(job_id=job.id, notes_done=done[0], bytes_written=written):
+                    raise ExportJobCancelled()
+                if data is None:
+                    break
+
+        tasks = [asyncio.create_task(_produce()), asyncio.create_task(_store())]
+        try:
+            # pierwszy błąd (lub usunięcie zlecenia) przerywa oba zadania
+            for finished in asyncio.as_completed(tasks):
+                await finished
+        except Exception as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            job.status = FAILED
+            if isinstance(e, ExportJobCancelled):
+                # zlecenie usunięte albo uznane za porzucone - sprzątamy kawałki dopisane w międzyczasie
+                await self.jobs.finish(job_id=job.id, status=FAILED, error="cancelled")
+                return job
+            job.error = str(e) or type(e).__name__
+            await self.jobs.finish(job_id=job.id, status=FAILED, error=job.error)
+            return job
+
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+        if not await self.jobs.finish(job_id=job.id, status=DONE, expires_at=expires_at):
+            # `expire` uznał zlecenie za porzucone i usunął część wyniku - nie oddajemy go jako done
+            job.status = FAILED
+            job.error = "worker_lost"
+            return job
+        job.status = DONE
+        job.notes_done = done[0]
+        job.expires_at = expires_at
+        return job
+
+    async def expire(self, *, stale_seconds: int) -> int:
+        """Usuwa przeterminowane wyniki i kończy zlecenia porzucone przez worker."""
+        now = datetime.utcnow()
+        return await self.jobs.expire(now=now, stale_before=now - timedelta(seconds=stale_seconds))
@@ -1,92 +1,195 @@
+import asyncio
 import base64
-import tempfile
-import os
+import hashlib
 from uuid import UUID
-from typing import Optional, cast
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple, Union, cast
 
-from domain.interfaces import NoteRepository, ExportServiceInterface
+from domain.entities import Note, Trash
+from domain.interfaces import NoteRepository, TrashRepository, ExportServiceInterface
 from application.services.encryption_service import EncryptionService
+from application.services.note_stream_service import NoteStreamService
+from application.services.user_key_service import UserKeyService
+from application.services.exporting.formats import EXPORT_FORMATS, ExportFormat, ExportRecord, safe_filename
+from application.services.search.blind_index import NOTES, TRASH
+from application.services.exporting.export_dto import ExportedNote
+
+
+# ile notatek odszyfrowywać naraz przy eksporcie całego konta
+EXPORT_BATCH = 32
+# rozmiar kawałków odpowiedzi przy eksporcie pojedynczej notatki
+EXPORT_CHUNK = 64 * 1024
+
+
+def note_etag(note: Note) -> str:
+    """ETag z szyfrogramu (tytuł, treść, strumień) - bez odszyfrowywania notatki."""
+    digest = hashlib.sha256()
+    for part in (note.title, note.content, str(note.stream_id or "").encode()):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Czy nagłówek If-None-Match obejmuje `etag` (lista, `*`, słabe porównanie W/)."""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(value.removeprefix("W/") == etag for value in candidates)
+
+
+async def _chunked(data: bytes) -> AsyncIterator[bytes]:
+    for i in range(0, len(data), EXPORT_CHUNK):
+        yield data[i:i + EXPORT_CHUNK]
 
 
 class ExportingService(ExportServiceInterface):
     """Service dla exportingu notes do pliku txt.
     
-    Przeprowadza odszyfrowywanie title i content,
-    tworzy plik .txt o nazwie title z zawartością content.
+    Przeprowadza odszyfrowywanie title i content (raz, z wczytanego wiersza)
+    i oddaje plik .txt o nazwie title strumieniowo z pamięci - bez plików
+    tymczasowych. Całe konto eksportuje `export_all` (ZIP, Markdown, NDJSON, CSV).
     """
 
-    def __init__(self, repo: NoteRepository, encryption: EncryptionService):
+    def __init__(self, repo: NoteRepository, encryption: EncryptionService, streams: Optional[NoteStreamService] = None,
+                 user_keys: Optional[UserKeyService] = None, trash_repo: Optional[TrashRepository] = None):
         """Initialize export service.
         
         Args:
             repo: Repository for accessing notes
             encryption: Service for decrypting note data
+            streams: Service for reading chunked (streamed) note content
+            user_keys: Service unsealing the user's KEK (v2 packages)
+            trash_repo: Repository for trashed notes (whole-account export)
         """
         self.encryption = encryption
         self.repo = repo
+        self.streams = streams
+        self.user_keys = user_keys
+        self.trash_repo = trash_repo
 
-    async def _decrypt_title(self, title_bytes: Optional[bytes], key_private_b64: Optional[str], note_id: int,user_uuid:UUID) -> Optional[str]:
-        """Odszyfrowuje tytuł notatki.
-        
-        Args:
-            title_bytes: Encrypted title bytes
-            key_private_b64: Base64 encoded private key
-            note_id: ID of the note
-            
-        Returns:
-            Decrypted title string or None if decryption fails
-        """
-        if not title_bytes or not key_private_b64:
+    async def _get_kek(self, user_uuid: UUID) -> Optional[bytes]:
+        if self.user_keys is None:
             return None
-        
         try:
-            note = await self.repo.get_by_id(note_id=note_id,user_uuid=user_uuid)
-            if note and note.title == title_bytes and note.key_private_b64 == key_private_b64:
-                priv = base64.b64decode(cast(bytes, note.key_private_b64))
-                tit_dec = self.encryption.decrypt_server(title_bytes)
-                priv_dec = self.encryption.decrypt_with_private(tit_dec.encode(), priv)
-                return priv_dec
+            return await self.user_keys.get_kek(user_uuid)
         except Exception:
             return None
-        
-        return None
-    
-    async def _decrypt_content(self, content_bytes: Optional[bytes], key_private_b64: Optional[str], note_id: int,user_uuid:UUID) -> Optional[str]:
-        """Odszyfrowuje zawartość notatki.
-        
-        Args:
-            content_bytes: Encrypted content bytes
-            key_private_b64: Base64 encoded private key
-            note_id: ID of the note
-            
-        Returns:
-            Decrypted content string or None if decryption fails
-        """
-        if not content_bytes or not key_private_b64:
+
+    def _open(self, value: bytes, key_private_b64: Optional[str], kek: Optional[bytes]) -> Optional[str]:
+        """Odszyfrowuje obie warstwy pola już wczytanej notatki (None przy błędzie)."""
+        if not value or not key_private_b64:
             return None
-        
         try:
-            note = await self.repo.get_by_id(note_id=note_id,user_uuid=user_uuid)
-            if note and note.content == content_bytes and note.key_private_b64 == key_private_b64:
-                priv = base64.b64decode(cast(bytes, key_private_b64))
-                content_dec = self.encryption.decrypt_server(content_bytes)
-                content_decrypt = self.encryption.decrypt_with_private(content_dec.encode(), priv)
-                return content_decrypt
+            package = self.encryption.decrypt_server(value).encode()
+            return self.encryption.decrypt_package(package, private_key=base64.b64decode(key_private_b64), kek=kek)
         except Exception:
             return None
-        
-        return None
 
-    async def export(self, note_id: int, repo: NoteRepository, user_uuid: UUID) -> tuple[str, str]:
-        """Exportuje notatkę do pliku tekstowego.
-        
+    def _open_note(self, note: Note, kek: Optional[bytes]) -> Tuple[Optional[str], Optional[str]]:
+        return self._open(note.title, note.key_private_b64, kek), self._open(note.content, note.key_private_b64, kek)
+
+    def _record(self, scope: str, row: Union[Note, Trash], kek: Optional[bytes]) -> ExportRecord:
+        """Rekord eksportu z jednym odszyfrowaniem tytułu i (poza notatkami strumieniowymi) treści."""
+        record = ExportRecord(id=row.id, scope=scope, title=None, tags=list(row.tags or []), created_at=row.created_at,
+                              trashed_at=getattr(row, "trashed_at", None))
+        record.title = self._open(row.title, row.key_private_b64, kek)
+        if row.stream_id is None:
+            record.content = self._open(row.content, row.key_private_b64, kek)
+        if record.title is None or (row.stream_id is None and record.content is None):
+            record.error = "decrypt_failed"
+        return record
+
+    async def _write_batch(self, writer: ExportFormat, scope: str, batch: List[Union[Note, Trash]], kek: Optional[bytes]) -> bytes:
+        # odszyfrowanie w wątkach, zapis po kolei - kolejność jak w bazie
+        records = await asyncio.gather(*(asyncio.to_thread(self._record, scope, row, kek) for row in batch))
+        out = bytearray()
+        for record in records:
+            async for data in writer.write(record):
+                out += data
+        return bytes(out)
+
+    async def _write_streamed(self, writer: ExportFormat, scope: str, row: Union[Note, Trash], user_uuid: UUID,
+                              kek: Optional[bytes]) -> AsyncIterator[bytes]:
+        record = self._record(scope, row, kek)
+        chunks = None
+        if record.error is None and self.streams is not None:
+            try:
+                chunks = await self.streams.read(
+                    stream_id=cast(UUID, row.stream_id),
+                    user_uuid=user_uuid,
+                    server_header=row.content,
+                    private_key=base64.b64decode(cast(str, row.key_private_b64)),
+                    kek=kek,
+                )
+            except ValueError:
+                pass
+        if chunks is None:
+            record.error = record.error or "decrypt_failed"
+        async for data in writer.write(record, chunks):
+            yield data
+
+    async def export_all(self, user_uuid: UUID, fmt: str = "zip", include_trash: bool = False,
+                         progress: Optional[Callable[[int], None]] = None) -> AsyncIterator[bytes]:
+        """Eksportuje całe konto jako jeden strumień w formacie `fmt` (patrz EXPORT_FORMATS).
+
+        - zip: `notes/<id> <tytuł>.txt` (+ `trash/` z `include_trash`)
+        - markdown: jak zip, pliki .md z metadanymi we front matter
+        - ndjson / csv: wiersz na notatkę z tagami, datami i stanem kosza
+
+        Notatki czytane są kursorem po stronie serwera i odszyfrowywane
+        partiami po EXPORT_BATCH, a wynik oddawany na bieżąco - pamięć nie
+        zależy od rozmiaru konta, nic nie trafia na dysk. Notatki strumieniowe
+        dopisywane są po zamknięciu kursora (ich kawałki wymagają osobnych
+        zapytań). Notatki, których nie da się odszyfrować, mają `error`
+        (w archiwach - lista w `errors.txt`). `progress` dostaje liczbę
+        notatek zapisanych od poprzedniego wywołania (zlecenia w tle).
+        """
+        writer = EXPORT_FORMATS[fmt]()
+        kek = await self._get_kek(user_uuid)
+        sources: List[Tuple[str, Any]] = [(NOTES, self.repo)]
+        if include_trash and self.trash_repo is not None:
+            sources.append((TRASH, self.trash_repo))
+
+        start = writer.start()
+        if start:
+            yield start
+        for scope, repo in sources:
+            streamed: List[Union[Note, Trash]] = []
+            batch: List[Union[Note, Trash]] = []
+            async for row in repo.iterate_all(user_uuid=user_uuid):
+                if row.stream_id is not None:
+                    # content to tylko nagłówek "s1" - lista zostaje mała
+                    streamed.append(row)
+                    continue
+                batch.append(row)
+                if len(batch) >= EXPORT_BATCH:
+                    yield await self._write_batch(writer, scope, batch, kek)
+                    if progress:
+                        progress(len(batch))
+                    batch = []
+            if batch:
+                yield await self._write_batch(writer, scope, batch, kek)
+                if progress:
+                    progress(len(batch))
+            for row in streamed:
+                async for data in self._write_streamed(writer, scope, row, user_uuid, kek):
+                    yield data
+                if progress:
+                    progress(1)
+        yield writer.finish()
+
+    async def export(self, note_id: int, repo: NoteRepository, user_uuid: UUID, if_none_match: Optional[str] = None) -> ExportedNote:
+        """Eksportuje notatkę jako plik tekstowy przesyłany strumieniowo z pamięci.
+
         Args:
             note_id: ID notatki do wyeksportowania
             repo: Repository dla dostępu do notatek
-            
+            if_none_match: nagłówek If-None-Match klienta
+
         Returns:
-            Tuple zawierający (ścieżka do pliku, nazwa pliku)
-            
+            ExportedNote - nazwa pliku, ETag i strumień treści; przy zgodnym
+            ETag bez treści i bez odszyfrowywania (odpowiedź 304)
+
         Raises:
             ValueError: Jeśli notatka nie istnieje lub odszyfrowanie się nie powiodło
         """
@@ -94,29 +197,31 @@ class ExportingService(ExportServiceInterface):
         if not note:
             raise ValueError(f"Notatka o ID {note_id} nie istnieje")
 
-        # Odszyfruj tytuł i zawartość
-        decrypted_title = await self._decrypt_title(note.title, note.key_private_b64, note_id,user_uuid)
-        decrypted_content = await self._decrypt_content(note.content, note.key_private_b64, note_id,user_uuid)
+        etag = note_etag(note)
+        if etag_matches(if_none_match, etag):
+            return ExportedNote(filename="", etag=etag)
 
-        if not decrypted_title or not decrypted_content:
-            raise ValueError("Nie udało się odszyfrować tytułu lub zawartości notatki")
-
-        # Utwórz bezpieczną nazwę pliku z tytułu (usuń znaki niedozwolone)
-        safe_filename = "".join(c for c in decrypted_title if c.isalnum() or c in (' ', '-', '_')).strip()
-        if not safe_filename:
-            safe_filename = f"note_{note_id}"
-        filename = f"{safe_filename}.txt"
-
-        # Utwórz tymczasowy plik
-        temp_dir = tempfile.gettempdir()
-        file_path = os.path.join(temp_dir, filename)
+        kek = await self._get_kek(user_uuid)
+        streamed = note.stream_id is not None and self.streams is not None
+        # jedno przejście: tytuł i treść odszyfrowane z już wczytanego wiersza
+        if streamed:
+            title, content = self._open(note.title, note.key_private_b64, kek), None
+        else:
+            title, content = await asyncio.to_thread(self._open_note, note, kek)
 
-        # Zapisz zawartość do pliku
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(decrypted_content)
-        except Exception as e:
-            raise ValueError(f"Nie udało się utworzyć pliku: {e}")
+        if not title or (not streamed and content is None):
+            raise ValueError("Nie udało się odszyfrować tytułu lub zawartości notatki")
 
-        return file_path, filename
-    
\ No newline at end of file
+        filename = f"{safe_filename(title, note_id)}.txt"
+        if streamed:
+            # treść strumieniowa - kawałek po kawałku, stała pamięć
+            body = await cast(NoteStreamService, self.streams).read(
+                stream_id=cast(UUID, note.stream_id),
+                user_uuid=user_uuid,
+                server_header=note.content,
+                private_key=base64.b64decode(cast(str, note.key_private_b64)),
+                kek=kek,
+            )
+        else:
+            body = _chunked(cast(str, content).encode("utf-8"))
+        return ExportedNote(filename=filename, etag=etag, body=body)
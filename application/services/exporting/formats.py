@@ -0,0 +1,207 @@
+import codecs
+import csv
+import io
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Type
+
+from application.services.exporting.zip_stream import ZipStream
+
+
+def safe_filename(title: Optional[str], note_id: int) -> str:
+    """Nazwa pliku z tytułu (bez znaków niedozwolonych) albo `note_<id>`."""
+    safe = "".join(c for c in title or "" if c.isalnum() or c in (' ', '-', '_')).strip()
+    return safe or f"note_{note_id}"
+
+
+@dataclass
+class ExportRecord:
+    """Odszyfrowana notatka (lub wpis kosza) z metadanymi do eksportu.
+
+    `content` jest None dla notatek strumieniowych - ich treść przychodzi
+    osobno jako strumień kawałków. `error` oznacza notatkę, której nie udało
+    się odszyfrować (eksportowane są wtedy same metadane).
+    """
+    id: int
+    scope: str
+    title: Optional[str]
+    tags: List[str] = field(default_factory=list)
+    created_at: Optional[datetime] = None
+    trashed_at: Optional[datetime] = None
+    content: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def trashed(self) -> bool:
+        return self.scope == "trash"
+
+    def metadata(self) -> dict:
+        return {
+            "id": self.id,
+            "scope": self.scope,
+            "title": self.title,
+            "tags": self.tags,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "trashed": self.trashed,
+            "trashed_at": self.trashed_at.isoformat() if self.trashed_at else None,
+        }
+
+
+async def _once(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+
+async def _text(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Kawałki bajtów jako tekst - znak UTF-8 rozcięty między kawałkami nie jest psuty."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _content(record: ExportRecord, chunks: Optional[AsyncIterator[bytes]]) -> AsyncIterator[bytes]:
+    if chunks is not None:
+        return chunks
+    return _once((record.content or "").encode("utf-8"))
+
+
+class ExportFormat(ABC):
+    """Format eksportu całego konta - zamienia kolejne rekordy na bajty odpowiedzi.
+
+    Każdy rekord zapisywany jest od razu, a treść notatek strumieniowych
+    kawałek po kawałku, więc żaden format nie trzyma w pamięci więcej niż
+    jednej notatki (formaty ZIP - dodatkowo katalog centralny).
+    """
+
+    media_type: str
+    extension: str
+
+    def start(self) -> bytes:
+        return b""
+
+    @abstractmethod
+    def write(self, record: ExportRecord, chunks: Optional[AsyncIterator[bytes]] = None) -> AsyncIterator[bytes]:
+        """Bajty jednego rekordu; `chunks` to treść notatki strumieniowej."""
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class NdjsonFormat(ExportFormat):
+    """JSON Lines - jeden obiekt na notatkę, treść jako ostatnie pole."""
+
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    async def write(self, record: ExportRecord, chunks: Optional[AsyncIterator[bytes]] = None) -> AsyncIterator[bytes]:
+        meta = {**record.metadata(), "error": record.error}
+        if record.error:
+            yield (json.dumps(meta, ensure_ascii=False) + "\n").encode("utf-8")
+            return
+        # obiekt otwarty przed treścią, żeby treść strumieniowa mogła iść kawałkami
+        yield (json.dumps(meta, ensure_ascii=False)[:-1] + ', "content": "').encode("utf-8")
+        async for text in _text(_content(record, chunks)):
+            yield json.dumps(text, ensure_ascii=False)[1:-1].encode("utf-8")
+        yield b'"}\n'
+
+
+class CsvFormat(ExportFormat):
+    """CSV (RFC 4180) z nagłówkiem; tagi rozdzielone średnikiem, treść w ostatniej kolumnie."""
+
+    media_type = "text/csv; charset=utf-8"
+    extension = "csv"
+    columns = ["id", "scope", "title", "tags", "created_at", "trashed", "trashed_at", "error", "content"]
+
+    @staticmethod
+    def _row(values: list) -> str:
+        out = io.StringIO()
+        csv.writer(out).writerow(values)
+        return out.getvalue()
+
+    def start(self) -> bytes:
+        # BOM - Excel rozpoznaje wtedy UTF-8
+        return ("\ufeff" + self._row(self.columns)).encode("utf-8")
+
+    async def write(self, record: ExportRecord, chunks: Optional[AsyncIterator[bytes]] = None) -> AsyncIterator[bytes]:
+        meta = record.metadata()
+        prefix = self._row([meta["id"], meta["scope"], meta["title"], ";".join(record.tags), meta["created_at"],
+                            meta["trashed"], meta["trashed_at"], record.error or ""])
+        yield (prefix[:-2] + ',"').encode("utf-8")
+        if not record.error:
+            async for text in _text(_content(record, chunks)):
+                yield text.replace('"', '""').encode("utf-8")
+        yield b'"\r\n'
+
+
+class _ZipFormat(ExportFormat):
+    """Archiwum ZIP z plikiem na notatkę (`notes/` i `trash/`) i `errors.txt` na końcu."""
+
+    media_type = "application/zip"
+    extension = "zip"
+    suffix = "txt"
+
+    def __init__(self):
+        self.archive = ZipStream()
+        self.failed: List[str] = []
+
+    def _name(self, record: ExportRecord) -> str:
+        return f"{record.scope}/{record.id} {safe_filename(record.title, record.id)}.{self.suffix}"
+
+    def _body(self, record: ExportRecord, chunks: Optional[AsyncIterator[bytes]]) -> AsyncIterator[bytes]:
+        return _content(record, chunks)
+
+    async def write(self, record: ExportRecord, chunks: Optional[AsyncIterator[bytes]] = None) -> AsyncIterator[bytes]:
+        if record.error:
+            self.failed.append(f"{record.scope} {record.id}")
+            return
+        if chunks is None:
+            # treść w pamięci - jeden wpis ze znanym rozmiarem
+            body = b"".join([piece async for piece in self._body(record, None)])
+            yield self.archive.add(self._name(record), body, record.created_at)
+            return
+        async for data in self.archive.add_stream(self._name(record), self._body(record, chunks), record.created_at):
+            yield data
+
+    def finish(self) -> bytes:
+        out = b""
+        if self.failed:
+            report = "Nie udało się odszyfrować notatek:\n" + "\n".join(self.failed) + "\n"
+            out = self.archive.add("errors.txt", report.encode("utf-8"))
+        return out + self.archive.close()
+
+
+class TextZipFormat(_ZipFormat):
+    """Jeden plik .txt z treścią na notatkę."""
+
+
+class MarkdownFormat(_ZipFormat):
+    """Pliki .md z metadanymi we front matter YAML (tytuł, tagi, daty, stan kosza)."""
+
+    suffix = "md"
+
+    @staticmethod
+    def _front_matter(record: ExportRecord) -> bytes:
+        meta = record.metadata()
+        # wartości jako JSON - poprawny YAML bez osobnej biblioteki
+        lines = ["---"] + [f"{key}: {json.dumps(value, ensure_ascii=False)}" for key, value in meta.items() if key != "scope"]
+        lines += ["---", "", ""]
+        return "\n".join(lines).encode("utf-8")
+
+    async def _body(self, record: ExportRecord, chunks: Optional[AsyncIterator[bytes]]) -> AsyncIterator[bytes]:
+        yield self._front_matter(record)
+        async for piece in _content(record, chunks):
+            yield piece
+
+
+EXPORT_FORMATS: Dict[str, Type[ExportFormat]] = {
+    "zip": TextZipFormat,
+    "markdown": MarkdownFormat,
+    "ndjson": NdjsonFormat,
+    "csv": CsvFormat,
+}
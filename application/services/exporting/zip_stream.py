@@ -0,0 +1,68 @@
+import time
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+
+class _Sink:
+    """Plik tylko do zapisu bez `tell`/`seek` - zipfile przechodzi wtedy w tryb strumieniowy."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class ZipStream:
+    """Archiwum ZIP składane w pamięci i oddawane kawałkami.
+
+    Na nieprzewijalnym wyjściu `zipfile` zapisuje rozmiary i CRC
+    w deskryptorach danych po każdym pliku, więc nic nie trafia na dysk,
+    a w buforze jest najwyżej jeden wpis (lub jeden kawałek notatki
+    strumieniowej). W pamięci zostaje tylko katalog centralny (nazwy plików).
+    """
+
+    def __init__(self, compression: int = zipfile.ZIP_DEFLATED):
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=compression, allowZip64=True)
+
+    def _info(self, name: str, modified: Optional[datetime]) -> zipfile.ZipInfo:
+        stamp = modified.timetuple()[:6] if modified and modified.year >= 1980 else time.localtime()[:6]
+        info = zipfile.ZipInfo(name, date_time=stamp)
+        info.compress_type = self._zip.compression
+        return info
+
+    def add(self, name: str, data: bytes, modified: Optional[datetime] = None) -> bytes:
+        """Dopisuje plik i zwraca bajty archiwum do wysłania."""
+        info = self._info(name, modified)
+        info.file_size = len(data)
+        with self._zip.open(info, "w") as f:
+            f.write(data)
+        return self._sink.drain()
+
+    async def add_stream(self, name: str, chunks: AsyncIterator[bytes], modified: Optional[datetime] = None) -> AsyncIterator[bytes]:
+        """Dopisuje plik o nieznanej długości kawałek po kawałku (ZIP64 na wypadek > 4 GB)."""
+        with self._zip.open(self._info(name, modified), "w", force_zip64=True) as f:
+            async for chunk in chunks:
+                f.write(chunk)
+                data = self._sink.drain()
+                if data:
+                    yield data
+        data = self._sink.drain()
+        if data:
+            yield data
+
+    def close(self) -> bytes:
+        """Zamyka archiwum (katalog centralny) i zwraca ostatnie bajty."""
+        self._zip.close()
+        return self._sink.drain()
@@ -1,102 +1,150 @@
 import base64
 from uuid import UUID
-from typing import List, Optional,cast
+from typing import Dict, List, Optional, Set, Union, cast
 
-from domain.entities import Note, Trash
-from domain.interfaces import NoteRepository, TrashRepository, FilteringServiceInterface
+from domain.entities import Note, Trash, SavedFilter
+from domain.interfaces import NoteRepository, TrashRepository, FilteringServiceInterface, TagRepository, SavedFilterRepository
 
-from application.common.utils import parse_created_at_str,tags_to_list
+from application.common.utils import normalize_title,normalize_tags
+from application.services.filtering.title_hash import TitleHasher
 from application.services.filtering.filter_dto import NotesFilter
 from application.services.encryption_service import EncryptionService
+from application.services.user_key_service import UserKeyService
 
 class FilteringService(FilteringServiceInterface):
-    def __init__(self, encryption_service:EncryptionService,note_repo:NoteRepository,trash_repo:TrashRepository):
+    def __init__(self, encryption_service:EncryptionService,note_repo:NoteRepository,trash_repo:TrashRepository,user_keys:Optional[UserKeyService]=None,tags:Optional[TagRepository]=None,title_hasher:Optional[TitleHasher]=None,saved:Optional[SavedFilterRepository]=None):
         self.encryption = encryption_service
         self.note=note_repo
         self.trash=trash_repo
+        self.user_keys=user_keys
+        # tabela note_tags - fasety liczone jednym zapytaniem GROUP BY
+        self.tags=tags
+        # skrót tytułu - filtr po tytule to zapytanie po indeksie, odszyfrowywane są tylko notatki bez skrótu
+        self.title_hasher=title_hasher
+        # zapisane filtry (inteligentne foldery) - członkostwo trzymane w bazie
+        self.saved=saved
 
-    async def _decrypt_title(self, title_bytes: Optional[bytes], key_private_b64: Optional[str],id:int,user_uuid:UUID) -> Optional[str]:
-        nota = await self.note.get_by_id(note_id=id,user_uuid=user_uuid)
-        trash = await self.trash.get_by_id(note_id=id,user_uuid=user_uuid)
-        if nota is not None:
-            print("DEBUG: brak title_bytes lub key_private_b64")
-            if nota.title==title_bytes:
-                print("tytuły się nie zgadzają")
-                if nota.key_private_b64 == key_private_b64:
-                    print("DEBUG: brak key_private_b64 albo się nie zgadzają")
-                    priv=base64.b64decode(cast(bytes,nota.key_private_b64))
-                    title_dec=self.encryption.decryptserver(nota.title)
-                    priv_decrypt = self.encryption.decrypt_with_private(title_dec.encode(),priv)
-                    return priv_decrypt 
-              
-        if trash is not None:
-            if trash.title==title_bytes:
-               if trash.key_private_b64==key_private_b64:
-                   priv=base64.b64decode(cast(bytes,trash.key_private_b64))
-                   trash_title_dec=self.encryption.decrypt_server(trash.title)
-                   priv_decrypt = self.encryption.decrypt_with_private(trash_title_dec.encode(),priv)
-                   return priv_decrypt
-           
-        if not title_bytes or not key_private_b64:
-            print("DEBUG: brak title_bytes lub key_private_b64")
+    def _title_digest(self, f: NotesFilter, user_uuid: UUID) -> Optional[bytes]:
+        if not f.title or self.title_hasher is None:
             return None
+        return self.title_hasher.digest(user_uuid, f.title)
 
-    async def _match_by_title(self, title_bytes, key_private_b64: Optional[str], f: NotesFilter,id:int,user_uuid:UUID) -> bool:
-        if not f.title:
-            return True
-        decrypted = await self._decrypt_title(title_bytes, key_private_b64,id,user_uuid)
-        if decrypted is None:
-            return False
-        return f.title == decrypted
+    async def facets(self, *, user_uuid: UUID, scope: str = "notes") -> Dict[str, List[dict]]:
+        """Liczba notatek per tag i per miesiąc utworzenia (bez czytania notatek)."""
+        if self.tags is None:
+            return {"tags": [], "months": []}
+        return await self.tags.facets(user_uuid=user_uuid, scope=scope)
 
-    async def _match_by_tag(self, tags, f: NotesFilter) -> bool:
-        if not f.tag:
-            return True
-        return f.tag.lower() in tags_to_list(tags)
+    async def save_filter(self, filters: NotesFilter, *, name: str, scope: str = "notes") -> SavedFilter:
+        """Zapisuje filtr jako inteligentny folder; listowanie nie przegląda już notatek.
 
-    async def _match_by_date(self, created_at_str, f: NotesFilter) -> bool:
-        if not (f.date_eq or f.date_from or f.date_to):
-            return True
+        Tytuł zapisywany jest tylko jako skrót, więc filtr po tytule wymaga
+        skonfigurowanego TitleHasher. Notatki bez `title_hash` (sprzed kolumny
+        albo edytowane bez plaintextu) nie trafiają do filtrów po tytule.
+        """
+        if self.saved is None:
+            raise ValueError("Zapisane filtry nie są dostępne")
+        title_hash = None
+        if filters.title:
+            if self.title_hasher is None:
+                raise ValueError("Filtr po tytule wymaga klucza skrótu tytułu")
+            title_hash = self.title_hasher.digest(filters.user_uuid, filters.title)
+        tag = normalize_tags([filters.tag]) if filters.tag else []
+        saved = SavedFilter(
+            user_uuid=filters.user_uuid,
+            name=name,
+            scope=scope,
+            tag=tag[0] if tag else None,
+            title_hash=title_hash,
+            date_eq=filters.date_eq,
+            date_from=filters.date_from,
+            date_to=filters.date_to,
+        )
+        return await self.saved.add(saved)
 
-        created = parse_created_at_str(created_at_str)
-        if created is None:
-            return False
+    async def saved_filters(self, *, user_uuid: UUID) -> List[SavedFilter]:
+        if self.saved is None:
+            return []
+        return await self.saved.get_all(user_uuid=user_uuid)
 
-        if f.date_eq and created != f.date_eq:
-            return False
-        if f.date_from and created < f.date_from:
+    async def saved_filter(self, *, filter_id: int, user_uuid: UUID) -> Optional[SavedFilter]:
+        if self.saved is None:
+            return None
+        return await self.saved.get(filter_id=filter_id, user_uuid=user_uuid)
+
+    async def saved_filter_notes(self, *, filter_id: int, user_uuid: UUID,
+                                 columns: Optional[Set[str]] = None) -> Optional[List[Union[Note, Trash]]]:
+        """Zawartość folderu albo None, jeśli filtr nie istnieje; z bazy czytane są tylko `columns`."""
+        if self.saved is None:
+            return None
+        return await self.saved.notes(filter_id=filter_id, user_uuid=user_uuid, columns=columns)
+
+    async def delete_saved_filter(self, *, filter_id: int, user_uuid: UUID) -> bool:
+        if self.saved is None:
             return False
-        if f.date_to and created > f.date_to:
+        return await self.saved.delete(filter_id=filter_id, user_uuid=user_uuid)
+
+    async def _get_kek(self, user_uuid:UUID) -> Optional[bytes]:
+        if self.user_keys is None:
+            return None
+        try:
+            return await self.user_keys.get_kek(user_uuid)
+        except Exception:
+            return None
+
+    async def _decrypt_title(self, title_bytes: Optional[bytes], key_private_b64: Optional[str],id:int,user_uuid:UUID,kek:Optional[bytes]=None) -> Optional[str]:
+        # odszyfrowuje tytuł z już wczytanego wiersza (bez ponownego pobierania notatki i kosza)
+        if not title_bytes or not key_private_b64:
+            return None
+        try:
+            priv = base64.b64decode(key_private_b64)
+            package = self.encryption.decrypt_server(title_bytes).encode()
+            return self.encryption.decrypt_package(package, private_key=priv, kek=kek)
+        except Exception:
+            return None
+
+    async def _match_by_title(self, title_bytes, key_private_b64: Optional[str], f: NotesFilter,id:int,user_uuid:UUID,kek:Optional[bytes]=None) -> bool:
+        if not f.title:
+            return True
+        decrypted = await self._decrypt_title(title_bytes, key_private_b64,id,user_uuid,kek)
+        if decrypted is None:
             return False
+        return normalize_title(f.title) == normalize_title(decrypted)
 
-        return True
+    async def match_title(self, rows: List[Union[Note, Trash]], title: str, user_uuid: UUID) -> List[Union[Note, Trash]]:
+        """Resztkowe sprawdzenie tytułu dla wierszy zawężonych już w SQL.
 
-    async def _match_note(self, note: Note, f: NotesFilter,id:int,*,user_uuid:UUID) -> bool:
-        return (
-            await self._match_by_title(note.title, note.key_private_b64, f,id,user_uuid) and
-            await self._match_by_tag(note.tags, f) and
-            await self._match_by_date(note.created_at, f)
-        )
+        Zgodny skrót przechodzi bez odszyfrowywania, pozostałe wiersze
+        (bez skrótu albo bez TitleHasher) są odszyfrowywane i porównywane.
+        """
+        f = NotesFilter(title=title, user_uuid=user_uuid)
+        wanted = self._title_digest(f, user_uuid)
+        kek = await self._get_kek(user_uuid)
+        matching = []
+        for row in rows:
+            if wanted is not None and row.title_hash == wanted:
+                matching.append(row)
+            elif await self._match_by_title(row.title, row.key_private_b64, f, cast(int, row.id), user_uuid, kek):
+                matching.append(row)
+        return matching
 
-    async def _match_trash(self, trash: Trash, f: NotesFilter,id:int,user_uuid:UUID) -> bool:
-        return (
-            await self._match_by_title(trash.title, trash.key_private_b64, f,id,user_uuid) and
-            await self._match_by_tag(trash.tags, f) and
-            await self._match_by_date(trash.created_at, f)
-        )
+    async def filter_page(self, repo: Union[NoteRepository, TrashRepository], filters: NotesFilter, user_uuid: UUID, *,
+                          columns: Optional[Set[str]] = None, after_id: Optional[int] = None,
+                          limit: Optional[int] = None) -> List[Union[Note, Trash]]:
+        """Strona wyników filtra: tag, daty i skrót tytułu w SQL, po id od `after_id`.
 
-    async def filter_notes(self, repo: NoteRepository, filters: NotesFilter,user_uuid:UUID) -> List[Note]:
-        all_notes = await repo.get_all(user_uuid=user_uuid)
-        matching_notes = []
-        for note in all_notes:
-            if await self._match_note(note=note, f=filters, id=note.id,user_uuid=user_uuid):
-                matching_notes.append(note)
-        return matching_notes
-
-    async def filter_trash(self, repo: TrashRepository, filters: NotesFilter,user_uuid:UUID) -> List[Trash]:
-        all_trash = await repo.get_all(user_uuid=user_uuid)
-        matching_trash = []
-        for trash in all_trash:
-            if await self._match_trash(trash=trash, f=filters, id=cast(int,trash.id),user_uuid=user_uuid):
-                matching_trash.append(trash)
-        return matching_trash
+        Z bazy czytane są tylko `columns` (None - wszystkie). Filtr po tytule
+        dokłada kolumny tytułu i sprawdza go resztkowo (`match_title`), więc
+        `limit` jest wtedy stosowany dopiero po dopasowaniu.
+        """
+        date_from = filters.date_eq or filters.date_from
+        date_to = filters.date_eq or filters.date_to
+        prefilter = dict(user_uuid=user_uuid, tag=filters.tag, date_from=date_from, date_to=date_to,
+                         title_hash=self._title_digest(filters, user_uuid), after_id=after_id)
+        if not filters.title:
+            return await repo.get_prefiltered(**prefilter, columns=columns, limit=limit)
+        if columns is not None:
+            columns = columns | {"title", "key_private_b64", "title_hash"}
+        rows = await repo.get_prefiltered(**prefilter, columns=columns)
+        rows = await self.match_title(rows, filters.title, user_uuid)
+        return rows[:limit] if limit else rows
@@ -0,0 +1,29 @@
+import hashlib
+import hmac
+from typing import Optional
+from uuid import UUID
+
+from application.common.utils import normalize_title
+
+
+class TitleHasher:
+    """Deterministyczny, kluczowany skrót znormalizowanego tytułu (kolumna `title_hash`).
+
+    HMAC-SHA256 kluczem wyprowadzonym per użytkownik z SEARCH_INDEX_KEY, więc
+    ten sam tytuł u dwóch użytkowników daje różne skróty, a baza nie pozwala
+    sprawdzić tytułu bez klucza. Ujawnia tylko, które notatki użytkownika mają
+    równe tytuły - tyle samo co ślepy indeks słów.
+    """
+
+    def __init__(self, key: bytes):
+        self._key = key
+
+    def _user_key(self, user_uuid: UUID) -> bytes:
+        return hmac.new(self._key, b"title-hash:" + user_uuid.bytes, hashlib.sha256).digest()
+
+    def digest(self, user_uuid: UUID, title: Optional[str]) -> Optional[bytes]:
+        """Skrót tytułu albo None dla pustego tytułu."""
+        normalized = normalize_title(title)
+        if not normalized:
+            return None
+        return hmac.new(self._user_key(user_uuid), normalized.encode(), hashlib.sha256).digest()
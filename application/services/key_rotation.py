@@ -0,0 +1,146 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from domain.entities import CipherRow, RotationCheckpoint
+from domain.interfaces import KeyRotationRepository, UserKeyRepository
+from application.services.encryption_service import EncryptionService
+
+
+class ServerKeyRotationService:
+    """Online rotacja klucza warstwy serwerowej.
+
+    Przechodzi tabele `notes`, `trash`, `note_chunks` i `export_job_chunks`
+    (wyniki eksportów w tle) partiami w kolejności id (keyset pagination), przepisuje szyfrogram warstwy serwerowej na klucz główny
+    i po każdej partii zapisuje checkpoint - przerwane zadanie wznawia się
+    od ostatniego przetworzonego id. Na końcu rotowane są też zaszyfrowane
+    klucze główne użytkowników z `user_keys`. Tempo jest ograniczone budżetem
+    `rows_per_second`, żeby rotacja nie wysycała bazy.
+
+    Wiersze nieczytelne żadnym kluczem trafiają do `checkpoint.skipped_ids`
+    i są ponawiane przy każdym uruchomieniu - dopóki jakiś zostaje, tabela
+    nie jest `finished` (stary klucz nie może jeszcze zostać usunięty).
+    """
+
+    TABLES = ("notes", "trash", "note_chunks", "export_job_chunks")
+
+    def __init__(
+        self,
+        repo: KeyRotationRepository,
+        encryption: EncryptionService,
+        *,
+        batch_size: int = 200,
+        rows_per_second: float = 500.0,
+        progress: Optional[Callable[[RotationCheckpoint, int], None]] = None,
+        user_keys: Optional[UserKeyRepository] = None,
+        skipped: Optional[Callable[[str, int, Exception], None]] = None,
+    ):
+        """
+        Args:
+            repo: Repository with cross-user access to ciphertext rows
+            encryption: Service configured with the new primary key and all previous keys
+            batch_size: Rows fetched and rewritten per batch
+            rows_per_second: Throughput budget (<= 0 disables throttling)
+            progress: Callback called after each batch with (checkpoint, total_rows)
+            user_keys: Repository of user master keys, rotated after the note tables
+            skipped: Callback called with (table_name, row_id, error) for a row no key can decrypt
+        """
+        self.repo = repo
+        self.encryption = encryption
+        self.batch_size = max(1, batch_size)
+        self.rows_per_second = rows_per_second
+        self.progress = progress
+        self.user_keys = user_keys
+        self.skipped = skipped
+
+    def _rotate_field(self, value: bytes) -> Optional[bytes]:
+        return self.encryption.rotate_server(value)
+
+    async def _throttle(self, rows: int, started: float) -> None:
+        if self.rows_per_second <= 0:
+            return
+        budget = rows / self.rows_per_second
+        elapsed = time.monotonic() - started
+        if elapsed < budget:
+            await asyncio.sleep(budget - elapsed)
+
+    async def _rotate_row(self, checkpoint: RotationCheckpoint, row: CipherRow) -> bool:
+        """Rotuje jeden wiersz; False, gdy nie da się go odszyfrować."""
+        try:
+            rotated = {name: self._rotate_field(value) for name, value in row.fields.items()}
+        except Exception as e:
+            # wiersz nieczytelny żadnym kluczem - nie blokuje rotacji reszty, ale zostaje do ponowienia
+            if self.skipped:
+                self.skipped(checkpoint.table_name, row.id, e)
+            return False
+        new_fields = {name: value for name, value in rotated.items() if value is not None}
+        if new_fields and await self.repo.swap_ciphertext(checkpoint.table_name, row, new_fields):
+            # jeśli wiersz zmienił się w międzyczasie, zapis aplikacji użył już klucza głównego
+            checkpoint.rows_rotated += 1
+        return True
+
+    async def _retry_skipped(self, checkpoint: RotationCheckpoint) -> None:
+        remaining: List[int] = []
+        for i in range(0, len(checkpoint.skipped_ids), self.batch_size):
+            ids = checkpoint.skipped_ids[i:i + self.batch_size]
+            # usunięte w międzyczasie wiersze po prostu znikają z listy
+            for row in await self.repo.fetch_rows(checkpoint.table_name, ids=ids):
+                if not await self._rotate_row(checkpoint, row):
+                    remaining.append(row.id)
+        checkpoint.skipped_ids = remaining
+
+    async def rotate_table(self, job_id: str, table_name: str) -> RotationCheckpoint:
+        checkpoint = await self.repo.get_checkpoint(job_id, table_name)
+        if checkpoint is None:
+            checkpoint = RotationCheckpoint(job_id=job_id, table_name=table_name)
+        if checkpoint.finished:
+            return checkpoint
+
+        # wiersze pominięte w poprzednich uruchomieniach (np. po dodaniu brakującego klucza)
+        if checkpoint.skipped_ids:
+            await self._retry_skipped(checkpoint)
+
+        total = checkpoint.rows_scanned + await self.repo.count_rows(table_name, after_id=checkpoint.last_id)
+
+        while True:
+            started = time.monotonic()
+            batch = await self.repo.fetch_batch(table_name, after_id=checkpoint.last_id, limit=self.batch_size)
+            if not batch:
+                break
+
+            for row in batch:
+                if not await self._rotate_row(checkpoint, row) and row.id not in checkpoint.skipped_ids:
+                    checkpoint.skipped_ids.append(row.id)
+
+            checkpoint.last_id = batch[-1].id
+            checkpoint.rows_scanned += len(batch)
+            checkpoint.updated_at = datetime.utcnow()
+            await self.repo.save_checkpoint(checkpoint)
+            if self.progress:
+                self.progress(checkpoint, total)
+
+            await self._throttle(len(batch), started)
+
+        checkpoint.finished = not checkpoint.skipped_ids
+        checkpoint.updated_at = datetime.utcnow()
+        await self.repo.save_checkpoint(checkpoint)
+        return checkpoint
+
+    async def rotate_user_keys(self) -> int:
+        """Rotuje `user_keys.private_key_enc` (jeden wiersz na użytkownika, idempotentnie)."""
+        if self.user_keys is None:
+            return 0
+        rotated = 0
+        for keys in await self.user_keys.get_all():
+            new_value = self._rotate_field(keys.private_key_enc)
+            if new_value is not None:
+                await self.user_keys.update_private_key(keys.user_uuid, new_value)
+                rotated += 1
+        return rotated
+
+    async def run(self, job_id: str) -> Dict[str, RotationCheckpoint]:
+        """Rotuje wszystkie tabele; ponowne wywołanie z tym samym `job_id` wznawia pracę."""
+        result = {table: await self.rotate_table(job_id, table) for table in self.TABLES}
+        await self.rotate_user_keys()
+        return result
@@ -0,0 +1,91 @@
+import base64
+from typing import Iterable, Optional, Set, Tuple, Union
+
+from domain.entities import Note, Trash
+from application.common.utils import format_datetime_to_str
+from application.services.encryption_service import EncryptionService
+
+
+NOTE_FIELDS: Tuple[str, ...] = ("id", "title", "content", "tags", "private_key", "created_at")
+TRASH_FIELDS: Tuple[str, ...] = NOTE_FIELDS + ("trashed_at",)
+
+# kolumny potrzebne do zbudowania pola odpowiedzi
+_FIELD_COLUMNS = {
+    "id": {"id"},
+    "title": {"title", "key_private_b64"},
+    "content": {"content", "key_private_b64", "stream_id"},
+    "tags": {"tags"},
+    "private_key": {"key_private_b64"},
+    "created_at": {"created_at"},
+    "trashed_at": {"trashed_at"},
+}
+
+
+def parse_fields(value: Optional[str], allowed: Tuple[str, ...] = NOTE_FIELDS) -> Tuple[str, ...]:
+    """`fields=title,created_at` -> wybrane pola w kolejności `allowed` (id zawsze).
+
+    Brak parametru oznacza wszystkie pola (dotychczasowa odpowiedź).
+
+    Raises:
+        ValueError: nieznane pole
+    """
+    if value is None or not value.strip():
+        return allowed
+    requested = {name.strip().lower() for name in value.split(",") if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"Nieznane pola: {', '.join(sorted(unknown))} (dozwolone: {', '.join(allowed)})")
+    requested.add("id")
+    return tuple(name for name in allowed if name in requested)
+
+
+def field_columns(fields: Iterable[str]) -> Set[str]:
+    """Kolumny tabeli notes/trash, które trzeba wybrać dla `fields` - bez `content` treść nie jest czytana."""
+    columns: Set[str] = set()
+    for name in fields:
+        columns |= _FIELD_COLUMNS[name]
+    return columns
+
+
+def needs_kek(fields: Iterable[str]) -> bool:
+    """KEK odpieczętowywany jest tylko, gdy odszyfrowywany jest tytuł lub treść."""
+    return any(name in ("title", "content") for name in fields)
+
+
+def note_view(
+    encryption: EncryptionService,
+    row: Union[Note, Trash],
+    fields: Tuple[str, ...],
+    *,
+    kek: Optional[bytes] = None,
+    missing_key: str = "No private key stored",
+) -> dict:
+    """Pola odpowiedzi listy z już wczytanego wiersza; odszyfrowywane są tylko `title`/`content` z `fields`.
+
+    Treść notatek strumieniowych to None (czytana przez /notes/{id}/stream).
+    Błąd odszyfrowania jest przekazywany dalej - router zwraca 400.
+    """
+    privkey = base64.b64decode(row.key_private_b64) if row.key_private_b64 else None
+
+    def _open(value: bytes) -> str:
+        if privkey is None:
+            return missing_key
+        return encryption.decrypt_package(encryption.decrypt_server(value).encode(), private_key=privkey, kek=kek)
+
+    view: dict = {}
+    for name in fields:
+        if name == "id":
+            view["id"] = row.id
+        elif name == "title":
+            view["title"] = _open(row.title)
+        elif name == "content":
+            view["content"] = None if row.stream_id is not None else _open(row.content)
+        elif name == "tags":
+            view["tags"] = row.tags
+        elif name == "private_key":
+            view["private_key"] = row.key_private_b64
+        elif name == "created_at":
+            view["created_at"] = format_datetime_to_str(row.created_at)
+        elif name == "trashed_at":
+            view["trashed_at"] = format_datetime_to_str(getattr(row, "trashed_at", None))
+    return view
@@ -0,0 +1,117 @@
+from typing import AsyncIterator, Optional, Tuple
+from uuid import UUID, uuid4
+
+from domain.entities import NoteChunk
+from domain.interfaces import NoteChunkRepository
+from application.services.encryption_service import EncryptionService
+from application.services.stream_encryption import STREAM_CHUNK_SIZE
+
+
+class NoteStreamService:
+    """Zapis i odczyt treści notatek w kawałkach o stałym rozmiarze.
+
+    Każdy kawałek przechodzi obie warstwy osobno (secretstream klienta,
+    potem warstwa serwerowa) i trafia do `note_chunks` jako osobny wiersz,
+    więc pamięć procesu nie zależy od rozmiaru notatki.
+    """
+
+    # ile kawałków pobierać z bazy naraz przy odczycie
+    READ_BATCH = 8
+
+    def __init__(self, chunks: NoteChunkRepository, encryption: EncryptionService, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.chunks = chunks
+        self.encryption = encryption
+        self.chunk_size = chunk_size
+
+    async def _rechunk(self, body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Dzieli dowolnie pocięte dane wejściowe na kawałki po `chunk_size` bajtów."""
+        buffer = bytearray()
+        async for piece in body:
+            buffer += piece
+            while len(buffer) >= self.chunk_size:
+                yield bytes(buffer[:self.chunk_size])
+                del buffer[:self.chunk_size]
+        if buffer:
+            yield bytes(buffer)
+
+    async def write(
+        self,
+        *,
+        user_uuid: UUID,
+        body: AsyncIterator[bytes],
+        recipient_public_key: bytes,
+        kek: Optional[bytes] = None,
+    ) -> Tuple[UUID, bytes, int]:
+        """Szyfruje i zapisuje strumień.
+
+        Przerwany zapis (rozłączenie klienta, błąd szyfrowania lub bazy)
+        usuwa już zapisane kawałki - bez wiersza notatki nic by ich nie usunęło.
+
+        Returns:
+            (stream_id, paczka nagłówka "s1" zaszyfrowana warstwą serwerową, rozmiar plaintextu)
+        """
+        stream_id = uuid4()
+        header_package, encryptor = self.encryption.stream_encryptor(recipient_public_key, kek)
+
+        seq = 0
+        size = 0
+        pending: Optional[bytes] = None
+        try:
+            # jeden kawałek wyprzedzenia - ostatni musi dostać tag FINAL
+            async for chunk in self._rechunk(body):
+                if pending is not None:
+                    await self._store(stream_id, seq, encryptor.push(pending), user_uuid)
+                    seq += 1
+                pending = chunk
+                size += len(chunk)
+            await self._store(stream_id, seq, encryptor.push(pending or b"", final=True), user_uuid)
+            server_header = self.encryption.encrypt_server(header_package.decode())
+        except BaseException:
+            # także CancelledError przy rozłączeniu klienta
+            await self.discard(stream_id=stream_id, user_uuid=user_uuid)
+            raise
+
+        return stream_id, server_header, size
+
+    async def discard(self, *, stream_id: UUID, user_uuid: UUID) -> None:
+        """Usuwa kawałki strumienia, do którego nie powstał wiersz notatki."""
+        await self.chunks.delete_stream(stream_id=stream_id, user_uuid=user_uuid)
+
+    async def _store(self, stream_id: UUID, seq: int, client_chunk: bytes, user_uuid: UUID) -> None:
+        data = self.encryption.encrypt_server_bytes(client_chunk)
+        await self.chunks.add(NoteChunk(stream_id=stream_id, seq=seq, data=data), user_uuid=user_uuid)
+
+    async def read(
+        self,
+        *,
+        stream_id: UUID,
+        user_uuid: UUID,
+        server_header: bytes,
+        private_key: Optional[bytes] = None,
+        kek: Optional[bytes] = None,
+    ) -> AsyncIterator[bytes]:
+        """Zwraca iterator odszyfrowanych kawałków treści.
+
+        Klucz strumienia jest otwierany od razu, więc błędny klucz prywatny
+        zgłasza ValueError przed wysłaniem pierwszego bajtu odpowiedzi.
+        """
+        header_package = self.encryption.decrypt_server(server_header).encode()
+        decryptor = self.encryption.stream_decryptor(header_package, private_key=private_key, kek=kek)
+
+        async def _iterate() -> AsyncIterator[bytes]:
+            after_seq = -1
+            while True:
+                batch = await self.chunks.get_batch(stream_id=stream_id, user_uuid=user_uuid,
+                                                    after_seq=after_seq, limit=self.READ_BATCH)
+                if not batch:
+                    break
+                for chunk in batch:
+                    yield decryptor.pull(self.encryption.decrypt_server_bytes(chunk.data))
+                    after_seq = chunk.seq
+            if not decryptor.finished:
+                raise ValueError("strumień treści jest niekompletny")
+
+        return _iterate()
+
+    async def delete(self, *, stream_id: UUID, user_uuid: UUID) -> int:
+        return await self.chunks.delete_stream(stream_id=stream_id, user_uuid=user_uuid)
@@ -0,0 +1,133 @@
+import hashlib
+import hmac
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+from uuid import UUID
+
+from domain.interfaces import NoteIndexer, SearchIndexRepository
+
+
+NOTES = "notes"
+TRASH = "trash"
+WORD = "word"
+TRIGRAM = "tri"
+# znacznik "notatka jest w indeksie" - pozwala odróżnić brak trafień od braku wpisów
+MARKER = "note"
+MARKER_TOKEN = b"\x00"
+
+# długość tokenu (bajty) - 128 bitów wystarcza, by kolizje były pomijalne
+TOKEN_SIZE = 16
+# dłuższe "słowa" to zwykle wklejone klucze/base64 - nie indeksujemy ich
+MAX_WORD_LENGTH = 64
+
+_WORD_RE = re.compile(r"\w+")
+# litery, których NFKD nie rozkłada na literę bazową + znak diakrytyczny
+_FOLD = str.maketrans({"ł": "l", "ø": "o", "đ": "d", "ß": "ss"})
+
+
+def normalize(text: str) -> str:
+    """Małe litery, bez znaków diakrytycznych (ą -> a, ł -> l, é -> e)."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold().translate(_FOLD))
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def word_list(text: Optional[str]) -> List[str]:
+    """Znormalizowane słowa tekstu w kolejności wystąpienia (z powtórzeniami)."""
+    if not text:
+        return []
+    return [w for w in _WORD_RE.findall(normalize(text)) if len(w) <= MAX_WORD_LENGTH]
+
+
+def words(text: Optional[str]) -> Set[str]:
+    """Zbiór znormalizowanych słów tekstu."""
+    return set(word_list(text))
+
+
+def trigrams(terms: Iterable[str]) -> Set[str]:
+    """Trigramy znormalizowanych słów (słowa krótsze niż 3 znaki nie dają żadnego)."""
+    return {term[i:i + 3] for term in terms for i in range(len(term) - 2)}
+
+
+class BlindIndexService(NoteIndexer):
+    """Ślepy indeks odwrócony dla wyszukiwania całych słów i podciągów.
+
+    Słowa oraz trigramy słów z tytułu, treści i tagów są zapisywane
+    w `search_tokens` jako HMAC-SHA256 kluczem wyprowadzonym per użytkownik,
+    więc baza nie zawiera plaintextu, a te same słowa u różnych użytkowników
+    dają różne tokeny. Zapytanie jest tokenizowane tak samo i rozwiązywane
+    jednym zapytaniem SQL po indeksie na każdą klauzulę OR:
+    - całe słowa: trafienie w indeksie jest wynikiem
+    - podciągi: trafienie jest kandydatem, który trzeba odszyfrować i sprawdzić
+      (trigramy nie gwarantują kolejności ani sąsiedztwa)
+    """
+
+    def __init__(self, repo: SearchIndexRepository, index_key: bytes):
+        self.repo = repo
+        self._index_key = index_key
+
+    def _user_key(self, user_uuid: UUID) -> bytes:
+        return hmac.new(self._index_key, b"search-index:" + user_uuid.bytes, hashlib.sha256).digest()
+
+    def tokens(self, user_uuid: UUID, values: Iterable[str]) -> Set[bytes]:
+        key = self._user_key(user_uuid)
+        return {hmac.new(key, value.encode(), hashlib.sha256).digest()[:TOKEN_SIZE] for value in values}
+
+    def _note_tokens(self, user_uuid: UUID, title: Optional[str], content: Optional[str], tags: Optional[List[str]]) -> Dict[str, Set[bytes]]:
+        terms = words(title) | words(content)
+        for tag in tags or []:
+            terms |= words(tag)
+        return {
+            MARKER: {MARKER_TOKEN},
+            WORD: self.tokens(user_uuid, terms),
+            TRIGRAM: self.tokens(user_uuid, trigrams(terms)),
+        }
+
+    async def index_note(
+        self,
+        *,
+        user_uuid: UUID,
+        note_id: int,
+        title: Optional[str],
+        content: Optional[str],
+        tags: Optional[List[str]] = None,
+        scope: str = NOTES,
+    ) -> None:
+        """Zastępuje wpisy indeksu notatki (plaintext nie jest nigdzie zapisywany)."""
+        tokens = self._note_tokens(user_uuid, title, content, tags)
+        await self.repo.replace(user_uuid=user_uuid, scope=scope, note_id=note_id, tokens=tokens)
+
+    async def move(self, *, user_uuid: UUID, from_scope: str, from_id: int, to_scope: str, to_id: int) -> None:
+        """Przenosi wpisy przy przenoszeniu notatki do kosza i z powrotem (zmienia się id)."""
+        await self.repo.move(user_uuid=user_uuid, from_scope=from_scope, from_id=from_id, to_scope=to_scope, to_id=to_id)
+
+    async def remove(self, *, user_uuid: UUID, note_id: int, scope: str = NOTES) -> None:
+        await self.repo.remove(user_uuid=user_uuid, scope=scope, note_id=note_id)
+
+    async def candidates(self, *, user_uuid: UUID, clauses: Iterable[Sequence[str]], whole_word: bool, scope: str = NOTES) -> Optional[Set[int]]:
+        """Id notatek, które mogą spełniać zapytanie (suma kandydatów klauzul OR).
+
+        `clauses` to wymagane terminy każdej klauzuli (wykluczenia nie zawężają).
+        Całe słowa: notatki zawierające wszystkie słowa klauzuli - dokładny wynik
+        dla klauzuli samych słów, nadzbiór dla fraz (indeks nie zna kolejności).
+        Podciągi: notatki zawierające wszystkie trigramy klauzuli - zawsze nadzbiór;
+        słowa krótsze niż 3 znaki są pomijane przy zawężaniu.
+        Zwraca None, gdy którejś klauzuli nie da się zawęzić (np. "ab") - wtedy
+        potrzebny jest pełny przegląd.
+        """
+        ids: Set[int] = set()
+        for required in clauses:
+            terms: Set[str] = set()
+            for term in required:
+                terms |= words(term)
+            values = terms if whole_word else trigrams(terms)
+            if not values:
+                return None
+            ids.update(await self.repo.find(
+                user_uuid=user_uuid, scope=scope, kind=WORD if whole_word else TRIGRAM, tokens=list(self.tokens(user_uuid, values)),
+            ))
+        return ids
+
+    async def indexed_ids(self, *, user_uuid: UUID, scope: str = NOTES) -> Set[int]:
+        """Id notatek, które mają wpisy w indeksie (reszta wymaga pełnego sprawdzenia)."""
+        return set(await self.repo.find(user_uuid=user_uuid, scope=scope, kind=MARKER, tokens=[MARKER_TOKEN]))
@@ -0,0 +1,33 @@
+from typing import List, Optional, Sequence
+from uuid import UUID
+
+from domain.interfaces import NoteIndexer
+from application.services.search.blind_index import NOTES
+
+
+class NoteIndexers(NoteIndexer):
+    """Przekazuje zmiany notatek do wszystkich skonfigurowanych indeksów (ślepy, w pamięci)."""
+
+    def __init__(self, indexers: Sequence[NoteIndexer]):
+        self.indexers = list(indexers)
+
+    async def index_note(
+        self,
+        *,
+        user_uuid: UUID,
+        note_id: int,
+        title: Optional[str],
+        content: Optional[str],
+        tags: Optional[List[str]] = None,
+        scope: str = NOTES,
+    ) -> None:
+        for indexer in self.indexers:
+            await indexer.index_note(user_uuid=user_uuid, note_id=note_id, title=title, content=content, tags=tags, scope=scope)
+
+    async def move(self, *, user_uuid: UUID, from_scope: str, from_id: int, to_scope: str, to_id: int) -> None:
+        for indexer in self.indexers:
+            await indexer.move(user_uuid=user_uuid, from_scope=from_scope, from_id=from_id, to_scope=to_scope, to_id=to_id)
+
+    async def remove(self, *, user_uuid: UUID, note_id: int, scope: str = NOTES) -> None:
+        for indexer in self.indexers:
+            await indexer.remove(user_uuid=user_uuid, note_id=note_id, scope=scope)
@@ -0,0 +1,195 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from uuid import UUID
+
+from domain.interfaces import AccountVersionRepository, NoteIndexer
+from application.services.search.blind_index import NOTES, TRASH
+from application.services.search.query import CompiledQuery, prepare_text, prepare_words
+from application.services.search.suggest_index import SuggestIndex
+
+
+# przybliżony narzut obiektów Pythona na jedną notatkę (bajty)
+_ENTRY_OVERHEAD = 256
+
+
+class IndexedNote:
+    """Odszyfrowane pola jednej notatki przygotowane do dopasowania.
+
+    Każde pole trzymane jest w dwóch postaciach (`query.prepare_text`
+    i `query.prepare_words`), więc wyszukiwanie nie normalizuje tekstu ponownie.
+    """
+
+    __slots__ = ("fields", "word_fields", "size")
+
+    def __init__(self, title: Optional[str], content: Optional[str], tags: Optional[List[str]]):
+        # kolejność jak w SearchService: tagi, tytuł, treść
+        raw = [*(tags or []), title or "", content or ""]
+        self.fields: Tuple[str, ...] = tuple(prepare_text(field) for field in raw)
+        self.word_fields: Tuple[str, ...] = tuple(prepare_words(field) for field in raw)
+        self.size = (
+            _ENTRY_OVERHEAD
+            + sum(len(field) + 64 for field in self.fields)
+            + sum(len(field) + 64 for field in self.word_fields)
+        )
+
+    def matches(self, query: CompiledQuery) -> bool:
+        return query.match_prepared(self.word_fields if query.whole_word else self.fields)
+
+
+class _UserIndex:
+    def __init__(self, loaded_at: float, version: Optional[int] = None):
+        self.loaded_at = loaded_at
+        # wersja konta (AccountVersionRepository), którą odzwierciedla indeks
+        self.version = version
+        self.scopes: Dict[str, Dict[int, IndexedNote]] = {NOTES: {}, TRASH: {}}
+        self.size = 0
+
+
+class InMemorySearchIndex(NoteIndexer):
+    """Opcjonalny indeks wyszukiwania w pamięci procesu (plaintext w RAM!).
+
+    Przy pierwszym wyszukiwaniu użytkownika `SearchService` odszyfrowuje raz
+    jego notatki i kosz i wywołuje `load`; potem zmiany są nanoszone
+    przyrostowo przez use case'y (create / edit / trash / restore / delete).
+    Przy przekroczeniu budżetu pamięci usuwani są całi użytkownicy w kolejności
+    LRU.
+
+    Zmiany z innych procesów (inne workery API, worker kosza) nie docierają
+    do tego indeksu - indeks pamięta wersję konta, z której powstał, i przy
+    innej wersji jest budowany od nowa. Wersje podbite w tym procesie
+    (`IndexedAccountVersions`) przesuwają ją bez przebudowy, bo zmiana jest już
+    naniesiona przyrostowo. `ttl_seconds` to dodatkowy limit wieku indeksu.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float = 300.0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._users: "OrderedDict[UUID, _UserIndex]" = OrderedDict()
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _get(self, user_uuid: UUID) -> Optional[_UserIndex]:
+        user = self._users.get(user_uuid)
+        if user is None:
+            return None
+        if self.ttl_seconds > 0 and time.monotonic() - user.loaded_at > self.ttl_seconds:
+            self.evict(user_uuid)
+            return None
+        self._users.move_to_end(user_uuid)
+        return user
+
+    def is_loaded(self, user_uuid: UUID, version: Optional[int] = None) -> bool:
+        """Czy indeks użytkownika jest w pamięci i (przy podanej `version`) aktualny."""
+        user = self._get(user_uuid)
+        if user is None:
+            return False
+        if version is not None and user.version != version:
+            self.evict(user_uuid)
+            return False
+        return True
+
+    def version_bumped(self, user_uuid: UUID, version: int) -> None:
+        """Zmiana z tego procesu: indeks przechodzi na `version` tylko, jeśli nie przegapił innej zmiany."""
+        user = self._users.get(user_uuid)
+        if user is not None and user.version is not None and user.version == version - 1:
+            user.version = version
+
+    def evict(self, user_uuid: UUID) -> None:
+        user = self._users.pop(user_uuid, None)
+        if user is not None:
+            self._size -= user.size
+
+    def _enforce_budget(self) -> None:
+        # najdłużej nieużywani użytkownicy wypadają pierwsi; ostatnio użyty zostaje zawsze
+        while self._size > self.max_bytes and len(self._users) > 1:
+            user_uuid, _ = next(iter(self._users.items()))
+            self.evict(user_uuid)
+
+    def load(self, user_uuid: UUID, entries: Dict[str, Iterable[tuple]], version: Optional[int] = None) -> None:
+        """Buduje indeks użytkownika; `entries` to {zakres: [(id, tytuł, treść, tagi), ...]}.
+
+        `version` - wersja konta odczytana przed pobraniem wierszy.
+        """
+        self.evict(user_uuid)
+        user = _UserIndex(time.monotonic(), version)
+        for scope, rows in entries.items():
+            for note_id, title, content, tags in rows:
+                entry = IndexedNote(title, content, tags)
+                user.scopes[scope][note_id] = entry
+                user.size += entry.size
+        self._users[user_uuid] = user
+        self._size += user.size
+        self._enforce_budget()
+
+    def search(self, user_uuid: UUID, query: CompiledQuery, *, scope: str = NOTES) -> Optional[List[int]]:
+        """Id pasujących notatek albo None, jeśli użytkownik nie jest w pamięci."""
+        user = self._get(user_uuid)
+        if user is None:
+            return None
+        return [note_id for note_id, entry in user.scopes[scope].items() if entry.matches(query)]
+
+    # --- aktualizacje przyrostowe (NoteIndexer) ---
+    def _put(self, user: _UserIndex, scope: str, note_id: int, entry: Optional[IndexedNote]) -> None:
+        old = user.scopes[scope].pop(note_id, None)
+        delta = -(old.size if old else 0)
+        if entry is not None:
+            user.scopes[scope][note_id] = entry
+            delta += entry.size
+        user.size += delta
+        self._size += delta
+
+    async def index_note(
+        self,
+        *,
+        user_uuid: UUID,
+        note_id: int,
+        title: Optional[str],
+        content: Optional[str],
+        tags: Optional[List[str]] = None,
+        scope: str = NOTES,
+    ) -> None:
+        user = self._get(user_uuid)
+        if user is None:
+            return  # niezaładowany użytkownik zostanie zbudowany przy następnym wyszukiwaniu
+        self._put(user, scope, note_id, IndexedNote(title, content, tags))
+        self._enforce_budget()
+
+    async def move(self, *, user_uuid: UUID, from_scope: str, from_id: int, to_scope: str, to_id: int) -> None:
+        user = self._get(user_uuid)
+        if user is None:
+            return
+        entry = user.scopes[from_scope].get(from_id)
+        self._put(user, from_scope, from_id, None)
+        if entry is not None:
+            self._put(user, to_scope, to_id, entry)
+
+    async def remove(self, *, user_uuid: UUID, note_id: int, scope: str = NOTES) -> None:
+        user = self._get(user_uuid)
+        if user is not None:
+            self._put(user, scope, note_id, None)
+
+
+class IndexedAccountVersions(AccountVersionRepository):
+    """Licznik wersji, który zgłasza podbicia z tego procesu do indeksów w pamięci.
+
+    Use case'y nanoszą zmianę na indeksy (`InMemorySearchIndex`, `SuggestIndex`)
+    przyrostowo i podbijają wersję - dzięki temu indeksy nie są przebudowywane
+    po każdej lokalnej zmianie.
+    """
+
+    def __init__(self, versions: AccountVersionRepository, *indexes: Union[InMemorySearchIndex, SuggestIndex]):
+        self.versions = versions
+        self.indexes = indexes
+
+    async def get(self, user_uuid: UUID) -> int:
+        return await self.versions.get(user_uuid)
+
+    async def bump(self, user_uuid: UUID) -> int:
+        version = await self.versions.bump(user_uuid)
+        for index in self.indexes:
+            index.version_bumped(user_uuid, version)
+        return version
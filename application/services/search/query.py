@@ -0,0 +1,146 @@
+"""Składnia zapytań wyszukiwania i ich kompilacja do jednego przebiegu po notatce.
+
+    kawa herbata          oba terminy (AND jest domyślny, słowo `AND` jest ignorowane)
+    kawa OR herbata       dowolny z terminów (także `|`)
+    "lista zakupów"       fraza - dokładnie ten ciąg
+    kawa -bezkofeinowa    wykluczenie (także -"fraza")
+
+AND wiąże mocniej niż OR: `a b OR c` oznacza (a AND b) OR c. Zapytanie, z którego
+parser nie wyciągnie żadnego terminu (np. samo `OR`), jest traktowane dosłownie.
+
+Wszystkie terminy zapytania są sprawdzane na tych samych odszyfrowanych polach,
+więc notatka jest odszyfrowywana raz niezależnie od liczby terminów.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from application.services.search.blind_index import word_list
+
+
+OR_TOKENS = ("OR", "|")
+AND_TOKEN = "AND"
+
+_TOKEN_RE = re.compile(r'(-?)"([^"]*)"|(\S+)')
+
+
+class Clause:
+    """Koniunkcja: wszystkie `required` obecne i żaden z `excluded`."""
+
+    __slots__ = ("required", "excluded")
+
+    def __init__(self, required: Sequence[str], excluded: Sequence[str]):
+        self.required = tuple(required)
+        self.excluded = tuple(excluded)
+
+
+class ParsedQuery:
+    """Zapytanie w postaci alternatywy klauzul (OR klauzul AND)."""
+
+    def __init__(self, clauses: List[Clause]):
+        self.clauses = clauses
+        # każdy termin raz - jeden wzorzec w dopasowaniu, niezależnie od liczby wystąpień
+        self.terms: List[str] = list(dict.fromkeys(t for c in clauses for t in (*c.required, *c.excluded)))
+
+    @property
+    def positive_terms(self) -> List[str]:
+        return list(dict.fromkeys(t for c in self.clauses for t in c.required))
+
+    @property
+    def is_simple(self) -> bool:
+        """Jedna klauzula samych pojedynczych słów - ślepy indeks słów rozstrzyga ją dokładnie."""
+        if len(self.clauses) != 1 or self.clauses[0].excluded:
+            return False
+        return all(len(word_list(term)) == 1 for term in self.clauses[0].required)
+
+
+def parse_query(query: str) -> ParsedQuery:
+    clauses: List[Clause] = []
+    required: List[str] = []
+    excluded: List[str] = []
+
+    for match in _TOKEN_RE.finditer(query):
+        negate, phrase, token = match.groups()
+        if token is not None:
+            if token in OR_TOKENS:
+                if required or excluded:
+                    clauses.append(Clause(required, excluded))
+                required, excluded = [], []
+                continue
+            if token == AND_TOKEN:
+                continue
+            if token.startswith("-") and len(token) > 1:
+                excluded.append(token[1:])
+            else:
+                required.append(token)
+        elif phrase.strip():
+            (excluded if negate else required).append(phrase.strip())
+    if required or excluded:
+        clauses.append(Clause(required, excluded))
+
+    if not any(c.required for c in clauses):
+        # same wykluczenia / same operatory - nie zgadujemy, szukamy tekstu dosłownie
+        clauses = [Clause([query.strip()], [])]
+    return ParsedQuery(clauses)
+
+
+def prepare_text(text: str) -> str:
+    """Pole w postaci do dopasowania podciągów."""
+    return text.lower()
+
+
+def prepare_words(text: str) -> str:
+    """Pole jako ciąg znormalizowanych słów ze spacjami na brzegach (dopasowanie całych słów i fraz)."""
+    return " " + " ".join(word_list(text)) + " "
+
+
+class CompiledQuery:
+    """Zapytanie przygotowane do sprawdzania notatek; kompilowane raz na wyszukiwanie."""
+
+    def __init__(self, parsed: ParsedQuery, whole_word: bool):
+        self.parsed = parsed
+        self.whole_word = whole_word
+        self.prepare = prepare_words if whole_word else prepare_text
+        if whole_word:
+            # " słowo " albo " słowo1 słowo2 " - tylko całe słowa w tej kolejności
+            patterns: List[Optional[str]] = [prepare_words(t) if word_list(t) else None for t in parsed.terms]
+        else:
+            patterns = [t.lower() for t in parsed.terms]
+        self._patterns = patterns
+        index: Dict[str, int] = {t: i for i, t in enumerate(parsed.terms)}
+        self._clauses = [
+            (frozenset(index[t] for t in c.required), frozenset(index[t] for t in c.excluded))
+            for c in parsed.clauses
+        ]
+        self._has_exclusions = any(excluded for _, excluded in self._clauses)
+
+    def _find(self, prepared: str) -> Set[int]:
+        # `str in` (C) dla każdego terminu - automat wielu wzorców w Pythonie
+        # wygrywa dopiero przy liczbie terminów niespotykanej w zapytaniach
+        return {i for i, pattern in enumerate(self._patterns) if pattern and pattern in prepared}
+
+    def evaluate(self, found: Set[int]) -> bool:
+        return any(required <= found and not (excluded & found) for required, excluded in self._clauses)
+
+    def match_prepared(self, fields: Iterable[Optional[str]]) -> bool:
+        """Sprawdza pola już przygotowane (`prepare`); kolejne pola są pobierane tylko w razie potrzeby.
+
+        Bez wykluczeń kończy po pierwszym polu, po którym zapytanie jest spełnione.
+        """
+        found: Set[int] = set()
+        for field in fields:
+            if field:
+                found |= self._find(field)
+            if not self._has_exclusions and self.evaluate(found):
+                return True
+        return self.evaluate(found)
+
+    def matches(self, fields: Iterable[Optional[str]]) -> bool:
+        """Jak `match_prepared`, dla surowych pól (np. leniwie odszyfrowywanych)."""
+        return self.match_prepared(self.prepare(field) if field else None for field in fields)
+
+
+@lru_cache(maxsize=256)
+def compile_query(query: str, whole_word: bool = False) -> CompiledQuery:
+    return CompiledQuery(parse_query(query), whole_word)
@@ -0,0 +1,84 @@
+import time
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from domain.interfaces import NoteRepository, TrashRepository, SearchServiceInterface, FilteringServiceInterface
+
+from application.services.filtering.filter_dto import NotesFilter
+from application.services.filtering.title_hash import TitleHasher
+from application.services.search.blind_index import NOTES
+from application.services.search.search_dto import NotesSearchQuery, QueryStage, SearchResult
+
+
+def _stage(name: str, started: float, rows_in: Optional[int], rows_out: int, **detail) -> QueryStage:
+    return QueryStage(stage=name, rows_in=rows_in, rows_out=rows_out,
+                      ms=round((time.perf_counter() - started) * 1000, 2), detail=detail)
+
+
+class QueryPlanner:
+    """One query combining `NotesFilter` predicates with a search query.
+
+    Stages, each working only on what the previous one let through:
+    1. `sql` - tag (via `note_tags`), date range and title hash are pushed
+       into a single SQL query; the account is not loaded into the app
+    2. `title` - residual title check: rows whose hash matched pass as is,
+       rows without a hash are decrypted and compared (only with a title filter)
+    3. `match` - the `SearchService` decrypt-and-match pipeline (blind and
+       in-memory indexes included) over the survivors; without a query the
+       survivors are only decrypted for display
+
+    Every stage reports rows in/out and time, returned in explain mode.
+    """
+
+    def __init__(self, note_repo: NoteRepository, trash_repo: TrashRepository, search: SearchServiceInterface,
+                 filtering: FilteringServiceInterface, title_hasher: Optional[TitleHasher] = None):
+        self.note_repo = note_repo
+        self.trash_repo = trash_repo
+        self.search = search
+        self.filtering = filtering
+        self.title_hasher = title_hasher
+
+    async def run(
+        self,
+        filters: NotesFilter,
+        search_query: Optional[NotesSearchQuery] = None,
+        *,
+        scope: str = NOTES,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[SearchResult], List[QueryStage]]:
+        """Returns the results and the executed plan.
+
+        `limit` caps filter-only queries (with a search query the limit of
+        `search_query` applies, as in /search/).
+        """
+        user_uuid: UUID = filters.user_uuid
+        repo = self.note_repo if scope == NOTES else self.trash_repo
+        plan: List[QueryStage] = []
+
+        date_from = filters.date_eq or filters.date_from
+        date_to = filters.date_eq or filters.date_to
+        title_hash = None
+        if filters.title and self.title_hasher is not None:
+            title_hash = self.title_hasher.digest(user_uuid, filters.title)
+        pushed = [name for name, value in (("tag", filters.tag), ("date_from", date_from), ("date_to", date_to),
+                                           ("title_hash", title_hash)) if value]
+
+        started = time.perf_counter()
+        rows = await repo.get_prefiltered(user_uuid=user_uuid, tag=filters.tag, date_from=date_from, date_to=date_to,
+                                          title_hash=title_hash)
+        plan.append(_stage("sql", started, None, len(rows), predicates=pushed))
+
+        if filters.title:
+            started = time.perf_counter()
+            hash_hits = sum(1 for row in rows if title_hash is not None and row.title_hash == title_hash)
+            rows_in = len(rows)
+            rows = await self.filtering.match_title(rows, filters.title, user_uuid)
+            plan.append(_stage("title", started, rows_in, len(rows), hash_hits=hash_hits, decrypted=rows_in - hash_hits))
+
+        if search_query is None and limit:
+            rows = rows[:limit]
+        started = time.perf_counter()
+        results = await self.search.search_rows(rows, search_query, user_uuid, scope)
+        plan.append(_stage("match", started, len(rows), len(results),
+                           query=search_query is not None, ranked=bool(search_query and search_query.ranked)))
+        return results, plan
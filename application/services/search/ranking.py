@@ -0,0 +1,156 @@
+"""Ranking wyników wyszukiwania (BM25) i krótkie fragmenty z podświetleniem.
+
+Pola są ważone jak w uproszczonym BM25F: wystąpienie w tytule liczy się
+jak TITLE_WEIGHT wystąpień w treści, w tagu - jak TAGS_WEIGHT. IDF liczony
+jest z liczby notatek w przeszukiwanym zakresie (`total_docs`) i liczby
+dopasowanych notatek zawierających dany termin - wyszukiwarka nie zna
+częstości terminów w notatkach, których nie odszyfrowała.
+"""
+
+import heapq
+import html
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from application.services.search.blind_index import normalize, word_list
+from application.services.search.query import parse_query
+
+
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 3.0
+TAGS_WEIGHT = 2.0
+CONTENT_WEIGHT = 1.0
+
+DEFAULT_TOP_K = 20
+SNIPPET_CHARS = 160
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+
+def query_terms(query: str) -> List[str]:
+    """Słowa wymaganych terminów zapytania (znormalizowane, bez powtórzeń, w kolejności).
+
+    Operatory i wykluczenia (`OR`, `-słowo`) nie wpływają na wynik.
+    """
+    return list(dict.fromkeys(w for term in parse_query(query).positive_terms for w in word_list(term)))
+
+
+class ScoredDocument:
+    """Statystyki jednej dopasowanej notatki potrzebne do BM25 (bez pełnej treści)."""
+
+    __slots__ = ("item", "tf", "length")
+
+    def __init__(self, item, tf: Dict[str, float], length: float):
+        self.item = item
+        self.tf = tf
+        self.length = length
+
+
+def document_stats(
+    terms: Sequence[str],
+    *,
+    title: Optional[str],
+    content: Optional[str],
+    tags: Optional[Iterable[str]],
+    whole_word: bool,
+) -> Tuple[Dict[str, float], float]:
+    """Ważone częstości terminów zapytania i ważona długość dokumentu.
+
+    W trybie podciągów słowo dokumentu pasuje do terminu, jeśli go zawiera
+    ("czekolada" pasuje do "cze") - tak samo jak samo wyszukiwanie.
+    """
+    tf = {term: 0.0 for term in terms}
+    length = 0.0
+    fields = ((title, TITLE_WEIGHT), (content, CONTENT_WEIGHT), (" ".join(tags or []), TAGS_WEIGHT))
+    for text, weight in fields:
+        tokens = word_list(text)
+        length += weight * len(tokens)
+        for token in tokens:
+            for term in terms:
+                if token == term or (not whole_word and term in token):
+                    tf[term] += weight
+    return tf, length
+
+
+def top_k(documents: List[ScoredDocument], terms: Sequence[str], total_docs: int, k: int) -> List[Tuple[float, object]]:
+    """Liczy BM25 dla wszystkich dokumentów i zwraca k najlepszych (malejąco)."""
+    if not documents:
+        return []
+    n = max(total_docs, len(documents))
+    avgdl = sum(doc.length for doc in documents) / len(documents) or 1.0
+    idf = {}
+    for term in terms:
+        df = sum(1 for doc in documents if doc.tf.get(term))
+        idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def score(doc: ScoredDocument) -> float:
+        norm = K1 * (1 - B + B * doc.length / avgdl)
+        return sum(idf[t] * doc.tf[t] * (K1 + 1) / (doc.tf[t] + norm) for t in terms if doc.tf.get(t))
+
+    # indeks jako drugi klucz - przy remisie wygrywa wcześniejsza notatka
+    scored = ((score(doc), -i, doc.item) for i, doc in enumerate(documents))
+    return [(s, item) for s, _, item in heapq.nlargest(k, scored, key=lambda entry: (entry[0], entry[1]))]
+
+
+def _pattern(query: str, terms: Sequence[str]) -> Optional["re.Pattern[str]"]:
+    needles = {*terms, *(term.lower() for term in parse_query(query).positive_terms)}
+    needles = sorted((n for n in needles if n), key=len, reverse=True)
+    if not needles:
+        return None
+    return re.compile("|".join(re.escape(n) for n in needles), re.IGNORECASE)
+
+
+def _spans(pattern: Optional["re.Pattern[str]"], text: str) -> List[Tuple[int, int]]:
+    """Rozłączne pozycje trafień w tekście i w jego wersji bez diakrytyków.
+
+    Wersja znormalizowana jest używana tylko, gdy ma tę samą długość
+    (ą -> a, ł -> l), więc pozycje odpowiadają oryginałowi.
+    """
+    if pattern is None:
+        return []
+    found = {m.span() for m in pattern.finditer(text)}
+    folded = normalize(text)
+    if folded != text and len(folded) == len(text):
+        found |= {m.span() for m in pattern.finditer(folded)}
+    spans: List[Tuple[int, int]] = []
+    for start, end in sorted(found):
+        if not spans or start >= spans[-1][1]:
+            spans.append((start, end))
+    return spans
+
+
+def snippet(text: Optional[str], query: str, terms: Sequence[str], width: int = SNIPPET_CHARS) -> Optional[str]:
+    """Fragment tekstu (do `width` znaków) wokół pierwszego trafienia, z podświetleniem.
+
+    Tekst jest HTML-escaped, trafienia otoczone `<mark>`; bez trafień
+    zwracany jest początek tekstu.
+    """
+    if not text:
+        return None
+    pattern = _pattern(query, terms)
+    spans = _spans(pattern, text)
+    start = 0
+    if spans:
+        start = max(0, spans[0][0] - width // 3)
+        # nie tniemy słowa na początku fragmentu
+        space = text.rfind(" ", 0, start)
+        if start and space != -1 and start - space < 20:
+            start = space + 1
+    end = min(len(text), start + width)
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        if space > start + width // 2:
+            end = space
+
+    parts = []
+    last = start
+    for s, e in spans:
+        if s < last or e > end:
+            continue
+        parts.append(html.escape(text[last:s]))
+        parts.append(HIGHLIGHT_START + html.escape(text[s:e]) + HIGHLIGHT_END)
+        last = e
+    parts.append(html.escape(text[last:end]))
+    return ("…" if start > 0 else "") + "".join(parts) + ("…" if end < len(text) else "")
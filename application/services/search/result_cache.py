@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+from uuid import UUID
+
+from application.services.search.query import compile_query
+from application.services.search.search_dto import NotesSearchQuery, SearchResult
+
+
+# przybliżony narzut jednego wyniku (obiekty Pythona, encja notatki bez szyfrogramów)
+_RESULT_OVERHEAD = 512
+
+
+def query_key(search_query: NotesSearchQuery) -> Tuple[Hashable, ...]:
+    """Znormalizowana postać zapytania - zapytania o tym samym znaczeniu mają ten sam klucz.
+
+    Wielkość liter, kolejność terminów w klauzuli i odstępy nie wpływają na wynik.
+    """
+    parsed = compile_query(search_query.query, search_query.whole_word).parsed
+    clauses = frozenset(
+        (frozenset(t.lower() for t in c.required), frozenset(t.lower() for t in c.excluded)) for c in parsed.clauses
+    )
+    fields = frozenset(search_query.fields) if search_query.fields is not None else None
+    return clauses, search_query.whole_word, search_query.ranked, search_query.limit, fields
+
+
+def _size(results: List[SearchResult]) -> int:
+    return sum(
+        _RESULT_OVERHEAD + len(r.note.title) + len(r.note.content)
+        + len(r.title or "") + len(r.content or "") + len(r.snippet or "")
+        for r in results
+    )
+
+
+class SearchResultCache:
+    """Cache wyników wyszukiwania per (użytkownik, zakres, zapytanie, wersja konta).
+
+    Każda zmiana notatek podbija wersję konta (`AccountVersionRepository`),
+    więc stare wpisy przestają pasować bez przeglądania cache - wypadają
+    z LRU po przekroczeniu `max_bytes`. Trzyma odszyfrowane wyniki w RAM.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Tuple[List[SearchResult], int]]" = OrderedDict()
+        # ostatnia znana wersja użytkownika - przy nowszej od razu zwalniamy jego stare wpisy
+        self._versions: Dict[UUID, int] = {}
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _drop(self, key: tuple) -> None:
+        _, size = self._entries.pop(key)
+        self._size -= size
+
+    def _forget_older(self, user_uuid: UUID, version: int) -> None:
+        known = self._versions.get(user_uuid)
+        if known is not None and known >= version:
+            return
+        self._versions[user_uuid] = version
+        if known is not None:
+            for key in [k for k in self._entries if k[0] == user_uuid and k[2] < version]:
+                self._drop(key)
+
+    def get(self, user_uuid: UUID, scope: str, version: int, search_query: NotesSearchQuery) -> Optional[List[SearchResult]]:
+        self._forget_older(user_uuid, version)
+        key = (user_uuid, scope, version, query_key(search_query))
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return list(entry[0])
+
+    def put(self, user_uuid: UUID, scope: str, version: int, search_query: NotesSearchQuery, results: List[SearchResult]) -> None:
+        size = _size(results)
+        if size > self.max_bytes:
+            return  # pojedynczy wynik większy niż cały budżet - nie wypychamy dla niego wszystkiego
+        key = (user_uuid, scope, version, query_key(search_query))
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (list(results), size)
+        self._size += size
+        while self._size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
@@ -1,7 +1,9 @@
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple, Union
 from pydantic import BaseModel, validator
 from uuid import UUID
 
+from domain.entities import Note, Trash
+
 class NotesSearchQuery(BaseModel):
     """DTO for searching notes by query string.
     
@@ -11,15 +13,34 @@ class NotesSearchQuery(BaseModel):
     - Note tags
     
     Matching is case-insensitive and partial (substring match).
+    Several terms must all match; `"..."` matches a phrase, `OR` (or `|`)
+    separates alternatives and `-term` excludes notes containing the term.
+    With `whole_word=True` every word of the query must appear as a whole
+    word (resolved by the blind keyword index when available).
+    `limit` stops the search after that many matches (first in storage order).
+    With `ranked=True` all matches are scored and `limit` is the number of
+    best results returned (top k, 20 by default).
+    `fields` lists the response fields to decrypt for display (None means
+    all); content is still decrypted when needed to decide a match.
     """
     query: str
     user_uuid: UUID
+    whole_word: bool = False
+    limit: Optional[int] = None
+    ranked: bool = False
+    fields: Optional[Tuple[str, ...]] = None
     @validator("query")
     def _validate_query(cls, value):
         """Ensure query is not empty after stripping whitespace."""
         if not value or not value.strip():
             raise ValueError("Search query cannot be empty")
         return value.strip()
+    @validator("limit")
+    def _validate_limit(cls, value):
+        """Ensure limit is positive when given."""
+        if value is not None and value < 1:
+            raise ValueError("limit must be a positive integer")
+        return value
     @validator("user_uuid")
     def _validate_user_uuid(cls, value):
         """Ensure user_uuid is a valid UUID."""
@@ -30,3 +51,31 @@ class NotesSearchQuery(BaseModel):
         str_strip_whitespace = True
         validate_assignment = True
 
+
+class SearchResult(BaseModel):
+    """A matching note together with its decrypted fields.
+
+    The search service decrypts each matching row once; routers display
+    `title`/`content` directly instead of fetching and decrypting again.
+    `content` is None for streamed notes and for fields that can't be decrypted.
+    Ranked results carry `score` and an HTML-escaped `snippet` (matches wrapped
+    in `<mark>`) instead of `content`.
+    """
+    note: Union[Note, Trash]
+    title: Optional[str] = None
+    content: Optional[str] = None
+    score: Optional[float] = None
+    snippet: Optional[str] = None
+
+
+class QueryStage(BaseModel):
+    """One stage of a unified query plan (explain mode).
+
+    `rows_in` is None for the SQL stage - the database scans the account,
+    the application only sees what survives the pushed-down predicates.
+    """
+    stage: str
+    rows_in: Optional[int] = None
+    rows_out: int
+    ms: float
+    detail: Dict[str, Any] = {}
@@ -1,13 +1,21 @@
+import asyncio
 import base64
 from uuid import UUID
-from typing import List, Optional, cast
+from typing import AsyncIterator, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
 from domain.entities import Note, Trash
-from domain.interfaces import NoteRepository, TrashRepository, SearchServiceInterface
+from domain.interfaces import NoteRepository, TrashRepository, SearchServiceInterface, AccountVersionRepository
 
 from application.common.utils import tags_to_list
-from application.services.search.search_dto import NotesSearchQuery
+from application.services.search.search_dto import NotesSearchQuery, SearchResult
 from application.services.encryption_service import EncryptionService
+from application.services.user_key_service import UserKeyService
+from application.services.search.blind_index import BlindIndexService, NOTES, TRASH
+from application.services.search.memory_index import InMemorySearchIndex
+from application.services.search.query import compile_query
+from application.services.search.suggest_index import SuggestIndex
+from application.services.search.result_cache import SearchResultCache
+from application.services.search.ranking import DEFAULT_TOP_K, ScoredDocument, document_stats, query_terms, snippet, top_k
 
 
 class SearchService(SearchServiceInterface):
@@ -17,158 +25,328 @@ class SearchService(SearchServiceInterface):
     - Decrypted note titles
     - Decrypted note content
     - Note tags
+
+    Queries may combine several terms, quoted phrases, OR and exclusions
+    (see `application.services.search.query`); all terms are checked in one
+    pass over each decrypted note.
+
+    With a configured blind index only candidate notes are decrypted:
+    whole-word queries use word tokens (exact for plain words), substring
+    queries use trigram tokens and verify candidates in full.
+
+    With an in-memory index the user's notes are decrypted once, on the first
+    search, and later queries are matched against plaintext held in memory.
+
+    With a result cache, results are kept per (user, query, account version);
+    every mutating use case bumps the version, so cached results never
+    outlive a change.
+
+    `suggest` answers search-as-you-type from a per-user trie of titles and
+    tags, without decrypting content.
+
+    In ranked mode matches are ordered by BM25 score and only the top k are
+    kept, each with a short highlighted snippet instead of the full content.
     """
 
-    def __init__(self,encryption_service: EncryptionService,note_repo: NoteRepository,trash_repo: TrashRepository):
+    def __init__(self,encryption_service: EncryptionService,note_repo: NoteRepository,trash_repo: TrashRepository,user_keys: Optional[UserKeyService] = None,index: Optional[BlindIndexService] = None,memory_index: Optional[InMemorySearchIndex] = None,concurrency: int = 4,suggest_index: Optional[SuggestIndex] = None,versions: Optional[AccountVersionRepository] = None,result_cache: Optional[SearchResultCache] = None):
         self.encryption = encryption_service
+        self.concurrency = max(1, concurrency)
         self.note_repo = note_repo
         self.trash_repo = trash_repo
+        self.user_keys = user_keys
+        self.index = index
+        self.memory_index = memory_index
+        self.suggest_index = suggest_index
+        self.versions = versions
+        self.result_cache = result_cache
 
-    async def _decrypt_title(self, title_bytes: Optional[bytes], key_private_b64: Optional[str], note_id: int,user_uuid:UUID) -> Optional[str]:
-        """Decrypts note title using hybrid encryption.
-        
-        Returns None if decryption fails or required data is missing.
-        """
-        if not title_bytes or not key_private_b64:
+    async def _get_kek(self, user_uuid: UUID) -> Optional[bytes]:
+        """Unseals the user's KEK once per search (None if the user has no master keys)."""
+        if self.user_keys is None:
             return None
-
         try:
-            note = await self.note_repo.get_by_id(note_id=note_id,user_uuid=user_uuid)
-            if note and note.title == title_bytes and note.key_private_b64 == key_private_b64:
-                priv = base64.b64decode(cast(bytes, note.key_private_b64))
-                title_dec = self.encryption.decrypt_server(title_bytes)
-                priv_decrypt = self.encryption.decrypt_with_private(title_dec.encode(), priv)
-                return priv_decrypt
-
-            trash = await self.trash_repo.get_by_id(note_id=note_id,user_uuid=user_uuid)
-            if trash and trash.title == title_bytes and trash.key_private_b64 == key_private_b64:
-                priv = base64.b64decode(cast(bytes, trash.key_private_b64))
-                trash_title_dec = self.encryption.decrypt_server(trash.title)
-                priv_decrypt = self.encryption.decrypt_with_private(trash_title_dec.encode(), priv)
-                return priv_decrypt
+            return await self.user_keys.get_kek(user_uuid)
         except Exception:
             return None
 
-        return None
+    def _open(self, value: Optional[bytes], key_private_b64: Optional[str], kek: Optional[bytes]) -> Optional[str]:
+        """Decrypts both layers of one field of an already loaded row.
 
-    async def _decrypt_content(self, content_bytes: Optional[bytes], key_private_b64: Optional[str], note_id: int,user_uuid:UUID) -> Optional[str]:
-        """Decrypts note content using hybrid encryption.
-        
         Returns None if decryption fails or required data is missing.
         """
-        if not content_bytes or not key_private_b64:
+        if not value or not key_private_b64:
             return None
-
         try:
-            note = await self.note_repo.get_by_id(note_id=note_id,user_uuid=user_uuid)
-            if note and note.content == content_bytes and note.key_private_b64 == key_private_b64:
-                priv = base64.b64decode(cast(bytes, note.key_private_b64))
-                content_dec = self.encryption.decrypt_server(content_bytes)
-                priv_decrypt = self.encryption.decrypt_with_private(content_dec.encode(), priv)
-                return priv_decrypt
-
-            trash = await self.trash_repo.get_by_id(note_id=note_id,user_uuid=user_uuid)
-            if trash and trash.content == content_bytes and trash.key_private_b64 == key_private_b64:
-                priv = base64.b64decode(cast(bytes, trash.key_private_b64))
-                trash_content_dec = self.encryption.decrypt_server(trash.content)
-                priv_decrypt = self.encryption.decrypt_with_private(trash_content_dec.encode(), priv)
-                return priv_decrypt
+            package = self.encryption.decrypt_server(value).encode()
+            return self.encryption.decrypt_package(package, private_key=base64.b64decode(key_private_b64), kek=kek)
         except Exception:
             return None
 
-        return None
+    def _note_matches(self, row: "_LazyRow", search_query: NotesSearchQuery) -> bool:
+        """Checks if a note matches the search query.
 
-    def _matches_query(self, text: Optional[str], query: str) -> bool:
-        """Checks if text contains query (case-insensitive, partial match).
-        
-        Returns True if query is found in text, False otherwise.
+        Every term of the query is matched against the same fields: tags,
+        then decrypted title, then decrypted content - each later field is
+        decrypted only if the query is not decided by the earlier ones.
+        Runs in a worker thread (see `_verify`).
         """
-        if not text:
-            return False
-        return query.lower() in text.lower()
+        query = compile_query(search_query.query, search_query.whole_word)
+        return query.matches(row.fields())
 
-    def _matches_tags(self, tags: List[str], query: str,user_uuid:UUID) -> bool:
-        """Checks if any tag contains the query (case-insensitive, partial match).
-        
-        Returns True if query is found in any tag, False otherwise.
+    def _check(self, row: Union[Note, Trash], matched: bool, search_query: NotesSearchQuery, kek: Optional[bytes]) -> Optional[SearchResult]:
+        """Matches one row and, if it matches, returns it with the requested fields decrypted (each at most once).
+
+        Fields left out of `search_query.fields` are not decrypted for display
+        (content of an index hit listed by title is never opened).
         """
-        if not tags:
-            return False
-        query_lower = query.lower()
-        return any(query_lower in tag for tag in tags)
+        lazy = _LazyRow(self, row, kek)
+        if not matched and not self._note_matches(lazy, search_query):
+            return None
+        # ranking needs both fields for BM25 and the snippet
+        wanted = None if search_query.ranked else search_query.fields
+        return SearchResult(
+            note=row,
+            title=lazy.title if wanted is None or "title" in wanted else None,
+            content=lazy.content if wanted is None or "content" in wanted else None,
+        )
 
-    async def _note_matches(self, note: Note, search_query: NotesSearchQuery) -> bool:
-        """Checks if a note matches the search query.
-        
-        Searches in decrypted title, decrypted content, and tags.
+    def _check_ranked(self, row: Union[Note, Trash], matched: bool, search_query: NotesSearchQuery, kek: Optional[bytes]) -> Optional[ScoredDocument]:
+        """Like `_check`, but keeps only BM25 statistics and a snippet instead of the full content."""
+        result = self._check(row, matched, search_query, kek)
+        if result is None:
+            return None
+        terms = query_terms(search_query.query)
+        tf, length = document_stats(terms, title=result.title, content=result.content, tags=row.tags, whole_word=search_query.whole_word)
+        result.snippet = snippet(result.content, search_query.query, terms) or snippet(result.title, search_query.query, terms)
+        result.content = None
+        return ScoredDocument(result, tf, length)
+
+    async def _verify(self, batch: List[Tuple[Union[Note, Trash], bool]], search_query: NotesSearchQuery, kek: Optional[bytes]) -> list:
+        """Checks one batch concurrently (at most `concurrency` rows), keeping row order.
+
+        Rows marked as already matched (index hits) are only decrypted for display.
+        """
+        check = self._check_ranked if search_query.ranked else self._check
+        results = await asyncio.gather(
+            *(asyncio.to_thread(check, row, matched, search_query, kek) for row, matched in batch)
+        )
+        return [result for result in results if result is not None]
+
+    async def _candidates(self, search_query: NotesSearchQuery, user_uuid: UUID, scope: str) -> Optional[Tuple[Set[int], Set[int]]]:
+        """Narrows the search with the blind index.
+
+        Returns (indexed ids, candidate ids) or None when the index can't serve
+        the query (no index configured, or a query shorter than a trigram).
+        Notes outside `indexed ids` (created before the index, not backfilled)
+        are always checked in full, so the result never misses them.
+        """
+        if self.index is None:
+            return None
+        parsed = compile_query(search_query.query, search_query.whole_word).parsed
+        ids = await self.index.candidates(
+            user_uuid=user_uuid, clauses=[c.required for c in parsed.clauses], whole_word=search_query.whole_word, scope=scope,
+        )
+        if ids is None:
+            return None
+        return await self.index.indexed_ids(user_uuid=user_uuid, scope=scope), ids
+
+    async def _load_memory_index(self, user_uuid: UUID, version: Optional[int]) -> None:
+        """Builds the user's in-memory index with one pass over notes and trash (KEK unsealed once).
+
+        `version` is read before the rows - a concurrent change can only make the index rebuild again.
+        """
+        assert self.memory_index is not None
+        kek = await self._get_kek(user_uuid)
+        entries = {}
+        for scope, rows in ((NOTES, await self.note_repo.get_all(user_uuid=user_uuid)),
+                            (TRASH, await self.trash_repo.get_all(user_uuid=user_uuid))):
+            entries[scope] = [
+                (row.id,
+                 self._open(row.title, row.key_private_b64, kek),
+                 None if row.stream_id is not None else self._open(row.content, row.key_private_b64, kek),
+                 row.tags)
+                for row in rows
+            ]
+        self.memory_index.load(user_uuid, entries, version)
+
+    async def _memory_search(self, search_query: NotesSearchQuery, user_uuid: UUID, scope: str) -> Optional[Set[int]]:
+        if self.memory_index is None:
+            return None
+        # changes made by other processes (API workers, trash purge) show up as a different account version
+        version = await self.versions.get(user_uuid) if self.versions is not None else None
+        if not self.memory_index.is_loaded(user_uuid, version):
+            await self._load_memory_index(user_uuid, version)
+        ids = self.memory_index.search(user_uuid, compile_query(search_query.query, search_query.whole_word), scope=scope)
+        return set(ids) if ids is not None else None
+
+    async def _matches(self, rows: Sequence[Union[Note, Trash]], search_query: NotesSearchQuery, user_uuid: UUID, scope: str) -> AsyncIterator[list]:
+        """Decrypt-and-match pipeline over already loaded rows, yielding matches batch by batch.
+
+        Rows are checked in order, `concurrency` at a time; the consumer
+        stops iterating once it has enough, so the rest is not decrypted.
         """
-        query = search_query.query
-        list_tags: List[str]= note.tags if note.tags is not None else [] 
+        kek = await self._get_kek(user_uuid)
+
+        memory_hits = await self._memory_search(search_query, user_uuid, scope)
+        if memory_hits is not None:
+            hits = [(row, True) for row in rows if row.id in memory_hits]
+            for i in range(0, len(hits), self.concurrency):
+                yield await self._verify(hits[i:i + self.concurrency], search_query, kek)
+            return
+
+        candidates = await self._candidates(search_query, user_uuid, scope)
+        # word tokens decide a plain all-words query exactly; anything else is verified
+        exact = search_query.whole_word and compile_query(search_query.query, True).parsed.is_simple
+        batch: List[Tuple[Union[Note, Trash], bool]] = []
 
-        # Check tags (no decryption needed)
-        if self._matches_tags(list_tags, query,user_uuid=note.user_uuid):
-            return True
+        for row in rows:
+            matched = False
+            if candidates is not None and row.id in candidates[0]:
+                if row.id not in candidates[1]:
+                    continue
+                # exact hits are decrypted only for display;
+                # other candidates (and notes missing from the index) are verified in full
+                matched = exact
+            batch.append((row, matched))
+            if len(batch) >= self.concurrency:
+                yield await self._verify(batch, search_query, kek)
+                batch = []
 
-        # Check title (needs decryption)
-        decrypted_title = await self._decrypt_title(note.title, note.key_private_b64, note.id,user_uuid=note.user_uuid)
-        if decrypted_title and self._matches_query(decrypted_title, query):
-            return True
+        if batch:
+            yield await self._verify(batch, search_query, kek)
 
-        # Check content (needs decryption)
-        decrypted_content = await self._decrypt_content(note.content, note.key_private_b64, note.id,user_uuid=note.user_uuid)
-        if decrypted_content and self._matches_query(decrypted_content, query):
-            return True
+    async def _search(self, rows: Sequence[Union[Note, Trash]], search_query: NotesSearchQuery, user_uuid: UUID, scope: str) -> List[SearchResult]:
+        """Runs the pipeline in one of two modes.
+
+        - default: matches in storage order with full content; once
+          `search_query.limit` matches are found the rest is not decrypted
+        - ranked: every match is scored (BM25 over title, content and tags)
+          and only the top `limit` are returned, with snippets instead of content
+        """
+        limit = search_query.limit
+        if search_query.ranked:
+            documents: List[ScoredDocument] = []
+            async for batch in self._matches(rows, search_query, user_uuid, scope):
+                documents.extend(batch)
+            ranked = top_k(documents, query_terms(search_query.query), len(rows), limit or DEFAULT_TOP_K)
+            for score, result in ranked:
+                result.score = round(score, 4)
+            return [result for _, result in ranked]
+
+        matching: List[SearchResult] = []
+        async for batch in self._matches(rows, search_query, user_uuid, scope):
+            matching.extend(batch)
+            if limit and len(matching) >= limit:
+                break
+        return matching[:limit] if limit else matching
+
+    def _display(self, row: Union[Note, Trash], kek: Optional[bytes]) -> SearchResult:
+        lazy = _LazyRow(self, row, kek)
+        return SearchResult(note=row, title=lazy.title, content=lazy.content)
+
+    async def search_rows(self, rows: Sequence[Union[Note, Trash]], search_query: Optional[NotesSearchQuery], user_uuid: UUID, scope: str = NOTES) -> List[SearchResult]:
+        """Decrypt-and-match over rows already narrowed by the caller (e.g. SQL prefilters in `QueryPlanner`).
+
+        Uses the same pipeline as `search_notes` (indexes included) but skips
+        the result cache. Without a query every row is only decrypted for display.
+        """
+        if search_query is not None:
+            return await self._search(rows, search_query, user_uuid, scope)
+        kek = await self._get_kek(user_uuid)
+        results: List[SearchResult] = []
+        for i in range(0, len(rows), self.concurrency):
+            batch = rows[i:i + self.concurrency]
+            results.extend(await asyncio.gather(*(asyncio.to_thread(self._display, row, kek) for row in batch)))
+        return results
 
-        return False
+    async def _load_suggest_index(self, user_uuid: UUID, version: Optional[int]) -> None:
+        """Builds the user's suggestion trie from titles and tags only (content is not even fetched)."""
+        assert self.suggest_index is not None
+        kek = await self._get_kek(user_uuid)
+        entries = {}
+        for scope, rows in ((NOTES, await self.note_repo.get_headers(user_uuid=user_uuid)),
+                            (TRASH, await self.trash_repo.get_headers(user_uuid=user_uuid))):
+            entries[scope] = [(row.id, self._open(row.title, row.key_private_b64, kek), row.tags) for row in rows]
+        self.suggest_index.load(user_uuid, entries, version)
 
-    async def search_notes(self, repo: NoteRepository, search_query: NotesSearchQuery,user_uuid:UUID) -> List[Note]:
+    async def suggest(self, user_uuid: UUID, prefix: str, limit: int = 10) -> List[dict]:
+        """Completions for `prefix` from note titles, title words and tags.
+
+        The first call for a user builds the trie (one title decryption per
+        note); later calls are answered from memory until the account version
+        changes in another process.
+        """
+        if self.suggest_index is None or not prefix.strip():
+            return []
+        version = await self.versions.get(user_uuid) if self.versions is not None else None
+        suggestions = self.suggest_index.suggest(user_uuid, prefix, limit, version)
+        if suggestions is None:
+            await self._load_suggest_index(user_uuid, version)
+            suggestions = self.suggest_index.suggest(user_uuid, prefix, limit) or []
+        return suggestions
+
+    async def _cached_search(self, repo, search_query: NotesSearchQuery, user_uuid: UUID, scope: str) -> List[SearchResult]:
+        """Serves the search from the result cache when the account version hasn't changed."""
+        if self.result_cache is None or self.versions is None:
+            return await self._search(await repo.get_all(user_uuid=user_uuid), search_query, user_uuid, scope)
+        # version is read before the rows - a concurrent change can only make the entry unreachable, never stale
+        version = await self.versions.get(user_uuid)
+        cached = self.result_cache.get(user_uuid, scope, version, search_query)
+        if cached is not None:
+            return cached
+        results = await self._search(await repo.get_all(user_uuid=user_uuid), search_query, user_uuid, scope)
+        self.result_cache.put(user_uuid, scope, version, search_query, results)
+        return results
+
+    async def search_notes(self, repo: NoteRepository, search_query: NotesSearchQuery,user_uuid:UUID) -> List[SearchResult]:
         """Searches for notes matching the query.
         
-        Returns a list of notes where the query appears in:
+        Returns a list of results (note + decrypted title/content) where the query appears in:
         - Title (decrypted)
         - Content (decrypted)
         - Tags
         """
-        all_notes = await repo.get_all(user_uuid=user_uuid)
-        matching_notes = []
-
-
-        for note in all_notes:
-            if await self._note_matches(note, search_query):
-                matching_notes.append(note)
-
-        return matching_notes
+        return await self._cached_search(repo, search_query, user_uuid, NOTES)
 
-    async def search_trash(self, repo: TrashRepository, search_query: NotesSearchQuery,user_uuid:UUID) -> List[Trash]:
+    async def search_trash(self, repo: TrashRepository, search_query: NotesSearchQuery,user_uuid:UUID) -> List[SearchResult]:
         """Searches for trashed notes matching the query.
         
-        Returns a list of trashed notes where the query appears in:
+        Returns a list of results (trashed note + decrypted title/content) where the query appears in:
         - Title (decrypted)
         - Content (decrypted)
         - Tags
         """
-        all_trash = await repo.get_all(user_uuid=user_uuid)
-        matching_trash = []
-        
-        for trash in all_trash:
-            # Reuse similar logic but for Trash entity
-            query = search_query.query
-            trash_tags: List[str]= trash.tags if trash.tags is not None else []
-            # Check tags
-            if self._matches_tags(trash_tags, query,user_uuid=trash.user_uuid):
-                matching_trash.append(trash)
-                continue
-
-            # Check title
-            decrypted_title = await self._decrypt_title(trash.title, trash.key_private_b64, trash.id,user_uuid=user_uuid)
-            if decrypted_title and self._matches_query(decrypted_title, query):
-                matching_trash.append(trash)
-                continue
-
-            # Check content
-            decrypted_content = await self._decrypt_content(trash.content, trash.key_private_b64, trash.id,user_uuid=user_uuid)
-            if decrypted_content and self._matches_query(decrypted_content, query):
-                matching_trash.append(trash)
-
-        return matching_trash
+        return await self._cached_search(repo, search_query, user_uuid, TRASH)
+
+
+class _LazyRow:
+    """Loaded row whose fields are decrypted on first access and at most once."""
+
+    _UNSET = object()
+
+    def __init__(self, service: SearchService, note: Union[Note, Trash], kek: Optional[bytes]):
+        self.note = note
+        self._service = service
+        self._kek = kek
+        self._title = self._UNSET
+        self._content = self._UNSET
+
+    @property
+    def title(self) -> Optional[str]:
+        if self._title is self._UNSET:
+            self._title = self._service._open(self.note.title, self.note.key_private_b64, self._kek)
+        return self._title
+
+    @property
+    def content(self) -> Optional[str]:
+        if self._content is self._UNSET:
+            # treść strumieniowa nie jest paczką v1/v2 - czytana przez /notes/{id}/stream
+            streamed = self.note.stream_id is not None
+            self._content = None if streamed else self._service._open(self.note.content, self.note.key_private_b64, self._kek)
+        return self._content
 
+    def fields(self) -> Iterator[Optional[str]]:
+        """Tags, title and content in matching order; each field is decrypted only when reached."""
+        yield from self.note.tags or []
+        yield self.title
+        yield self.content
@@ -0,0 +1,276 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from domain.interfaces import NoteIndexer
+from application.services.search.blind_index import MAX_WORD_LENGTH, NOTES, normalize
+
+
+TITLE = "title"
+WORD = "word"
+TAG = "tag"
+
+# przybliżony koszt węzła drzewa (dict + obiekt) i wpisu notatki w bajtach
+_NODE_BYTES = 200
+_ENTRY_BYTES = 128
+# tytuły dłuższe od klucza są podpowiadane w całości, ale drzewo ma ograniczoną głębokość
+MAX_KEY_LENGTH = 32
+# ile węzłów poddrzewa przeglądamy - ogranicza czas odpowiedzi dla krótkich
+# prefiksów na dużych kontach (wtedy ranking dotyczy przejrzanej części)
+MAX_VISITED = 5000
+
+_WORD_RE = re.compile(r"\w{2,}")
+
+
+class _Node:
+    __slots__ = ("children", "ends")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # rodzaj -> {tekst do wyświetlenia: liczba notatek}; różne teksty dzielą węzeł,
+        # gdy mają ten sam klucz (wielkość liter, znaki diakrytyczne, obcięcie do MAX_KEY_LENGTH)
+        self.ends: Optional[Dict[str, Dict[str, int]]] = None
+
+
+def _full_key(text: str) -> str:
+    return " ".join(normalize(text).split())
+
+
+def _key(text: str) -> str:
+    return _full_key(text)[:MAX_KEY_LENGTH]
+
+
+def _terms(title: Optional[str], tags: Optional[List[str]]) -> List[Tuple[str, str]]:
+    """Pary (rodzaj, tekst) zapisywane w drzewie dla jednej notatki, bez powtórzeń."""
+    terms = []
+    if title and title.strip():
+        terms.append((TITLE, " ".join(title.split())))
+        words = _WORD_RE.findall(title.lower())
+        terms.extend((WORD, word) for word in dict.fromkeys(words) if len(word) <= MAX_WORD_LENGTH)
+    terms.extend((TAG, tag) for tag in dict.fromkeys(tags or []) if tag and tag.strip())
+    return terms
+
+
+def _entry_size(entry: Tuple[Optional[str], List[str]]) -> int:
+    title, tags = entry
+    return _ENTRY_BYTES + len(title or "") + sum(len(tag) for tag in tags)
+
+
+class _UserTrie:
+    def __init__(self, loaded_at: float, version: Optional[int] = None):
+        self.loaded_at = loaded_at
+        # wersja konta (AccountVersionRepository), którą odzwierciedla drzewo
+        self.version = version
+        self.root = _Node()
+        self.nodes = 1
+        self.entry_bytes = 0
+        # (zakres, id) -> (tytuł, tagi); kosz trzymamy tylko po to, by przywrócenie mogło odbudować wpisy
+        self.entries: Dict[Tuple[str, int], Tuple[Optional[str], List[str]]] = {}
+
+    @property
+    def size(self) -> int:
+        return self.nodes * _NODE_BYTES + self.entry_bytes
+
+    def add(self, kind: str, text: str) -> None:
+        node = self.root
+        for char in _key(text):
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+                self.nodes += 1
+            node = child
+        if node.ends is None:
+            node.ends = {}
+        texts = node.ends.setdefault(kind, {})
+        texts[text] = texts.get(text, 0) + 1
+
+    def discard(self, kind: str, text: str) -> None:
+        path = [self.root]
+        for char in _key(text):
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        node = path[-1]
+        texts = node.ends.get(kind) if node.ends else None
+        if not texts or text not in texts:
+            return
+        texts[text] -= 1
+        if texts[text] > 0:
+            return
+        del texts[text]
+        if texts:
+            return
+        del node.ends[kind]
+        if not node.ends:
+            node.ends = None
+        # usuwamy puste gałęzie, żeby rozmiar odpowiadał zawartości
+        key = _key(text)
+        for depth in range(len(path) - 1, 0, -1):
+            node = path[depth]
+            if node.children or node.ends:
+                break
+            del path[depth - 1].children[key[depth - 1]]
+            self.nodes -= 1
+
+    @staticmethod
+    def _suggestions(kind: str, texts: Dict[str, int]) -> List[Tuple[int, str, str]]:
+        """Jedna podpowiedź na pełny znormalizowany tekst; wyświetlany jest najczęstszy wariant zapisu."""
+        groups: Dict[str, List[Tuple[int, str]]] = {}
+        for text, count in texts.items():
+            groups.setdefault(_full_key(text), []).append((count, text))
+        found = []
+        for variants in groups.values():
+            _, display = max(variants, key=lambda item: (item[0], item[1]))
+            found.append((sum(count for count, _ in variants), kind, display))
+        return found
+
+    def put(self, scope: str, note_id: int, title: Optional[str], tags: Optional[List[str]]) -> None:
+        self.drop(scope, note_id)
+        entry = self.entries[(scope, note_id)] = (title, list(tags or []))
+        self.entry_bytes += _entry_size(entry)
+        if scope == NOTES:
+            for kind, text in _terms(title, tags):
+                self.add(kind, text)
+
+    def drop(self, scope: str, note_id: int) -> Optional[Tuple[Optional[str], List[str]]]:
+        entry = self.entries.pop((scope, note_id), None)
+        if entry is not None:
+            self.entry_bytes -= _entry_size(entry)
+        if entry is not None and scope == NOTES:
+            for kind, text in _terms(*entry):
+                self.discard(kind, text)
+        return entry
+
+    def complete(self, prefix: str, limit: int) -> List[dict]:
+        node = self.root
+        for char in _key(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        found = []
+        stack = [node]
+        visited = 0
+        while stack and visited < MAX_VISITED:
+            current = stack.pop()
+            visited += 1
+            if current.ends:
+                for kind, texts in current.ends.items():
+                    found.extend(self._suggestions(kind, texts))
+            stack.extend(current.children.values())
+        # najczęstsze najpierw, potem tytuły przed słowami i tagami, potem alfabetycznie
+        order = {TITLE: 0, TAG: 1, WORD: 2}
+        found.sort(key=lambda item: (-item[0], order[item[1]], len(item[2]), item[2].lower()))
+        return [{"text": text, "kind": kind, "count": count} for count, kind, text in found[:limit]]
+
+
+class SuggestIndex(NoteIndexer):
+    """Drzewo prefiksowe tytułów, słów tytułów i tagów - podpowiedzi bez odszyfrowywania treści.
+
+    Budowane leniwie przy pierwszej podpowiedzi użytkownika (`load`, tylko
+    tytuły i tagi), potem aktualizowane przez use case'y notatek. Klucze są
+    znormalizowane (`normalize`), więc "zakupow" podpowiada "Zakupów".
+    Trzyma tytuły w RAM - budżet `max_bytes` obowiązuje dla wszystkich
+    użytkowników łącznie (LRU), `ttl_seconds` jak w `InMemorySearchIndex`.
+
+    Jak `InMemorySearchIndex` drzewo pamięta wersję konta, z której powstało -
+    zmiany z innych procesów (inne workery API, worker kosza, przywrócenie
+    kopii) zmieniają wersję i drzewo jest budowane od nowa.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float = 300.0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._users: "OrderedDict[UUID, _UserTrie]" = OrderedDict()
+
+    @property
+    def size(self) -> int:
+        return sum(user.size for user in self._users.values())
+
+    def _get(self, user_uuid: UUID) -> Optional[_UserTrie]:
+        user = self._users.get(user_uuid)
+        if user is None:
+            return None
+        if self.ttl_seconds > 0 and time.monotonic() - user.loaded_at > self.ttl_seconds:
+            self.evict(user_uuid)
+            return None
+        self._users.move_to_end(user_uuid)
+        return user
+
+    def _current(self, user_uuid: UUID, version: Optional[int]) -> Optional[_UserTrie]:
+        user = self._get(user_uuid)
+        if user is not None and version is not None and user.version != version:
+            self.evict(user_uuid)
+            return None
+        return user
+
+    def is_loaded(self, user_uuid: UUID, version: Optional[int] = None) -> bool:
+        """Czy drzewo użytkownika jest w pamięci i (przy podanej `version`) aktualne."""
+        return self._current(user_uuid, version) is not None
+
+    def version_bumped(self, user_uuid: UUID, version: int) -> None:
+        """Zmiana z tego procesu: drzewo przechodzi na `version` tylko, jeśli nie przegapiło innej zmiany."""
+        user = self._users.get(user_uuid)
+        if user is not None and user.version is not None and user.version == version - 1:
+            user.version = version
+
+    def evict(self, user_uuid: UUID) -> None:
+        self._users.pop(user_uuid, None)
+
+    def _enforce_budget(self) -> None:
+        # ostatnio użyty użytkownik zostaje zawsze (inaczej każda podpowiedź budowałaby drzewo od nowa)
+        while len(self._users) > 1 and self.size > self.max_bytes:
+            self._users.popitem(last=False)
+
+    def load(self, user_uuid: UUID, entries: Dict[str, Iterable[Tuple[int, Optional[str], Optional[List[str]]]]],
+             version: Optional[int] = None) -> None:
+        """Buduje drzewo użytkownika; `entries` to {zakres: [(id, tytuł, tagi), ...]}.
+
+        `version` - wersja konta odczytana przed pobraniem wierszy.
+        """
+        user = _UserTrie(time.monotonic(), version)
+        for scope, rows in entries.items():
+            for note_id, title, tags in rows:
+                user.put(scope, note_id, title, tags)
+        self._users[user_uuid] = user
+        self._users.move_to_end(user_uuid)
+        self._enforce_budget()
+
+    def suggest(self, user_uuid: UUID, prefix: str, limit: int = 10, version: Optional[int] = None) -> Optional[List[dict]]:
+        """Podpowiedzi dla prefiksu albo None, jeśli drzewo nie jest załadowane (lub nie odpowiada `version`)."""
+        user = self._current(user_uuid, version)
+        if user is None:
+            return None
+        return user.complete(prefix, limit)
+
+    # --- aktualizacje przyrostowe (NoteIndexer) ---
+    async def index_note(
+        self,
+        *,
+        user_uuid: UUID,
+        note_id: int,
+        title: Optional[str],
+        content: Optional[str],
+        tags: Optional[List[str]] = None,
+        scope: str = NOTES,
+    ) -> None:
+        user = self._get(user_uuid)
+        if user is None:
+            return  # zostanie zbudowane przy następnej podpowiedzi
+        user.put(scope, note_id, title, tags)
+        self._enforce_budget()
+
+    async def move(self, *, user_uuid: UUID, from_scope: str, from_id: int, to_scope: str, to_id: int) -> None:
+        user = self._get(user_uuid)
+        if user is None:
+            return
+        entry = user.drop(from_scope, from_id)
+        if entry is not None:
+            user.put(to_scope, to_id, *entry)
+
+    async def remove(self, *, user_uuid: UUID, note_id: int, scope: str = NOTES) -> None:
+        user = self._get(user_uuid)
+        if user is not None:
+            user.drop(scope, note_id)
@@ -1,4 +1,4 @@
-from domain.interfaces import TrashRepository, UserRepository
+from domain.interfaces import TrashRepository, UserRepository, AccountVersionRepository
 from datetime import datetime, timedelta
 from uuid import UUID
 from typing import Optional
@@ -8,10 +8,12 @@ class DeleteXTime:
     Serwis do permanentnego usuwania notatek z kosza po określonym czasie.
     """
 
-    def __init__(self, trashcan: TrashRepository, ttl_days: int = 30, user_repo: Optional[UserRepository] = None):
+    def __init__(self, trashcan: TrashRepository, ttl_days: int = 30, user_repo: Optional[UserRepository] = None,
+                 versions: Optional[AccountVersionRepository] = None):
         self._trash = trashcan
         self._ttl = timedelta(days=ttl_days)
         self._user_repo = user_repo
+        self._versions = versions
 
     async def execute(self, note_id: int,user_uuid:UUID) -> bool:
         trashed = await self._trash.get_by_id(note_id=note_id,user_uuid=user_uuid)
@@ -19,7 +21,10 @@ class DeleteXTime:
             return False
 
         if datetime.utcnow() >= trashed.trashed_at + self._ttl:
-            return await self._trash.delete_permanently(note_id=note_id,user_uuid=user_uuid)
+            deleted = await self._trash.delete_permanently(note_id=note_id,user_uuid=user_uuid)
+            if deleted and self._versions is not None:
+                await self._versions.bump(user_uuid)
+            return deleted
 
         return False
 
@@ -36,4 +41,6 @@ class DeleteXTime:
                 if await self._trash.delete_permanently(note_id=trashed.id,user_uuid=user_uuid):
                     deleted_count += 1
 
+        if deleted_count and self._versions is not None:
+            await self._versions.bump(user_uuid)
         return deleted_count
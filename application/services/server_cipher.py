@@ -0,0 +1,145 @@
+"""Warstwa szyfrowania po stronie serwera.
+
+Dostępne szyfry:
+- `fernet`: dotychczasowy format (AES-CBC + HMAC, token base64)
+- `aesgcm`: AES-256-GCM, surowe bajty z nagłówkiem
+- `xchacha20`: XChaCha20-Poly1305 (libsodium), surowe bajty z nagłówkiem
+
+Format AEAD (bytes):
+  | 1B wersja formatu | 1B id algorytmu | 4B key id | nonce | ciphertext + tag |
+Nagłówek (6 bajtów) jest uwierzytelniany jako associated data.
+
+Tokeny Fernet zawsze zaczynają się od b"gAAAAA", więc odczyt rozpoznaje
+oba formaty i stare wiersze pozostają czytelne po zmianie szyfru.
+
+Obsługiwanych jest wiele kluczy (jak MultiFernet): pierwszy szyfruje,
+wszystkie odszyfrowują. `rotate` przepisuje szyfrogram na klucz główny.
+"""
+
+import base64
+import hashlib
+import os
+from typing import Dict, Optional, Sequence, Union
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from nacl.bindings import (
+    crypto_aead_xchacha20poly1305_ietf_decrypt,
+    crypto_aead_xchacha20poly1305_ietf_encrypt,
+    crypto_aead_xchacha20poly1305_ietf_NPUBBYTES,
+)
+
+
+FORMAT_VERSION = 0x01
+ALG_AESGCM = 0x01
+ALG_XCHACHA20 = 0x02
+KEY_ID_SIZE = 4
+HEADER_SIZE = 2 + KEY_ID_SIZE
+FERNET_PREFIX = b"gAAAAA"
+
+
+def is_fernet_token(data: bytes) -> bool:
+    return data[:len(FERNET_PREFIX)] == FERNET_PREFIX
+
+
+def derive_aead_key(server_key: bytes) -> bytes:
+    """Wyprowadza 32-bajtowy klucz AEAD z klucza Fernet (base64) z ustawień."""
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"encrypted-notepad/server-aead/v1",
+    ).derive(base64.urlsafe_b64decode(server_key))
+
+
+def key_id_for(server_key: bytes) -> bytes:
+    """Krótki, nieodwracalny identyfikator klucza zapisywany w nagłówku."""
+    return hashlib.sha256(b"key-id:" + server_key).digest()[:KEY_ID_SIZE]
+
+
+class ServerCipher:
+    """Szyfr warstwy serwerowej z wybieralnym algorytmem zapisu.
+
+    `algorithm` decyduje tylko o formacie zapisu (`fernet`, `aesgcm`, `xchacha20`);
+    odczyt obsługuje wszystkie formaty, więc zmiana ustawienia (w obie strony)
+    nie wymaga migracji istniejących wierszy.
+
+    `server_keys` to jeden klucz albo lista kluczy - pierwszy jest kluczem głównym.
+    """
+
+    ALGORITHMS = {"fernet": None, "aesgcm": ALG_AESGCM, "xchacha20": ALG_XCHACHA20}
+
+    def __init__(self, server_keys: Union[bytes, Sequence[bytes]], algorithm: str = "fernet"):
+        algorithm = algorithm.lower()
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"nieznany algorytm szyfrowania serwera: {algorithm}")
+        keys = [server_keys] if isinstance(server_keys, bytes) else list(server_keys)
+        if not keys:
+            raise ValueError("brak kluczy serwera")
+
+        self.algorithm = algorithm
+        self._alg_id = self.ALGORITHMS[algorithm]
+        self._primary_fernet = Fernet(keys[0])
+        self._fernet = MultiFernet([Fernet(k) for k in keys])
+        self._key_id = key_id_for(keys[0])
+        self._keys: Dict[bytes, bytes] = {key_id_for(k): derive_aead_key(k) for k in keys}
+        self._aesgcm: Dict[bytes, AESGCM] = {kid: AESGCM(k) for kid, k in self._keys.items()}
+
+    @staticmethod
+    def _header(alg_id: int, key_id: bytes) -> bytes:
+        return bytes((FORMAT_VERSION, alg_id)) + key_id
+
+    def encrypt(self, data: bytes) -> bytes:
+        if self._alg_id is None:
+            return self._fernet.encrypt(data)
+
+        key = self._keys[self._key_id]
+        header = self._header(self._alg_id, self._key_id)
+        if self._alg_id == ALG_AESGCM:
+            nonce = os.urandom(12)
+            return header + nonce + self._aesgcm[self._key_id].encrypt(nonce, data, header)
+        nonce = os.urandom(crypto_aead_xchacha20poly1305_ietf_NPUBBYTES)
+        return header + nonce + crypto_aead_xchacha20poly1305_ietf_encrypt(data, header, nonce, key)
+
+    def decrypt(self, token: bytes) -> bytes:
+        if is_fernet_token(token):
+            return self._fernet.decrypt(token)
+        if len(token) < HEADER_SIZE or token[0] != FORMAT_VERSION:
+            raise ValueError("nieznany format szyfrogramu serwera")
+
+        header = token[:HEADER_SIZE]
+        alg_id, key_id = token[1], token[2:HEADER_SIZE]
+        key = self._keys.get(key_id)
+        if key is None:
+            raise ValueError(f"nieznany klucz serwera (key id {key_id.hex()})")
+
+        if alg_id == ALG_AESGCM:
+            nonce, ciphertext = token[HEADER_SIZE:HEADER_SIZE + 12], token[HEADER_SIZE + 12:]
+            return self._aesgcm[key_id].decrypt(nonce, ciphertext, header)
+        if alg_id == ALG_XCHACHA20:
+            n = crypto_aead_xchacha20poly1305_ietf_NPUBBYTES
+            nonce, ciphertext = token[HEADER_SIZE:HEADER_SIZE + n], token[HEADER_SIZE + n:]
+            return crypto_aead_xchacha20poly1305_ietf_decrypt(ciphertext, header, nonce, key)
+        raise ValueError(f"nieznany algorytm szyfrogramu serwera ({alg_id})")
+
+    @property
+    def primary_key_id(self) -> bytes:
+        return self._key_id
+
+    def rotate(self, token: bytes) -> Optional[bytes]:
+        """Zwraca szyfrogram przepisany na klucz główny i bieżący algorytm
+        albo None, jeśli `token` już jest w docelowej postaci.
+        """
+        if is_fernet_token(token):
+            if self._alg_id is None:
+                try:
+                    self._primary_fernet.decrypt(token)
+                    return None
+                except InvalidToken:
+                    pass
+        elif self._alg_id is not None and token[1:2] == bytes((self._alg_id,)) \
+                and token[2:HEADER_SIZE] == self._key_id:
+            return None
+        return self.encrypt(self.decrypt(token))
@@ -0,0 +1,52 @@
+"""Strumieniowe szyfrowanie treści notatek (libsodium secretstream).
+
+Duża notatka jest dzielona na kawałki o stałym rozmiarze; każdy kawałek
+jest szyfrowany osobno, więc w pamięci trzymany jest zawsze tylko jeden.
+secretstream chroni kolejność kawałków i wykrywa obcięcie strumienia
+(ostatni kawałek ma tag FINAL).
+"""
+
+from nacl.bindings import (
+    crypto_secretstream_xchacha20poly1305_init_pull,
+    crypto_secretstream_xchacha20poly1305_init_push,
+    crypto_secretstream_xchacha20poly1305_pull,
+    crypto_secretstream_xchacha20poly1305_push,
+    crypto_secretstream_xchacha20poly1305_state,
+    crypto_secretstream_xchacha20poly1305_TAG_FINAL,
+    crypto_secretstream_xchacha20poly1305_TAG_MESSAGE,
+)
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class StreamEncryptor:
+    """Szyfruje kolejne kawałki jednego strumienia."""
+
+    def __init__(self, key: bytes):
+        self._state = crypto_secretstream_xchacha20poly1305_state()
+        self.header = crypto_secretstream_xchacha20poly1305_init_push(self._state, key)
+        self._finished = False
+
+    def push(self, chunk: bytes, *, final: bool = False) -> bytes:
+        if self._finished:
+            raise ValueError("strumień został już zamknięty")
+        tag = crypto_secretstream_xchacha20poly1305_TAG_FINAL if final else crypto_secretstream_xchacha20poly1305_TAG_MESSAGE
+        self._finished = final
+        return crypto_secretstream_xchacha20poly1305_push(self._state, chunk, None, tag)
+
+
+class StreamDecryptor:
+    """Odszyfrowuje kolejne kawałki i pilnuje, by strumień był kompletny."""
+
+    def __init__(self, key: bytes, header: bytes):
+        self._state = crypto_secretstream_xchacha20poly1305_state()
+        crypto_secretstream_xchacha20poly1305_init_pull(self._state, header, key)
+        self.finished = False
+
+    def pull(self, chunk: bytes) -> bytes:
+        if self.finished:
+            raise ValueError("dane po końcu strumienia")
+        plaintext, tag = crypto_secretstream_xchacha20poly1305_pull(self._state, chunk, None)
+        self.finished = tag == crypto_secretstream_xchacha20poly1305_TAG_FINAL
+        return plaintext
@@ -0,0 +1,49 @@
+import base64
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from domain.entities import UserKeys
+from domain.interfaces import UserKeyRepository
+from application.services.encryption_service import EncryptionService
+
+
+class UserKeyService:
+    """Serwis hierarchii kluczy użytkownika.
+
+    Każdy użytkownik może (opcjonalnie) mieć główną parę kluczy NaCl.
+    Do publicznego klucza głównego zapieczętowany jest symetryczny KEK,
+    którym opakowywane są klucze sesyjne notatek (paczki v2).
+    """
+
+    def __init__(self, repo: UserKeyRepository, encryption: EncryptionService):
+        self._repo = repo
+        self._encryption = encryption
+
+    async def ensure_keys(self, user_uuid: UUID) -> UserKeys:
+        """Zwraca klucze użytkownika, tworząc je przy pierwszym wywołaniu."""
+        existing = await self._repo.get_by_user(user_uuid)
+        if existing:
+            return existing
+
+        master_priv, master_pub = self._encryption.generate_nacl_keypair()
+        kek = self._encryption.generate_kek()
+        keys = UserKeys(
+            user_uuid=user_uuid,
+            public_key_b64=base64.b64encode(master_pub).decode(),
+            private_key_enc=self._encryption.encrypt_server(base64.b64encode(master_priv).decode()),
+            sealed_kek=self._encryption.seal_kek(kek, master_pub),
+            created_at=datetime.utcnow(),
+        )
+        return await self._repo.add(keys)
+
+    async def get_kek(self, user_uuid: UUID) -> Optional[bytes]:
+        """Odpieczętowuje KEK użytkownika albo zwraca None, jeśli nie ma on kluczy głównych.
+
+        Wywoływane raz na żądanie - to jedyna operacja asymetryczna przy listowaniu.
+        """
+        keys = await self._repo.get_by_user(user_uuid)
+        if keys is None:
+            return None
+        master_priv = base64.b64decode(self._encryption.decrypt_server(keys.private_key_enc))
+        return self._encryption.unseal_kek(keys.sealed_kek, master_priv)
@@ -4,15 +4,20 @@ from typing import Optional,List
 
 
 from domain.entities import Note
-from domain.interfaces import NoteRepository
+from domain.interfaces import NoteRepository, NoteIndexer, AccountVersionRepository
 from application.services.encryption_service import EncryptionService
+from application.services.filtering.title_hash import TitleHasher
 
 class CreateNoteUseCase:
-    def __init__(self, repo: NoteRepository, encryption: EncryptionService):
+    def __init__(self, repo: NoteRepository, encryption: EncryptionService, index: Optional[NoteIndexer] = None,
+                 versions: Optional[AccountVersionRepository] = None, title_hasher: Optional[TitleHasher] = None):
         '''konstruktor do inicjalizacji repozytorium i serwisu szyfrującego'''
         '''repozytorium aka baza danych'''
         self.repo = repo
         self.encryption = encryption
+        self.index = index
+        self.versions = versions
+        self.title_hasher = title_hasher
     
     async def execute(
             self,
@@ -22,9 +27,12 @@ class CreateNoteUseCase:
             title:str, 
             client_private_key_b64: Optional[str] = None,
             tags: List[str] | None = None,
+            plain_title: Optional[str] = None,
+            plain_content: Optional[str] = None,
             ) -> Note:
         '''wykorzystuje encryption service do ponownego zaszyfrowania notatki.
-        wysłanej z klienta i zapisuje ją w repozytorium. Przechowuje też klucz prywatny klienta.'''
+        wysłanej z klienta i zapisuje ją w repozytorium. Przechowuje też klucz prywatny klienta.
+        Jeśli podano plaintext (`plain_title`/`plain_content`), notatka trafia do ślepego indeksu.'''
         encrypted_for_server = self.encryption.encryptserver(local_encrypted_content)
         encrypted_title = self.encryption.encryptserver(title)
 
@@ -37,7 +45,12 @@ class CreateNoteUseCase:
             tags=tags,
             created_at=datetime.utcnow(),
             key_private_b64=client_private_key_b64,
+            title_hash=self.title_hasher.digest(user_uuid, plain_title) if self.title_hasher and plain_title is not None else None,
         )
         await self.repo.add(note)
+        if self.index is not None and (plain_title is not None or plain_content is not None):
+            await self.index.index_note(user_uuid=user_uuid, note_id=note.id, title=plain_title, content=plain_content, tags=tags)
+        if self.versions is not None:
+            await self.versions.bump(user_uuid)
         return note
         
\ No newline at end of file
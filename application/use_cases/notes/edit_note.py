@@ -1,13 +1,21 @@
 from typing import Optional,List
 from datetime import datetime
 from uuid import UUID
-from domain.interfaces import NoteRepository
+from domain.interfaces import NoteRepository, NoteIndexer, AccountVersionRepository
 from application.services.encryption_service import EncryptionService
+from application.services.note_stream_service import NoteStreamService
+from application.services.filtering.title_hash import TitleHasher
 
 class EditNoteUseCase:
-    def __init__(self, repo: NoteRepository, encryption: EncryptionService):
+    def __init__(self, repo: NoteRepository, encryption: EncryptionService, streams: Optional[NoteStreamService] = None,
+                 index: Optional[NoteIndexer] = None, versions: Optional[AccountVersionRepository] = None,
+                 title_hasher: Optional[TitleHasher] = None):
         self.repo = repo
         self.encryption = encryption
+        self.streams = streams
+        self.index = index
+        self.versions = versions
+        self.title_hasher = title_hasher
 
     async def execute(self,
                       *,
@@ -16,7 +24,9 @@ class EditNoteUseCase:
                       new_local_encrypted_content: str,
                       new_client_private_key_b64: Optional[str]=None ,
                       new_title:str | None=None,
-                      new_tags:List[str]| None=None
+                      new_tags:List[str]| None=None,
+                      plain_title: Optional[str] = None,
+                      plain_content: Optional[str] = None,
                       ) -> str:
         '''Edytuje istniejącą notatkę o podanym ID, aktualizując jej zawartość i klucz prywatny.'''                         # zmieniłem z optional na stały zobaczmy co się stanie 
         existing_note = await self.repo.get_by_id(note_id=note_id,user_uuid=user_uuid)  # Pobierz istniejącą notatkę z repozytorium
@@ -38,7 +48,14 @@ class EditNoteUseCase:
 
         
         existing_note.created_at = datetime.utcnow()
-        
+
+        # skrót tytułu: nowy z plaintextu, a przy zmianie tytułu bez plaintextu - wyczyszczony (b""),
+        # żeby filtr po tytule nie trafiał w nieaktualny skrót
+        title_hash = None
+        if self.title_hasher is not None and plain_title is not None:
+            title_hash = self.title_hasher.digest(user_uuid, plain_title) or b""
+        elif new_title is not None:
+            title_hash = b""
         
         updated_note = await self.repo.update(
             note_id,
@@ -46,10 +63,20 @@ class EditNoteUseCase:
             content=encrypted_content,
             title=existing_note.title,
             tags=existing_note.tags,
-            updated_at=existing_note.created_at
+            updated_at=existing_note.created_at,
+            title_hash=title_hash,
             )
         
         if updated_note:
+            if self.versions is not None:
+                await self.versions.bump(user_uuid)
+            # treść strumieniowa została zastąpiona zwykłą - usuń stare kawałki
+            if existing_note.stream_id is not None and self.streams is not None:
+                await self.streams.delete(stream_id=existing_note.stream_id, user_uuid=user_uuid)
+            if self.index is not None and plain_content is not None:
+                # plain_title jest wymagany razem z treścią - indeks zastępuje wszystkie słowa notatki
+                await self.index.index_note(user_uuid=user_uuid, note_id=note_id, title=plain_title,
+                                            content=plain_content, tags=existing_note.tags)
             # Also update the key if provided
             if new_client_private_key_b64:
                 updated_note.key_private_b64 = new_client_private_key_b64
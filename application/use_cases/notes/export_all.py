@@ -0,0 +1,21 @@
+from typing import AsyncIterator
+from uuid import UUID
+
+from application.services.exporting.export_service import ExportingService
+
+
+class ExportAllUseCase:
+    """Use case for exporting the whole account in one request.
+
+    Formats: ZIP of .txt files, Markdown bundle (ZIP of .md files with
+    front matter), NDJSON and CSV - the last three carry tags, dates and
+    trash state. The output is produced as a stream of bytes while notes
+    are read, so neither memory nor disk usage grows with the account size.
+    """
+
+    def __init__(self, export_service: ExportingService):
+        self.export_service = export_service
+
+    def execute(self, *, user_uuid: UUID, fmt: str = "zip", include_trash: bool = False) -> AsyncIterator[bytes]:
+        """Return an async iterator over the bytes of the export."""
+        return self.export_service.export_all(user_uuid, fmt, include_trash)
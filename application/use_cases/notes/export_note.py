@@ -1,13 +1,15 @@
+from typing import Optional
+
 from domain.interfaces import NoteRepository, ExportServiceInterface
-from application.services.exporting.export_dto import NotesExport
+from application.services.exporting.export_dto import NotesExport, ExportedNote
 
 
 class ExportNoteUseCase:
     """Use case for exporting a note to a text file.
     
-    Exports a note by decrypting its title and content,
-    then creating a .txt file with the title as filename
-    and content as file content.
+    Exports a note by decrypting its title and content once,
+    then streaming the content as a .txt file named after the title.
+    Unchanged notes (matching ETag) are not decrypted at all.
     """
 
     def __init__(self, repo: NoteRepository, export_service: ExportServiceInterface):
@@ -21,17 +23,19 @@ class ExportNoteUseCase:
         self.export_service = export_service
 
 
-    async def execute(self, export_request: NotesExport) -> tuple[str, str]:
+    async def execute(self, export_request: NotesExport, if_none_match: Optional[str] = None) -> ExportedNote:
         """Execute the export operation.
         
         Args:
             export_request: DTO containing the note ID to export
+            if_none_match: Client's If-None-Match header, if any
             
         Returns:
-            Tuple containing (file_path, filename)
+            Filename, ETag and content stream (no stream when not modified)
             
         Raises:
             ValueError: If note doesn't exist or decryption fails
         """
-        return await self.export_service.export(export_request.note_id, self.repo,user_uuid=export_request.user_uuid)
+        return await self.export_service.export(export_request.note_id, self.repo, user_uuid=export_request.user_uuid,
+                                                if_none_match=if_none_match)
 
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional, Set
 
 from domain.entities import Note
 from domain.interfaces import NoteRepository, FilteringServiceInterface
@@ -17,13 +17,18 @@ class FilterNotesUseCase:
         self.filtering = filter_service
     
     
-    async def execute(self, filters: NotesFilter) -> List[Note]:
+    async def execute(self, filters: NotesFilter, *, columns: Optional[Set[str]] = None,
+                      after_id: Optional[int] = None, limit: Optional[int] = None) -> List[Note]:
         """Execute the filtering operation.
         
         Args:
             filters: DTO containing filter criteria
+            columns: Columns to read (None reads all; skipped ciphertext is b"")
+            after_id: Return notes with a greater id (keyset pagination)
+            limit: Page size
             
         Returns:
-            List of notes matching the filter criteria
+            List of notes matching the filter criteria, ordered by id
         """
-        return await self.filtering.filter_notes(self.repo, filters,user_uuid=filters.user_uuid)
\ No newline at end of file
+        return await self.filtering.filter_page(self.repo, filters, filters.user_uuid,
+                                                columns=columns, after_id=after_id, limit=limit)
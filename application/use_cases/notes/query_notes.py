@@ -0,0 +1,27 @@
+from typing import List, Optional, Tuple
+
+from application.services.filtering.filter_dto import NotesFilter
+from application.services.search.query_planner import QueryPlanner
+from application.services.search.search_dto import NotesSearchQuery, QueryStage, SearchResult
+
+
+class QueryNotesUseCase:
+    """Use case for one combined filter + search query (notes or trash).
+
+    Filter predicates are evaluated in SQL first; only the surviving notes
+    are decrypted and matched against the search query.
+    """
+
+    def __init__(self, planner: QueryPlanner):
+        self.planner = planner
+
+    async def execute(
+        self,
+        filters: NotesFilter,
+        search_query: Optional[NotesSearchQuery] = None,
+        *,
+        scope: str = "notes",
+        limit: Optional[int] = None,
+    ) -> Tuple[List[SearchResult], List[QueryStage]]:
+        """Return matching notes with decrypted fields and the executed plan."""
+        return await self.planner.run(filters, search_query, scope=scope, limit=limit)
@@ -1,9 +1,8 @@
 from typing import List
 
-from domain.entities import Note
 from domain.interfaces import NoteRepository, SearchServiceInterface
 
-from application.services.search.search_dto import NotesSearchQuery
+from application.services.search.search_dto import NotesSearchQuery, SearchResult
 
 
 class SearchNotesUseCase:
@@ -23,14 +22,14 @@ class SearchNotesUseCase:
         self.search_service = search_service
 
 
-    async def execute(self, search_query: NotesSearchQuery) -> List[Note]:
+    async def execute(self, search_query: NotesSearchQuery) -> List[SearchResult]:
         """Execute the search operation.
         
         Args:
             search_query: DTO containing the search query string
             
         Returns:
-            List of notes matching the search query
+            Matching notes with their decrypted title and content
         """
         return await self.search_service.search_notes(self.repo, search_query,user_uuid=search_query.user_uuid)
 
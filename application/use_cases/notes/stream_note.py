@@ -0,0 +1,95 @@
+from uuid import UUID
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from domain.entities import Note
+from domain.interfaces import NoteRepository, NoteIndexer, AccountVersionRepository
+from application.services.encryption_service import EncryptionService
+from application.services.note_stream_service import NoteStreamService
+from application.services.filtering.title_hash import TitleHasher
+
+
+class StreamNoteUseCase:
+    def __init__(self, repo: NoteRepository, streams: NoteStreamService, encryption: EncryptionService,
+                 index: Optional[NoteIndexer] = None, versions: Optional[AccountVersionRepository] = None,
+                 title_hasher: Optional[TitleHasher] = None):
+        '''zapis i odczyt dużych notatek w kawałkach (stała pamięć niezależnie od rozmiaru)'''
+        self.repo = repo
+        self.streams = streams
+        self.encryption = encryption
+        self.index = index
+        self.versions = versions
+        self.title_hasher = title_hasher
+
+    async def upload(
+            self,
+            *,
+            user_uuid: UUID,
+            title: str,
+            body: AsyncIterator[bytes],
+            recipient_public_key: bytes,
+            client_private_key_b64: Optional[str] = None,
+            kek: Optional[bytes] = None,
+            tags: List[str] | None = None,
+            plain_title: Optional[str] = None,
+            ) -> Tuple[Note, int]:
+        '''szyfruje treść kawałkami i zapisuje notatkę; `title` to już lokalnie zaszyfrowana paczka.
+        Wiersz notatki powstaje dopiero po zapisaniu wszystkich kawałków.
+        Do ślepego indeksu trafia tylko tytuł i tagi (treść nie jest trzymana w pamięci).'''
+        stream_id, server_header, size = await self.streams.write(
+            user_uuid=user_uuid,
+            body=body,
+            recipient_public_key=recipient_public_key,
+            kek=kek,
+        )
+        try:
+            note = Note(
+                id=0,
+                title=self.encryption.encryptserver(title),
+                content=server_header,
+                user_uuid=user_uuid,
+                tags=tags,
+                created_at=datetime.utcnow(),
+                key_private_b64=client_private_key_b64,
+                stream_id=stream_id,
+                title_hash=self.title_hasher.digest(user_uuid, plain_title) if self.title_hasher and plain_title is not None else None,
+            )
+            await self.repo.add(note)
+        except BaseException:
+            # bez wiersza notatki kawałki nie byłyby nigdy usunięte
+            await self.streams.discard(stream_id=stream_id, user_uuid=user_uuid)
+            raise
+        if self.index is not None and plain_title is not None:
+            await self.index.index_note(user_uuid=user_uuid, note_id=note.id, title=plain_title, content=None, tags=tags)
+        if self.versions is not None:
+            await self.versions.bump(user_uuid)
+        return note, size
+
+    async def download(
+            self,
+            *,
+            note_id: int,
+            user_uuid: UUID,
+            private_key: Optional[bytes] = None,
+            kek: Optional[bytes] = None,
+            ) -> Optional[AsyncIterator[bytes]]:
+        '''zwraca iterator odszyfrowanej treści albo None, jeśli notatka nie istnieje.
+        Zwykłe (niestrumieniowe) notatki są zwracane jako jeden kawałek.'''
+        note = await self.repo.get_by_id(note_id=note_id, user_uuid=user_uuid)
+        if not note:
+            return None
+        if note.stream_id is None:
+            package = self.encryption.decrypt_server(note.content).encode()
+            text = self.encryption.decrypt_package(package, private_key=private_key, kek=kek)
+            return self._single(text.encode())
+        return await self.streams.read(
+            stream_id=note.stream_id,
+            user_uuid=user_uuid,
+            server_header=note.content,
+            private_key=private_key,
+            kek=kek,
+        )
+
+    @staticmethod
+    async def _single(data: bytes) -> AsyncIterator[bytes]:
+        yield data
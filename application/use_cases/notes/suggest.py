@@ -0,0 +1,19 @@
+from typing import List
+from uuid import UUID
+
+from domain.interfaces import SearchServiceInterface
+
+
+class SuggestUseCase:
+    """Use case for search-as-you-type suggestions.
+
+    Completes a prefix from note titles, title words and tags without
+    decrypting note content.
+    """
+
+    def __init__(self, search_service: SearchServiceInterface):
+        self.search_service = search_service
+
+    async def execute(self, *, user_uuid: UUID, prefix: str, limit: int = 10) -> List[dict]:
+        """Return up to `limit` suggestions ({"text", "kind", "count"}) for the prefix."""
+        return await self.search_service.suggest(user_uuid, prefix, limit)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional, Set
 
 from domain.entities import Trash
 from domain.interfaces import TrashRepository, FilteringServiceInterface
@@ -17,13 +17,18 @@ class FilterTrashUseCase:
         self.filtering = filtering_service
 
 
-    async def execute(self, filters: NotesFilter) -> List[Trash]:
+    async def execute(self, filters: NotesFilter, *, columns: Optional[Set[str]] = None,
+                      after_id: Optional[int] = None, limit: Optional[int] = None) -> List[Trash]:
         """Execute the filtering operation.
         
         Args:
             filters: DTO containing filter criteria
+            columns: Columns to read (None reads all; skipped ciphertext is b"")
+            after_id: Return trashed notes with a greater id (keyset pagination)
+            limit: Page size
             
         Returns:
-            List of trashed notes matching the filter criteria
+            List of trashed notes matching the filter criteria, ordered by id
         """
-        return await self.filtering.filter_trash(self.repo, filters,user_uuid=filters.user_uuid)
\ No newline at end of file
+        return await self.filtering.filter_page(self.repo, filters, filters.user_uuid,
+                                                columns=columns, after_id=after_id, limit=limit)
@@ -1,9 +1,8 @@
 from typing import List
 
-from domain.entities import Trash
 from domain.interfaces import TrashRepository, SearchServiceInterface
 
-from application.services.search.search_dto import NotesSearchQuery
+from application.services.search.search_dto import NotesSearchQuery, SearchResult
 
 
 class SearchTrashUseCase:
@@ -22,14 +21,14 @@ class SearchTrashUseCase:
         self.repo = repo
         self.search = search_service
 
-    async def execute(self, search_query: NotesSearchQuery) -> List[Trash]:
+    async def execute(self, search_query: NotesSearchQuery) -> List[SearchResult]:
         """Execute the search operation.
         
         Args:
             search_query: DTO containing the search query string
             
         Returns:
-            List of trashed notes matching the search query
+            Matching trashed notes with their decrypted title and content
         """
         return await self.search.search_trash(self.repo, search_query,user_uuid=search_query.user_uuid)
 
@@ -1,10 +1,18 @@
-from domain.interfaces import TrashRepository
+from domain.interfaces import TrashRepository,NoteIndexer,AccountVersionRepository
 from uuid import UUID
+from typing import Optional
+from application.services.search.blind_index import TRASH
 class PermamentDelitionUseCase:
-    def __init__(self,trash_can:TrashRepository):
+    def __init__(self,trash_can:TrashRepository,index:Optional[NoteIndexer]=None,versions:Optional[AccountVersionRepository]=None):
         '''zapewnia permamentne usuwanie notatki z kosza'''
         self._trash=trash_can
+        self._index=index
+        self._versions=versions
     async def execute(self,*,note_id:int,user_uuid:UUID)->bool:
         '''permamentne usuwanie'''
         result=await self._trash.delete_permanently(note_id=note_id,user_uuid=user_uuid)
+        if result and self._index is not None:
+            await self._index.remove(user_uuid=user_uuid, note_id=note_id, scope=TRASH)
+        if result and self._versions is not None:
+            await self._versions.bump(user_uuid)
         return result
\ No newline at end of file
@@ -1,11 +1,16 @@
-from domain.interfaces import NoteRepository,TrashRepository
+from domain.interfaces import NoteRepository,TrashRepository,NoteIndexer,AccountVersionRepository
 from domain.entities import Note
 from uuid import UUID
+from typing import Optional
+from application.services.search.blind_index import NOTES, TRASH
 class TrashRestoreUseCase:
-    def __init__(self,note:NoteRepository,trash:TrashRepository):
+    def __init__(self,note:NoteRepository,trash:TrashRepository,index:Optional[NoteIndexer]=None,
+                 versions:Optional[AccountVersionRepository]=None):
         '''przywraca note z kosza spowrotem do note_repo'''
         self._note=note
         self._trash=trash
+        self._index=index
+        self._versions=versions
     async def execute(self,*,note_id:int,user_uuid:UUID)->bool:
         '''przywraca notatkę z kosza do note_repo'''
         trashed = await self._trash.restore(
@@ -24,12 +29,18 @@ class TrashRestoreUseCase:
             created_at=trashed.created_at,
             key_private_b64=trashed.key_private_b64,
             public_key_b64=trashed.public_key_b64,
+            stream_id=trashed.stream_id,
+            title_hash=trashed.title_hash,
         )
         await self._note.add(
             note=restored
         )
+        if self._index is not None:
+            await self._index.move(user_uuid=user_uuid, from_scope=TRASH, from_id=note_id, to_scope=NOTES, to_id=restored.id)
         await self._trash.delete_permanently(
             note_id=note_id,
             user_uuid=user_uuid
         )
+        if self._versions is not None:
+            await self._versions.bump(user_uuid)
         return True
\ No newline at end of file
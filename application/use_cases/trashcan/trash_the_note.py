@@ -1,14 +1,19 @@
 from datetime import datetime
+from typing import Optional
 from uuid import UUID
 
 from domain.entities import Note, Trash
-from domain.interfaces import NoteRepository, TrashRepository
+from domain.interfaces import NoteRepository, TrashRepository, NoteIndexer, AccountVersionRepository
+from application.services.search.blind_index import NOTES, TRASH
 
 
 class TrashNoteUseCase:
-    def __init__(self, note_repo: NoteRepository, trash_repo: TrashRepository):
+    def __init__(self, note_repo: NoteRepository, trash_repo: TrashRepository, index: Optional[NoteIndexer] = None,
+                 versions: Optional[AccountVersionRepository] = None):
         self.note_repo = note_repo
         self.trash_repo = trash_repo
+        self.index = index
+        self.versions = versions
 
     async def execute(self, *, note_id: int, user_uuid: UUID) -> bool:
         note = await self.note_repo.get_by_id(
@@ -29,11 +34,18 @@ class TrashNoteUseCase:
             trashed_at=datetime.utcnow(),
             key_private_b64=note.key_private_b64,
             public_key_b64=note.public_key_b64,
+            stream_id=note.stream_id,
+            title_hash=note.title_hash,
         )
 
         await self.trash_repo.add_to_trash(trashed)
+        if self.index is not None:
+            # kosz nadaje nowe id - wpisy indeksu idą za notatką
+            await self.index.move(user_uuid=user_uuid, from_scope=NOTES, from_id=note_id, to_scope=TRASH, to_id=trashed.id)
         await self.note_repo.delete_notes(
             note_id=note_id,
             user_uuid=user_uuid
         )
+        if self.versions is not None:
+            await self.versions.bump(user_uuid)
         return True
@@ -0,0 +1,225 @@
+"""Mikro-benchmark operacji `EncryptionService` dla różnych rozmiarów notatek.
+
+Mierzy dla każdej operacji i rozmiaru:
+- ops/s (jeden wątek oraz BENCH_WORKERS równoległych procesów)
+- opóźnienie p50 / p99 (ms)
+- bajty zapisywane w `notes.content` (paczka klienta + warstwa serwerowa)
+
+Wyniki zapisywane są jako JSON (BENCH_OUTPUT); jeśli podano BENCH_BASELINE,
+wyniki są porównywane z wcześniejszym plikiem i skrypt kończy się kodem 1,
+gdy ops/s spadnie o więcej niż BENCH_REGRESSION (ułamek, domyślnie 0.10).
+
+Uruchomienie (z katalogu repozytorium):
+    PYTHONPATH=. python benchmarks/crypto_bench.py
+    BENCH_BASELINE=bench-main.json PYTHONPATH=. python benchmarks/crypto_bench.py
+
+Zmienne środowiskowe:
+    BENCH_SIZES        rozmiary w bajtach, po przecinku (domyślnie 100 B .. 10 MB)
+    BENCH_OPS          podzbiór operacji, po przecinku (domyślnie wszystkie)
+    BENCH_MIN_SECONDS  minimalny czas pomiaru jednej kombinacji (domyślnie 0.5)
+    BENCH_MIN_RUNS     minimalna liczba wywołań (domyślnie 5, ważne dla 10 MB)
+    BENCH_WORKERS      liczba procesów w pomiarze równoległym (domyślnie liczba CPU, 1 wyłącza)
+    BENCH_CIPHER       format warstwy serwerowej (fernet / aesgcm / xchacha20)
+    BENCH_COMPRESSION  algorytm kompresji plaintextu (zlib / zstd / none, domyślnie none)
+    BENCH_OUTPUT       ścieżka pliku z wynikami (domyślnie bench-results.json)
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from cryptography.fernet import Fernet
+
+from application.services.compression import Compressor
+from application.services.encryption_service import EncryptionService
+
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+OPERATIONS = [
+    "generate_nacl_keypair",
+    "encrypt_for_recipient",
+    "decrypt_with_private",
+    "encrypt_server",
+    "decrypt_server",
+    "store_note",
+    "load_note",
+]
+
+SIZES = [int(s) for s in os.getenv("BENCH_SIZES", "").split(",") if s.strip()] or DEFAULT_SIZES
+OPS = [o.strip() for o in os.getenv("BENCH_OPS", "").split(",") if o.strip()] or OPERATIONS
+MIN_SECONDS = float(os.getenv("BENCH_MIN_SECONDS", "0.5"))
+MIN_RUNS = int(os.getenv("BENCH_MIN_RUNS", "5"))
+WORKERS = int(os.getenv("BENCH_WORKERS", str(os.cpu_count() or 1)))
+CIPHER = os.getenv("BENCH_CIPHER", "fernet")
+COMPRESSION = os.getenv("BENCH_COMPRESSION", "none")
+OUTPUT = os.getenv("BENCH_OUTPUT", "bench-results.json")
+BASELINE = os.getenv("BENCH_BASELINE")
+REGRESSION = float(os.getenv("BENCH_REGRESSION", "0.10"))
+
+
+def _payload(size: int) -> str:
+    # tekst ze stałym ziarnem - ten sam wejściowy plaintext w każdym uruchomieniu
+    words = ["notatka", "szyfr", "klucz", "tekst", "lista", "zakupy", "spotkanie", "projekt"]
+    out: List[str] = []
+    length = 0
+    i = 0
+    while length < size:
+        word = words[(i * 7 + i // 3) % len(words)]
+        out.append(word)
+        length += len(word) + 1
+        i += 1
+    return " ".join(out)[:size]
+
+
+def _prepare(operation: str, size: int, server_key: bytes) -> Callable[[], object]:
+    """Buduje funkcję wykonującą jedną operację (dane przygotowane z góry)."""
+    service = EncryptionService(server_key, CIPHER, Compressor(COMPRESSION))
+    priv, pub = service.generate_nacl_keypair()
+    plaintext = _payload(size)
+    package = service.encrypt_for_recipient(plaintext, pub)
+    token = service.encrypt_server(package.decode())
+
+    return {
+        "generate_nacl_keypair": service.generate_nacl_keypair,
+        "encrypt_for_recipient": lambda: service.encrypt_for_recipient(plaintext, pub),
+        "decrypt_with_private": lambda: service.decrypt_with_private(package, priv),
+        "encrypt_server": lambda: service.encrypt_server(package.decode()),
+        "decrypt_server": lambda: service.decrypt_server(token),
+        # pełna ścieżka zapisu / odczytu notatki jak w CreateNoteUseCase / GET /notes/{id}
+        "store_note": lambda: service.encrypt_server(service.encrypt_for_recipient(plaintext, pub).decode()),
+        "load_note": lambda: service.decrypt_with_private(service.decrypt_server(token).encode(), priv),
+    }[operation]
+
+
+def _stored_bytes(size: int, server_key: bytes) -> int:
+    service = EncryptionService(server_key, CIPHER, Compressor(COMPRESSION))
+    _, pub = service.generate_nacl_keypair()
+    return len(service.encrypt_server(service.encrypt_for_recipient(_payload(size), pub).decode()))
+
+
+def _measure(operation: str, size: int, server_key: bytes) -> Dict[str, float]:
+    """Wywołuje operację aż upłynie MIN_SECONDS (co najmniej MIN_RUNS razy)."""
+    fn = _prepare(operation, size, server_key)
+    fn()  # rozgrzewka
+    latencies: List[float] = []
+    start = time.perf_counter()
+    while len(latencies) < MIN_RUNS or time.perf_counter() - start < MIN_SECONDS:
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return {"runs": len(latencies), "elapsed": time.perf_counter() - start, "latencies": latencies}
+
+
+def _summary(samples: List[Dict[str, float]]) -> Dict[str, float]:
+    latencies = sorted(lat for s in samples for lat in s["latencies"])
+    runs = sum(s["runs"] for s in samples)
+    # procesy działają równolegle - przepustowość to suma przepustowości procesów
+    ops = sum(s["runs"] / s["elapsed"] for s in samples)
+    p99_index = min(len(latencies) - 1, int(len(latencies) * 0.99))
+    return {
+        "runs": runs,
+        "ops_per_sec": round(ops, 3),
+        "p50_ms": round(statistics.median(latencies) * 1000, 4),
+        "p99_ms": round(latencies[p99_index] * 1000, 4),
+    }
+
+
+def _run(server_key: bytes) -> List[dict]:
+    results = []
+    pool = ProcessPoolExecutor(WORKERS) if WORKERS > 1 else None
+    try:
+        for size in SIZES:
+            stored = _stored_bytes(size, server_key)
+            for operation in OPS:
+                if operation == "generate_nacl_keypair" and size != SIZES[0]:
+                    continue  # nie zależy od rozmiaru notatki
+                entry = {
+                    "operation": operation,
+                    "size": size,
+                    "stored_bytes": stored,
+                    "expansion": round(stored / size, 3),
+                    "single": _summary([_measure(operation, size, server_key)]),
+                }
+                if pool is not None:
+                    futures = [pool.submit(_measure, operation, size, server_key) for _ in range(WORKERS)]
+                    entry["parallel"] = _summary([f.result() for f in futures])
+                results.append(entry)
+                _print_row(entry)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
+
+
+def _print_row(entry: dict) -> None:
+    single = entry["single"]
+    parallel = entry.get("parallel")
+    par = f"{parallel['ops_per_sec']:>12.1f}" if parallel else f"{'-':>12}"
+    print(f"{entry['operation']:>22} {entry['size']:>9} {single['ops_per_sec']:>12.1f} {par} "
+          f"{single['p50_ms']:>10.3f} {single['p99_ms']:>10.3f} {entry['stored_bytes']:>10} {entry['expansion']:>7.2f}x")
+
+
+def _compare(results: List[dict], baseline_path: str) -> int:
+    """Porównuje ops/s z plikiem bazowym; zwraca liczbę regresji."""
+    with open(baseline_path) as f:
+        baseline = {(r["operation"], r["size"]): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"\ncomparison with {baseline_path} (regression threshold {REGRESSION:.0%}):")
+    for entry in results:
+        base = baseline.get((entry["operation"], entry["size"]))
+        if base is None:
+            continue
+        for mode in ("single", "parallel"):
+            if mode not in entry or mode not in base:
+                continue
+            old, new = base[mode]["ops_per_sec"], entry[mode]["ops_per_sec"]
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if change < -REGRESSION:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{entry['operation']:>22} {entry['size']:>9} {mode:>8}: {old:>12.1f} -> {new:>12.1f} ops/s ({change:+.1%}){flag}")
+        if entry["stored_bytes"] != base["stored_bytes"]:
+            print(f"{entry['operation']:>22} {entry['size']:>9}   stored: {base['stored_bytes']} -> {entry['stored_bytes']} bytes")
+    return regressions
+
+
+def main() -> Optional[int]:
+    server_key = Fernet.generate_key()
+
+    print(f"cipher={CIPHER} compression={COMPRESSION} workers={WORKERS}")
+    print(f"{'operation':>22} {'size':>9} {'ops/s':>12} {'ops/s par':>12} {'p50 ms':>10} {'p99 ms':>10} {'stored B':>10} {'expand':>8}")
+    results = _run(server_key)
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "cipher": CIPHER,
+            "compression": COMPRESSION,
+            "workers": WORKERS,
+            "min_seconds": MIN_SECONDS,
+            "min_runs": MIN_RUNS,
+        },
+        "results": results,
+    }
+    with open(OUTPUT, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {OUTPUT}")
+
+    if BASELINE:
+        return 1 if _compare(results, BASELINE) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Benchmark warstwy serwerowej: fernet vs aesgcm vs xchacha20.
+
+Dla każdego rozmiaru notatki mierzy przepustowość encrypt/decrypt (MB/s)
+oraz liczbę bajtów zapisywanych w kolumnie `notes.content`
+(paczka klienta + warstwa serwerowa).
+
+Uruchomienie (z katalogu repozytorium):
+    PYTHONPATH=. python benchmarks/server_cipher_bench.py
+"""
+
+import os
+import time
+
+from cryptography.fernet import Fernet
+
+from application.services.encryption_service import EncryptionService
+from application.services.server_cipher import ServerCipher
+
+
+SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+ALGORITHMS = ["fernet", "aesgcm", "xchacha20"]
+MIN_SECONDS = float(os.getenv("BENCH_MIN_SECONDS", "0.5"))
+
+
+def _throughput(fn, payload_size: int) -> float:
+    """Zwraca MB/s dla `fn` wywoływanej aż upłynie MIN_SECONDS."""
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            return runs * payload_size / elapsed / 1_000_000
+
+
+def main():
+    server_key = Fernet.generate_key()
+    client = EncryptionService()
+    _, client_pub = client.generate_nacl_keypair()
+
+    print(f"{'size':>9} {'cipher':>10} {'enc MB/s':>10} {'dec MB/s':>10} {'stored B':>10} {'overhead':>9}")
+    for size in SIZES:
+        plaintext = os.urandom(size // 2).hex()[:size]
+        package = client.encrypt_for_recipient(plaintext, client_pub)
+
+        for name in ALGORITHMS:
+            cipher = ServerCipher(server_key, name)
+            token = cipher.encrypt(package)
+            assert cipher.decrypt(token) == package
+
+            enc = _throughput(lambda: cipher.encrypt(package), len(package))
+            dec = _throughput(lambda: cipher.decrypt(token), len(package))
+            print(f"{size:>9} {name:>10} {enc:>10.1f} {dec:>10.1f} {len(token):>10} {len(token) / size:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
-from datetime import datetime
-from typing import Optional, List
+from datetime import date, datetime
+from typing import Dict, Optional, List
 from uuid import UUID
 from pydantic import BaseModel, ConfigDict
 
@@ -23,6 +23,10 @@ class Note(BaseModel):
     tags: Optional[List[str]] = None
     key_private_b64: Optional[str] = None
     public_key_b64: Optional[str] = None
+    # treść zapisana strumieniowo w `note_chunks` (content zawiera wtedy paczkę "s1")
+    stream_id: Optional[UUID] = None
+    # HMAC znormalizowanego tytułu (TitleHasher) - filtr po tytule bez odszyfrowywania
+    title_hash: Optional[bytes] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -36,4 +40,100 @@ class Trash(BaseModel):
     created_at: Optional[datetime] = None
     trashed_at: datetime
     key_private_b64: Optional[str] = None
-    public_key_b64: Optional[str] = None
\ No newline at end of file
+    public_key_b64: Optional[str] = None
+    stream_id: Optional[UUID] = None
+    title_hash: Optional[bytes] = None
+
+
+class SavedFilter(BaseModel):
+    """Zapisany filtr ("inteligentny folder") z członkostwem w `saved_filter_members`.
+
+    Tytuł przechowywany jest tylko jako skrót (TitleHasher) - plaintext filtra
+    nie trafia do bazy.
+    """
+    id: Optional[int] = None
+    user_uuid: UUID
+    name: str
+    scope: str = "notes"
+    tag: Optional[str] = None
+    title_hash: Optional[bytes] = None
+    date_eq: Optional[date] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    created_at: Optional[datetime] = None
+    # liczba notatek w folderze (wypełniana przy listowaniu)
+    count: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserKeys(BaseModel):
+    """Główna para kluczy użytkownika (hierarchia kluczy).
+
+    - `private_key_enc`: prywatny klucz główny zaszyfrowany warstwą serwerową
+    - `sealed_kek`: klucz KEK zapieczętowany do `public_key_b64`
+    """
+    user_uuid: UUID
+    public_key_b64: str
+    private_key_enc: bytes
+    sealed_kek: bytes
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CipherRow(BaseModel):
+    """Zaszyfrowane pola jednego wiersza (np. title/content) - bez danych użytkownika (rotacja kluczy)."""
+    id: int
+    fields: Dict[str, bytes]
+
+
+class RotationCheckpoint(BaseModel):
+    """Postęp rotacji klucza serwera dla jednej tabeli."""
+    job_id: str
+    table_name: str
+    last_id: int = 0
+    rows_scanned: int = 0
+    rows_rotated: int = 0
+    # wiersze, których nie udało się odszyfrować żadnym kluczem - ponawiane, tabela nie jest wtedy finished
+    skipped_ids: List[int] = []
+    finished: bool = False
+    updated_at: Optional[datetime] = None
+
+    @property
+    def rows_skipped(self) -> int:
+        return len(self.skipped_ids)
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class NoteChunk(BaseModel):
+    """Zaszyfrowany kawałek treści notatki zapisanej strumieniowo."""
+    stream_id: UUID
+    seq: int
+    data: bytes
+
+
+class ExportJob(BaseModel):
+    """Zlecenie eksportu całego konta wykonywane w tle (scripts/export_worker.py).
+
+    Wynik zapisywany jest kawałkami w `export_job_chunks` (zaszyfrowany kluczem
+    serwera) i usuwany po `expires_at`.
+    """
+    id: UUID
+    user_uuid: UUID
+    format: str = "zip"
+    include_trash: bool = False
+    # queued -> running -> done | failed; done -> expired
+    status: str = "queued"
+    notes_total: Optional[int] = None
+    notes_done: int = 0
+    bytes_written: int = 0
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,11 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple, Union
+from datetime import date, datetime
 from uuid import UUID
 
-from .entities import Note, Trash, User
-from application.services.search.search_dto import NotesSearchQuery
+from .entities import Note, Trash, User, UserKeys, CipherRow, RotationCheckpoint, NoteChunk, SavedFilter, ExportJob
+from application.services.search.search_dto import NotesSearchQuery, SearchResult
 from application.services.filtering.filter_dto import NotesFilter
+from application.services.exporting.export_dto import ExportedNote
 
 
 class NoteRepository(ABC):
@@ -23,6 +24,19 @@ class NoteRepository(ABC):
     async def get_all(self,*, user_uuid: UUID) -> List[Note]:
         pass
 
+    @abstractmethod
+    async def get_headers(self, *, user_uuid: UUID) -> List[Note]:
+        """Notatki bez treści (`content == b""`) - tytuły i tagi bez pobierania blobów."""
+        pass
+
+    @abstractmethod
+    def iterate_all(self, *, user_uuid: UUID) -> AsyncIterator[Note]:
+        """Notatki użytkownika po kolei z kursora po stronie serwera (stała pamięć).
+
+        Kursor zajmuje połączenie - w trakcie iteracji nie wykonuj innych zapytań.
+        """
+        pass
+
     @abstractmethod
     async def update(
         self,
@@ -33,7 +47,22 @@ class NoteRepository(ABC):
         content: Optional[bytes] = None,
         tags: Optional[List[str]] = None,
         updated_at: Optional[datetime] = None,
+        title_hash: Optional[bytes] = None,
     ) -> Optional[Note]:
+        """Zmienia podane pola; `title_hash=b""` czyści skrót tytułu (NULL)."""
+        pass
+
+    @abstractmethod
+    async def get_prefiltered(self, *, user_uuid: UUID, tag: Optional[str] = None, date_from: Optional[date] = None,
+                              date_to: Optional[date] = None, title_hash: Optional[bytes] = None,
+                              columns: Optional[Set[str]] = None, after_id: Optional[int] = None,
+                              limit: Optional[int] = None) -> List[Note]:
+        """Notatki spełniające predykaty liczone w SQL (tag, zakres dat, skrót tytułu lub jego brak).
+
+        Kolejność po id; `after_id` i `limit` to stronicowanie po kluczu.
+        `columns` ogranicza SELECT do podanych kolumn (id i user_uuid zawsze) -
+        pominięte `title`/`content` są w encji jako b"".
+        """
         pass
 
     @abstractmethod
@@ -61,6 +90,16 @@ class TrashRepository(ABC):
     async def get_all(self, user_uuid: UUID) -> List[Trash]:
         pass
 
+    @abstractmethod
+    async def get_headers(self, *, user_uuid: UUID) -> List[Trash]:
+        """Notatki z kosza bez treści (`content == b""`)."""
+        pass
+
+    @abstractmethod
+    def iterate_all(self, *, user_uuid: UUID) -> AsyncIterator[Trash]:
+        """Jak `NoteRepository.iterate_all` - kursor po stronie serwera."""
+        pass
+
     @abstractmethod
     async def restore(self, *,note_id: int,user_uuid:UUID) -> Optional[Note]:
         pass
@@ -69,6 +108,26 @@ class TrashRepository(ABC):
     async def delete_permanently(self, *,note_id: int,user_uuid:UUID) -> bool:
         pass
 
+    @abstractmethod
+    async def update(
+        self,
+        note_id: int,
+        *,
+        user_uuid: UUID,
+        title: Optional[bytes] = None,
+        content: Optional[bytes] = None,
+        title_hash: Optional[bytes] = None,
+    ) -> Optional[Trash]:
+        pass
+
+    @abstractmethod
+    async def get_prefiltered(self, *, user_uuid: UUID, tag: Optional[str] = None, date_from: Optional[date] = None,
+                              date_to: Optional[date] = None, title_hash: Optional[bytes] = None,
+                              columns: Optional[Set[str]] = None, after_id: Optional[int] = None,
+                              limit: Optional[int] = None) -> List[Trash]:
+        """Jak `NoteRepository.get_prefiltered` (trashed_at wybierane zawsze)."""
+        pass
+
 
 
 class UserRepository(ABC):
@@ -95,6 +154,261 @@ class UserRepository(ABC):
 
 
 
+class UserKeyRepository(ABC):
+
+    @abstractmethod
+    async def add(self, keys: UserKeys) -> UserKeys:
+        pass
+
+    @abstractmethod
+    async def get_by_user(self, user_uuid: UUID) -> Optional[UserKeys]:
+        pass
+
+    @abstractmethod
+    async def get_all(self) -> List[UserKeys]:
+        pass
+
+    @abstractmethod
+    async def update_private_key(self, user_uuid: UUID, private_key_enc: bytes) -> None:
+        pass
+
+
+
+class NoteChunkRepository(ABC):
+
+    @abstractmethod
+    async def add(self, chunk: NoteChunk, *, user_uuid: UUID) -> None:
+        pass
+
+    @abstractmethod
+    async def get_batch(self, *, stream_id: UUID, user_uuid: UUID, after_seq: int, limit: int) -> List[NoteChunk]:
+        pass
+
+    @abstractmethod
+    async def delete_stream(self, *, stream_id: UUID, user_uuid: UUID) -> int:
+        pass
+
+
+
+class SearchIndexRepository(ABC):
+    """Ślepy indeks wyszukiwania - tokeny per (użytkownik, zakres notes/trash, notatka)."""
+
+    @abstractmethod
+    async def replace(self, *, user_uuid: UUID, scope: str, note_id: int, tokens: Dict[str, Set[bytes]]) -> None:
+        """Zastępuje wszystkie tokeny notatki; `tokens` to {rodzaj: zbiór tokenów}."""
+        pass
+
+    @abstractmethod
+    async def move(self, *, user_uuid: UUID, from_scope: str, from_id: int, to_scope: str, to_id: int) -> None:
+        pass
+
+    @abstractmethod
+    async def remove(self, *, user_uuid: UUID, scope: str, note_id: int) -> None:
+        pass
+
+    @abstractmethod
+    async def find(self, *, user_uuid: UUID, scope: str, kind: str, tokens: List[bytes]) -> List[int]:
+        """Zwraca id notatek zawierających wszystkie podane tokeny."""
+        pass
+
+
+class TagRepository(ABC):
+    """Znormalizowane tagi notatek (`note_tags`) - odczyt; zapis odbywa się razem z notatką."""
+
+    @abstractmethod
+    async def note_ids(self, *, user_uuid: UUID, scope: str, tag: str) -> List[int]:
+        """Id notatek z danym tagiem (porównanie po normalizacji)."""
+        pass
+
+    @abstractmethod
+    async def facets(self, *, user_uuid: UUID, scope: str) -> Dict[str, List[dict]]:
+        """{"tags": [{"tag", "count"}], "months": [{"month": "YYYY-MM", "count"}]}"""
+        pass
+
+
+class SavedFilterRepository(ABC):
+    """Zapisane filtry; członkostwo aktualizują repozytoria notatek i kosza przy każdym zapisie."""
+
+    @abstractmethod
+    async def add(self, saved: SavedFilter) -> SavedFilter:
+        """Zapisuje filtr i wylicza jego członkostwo (jedyny pełny przegląd notatek)."""
+        pass
+
+    @abstractmethod
+    async def get(self, *, filter_id: int, user_uuid: UUID) -> Optional[SavedFilter]:
+        pass
+
+    @abstractmethod
+    async def get_all(self, *, user_uuid: UUID) -> List[SavedFilter]:
+        """Filtry użytkownika z liczbą notatek (`count`)."""
+        pass
+
+    @abstractmethod
+    async def delete(self, *, filter_id: int, user_uuid: UUID) -> bool:
+        pass
+
+    @abstractmethod
+    async def notes(self, *, filter_id: int, user_uuid: UUID,
+                    columns: Optional[Set[str]] = None) -> Optional[List[Union[Note, Trash]]]:
+        """Notatki (lub wpisy kosza) należące do filtra - jeden odczyt po indeksie; None, gdy filtra nie ma.
+
+        Czytane są tylko `columns` (None - wszystkie), jak w `get_prefiltered`.
+        """
+        pass
+
+
+class ExportJobRepository(ABC):
+    """Zlecenia eksportu w tle i ich wynik (kawałki zaszyfrowane kluczem serwera)."""
+
+    @abstractmethod
+    async def add(self, job: ExportJob) -> ExportJob:
+        pass
+
+    @abstractmethod
+    async def get(self, *, job_id: UUID, user_uuid: UUID) -> Optional[ExportJob]:
+        pass
+
+    @abstractmethod
+    async def get_all(self, *, user_uuid: UUID) -> List[ExportJob]:
+        """Zlecenia użytkownika, najnowsze pierwsze."""
+        pass
+
+    @abstractmethod
+    async def count_active(self, *, user_uuid: UUID) -> int:
+        """Liczba zleceń użytkownika w kolejce lub w trakcie."""
+        pass
+
+    @abstractmethod
+    async def delete(self, *, job_id: UUID, user_uuid: UUID) -> bool:
+        """Usuwa zlecenie razem z wynikiem (także przerywa trwające)."""
+        pass
+
+    @abstractmethod
+    async def claim(self, *, per_user: int, global_limit: int) -> Optional[ExportJob]:
+        """Atomowo przejmuje najstarsze zlecenie z kolejki (status running).
+
+        None, gdy kolejka jest pusta, działa już `global_limit` zleceń, albo
+        wszyscy czekający użytkownicy mają po `per_user` trwających zleceń.
+        """
+        pass
+
+    @abstractmethod
+    async def add_chunk(self, *, job_id: UUID, seq: int, data: bytes) -> None:
+        pass
+
+    @abstractmethod
+    async def get_chunks(self, *, job_id: UUID, after_seq: int, limit: int) -> List[bytes]:
+        """Kolejne kawałki wyniku (seq > after_seq, rosnąco)."""
+        pass
+
+    @abstractmethod
+    async def update_progress(self, *, job_id: UUID, notes_done: int, bytes_written: int) -> bool:
+        """Zapisuje postęp (i heartbeat `updated_at`) trwającego zlecenia; False, gdy zostało usunięte lub nie jest już running."""
+        pass
+
+    @abstractmethod
+    async def finish(self, *, job_id: UUID, status: str, error: Optional[str] = None,
+                     expires_at: Optional[datetime] = None) -> bool:
+        """Kończy trwające zlecenie; False (i usunięcie wyniku), gdy nie jest już running."""
+        pass
+
+    @abstractmethod
+    async def expire(self, *, now: datetime, stale_before: datetime) -> int:
+        """Usuwa wyniki po `expires_at` i oznacza jako failed zlecenia bez heartbeatu od `stale_before`."""
+        pass
+
+
+class AccountRestoreRepository(ABC):
+    """Masowe ładowanie kopii zapasowej konta (COPY zamiast pojedynczych INSERT-ów)."""
+
+    @abstractmethod
+    async def restore(
+        self,
+        *,
+        user: User,
+        keys: Optional[UserKeys],
+        batches: AsyncIterator[Tuple[str, list]],
+        replace: bool = False,
+    ) -> Dict[str, int]:
+        """Ładuje partie (`notes` / `trash` -> encje z szyfrogramem serwera, `chunks` -> NoteChunk)
+        w jednej transakcji i zwraca liczbę wierszy na rodzaj.
+
+        Brakujący użytkownik jest tworzony; `replace` usuwa wcześniej jego notatki,
+        kosz i kawałki treści. Błąd w dowolnej partii wycofuje całość.
+        """
+        pass
+
+
+class AccountVersionRepository(ABC):
+    """Licznik wersji danych użytkownika (notatki + kosz)."""
+
+    @abstractmethod
+    async def get(self, user_uuid: UUID) -> int:
+        """Bieżąca wersja (0, jeśli konto jeszcze nic nie zmieniło)."""
+        pass
+
+    @abstractmethod
+    async def bump(self, user_uuid: UUID) -> int:
+        """Podbija wersję po zmianie danych i zwraca nową."""
+        pass
+
+
+class NoteIndexer(ABC):
+    """Odbiorca zmian notatek utrzymujący indeks wyszukiwania (plaintext przychodzi z routera)."""
+
+    @abstractmethod
+    async def index_note(
+        self,
+        *,
+        user_uuid: UUID,
+        note_id: int,
+        title: Optional[str],
+        content: Optional[str],
+        tags: Optional[List[str]] = None,
+        scope: str = "notes",
+    ) -> None:
+        pass
+
+    @abstractmethod
+    async def move(self, *, user_uuid: UUID, from_scope: str, from_id: int, to_scope: str, to_id: int) -> None:
+        pass
+
+    @abstractmethod
+    async def remove(self, *, user_uuid: UUID, note_id: int, scope: str = "notes") -> None:
+        pass
+
+
+class KeyRotationRepository(ABC):
+    """Dostęp do szyfrogramów wszystkich użytkowników - tylko dla zadań administracyjnych."""
+
+    @abstractmethod
+    async def count_rows(self, table_name: str, *, after_id: int = 0) -> int:
+        pass
+
+    @abstractmethod
+    async def fetch_batch(self, table_name: str, *, after_id: int, limit: int) -> List[CipherRow]:
+        pass
+
+    @abstractmethod
+    async def fetch_rows(self, table_name: str, *, ids: List[int]) -> List[CipherRow]:
+        """Wybrane wiersze (ponowienie pominiętych); usunięte w międzyczasie nie są zwracane."""
+        pass
+
+    @abstractmethod
+    async def swap_ciphertext(self, table_name: str, row: CipherRow, new_fields: Dict[str, bytes]) -> bool:
+        """Podmienia szyfrogram tylko jeśli wiersz nie zmienił się od odczytu."""
+        pass
+
+    @abstractmethod
+    async def get_checkpoint(self, job_id: str, table_name: str) -> Optional[RotationCheckpoint]:
+        pass
+
+    @abstractmethod
+    async def save_checkpoint(self, checkpoint: RotationCheckpoint) -> None:
+        pass
+
+
+
 class SearchServiceInterface(ABC):
 
     @abstractmethod
@@ -103,7 +417,7 @@ class SearchServiceInterface(ABC):
         repo: NoteRepository,
         search_query: NotesSearchQuery,
         user_uuid:UUID
-    ) -> List[Note]:
+    ) -> List[SearchResult]:
         pass
 
     @abstractmethod
@@ -112,7 +426,22 @@ class SearchServiceInterface(ABC):
         repo: TrashRepository,
         search_query: NotesSearchQuery,
         user_uuid:UUID
-    ) -> List[Trash]:
+    ) -> List[SearchResult]:
+        pass
+
+    @abstractmethod
+    async def suggest(self, user_uuid: UUID, prefix: str, limit: int = 10) -> List[dict]:
+        pass
+
+    @abstractmethod
+    async def search_rows(
+        self,
+        rows: Sequence[Union[Note, Trash]],
+        search_query: Optional[NotesSearchQuery],
+        user_uuid: UUID,
+        scope: str = "notes",
+    ) -> List[SearchResult]:
+        """Odszyfrowanie i dopasowanie tylko podanych (już zawężonych) wierszy."""
         pass
 
 
@@ -120,21 +449,45 @@ class SearchServiceInterface(ABC):
 class FilteringServiceInterface(ABC):
 
     @abstractmethod
-    async def filter_notes(
+    async def filter_page(
         self,
-        repo: NoteRepository,
+        repo: Union[NoteRepository, TrashRepository],
         filters: NotesFilter,
-        user_uuid:UUID,
-    ) -> List[Note]:
+        user_uuid: UUID,
+        *,
+        columns: Optional[Set[str]] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Union[Note, Trash]]:
         pass
 
     @abstractmethod
-    async def filter_trash(
-        self,
-        repo: TrashRepository,
-        filters: NotesFilter,
-        user_uuid:UUID,
-    ) -> List[Trash]:
+    async def facets(self, *, user_uuid: UUID, scope: str = "notes") -> Dict[str, List[dict]]:
+        pass
+
+    @abstractmethod
+    async def match_title(self, rows: List[Union[Note, Trash]], title: str, user_uuid: UUID) -> List[Union[Note, Trash]]:
+        pass
+
+    @abstractmethod
+    async def save_filter(self, filters: NotesFilter, *, name: str, scope: str = "notes") -> SavedFilter:
+        pass
+
+    @abstractmethod
+    async def saved_filters(self, *, user_uuid: UUID) -> List[SavedFilter]:
+        pass
+
+    @abstractmethod
+    async def saved_filter(self, *, filter_id: int, user_uuid: UUID) -> Optional[SavedFilter]:
+        pass
+
+    @abstractmethod
+    async def saved_filter_notes(self, *, filter_id: int, user_uuid: UUID,
+                                 columns: Optional[Set[str]] = None) -> Optional[List[Union[Note, Trash]]]:
+        pass
+
+    @abstractmethod
+    async def delete_saved_filter(self, *, filter_id: int, user_uuid: UUID) -> bool:
         pass
 
 
@@ -145,6 +498,7 @@ class ExportServiceInterface(ABC):
         self,
         note_id: int,
         repo: NoteRepository,
-        user_uuid: UUID
-    ) -> tuple[str, str]:
+        user_uuid: UUID,
+        if_none_match: Optional[str] = None,
+    ) -> ExportedNote:
         pass
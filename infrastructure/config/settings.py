@@ -15,6 +15,69 @@ class Settings:
             print("WARNING: No SERVER_KEY in environment — generated ephemeral key.")
             print("Set SERVER_KEY env to persist across restarts:", key.decode())
 
+        # poprzednie klucze (rotacja): tylko do odczytu, oddzielone przecinkami
+        previous = os.getenv("SERVER_KEYS_PREVIOUS", "")
+        self.SERVER_KEYS_PREVIOUS = [k.strip().encode() for k in previous.split(",") if k.strip()]
+        # pierwszy klucz szyfruje, wszystkie odszyfrowują (MultiFernet-style)
+        self.SERVER_KEYS = [self.SERVER_KEY, *self.SERVER_KEYS_PREVIOUS]
+
+        # rotacja kluczy: rozmiar partii i budżet wierszy na sekundę
+        self.ROTATION_BATCH_SIZE = int(os.getenv("ROTATION_BATCH_SIZE", "200"))
+        self.ROTATION_ROWS_PER_SECOND = float(os.getenv("ROTATION_ROWS_PER_SECOND", "500"))
+
+        # format zapisu warstwy serwerowej: fernet (domyślnie) | aesgcm | xchacha20
+        self.SERVER_CIPHER = os.getenv("SERVER_CIPHER", "fernet").strip().lower()
+
+        # kompresja plaintextu przed szyfrowaniem: zstd (jeśli zainstalowany) | zlib | none
+        self.COMPRESSION_ALGORITHM = os.getenv("COMPRESSION_ALGORITHM", "").strip().lower() or None
+        # minimalny rozmiar treści (bajty), od którego próbujemy kompresji
+        self.COMPRESSION_THRESHOLD = int(os.getenv("COMPRESSION_THRESHOLD", "512"))
+        # limit rozmiaru treści notatki (bajty) - większe nie są kompresowane, a dekompresja
+        # odrzuca paczki rozwijające się ponad limit; nie obniżać poniżej istniejących notatek
+        self.NOTE_MAX_BYTES = int(os.getenv("NOTE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+        # klucz ślepego indeksu wyszukiwania i skrótów tytułów - niezależny od SERVER_KEY i stały:
+        # rotacja SERVER_KEY go nie zmienia, a jego zmiana wymaga scripts/backfill_search_index.py
+        index_key = os.getenv("SEARCH_INDEX_KEY")
+        if index_key:
+            self.SEARCH_INDEX_KEY = index_key.encode()
+        elif env_key:
+            raise RuntimeError("Brak zmiennej SEARCH_INDEX_KEY (wymagana obok SERVER_KEY)")
+        else:
+            # dev bez SERVER_KEY: klucz tymczasowy jak SERVER_KEY, indeks ważny do restartu
+            self.SEARCH_INDEX_KEY = Fernet.generate_key()
+            print("WARNING: No SEARCH_INDEX_KEY in environment — generated ephemeral key.")
+
+        # opcjonalny indeks wyszukiwania w pamięci procesu (trzyma plaintext w RAM)
+        self.SEARCH_MEMORY_INDEX = os.getenv("SEARCH_MEMORY_INDEX", "false").strip().lower() in ("1", "true", "yes")
+        self.SEARCH_MEMORY_INDEX_MB = int(os.getenv("SEARCH_MEMORY_INDEX_MB", "64"))
+        # po tylu sekundach indeks użytkownika jest budowany od nowa (zmiany z innych procesów)
+        self.SEARCH_MEMORY_INDEX_TTL = float(os.getenv("SEARCH_MEMORY_INDEX_TTL", "300"))
+
+        # podpowiedzi GET /search/suggest: drzewo tytułów i tagów w pamięci procesu (plaintext tytułów w RAM)
+        self.SEARCH_SUGGEST_MB = int(os.getenv("SEARCH_SUGGEST_MB", "32"))
+        self.SEARCH_SUGGEST_TTL = float(os.getenv("SEARCH_SUGGEST_TTL", "300"))
+
+        # cache wyników wyszukiwania (odszyfrowane wyniki w RAM), 0 wyłącza
+        self.SEARCH_RESULT_CACHE_MB = int(os.getenv("SEARCH_RESULT_CACHE_MB", "32"))
+
+        # ile notatek wyszukiwarka odszyfrowuje równolegle (wątki)
+        self.SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "4"))
+
+        # eksport w tle (scripts/export_worker.py): zlecenia w kolejce/w trakcie na użytkownika,
+        # trwające naraz na użytkownika i łącznie, czas przechowywania wyniku
+        self.EXPORT_JOBS_MAX_ACTIVE = int(os.getenv("EXPORT_JOBS_MAX_ACTIVE", "3"))
+        self.EXPORT_JOBS_PER_USER = int(os.getenv("EXPORT_JOBS_PER_USER", "1"))
+        self.EXPORT_JOBS_GLOBAL = int(os.getenv("EXPORT_JOBS_GLOBAL", "4"))
+        self.EXPORT_JOB_TTL_SECONDS = int(os.getenv("EXPORT_JOB_TTL_SECONDS", "86400"))
+        # zlecenie bez zapisu postępu przez tyle sekund uznawane jest za porzucone
+        self.EXPORT_JOB_STALE_SECONDS = int(os.getenv("EXPORT_JOB_STALE_SECONDS", "900"))
+
+        # klucz kopii zapasowych kont (scripts/account_backup.py) - ten sam we wszystkich wdrożeniach,
+        # między którymi przenoszone są konta; brak = kopie wyłączone
+        backup_key = os.getenv("BACKUP_KEY")
+        self.BACKUP_KEY = backup_key.encode() if backup_key else None
+
         # JWT settings
         self.JWT_SECRET = os.getenv("JWT_SECRET", "i")
         # expiration in seconds
@@ -0,0 +1,24 @@
+from uuid import UUID
+
+from sqlalchemy.dialects.postgresql import insert
+
+from domain.interfaces import AccountVersionRepository
+from presentation.db import database, account_versions_table
+
+
+class SQLAccountVersionRepository(AccountVersionRepository):
+    async def get(self, user_uuid: UUID) -> int:
+        t = account_versions_table
+        row = await database.fetch_one(t.select().where(t.c.user_uuid == str(user_uuid)))
+        return row["version"] if row else 0
+
+    async def bump(self, user_uuid: UUID) -> int:
+        t = account_versions_table
+        # jedno zapytanie, atomowe także przy równoległych zmianach z kilku procesów
+        query = (
+            insert(t)
+            .values(user_uuid=user_uuid, version=1)
+            .on_conflict_do_update(index_elements=[t.c.user_uuid], set_={"version": t.c.version + 1})
+            .returning(t.c.version)
+        )
+        return await database.execute(query)
@@ -0,0 +1,109 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import sqlalchemy
+
+from domain.entities import Note, NoteChunk, Trash, User, UserKeys
+from domain.interfaces import AccountRestoreRepository
+from application.common.utils import normalize_tags
+from presentation.db import (
+    database, users_table, user_keys_table, notes_table, trash_table, note_chunks_table, note_tags_table,
+    search_tokens_table,
+)
+from infrastructure.repositories.sql_saved_filter_repo import rebuild_user_filters
+
+
+NOTE_COLUMNS = ["id", "user_uuid", "title", "content", "created_at", "tags", "key_private_b64", "public_key_b64", "stream_id"]
+TRASH_COLUMNS = NOTE_COLUMNS + ["trashed_at"]
+CHUNK_COLUMNS = ["stream_id", "seq", "user_uuid", "data"]
+
+
+class SQLAccountRestoreRepository(AccountRestoreRepository):
+    """Odtwarzanie konta przez COPY (asyncpg `copy_records_to_table`) w jednej transakcji.
+
+    Id notatek rezerwowane są z sekwencji przed COPY, żeby w tej samej
+    transakcji załadować `note_tags`; członkostwo zapisanych filtrów liczone
+    jest raz na końcu, zamiast przy każdej notatce.
+    """
+
+    async def _ensure_user(self, user: User) -> None:
+        u = users_table
+        if await database.fetch_one(sqlalchemy.select(u.c.id).where(u.c.uuid == str(user.uuid))):
+            return
+        if await database.fetch_one(sqlalchemy.select(u.c.id).where(u.c.email == user.email)):
+            raise ValueError(f"Adres {user.email} należy już do innego konta")
+        await database.execute(
+            u.insert().values(email=user.email, password_hash=user.password_hash, uuid=user.uuid, created_at=user.created_at)
+        )
+
+    async def _restore_keys(self, user: User, keys: Optional[UserKeys], replace: bool) -> None:
+        k = user_keys_table
+        existing = await database.fetch_one(k.select().where(k.c.user_uuid == str(user.uuid)))
+        if existing and replace:
+            await database.execute(k.delete().where(k.c.user_uuid == str(user.uuid)))
+            existing = None
+        if keys is None:
+            return
+        if existing:
+            # paczki v2 z kopii otwiera tylko KEK z kopii
+            if existing["public_key_b64"] != keys.public_key_b64:
+                raise ValueError("Konto ma inne klucze główne niż kopia - odtwórz z replace")
+            return
+        await database.execute(
+            k.insert().values(user_uuid=user.uuid, public_key_b64=keys.public_key_b64, private_key_enc=keys.private_key_enc,
+                              sealed_kek=keys.sealed_kek, created_at=keys.created_at)
+        )
+
+    async def _clear(self, user: User) -> None:
+        for table in (note_chunks_table, notes_table, trash_table, note_tags_table, search_tokens_table):
+            await database.execute(table.delete().where(table.c.user_uuid == str(user.uuid)))
+
+    async def _copy_rows(self, raw, user: User, scope: str, rows: List[Union[Note, Trash]]) -> None:
+        table = notes_table if scope == "notes" else trash_table
+        ids = [
+            r["id"] for r in await database.fetch_all(
+                sqlalchemy.select(sqlalchemy.func.nextval(sqlalchemy.func.pg_get_serial_sequence(table.name, "id")).label("id"))
+                .select_from(sqlalchemy.func.generate_series(1, len(rows)))
+            )
+        ]
+        records = []
+        tags = []
+        for note_id, row in zip(ids, rows):
+            record = (note_id, user.uuid, row.title, row.content, row.created_at, row.tags, row.key_private_b64,
+                      row.public_key_b64, row.stream_id)
+            records.append(record + (row.trashed_at,) if scope == "trash" else record)
+            tags += [(user.uuid, scope, tag, note_id) for tag in normalize_tags(row.tags)]
+        await raw.copy_records_to_table(table.name, records=records,
+                                        columns=TRASH_COLUMNS if scope == "trash" else NOTE_COLUMNS)
+        if tags:
+            await raw.copy_records_to_table(note_tags_table.name, records=tags,
+                                            columns=["user_uuid", "scope", "tag", "note_id"])
+
+    async def restore(
+        self,
+        *,
+        user: User,
+        keys: Optional[UserKeys],
+        batches: AsyncIterator[Tuple[str, list]],
+        replace: bool = False,
+    ) -> Dict[str, int]:
+        counts = {"notes": 0, "trash": 0, "chunks": 0}
+        async with database.connection() as connection:
+            async with connection.transaction():
+                raw = connection.raw_connection
+                await self._ensure_user(user)
+                if replace:
+                    await self._clear(user)
+                await self._restore_keys(user, keys, replace)
+                async for scope, rows in batches:
+                    if scope == "chunks":
+                        chunks: List[NoteChunk] = rows
+                        await raw.copy_records_to_table(
+                            note_chunks_table.name, columns=CHUNK_COLUMNS,
+                            records=[(c.stream_id, c.seq, user.uuid, c.data) for c in chunks],
+                        )
+                    else:
+                        await self._copy_rows(raw, user, scope, rows)
+                    counts[scope] += len(rows)
+                for scope in ("notes", "trash"):
+                    await rebuild_user_filters(user.uuid, scope)
+        return counts
@@ -0,0 +1,38 @@
+from typing import List
+from uuid import UUID
+
+import sqlalchemy
+
+from domain.entities import NoteChunk
+from domain.interfaces import NoteChunkRepository
+from presentation.db import database, note_chunks_table
+
+
+class SQLNoteChunkRepository(NoteChunkRepository):
+    async def add(self, chunk: NoteChunk, *, user_uuid: UUID) -> None:
+        query = note_chunks_table.insert().values(
+            stream_id=chunk.stream_id,
+            seq=chunk.seq,
+            user_uuid=user_uuid,
+            data=chunk.data,
+        )
+        await database.execute(query)
+
+    async def get_batch(self, *, stream_id: UUID, user_uuid: UUID, after_seq: int, limit: int) -> List[NoteChunk]:
+        t = note_chunks_table
+        query = (
+            sqlalchemy.select(t.c.stream_id, t.c.seq, t.c.data)
+            .where(t.c.stream_id == str(stream_id))
+            .where(t.c.user_uuid == str(user_uuid))
+            .where(t.c.seq > after_seq)
+            .order_by(t.c.seq)
+            .limit(limit)
+        )
+        rows = await database.fetch_all(query)
+        return [NoteChunk(stream_id=r["stream_id"], seq=r["seq"], data=r["data"]) for r in rows]
+
+    async def delete_stream(self, *, stream_id: UUID, user_uuid: UUID) -> int:
+        t = note_chunks_table
+        query = t.delete().where(t.c.stream_id == str(stream_id)).where(t.c.user_uuid == str(user_uuid)).returning(t.c.seq)
+        rows = await database.fetch_all(query)
+        return len(rows)
@@ -0,0 +1,173 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+import sqlalchemy
+
+from domain.entities import ExportJob
+from domain.interfaces import ExportJobRepository
+from presentation.db import database, export_jobs_table, export_job_chunks_table, notes_table, trash_table
+
+
+# klucz blokady doradczej serializującej przejmowanie zleceń przez wiele workerów
+CLAIM_LOCK_KEY = 0x6578706F7274
+
+
+def _job(r) -> ExportJob:
+    return ExportJob(id=r["id"], user_uuid=r["user_uuid"], format=r["format"], include_trash=r["include_trash"],
+                     status=r["status"], notes_total=r["notes_total"], notes_done=r["notes_done"],
+                     bytes_written=r["bytes_written"], error=r["error"], created_at=r["created_at"],
+                     started_at=r["started_at"], updated_at=r["updated_at"], finished_at=r["finished_at"],
+                     expires_at=r["expires_at"])
+
+
+def _count(table: sqlalchemy.Table, user_uuid):
+    return sqlalchemy.select(sqlalchemy.func.count()).select_from(table).where(table.c.user_uuid == user_uuid).scalar_subquery()
+
+
+class SQLExportJobRepository(ExportJobRepository):
+    async def add(self, job: ExportJob) -> ExportJob:
+        query = (
+            export_jobs_table.insert()
+            .values(
+                id=job.id,
+                user_uuid=job.user_uuid,
+                format=job.format,
+                include_trash=job.include_trash,
+                status=job.status,
+                notes_done=0,
+                bytes_written=0,
+                created_at=job.created_at or datetime.utcnow(),
+            )
+            .returning(*export_jobs_table.c)
+        )
+        return _job(await database.fetch_one(query))
+
+    async def get(self, *, job_id: UUID, user_uuid: UUID) -> Optional[ExportJob]:
+        j = export_jobs_table
+        row = await database.fetch_one(j.select().where(j.c.id == str(job_id)).where(j.c.user_uuid == str(user_uuid)))
+        return _job(row) if row else None
+
+    async def get_all(self, *, user_uuid: UUID) -> List[ExportJob]:
+        j = export_jobs_table
+        rows = await database.fetch_all(j.select().where(j.c.user_uuid == str(user_uuid)).order_by(j.c.created_at.desc()))
+        return [_job(r) for r in rows]
+
+    async def count_active(self, *, user_uuid: UUID) -> int:
+        j = export_jobs_table
+        query = (
+            sqlalchemy.select(sqlalchemy.func.count())
+            .select_from(j)
+            .where(j.c.user_uuid == str(user_uuid))
+            .where(j.c.status.in_(("queued", "running")))
+        )
+        return await database.fetch_val(query) or 0
+
+    async def delete(self, *, job_id: UUID, user_uuid: UUID) -> bool:
+        j = export_jobs_table
+        # kawałki wyniku usuwa ON DELETE CASCADE
+        row = await database.fetch_one(
+            j.delete().where(j.c.id == str(job_id)).where(j.c.user_uuid == str(user_uuid)).returning(j.c.id)
+        )
+        return row is not None
+
+    async def claim(self, *, per_user: int, global_limit: int) -> Optional[ExportJob]:
+        j = export_jobs_table
+        async with database.transaction():
+            # jeden przejmujący naraz - limity liczone poniżej nie rozjadą się między workerami
+            await database.execute(sqlalchemy.select(sqlalchemy.func.pg_advisory_xact_lock(CLAIM_LOCK_KEY)))
+            running = await database.fetch_val(
+                sqlalchemy.select(sqlalchemy.func.count()).select_from(j).where(j.c.status == "running")
+            )
+            if running >= global_limit:
+                return None
+            busy = (
+                sqlalchemy.select(j.c.user_uuid)
+                .where(j.c.status == "running")
+                .group_by(j.c.user_uuid)
+                .having(sqlalchemy.func.count() >= per_user)
+            )
+            row = await database.fetch_one(
+                sqlalchemy.select(j.c.id, j.c.user_uuid, j.c.include_trash)
+                .where(j.c.status == "queued")
+                .where(j.c.user_uuid.not_in(busy))
+                .order_by(j.c.created_at)
+                .limit(1)
+            )
+            if row is None:
+                return None
+            total = _count(notes_table, row["user_uuid"])
+            if row["include_trash"]:
+                total = total + _count(trash_table, row["user_uuid"])
+            now = datetime.utcnow()
+            claimed = await database.fetch_one(
+                j.update()
+                .where(j.c.id == row["id"])
+                .values(status="running", started_at=now, updated_at=now, notes_total=total)
+                .returning(*j.c)
+            )
+        return _job(claimed)
+
+    async def add_chunk(self, *, job_id: UUID, seq: int, data: bytes) -> None:
+        await database.execute(export_job_chunks_table.insert().values(job_id=job_id, seq=seq, data=data))
+
+    async def get_chunks(self, *, job_id: UUID, after_seq: int, limit: int) -> List[bytes]:
+        c = export_job_chunks_table
+        rows = await database.fetch_all(
+            sqlalchemy.select(c.c.data).where(c.c.job_id == str(job_id)).where(c.c.seq > after_seq).order_by(c.c.seq).limit(limit)
+        )
+        return [r["data"] for r in rows]
+
+    async def update_progress(self, *, job_id: UUID, notes_done: int, bytes_written: int) -> bool:
+        j = export_jobs_table
+        row = await database.fetch_one(
+            j.update()
+            .where(j.c.id == str(job_id))
+            .where(j.c.status == "running")
+            .values(notes_done=notes_done, bytes_written=bytes_written, updated_at=datetime.utcnow())
+            .returning(j.c.id)
+        )
+        return row is not None
+
+    async def finish(self, *, job_id: UUID, status: str, error: Optional[str] = None,
+                     expires_at: Optional[datetime] = None) -> bool:
+        j = export_jobs_table
+        c = export_job_chunks_table
+        now = datetime.utcnow()
+        async with database.transaction():
+            # tylko trwające zlecenie - uznane przez `expire` za porzucone nie wraca jako done
+            row = await database.fetch_one(
+                j.update()
+                .where(j.c.id == str(job_id))
+                .where(j.c.status == "running")
+                .values(status=status, error=error[:255] if error else None, finished_at=now, updated_at=now,
+                        expires_at=expires_at)
+                .returning(j.c.id)
+            )
+            if row is None or status != "done":
+                # niepełny wynik (albo dopisany po unieważnieniu zlecenia) nie nadaje się do pobrania
+                await database.execute(c.delete().where(c.c.job_id == str(job_id)))
+        return row is not None
+
+    async def expire(self, *, now: datetime, stale_before: datetime) -> int:
+        j = export_jobs_table
+        c = export_job_chunks_table
+        async with database.transaction():
+            expired = await database.fetch_all(
+                j.update()
+                .where(j.c.status == "done")
+                .where(j.c.expires_at < now)
+                .values(status="expired", updated_at=now)
+                .returning(j.c.id)
+            )
+            stale = await database.fetch_all(
+                j.update()
+                .where(j.c.status == "running")
+                .where(j.c.updated_at < stale_before)
+                .values(status="failed", error="worker_lost", finished_at=now, updated_at=now)
+                .returning(j.c.id)
+            )
+            ids = [r["id"] for r in expired] + [r["id"] for r in stale]
+            if ids:
+                await database.execute(c.delete().where(c.c.job_id.in_(ids)))
+        return len(ids)
@@ -1,9 +1,13 @@
-from typing import List, Optional,cast
+from typing import AsyncIterator, List, Optional, Set, cast
 from uuid import UUID
-from datetime import datetime
+from datetime import date, datetime
 from domain.entities import Note
 from domain.interfaces import NoteRepository
+from sqlalchemy import select
+
 from presentation.db import database, notes_table
+from infrastructure.repositories.sql_tag_repo import replace_note_tags, delete_note_tags, prefilter_conditions, projected_columns, projected_values
+from infrastructure.repositories.sql_saved_filter_repo import refresh_note_filters, delete_note_filters
 
 
 class SQLNoteRepository(NoteRepository):
@@ -18,12 +22,17 @@ class SQLNoteRepository(NoteRepository):
                 created_at=note.created_at,
                 key_private_b64=note.key_private_b64,
                 public_key_b64=note.public_key_b64,
+                stream_id=note.stream_id,
+                title_hash=note.title_hash,
             )
             .returning(notes_table.c.id)
         )
-        row = await database.fetch_one(query)
-        if row:
-            note.id = row["id"]
+        async with database.transaction():
+            row = await database.fetch_one(query)
+            if row:
+                note.id = row["id"]
+                await replace_note_tags(note.user_uuid, "notes", note.id, note.tags)
+                await refresh_note_filters(note.user_uuid, "notes", note.id)
         return note
 
     async def get_by_id(self, *, note_id: int, user_uuid: UUID) -> Optional[Note]:
@@ -33,7 +42,8 @@ class SQLNoteRepository(NoteRepository):
             return None
         return Note(id=row["id"], user_uuid=row["user_uuid"], title=row["title"], 
                     content=row["content"], created_at=row["created_at"], tags=row["tags"], 
-                    key_private_b64=row["key_private_b64"],public_key_b64=row["public_key_b64"])
+                    key_private_b64=row["key_private_b64"],public_key_b64=row["public_key_b64"],
+                    stream_id=row["stream_id"], title_hash=row["title_hash"])
 
     async def get_all(self, *,user_uuid:UUID) -> List[Note]:
         rows = await database.fetch_all(
@@ -44,9 +54,43 @@ class SQLNoteRepository(NoteRepository):
         return [
             Note(id=r["id"], user_uuid=r["user_uuid"], title=r["title"], content=r["content"], 
                  created_at=r["created_at"], tags=r["tags"], key_private_b64=r["key_private_b64"],
-                 public_key_b64=r["public_key_b64"]) for r in rows
+                 public_key_b64=r["public_key_b64"], stream_id=r["stream_id"], title_hash=r["title_hash"]) for r in rows
         ]
 
+    async def get_headers(self, *, user_uuid: UUID) -> List[Note]:
+        # bez kolumny content - przy dużych notatkach to większość przesyłanych danych
+        columns = [c for c in notes_table.c if c.name != "content"]
+        rows = await database.fetch_all(select(*columns).where(notes_table.c.user_uuid == str(user_uuid)))
+        return [
+            Note(id=r["id"], user_uuid=r["user_uuid"], title=r["title"], content=b"",
+                 created_at=r["created_at"], tags=r["tags"], key_private_b64=r["key_private_b64"],
+                 public_key_b64=r["public_key_b64"], stream_id=r["stream_id"], title_hash=r["title_hash"]) for r in rows
+        ]
+
+    async def iterate_all(self, *, user_uuid: UUID) -> AsyncIterator[Note]:
+        # databases.iterate = kursor asyncpg w transakcji, wiersze pobierane partiami
+        query = notes_table.select().where(notes_table.c.user_uuid == str(user_uuid)).order_by(notes_table.c.id)
+        async for r in database.iterate(query):
+            yield Note(id=r["id"], user_uuid=r["user_uuid"], title=r["title"], content=r["content"],
+                       created_at=r["created_at"], tags=r["tags"], key_private_b64=r["key_private_b64"],
+                       public_key_b64=r["public_key_b64"], stream_id=r["stream_id"], title_hash=r["title_hash"])
+
+    async def get_prefiltered(self, *, user_uuid: UUID, tag: Optional[str] = None, date_from: Optional[date] = None,
+                              date_to: Optional[date] = None, title_hash: Optional[bytes] = None,
+                              columns: Optional[Set[str]] = None, after_id: Optional[int] = None,
+                              limit: Optional[int] = None) -> List[Note]:
+        t = notes_table
+        conditions = prefilter_conditions(t, "notes", tag=tag, date_from=date_from, date_to=date_to, title_hash=title_hash)
+        if after_id is not None:
+            conditions.append(t.c.id > after_id)
+        # pominięte kolumny (np. content przy liście tytułów) nie są czytane z bazy
+        selected = projected_columns(t, columns, {"id", "user_uuid"})
+        query = select(*selected).where(t.c.user_uuid == str(user_uuid)).where(*conditions).order_by(t.c.id)
+        if limit:
+            query = query.limit(limit)
+        rows = await database.fetch_all(query)
+        return [Note(**projected_values(r, selected)) for r in rows]
+
     async def update(
         self,
         note_id: int,
@@ -56,26 +100,39 @@ class SQLNoteRepository(NoteRepository):
         content: Optional[bytes] = None,
         tags: Optional[List[str]] = None,
         updated_at: Optional[datetime] = None,
+        title_hash: Optional[bytes] = None,
     ) -> Optional[Note]:
         values = {}
         if content is not None:
             values["content"] = content
+            # nowa treść zapisywana jest w całości - notatka przestaje być strumieniowa
+            values["stream_id"] = None
         if title is not None:
             values["title"] = title
         if tags is not None:
             values["tags"] = tags
         if updated_at is not None:
             values["updated_at"] = updated_at
+        if title_hash is not None:
+            values["title_hash"] = title_hash or None
         query = notes_table.update().where(notes_table.c.id == note_id).where(notes_table.c.user_uuid == str(user_uuid)).values(**values).returning(*notes_table.c)
-        row = await database.fetch_one(query)
+        async with database.transaction():
+            row = await database.fetch_one(query)
+            if row and tags is not None:
+                await replace_note_tags(user_uuid, "notes", note_id, tags)
+            if row:
+                await refresh_note_filters(user_uuid, "notes", note_id)
         if not row:
             return None
-        return Note(id=row["id"], user_uuid=row["user_uuid"], title=row["title"], content=row["content"], created_at=row["created_at"], tags=row["tags"], key_private_b64=row["key_private_b64"], public_key_b64=row["public_key_b64"])
+        return Note(id=row["id"], user_uuid=row["user_uuid"], title=row["title"], content=row["content"], created_at=row["created_at"], tags=row["tags"], key_private_b64=row["key_private_b64"], public_key_b64=row["public_key_b64"], stream_id=row["stream_id"], title_hash=row["title_hash"])
 
     async def delete_notes(self, note_id: int, *, user_uuid:UUID) -> bool:
         # attempt delete and return whether it existed
         row = await database.fetch_one(notes_table.select().where(notes_table.c.id == note_id).where(notes_table.c.user_uuid == str(user_uuid)))
         if not row:
             return False
-        await database.execute(notes_table.delete().where(notes_table.c.id == note_id).where(notes_table.c.user_uuid == str(user_uuid)))
+        async with database.transaction():
+            await database.execute(notes_table.delete().where(notes_table.c.id == note_id).where(notes_table.c.user_uuid == str(user_uuid)))
+            await delete_note_tags(user_uuid, "notes", note_id)
+            await delete_note_filters(user_uuid, "notes", note_id)
         return True
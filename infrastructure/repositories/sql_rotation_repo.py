@@ -0,0 +1,79 @@
+from typing import Dict, List, Optional, Tuple
+
+import sqlalchemy
+from sqlalchemy.dialects.postgresql import insert
+
+from domain.entities import CipherRow, RotationCheckpoint
+from domain.interfaces import KeyRotationRepository
+from presentation.db import (database, notes_table, trash_table, note_chunks_table, rotation_checkpoints_table,
+                          export_job_chunks_table)
+
+
+class SQLKeyRotationRepository(KeyRotationRepository):
+    # tabela -> kolumny z szyfrogramem warstwy serwerowej
+    TABLES = {
+        "notes": (notes_table, ("title", "content")),
+        "trash": (trash_table, ("title", "content")),
+        "note_chunks": (note_chunks_table, ("data",)),
+        "export_job_chunks": (export_job_chunks_table, ("data",)),
+    }
+
+    def _spec(self, table_name: str) -> Tuple[sqlalchemy.Table, Tuple[str, ...]]:
+        try:
+            return self.TABLES[table_name]
+        except KeyError:
+            raise ValueError(f"nieobsługiwana tabela: {table_name}")
+
+    def _table(self, table_name: str) -> sqlalchemy.Table:
+        return self._spec(table_name)[0]
+
+    async def count_rows(self, table_name: str, *, after_id: int = 0) -> int:
+        table = self._table(table_name)
+        query = sqlalchemy.select(sqlalchemy.func.count()).select_from(table).where(table.c.id > after_id)
+        return int(await database.fetch_val(query) or 0)
+
+    async def fetch_batch(self, table_name: str, *, after_id: int, limit: int) -> List[CipherRow]:
+        table, columns = self._spec(table_name)
+        # keyset pagination po kluczu głównym - bez OFFSET, stały koszt partii
+        query = (
+            sqlalchemy.select(table.c.id, *(table.c[c] for c in columns))
+            .where(table.c.id > after_id)
+            .order_by(table.c.id)
+            .limit(limit)
+        )
+        rows = await database.fetch_all(query)
+        return [CipherRow(id=r["id"], fields={c: r[c] for c in columns}) for r in rows]
+
+    async def fetch_rows(self, table_name: str, *, ids: List[int]) -> List[CipherRow]:
+        table, columns = self._spec(table_name)
+        if not ids:
+            return []
+        query = sqlalchemy.select(table.c.id, *(table.c[c] for c in columns)).where(table.c.id.in_(ids)).order_by(table.c.id)
+        rows = await database.fetch_all(query)
+        return [CipherRow(id=r["id"], fields={c: r[c] for c in columns}) for r in rows]
+
+    async def swap_ciphertext(self, table_name: str, row: CipherRow, new_fields: Dict[str, bytes]) -> bool:
+        table = self._table(table_name)
+        query = table.update().where(table.c.id == row.id)
+        for column, old_value in row.fields.items():
+            query = query.where(table.c[column] == old_value)
+        query = query.values(**new_fields).returning(table.c.id)
+        return await database.fetch_one(query) is not None
+
+    async def get_checkpoint(self, job_id: str, table_name: str) -> Optional[RotationCheckpoint]:
+        t = rotation_checkpoints_table
+        row = await database.fetch_one(t.select().where(t.c.job_id == job_id).where(t.c.table_name == table_name))
+        if not row:
+            return None
+        return RotationCheckpoint(job_id=row["job_id"], table_name=row["table_name"], last_id=row["last_id"],
+                                  rows_scanned=row["rows_scanned"], rows_rotated=row["rows_rotated"],
+                                  skipped_ids=list(row["skipped_ids"] or []), finished=row["finished"],
+                                  updated_at=row["updated_at"])
+
+    async def save_checkpoint(self, checkpoint: RotationCheckpoint) -> None:
+        values = checkpoint.model_dump()
+        query = insert(rotation_checkpoints_table).values(**values).on_conflict_do_update(
+            index_elements=[rotation_checkpoints_table.c.job_id, rotation_checkpoints_table.c.table_name],
+            set_={k: v for k, v in values.items() if k not in ("job_id", "table_name")},
+        )
+        await database.execute(query)
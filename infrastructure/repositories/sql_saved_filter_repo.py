@@ -0,0 +1,156 @@
+from datetime import datetime
+from typing import List, Optional, Set, Union
+from uuid import UUID
+
+import sqlalchemy
+
+from domain.entities import Note, SavedFilter, Trash
+from domain.interfaces import SavedFilterRepository
+from presentation.db import database, note_tags_table, notes_table, trash_table, saved_filters_table, saved_filter_members_table
+from infrastructure.repositories.sql_tag_repo import projected_columns, projected_values
+
+
+def _table(scope: str) -> sqlalchemy.Table:
+    return notes_table if scope == "notes" else trash_table
+
+
+def _matches(n: sqlalchemy.Table, scope: str):
+    """Warunek "notatka `n` spełnia filtr `saved_filters`" - ta sama semantyka co FilteringService.
+
+    Tag przez `note_tags`, tytuł przez `title_hash` (notatki bez skrótu nie
+    pasują do filtra po tytule), daty po dniu utworzenia.
+    """
+    f = saved_filters_table
+    t = note_tags_table
+    day = sqlalchemy.cast(n.c.created_at, sqlalchemy.Date)
+    tagged = (
+        sqlalchemy.exists()
+        .where(t.c.user_uuid == n.c.user_uuid)
+        .where(t.c.scope == scope)
+        .where(t.c.note_id == n.c.id)
+        .where(t.c.tag == f.c.tag)
+    )
+    return sqlalchemy.and_(
+        sqlalchemy.or_(f.c.tag.is_(None), tagged),
+        sqlalchemy.or_(f.c.title_hash.is_(None), n.c.title_hash == f.c.title_hash),
+        sqlalchemy.or_(f.c.date_eq.is_(None), day == f.c.date_eq),
+        sqlalchemy.or_(f.c.date_from.is_(None), day >= f.c.date_from),
+        sqlalchemy.or_(f.c.date_to.is_(None), day <= f.c.date_to),
+    )
+
+
+async def _insert_members(user_uuid: UUID, scope: str, *conditions) -> None:
+    # INSERT ... SELECT: dopasowanie liczone w bazie, bez pobierania notatek
+    f = saved_filters_table
+    n = _table(scope)
+    query = (
+        sqlalchemy.select(f.c.id.label("filter_id"), n.c.id.label("note_id"))
+        .select_from(f.join(n, n.c.user_uuid == f.c.user_uuid))
+        .where(f.c.user_uuid == str(user_uuid))
+        .where(f.c.scope == scope)
+        .where(_matches(n, scope))
+        .where(*conditions)
+    )
+    await database.execute(saved_filter_members_table.insert().from_select(["filter_id", "note_id"], query))
+
+
+async def delete_note_filters(user_uuid: UUID, scope: str, note_id: int) -> None:
+    """Usuwa notatkę ze wszystkich zapisanych filtrów użytkownika w danym zakresie."""
+    f = saved_filters_table
+    m = saved_filter_members_table
+    await database.execute(
+        m.delete()
+        .where(m.c.note_id == note_id)
+        .where(m.c.filter_id.in_(sqlalchemy.select(f.c.id).where(f.c.user_uuid == str(user_uuid)).where(f.c.scope == scope)))
+    )
+
+
+async def refresh_note_filters(user_uuid: UUID, scope: str, note_id: int) -> None:
+    """Przelicza członkostwo jednej notatki; wywoływane wewnątrz transakcji zapisu notatki (po `note_tags`)."""
+    await delete_note_filters(user_uuid, scope, note_id)
+    await _insert_members(user_uuid, scope, _table(scope).c.id == note_id)
+
+
+async def rebuild_user_filters(user_uuid: UUID, scope: str) -> None:
+    """Przelicza członkostwo wszystkich filtrów użytkownika w zakresie (po masowym ładowaniu notatek)."""
+    f = saved_filters_table
+    m = saved_filter_members_table
+    await database.execute(
+        m.delete().where(m.c.filter_id.in_(sqlalchemy.select(f.c.id).where(f.c.user_uuid == str(user_uuid)).where(f.c.scope == scope)))
+    )
+    await _insert_members(user_uuid, scope)
+
+
+def _saved_filter(r, count: Optional[int] = None) -> SavedFilter:
+    return SavedFilter(id=r["id"], user_uuid=r["user_uuid"], name=r["name"], scope=r["scope"], tag=r["tag"],
+                       title_hash=r["title_hash"], date_eq=r["date_eq"], date_from=r["date_from"],
+                       date_to=r["date_to"], created_at=r["created_at"], count=count)
+
+
+class SQLSavedFilterRepository(SavedFilterRepository):
+    async def add(self, saved: SavedFilter) -> SavedFilter:
+        query = (
+            saved_filters_table.insert()
+            .values(
+                user_uuid=saved.user_uuid,
+                name=saved.name,
+                scope=saved.scope,
+                tag=saved.tag,
+                title_hash=saved.title_hash,
+                date_eq=saved.date_eq,
+                date_from=saved.date_from,
+                date_to=saved.date_to,
+                created_at=saved.created_at or datetime.utcnow(),
+            )
+            .returning(*saved_filters_table.c)
+        )
+        async with database.transaction():
+            row = await database.fetch_one(query)
+            # jedyne pełne przejście po notatkach - dalej członkostwo zmienia się przyrostowo
+            await _insert_members(saved.user_uuid, saved.scope, saved_filters_table.c.id == row["id"])
+        return _saved_filter(row)
+
+    async def get(self, *, filter_id: int, user_uuid: UUID) -> Optional[SavedFilter]:
+        f = saved_filters_table
+        row = await database.fetch_one(f.select().where(f.c.id == filter_id).where(f.c.user_uuid == str(user_uuid)))
+        return _saved_filter(row) if row else None
+
+    async def get_all(self, *, user_uuid: UUID) -> List[SavedFilter]:
+        f = saved_filters_table
+        m = saved_filter_members_table
+        rows = await database.fetch_all(
+            sqlalchemy.select(f, sqlalchemy.func.count(m.c.note_id).label("count"))
+            .select_from(f.outerjoin(m, m.c.filter_id == f.c.id))
+            .where(f.c.user_uuid == str(user_uuid))
+            .group_by(f.c.id)
+            .order_by(f.c.name, f.c.id)
+        )
+        return [_saved_filter(r, r["count"]) for r in rows]
+
+    async def delete(self, *, filter_id: int, user_uuid: UUID) -> bool:
+        f = saved_filters_table
+        # członkostwo usuwa ON DELETE CASCADE
+        row = await database.fetch_one(
+            f.delete().where(f.c.id == filter_id).where(f.c.user_uuid == str(user_uuid)).returning(f.c.id)
+        )
+        return row is not None
+
+    async def notes(self, *, filter_id: int, user_uuid: UUID,
+                    columns: Optional[Set[str]] = None) -> Optional[List[Union[Note, Trash]]]:
+        saved = await self.get(filter_id=filter_id, user_uuid=user_uuid)
+        if saved is None:
+            return None
+        n = _table(saved.scope)
+        m = saved_filter_members_table
+        entity = Note if saved.scope == "notes" else Trash
+        # pominięte kolumny (np. content przy liście tytułów) nie są czytane z bazy
+        selected = projected_columns(n, columns, {"id", "user_uuid"} if entity is Note else {"id", "user_uuid", "trashed_at"})
+        # jeden odczyt po kluczu głównym członkostwa złączony z notatkami
+        rows = await database.fetch_all(
+            sqlalchemy.select(*selected)
+            .select_from(m.join(n, n.c.id == m.c.note_id))
+            .where(m.c.filter_id == filter_id)
+            .where(n.c.user_uuid == str(user_uuid))
+            .order_by(n.c.id)
+        )
+        return [entity(**projected_values(r, selected)) for r in rows]
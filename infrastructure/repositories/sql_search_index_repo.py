@@ -0,0 +1,58 @@
+from typing import Dict, List, Set
+from uuid import UUID
+
+import sqlalchemy
+
+from domain.interfaces import SearchIndexRepository
+from presentation.db import database, search_tokens_table
+
+
+class SQLSearchIndexRepository(SearchIndexRepository):
+    async def replace(self, *, user_uuid: UUID, scope: str, note_id: int, tokens: Dict[str, Set[bytes]]) -> None:
+        t = search_tokens_table
+        rows = [
+            {"user_uuid": user_uuid, "scope": scope, "note_id": note_id, "kind": kind, "token": token}
+            for kind, values in tokens.items()
+            for token in values
+        ]
+        async with database.transaction():
+            await database.execute(
+                t.delete().where(t.c.user_uuid == str(user_uuid)).where(t.c.scope == scope).where(t.c.note_id == note_id)
+            )
+            if rows:
+                await database.execute_many(t.insert(), rows)
+
+    async def move(self, *, user_uuid: UUID, from_scope: str, from_id: int, to_scope: str, to_id: int) -> None:
+        t = search_tokens_table
+        query = (
+            t.update()
+            .where(t.c.user_uuid == str(user_uuid))
+            .where(t.c.scope == from_scope)
+            .where(t.c.note_id == from_id)
+            .values(scope=to_scope, note_id=to_id)
+        )
+        await database.execute(query)
+
+    async def remove(self, *, user_uuid: UUID, scope: str, note_id: int) -> None:
+        t = search_tokens_table
+        await database.execute(
+            t.delete().where(t.c.user_uuid == str(user_uuid)).where(t.c.scope == scope).where(t.c.note_id == note_id)
+        )
+
+    async def find(self, *, user_uuid: UUID, scope: str, kind: str, tokens: List[bytes]) -> List[int]:
+        if not tokens:
+            return []
+        t = search_tokens_table
+        unique = list(set(tokens))
+        query = (
+            sqlalchemy.select(t.c.note_id)
+            .where(t.c.user_uuid == str(user_uuid))
+            .where(t.c.scope == scope)
+            .where(t.c.kind == kind)
+            .where(t.c.token.in_(unique))
+            .group_by(t.c.note_id)
+            .having(sqlalchemy.func.count(sqlalchemy.distinct(t.c.token)) == len(unique))
+            .order_by(t.c.note_id)
+        )
+        rows = await database.fetch_all(query)
+        return [r["note_id"] for r in rows]
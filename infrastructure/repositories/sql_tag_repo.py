@@ -0,0 +1,110 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Set
+from uuid import UUID
+
+import sqlalchemy
+
+from domain.interfaces import TagRepository
+from application.common.utils import normalize_tags
+from presentation.db import database, note_tags_table, notes_table, trash_table
+
+
+async def replace_note_tags(user_uuid: UUID, scope: str, note_id: int, tags: Optional[List[str]]) -> None:
+    """Zastępuje wiersze `note_tags` notatki; wywoływane wewnątrz transakcji zapisu notatki."""
+    await delete_note_tags(user_uuid, scope, note_id)
+    rows = [{"user_uuid": user_uuid, "scope": scope, "tag": tag, "note_id": note_id} for tag in normalize_tags(tags)]
+    if rows:
+        await database.execute_many(note_tags_table.insert(), rows)
+
+
+async def delete_note_tags(user_uuid: UUID, scope: str, note_id: int) -> None:
+    t = note_tags_table
+    await database.execute(
+        t.delete().where(t.c.user_uuid == str(user_uuid)).where(t.c.scope == scope).where(t.c.note_id == note_id)
+    )
+
+
+def prefilter_conditions(table: sqlalchemy.Table, scope: str, *, tag: Optional[str] = None,
+                         date_from: Optional[date] = None, date_to: Optional[date] = None,
+                         title_hash: Optional[bytes] = None) -> list:
+    """Predykaty WHERE dla notatek/kosza liczone w SQL zamiast po odszyfrowaniu.
+
+    Tag przez `note_tags`, daty jako zakres na `created_at` (dzień `date_to`
+    włącznie), skrót tytułu - zgodny albo brak skrótu (do sprawdzenia później).
+    """
+    conditions = []
+    normalized = normalize_tags([tag]) if tag else []
+    if normalized:
+        t = note_tags_table
+        conditions.append(
+            sqlalchemy.exists()
+            .where(t.c.user_uuid == table.c.user_uuid)
+            .where(t.c.scope == scope)
+            .where(t.c.note_id == table.c.id)
+            .where(t.c.tag == normalized[0])
+        )
+    if date_from is not None:
+        conditions.append(table.c.created_at >= datetime.combine(date_from, time.min))
+    if date_to is not None:
+        conditions.append(table.c.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+    if title_hash is not None:
+        conditions.append(sqlalchemy.or_(table.c.title_hash == title_hash, table.c.title_hash.is_(None)))
+    return conditions
+
+
+def projected_columns(table: sqlalchemy.Table, columns: Optional[Set[str]], required: Set[str]) -> list:
+    """Kolumny do SELECT: wszystkie (`columns` None) albo tylko `columns` i `required`."""
+    if columns is None:
+        return list(table.c)
+    return [c for c in table.c if c.name in columns or c.name in required]
+
+
+def projected_values(row, selected: list) -> dict:
+    """Wartości wybranych kolumn; pominięte szyfrogramy jako b"" (jak w `get_headers`)."""
+    return {"title": b"", "content": b"", **{c.name: row[c.name] for c in selected}}
+
+
+class SQLTagRepository(TagRepository):
+    async def note_ids(self, *, user_uuid: UUID, scope: str, tag: str) -> List[int]:
+        t = note_tags_table
+        tag = normalize_tags([tag])
+        if not tag:
+            return []
+        rows = await database.fetch_all(
+            sqlalchemy.select(t.c.note_id)
+            .where(t.c.user_uuid == str(user_uuid))
+            .where(t.c.scope == scope)
+            .where(t.c.tag == tag[0])
+        )
+        return [r["note_id"] for r in rows]
+
+    async def facets(self, *, user_uuid: UUID, scope: str) -> Dict[str, List[dict]]:
+        n = notes_table if scope == "notes" else trash_table
+        t = note_tags_table
+        # literał zamiast parametru - wyrażenie w SELECT i GROUP BY musi być identyczne
+        month = sqlalchemy.func.date_trunc(sqlalchemy.literal_column("'month'"), n.c.created_at)
+        # jedno przejście: GROUPING SETS liczy osobno grupy po tagu i po miesiącu;
+        # LEFT JOIN mnoży notatki przez tagi, stąd count(DISTINCT id)
+        query = (
+            sqlalchemy.select(
+                t.c.tag,
+                month.label("month"),
+                sqlalchemy.func.grouping(t.c.tag).label("by_month"),
+                sqlalchemy.func.count(sqlalchemy.distinct(n.c.id)).label("count"),
+            )
+            .select_from(
+                n.outerjoin(t, sqlalchemy.and_(t.c.user_uuid == n.c.user_uuid, t.c.scope == scope, t.c.note_id == n.c.id))
+            )
+            .where(n.c.user_uuid == str(user_uuid))
+            .group_by(sqlalchemy.func.grouping_sets(sqlalchemy.tuple_(t.c.tag), sqlalchemy.tuple_(month)))
+        )
+        tags: List[dict] = []
+        months: List[dict] = []
+        for r in await database.fetch_all(query):
+            if r["by_month"]:
+                months.append({"month": r["month"].strftime("%Y-%m") if r["month"] else None, "count": r["count"]})
+            elif r["tag"] is not None:  # grupa notatek bez tagów
+                tags.append({"tag": r["tag"], "count": r["count"]})
+        tags.sort(key=lambda f: (-f["count"], f["tag"]))
+        months.sort(key=lambda f: f["month"] or "", reverse=True)
+        return {"tags": tags, "months": months}
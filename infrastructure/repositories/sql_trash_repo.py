@@ -1,9 +1,14 @@
-from typing import List, Optional
+from datetime import date
+from typing import AsyncIterator, List, Optional, Set
 from uuid import UUID
 
 from domain.entities import Trash, Note
 from domain.interfaces import TrashRepository
-from presentation.db import database, trash_table
+from sqlalchemy import select
+
+from presentation.db import database, trash_table, note_chunks_table, search_tokens_table
+from infrastructure.repositories.sql_tag_repo import replace_note_tags, delete_note_tags, prefilter_conditions, projected_columns, projected_values
+from infrastructure.repositories.sql_saved_filter_repo import refresh_note_filters, delete_note_filters
 
 
 class SQLTrashRepository(TrashRepository):
@@ -19,12 +24,17 @@ class SQLTrashRepository(TrashRepository):
                 trashed_at=trashed_note.trashed_at,
                 key_private_b64=trashed_note.key_private_b64,
                 public_key_b64=trashed_note.public_key_b64,
+                stream_id=trashed_note.stream_id,
+                title_hash=trashed_note.title_hash,
             )
             .returning(trash_table.c.id)
         )
-        row = await database.fetch_one(query)
-        if row:
-            trashed_note.id = row["id"]
+        async with database.transaction():
+            row = await database.fetch_one(query)
+            if row:
+                trashed_note.id = row["id"]
+                await replace_note_tags(trashed_note.user_uuid, "trash", trashed_note.id, trashed_note.tags)
+                await refresh_note_filters(trashed_note.user_uuid, "trash", trashed_note.id)
         return trashed_note
 
     async def get_by_id(self, *, note_id: int, user_uuid: UUID) -> Optional[Trash]:
@@ -35,7 +45,8 @@ class SQLTrashRepository(TrashRepository):
         return Trash(id=row["id"], user_uuid=row["user_uuid"], 
                     title=row["title"], content=row["content"], tags=row["tags"],
                     created_at=row["created_at"], trashed_at=row["trashed_at"],
-                    key_private_b64=row["key_private_b64"], public_key_b64=row["public_key_b64"])
+                    key_private_b64=row["key_private_b64"], public_key_b64=row["public_key_b64"],
+                    stream_id=row["stream_id"], title_hash=row["title_hash"])
 
     async def get_all(self, user_uuid: UUID) -> List[Trash]:
         rows = await database.fetch_all(trash_table.select().where(trash_table.c.user_uuid == str(user_uuid)))
@@ -43,25 +54,110 @@ class SQLTrashRepository(TrashRepository):
             Trash(id=r["id"], user_uuid=r["user_uuid"], 
                   title=r["title"], content=r["content"], tags=r["tags"], 
                   created_at=r["created_at"], trashed_at=r["trashed_at"], 
-                  key_private_b64=r["key_private_b64"],public_key_b64=r["public_key_b64"]) for r in rows
+                  key_private_b64=r["key_private_b64"],public_key_b64=r["public_key_b64"],
+                  stream_id=r["stream_id"], title_hash=r["title_hash"]) for r in rows
         ]
 
+    async def get_headers(self, *, user_uuid: UUID) -> List[Trash]:
+        columns = [c for c in trash_table.c if c.name != "content"]
+        rows = await database.fetch_all(select(*columns).where(trash_table.c.user_uuid == str(user_uuid)))
+        return [
+            Trash(id=r["id"], user_uuid=r["user_uuid"],
+                  title=r["title"], content=b"", tags=r["tags"],
+                  created_at=r["created_at"], trashed_at=r["trashed_at"],
+                  key_private_b64=r["key_private_b64"], public_key_b64=r["public_key_b64"],
+                  stream_id=r["stream_id"], title_hash=r["title_hash"]) for r in rows
+        ]
+
+    async def iterate_all(self, *, user_uuid: UUID) -> AsyncIterator[Trash]:
+        query = trash_table.select().where(trash_table.c.user_uuid == str(user_uuid)).order_by(trash_table.c.id)
+        async for r in database.iterate(query):
+            yield Trash(id=r["id"], user_uuid=r["user_uuid"],
+                        title=r["title"], content=r["content"], tags=r["tags"],
+                        created_at=r["created_at"], trashed_at=r["trashed_at"],
+                        key_private_b64=r["key_private_b64"], public_key_b64=r["public_key_b64"],
+                        stream_id=r["stream_id"], title_hash=r["title_hash"])
+
+    async def get_prefiltered(self, *, user_uuid: UUID, tag: Optional[str] = None, date_from: Optional[date] = None,
+                              date_to: Optional[date] = None, title_hash: Optional[bytes] = None,
+                              columns: Optional[Set[str]] = None, after_id: Optional[int] = None,
+                              limit: Optional[int] = None) -> List[Trash]:
+        t = trash_table
+        conditions = prefilter_conditions(t, "trash", tag=tag, date_from=date_from, date_to=date_to, title_hash=title_hash)
+        if after_id is not None:
+            conditions.append(t.c.id > after_id)
+        # pominięte kolumny (np. content przy liście tytułów) nie są czytane z bazy
+        selected = projected_columns(t, columns, {"id", "user_uuid", "trashed_at"})
+        query = select(*selected).where(t.c.user_uuid == str(user_uuid)).where(*conditions).order_by(t.c.id)
+        if limit:
+            query = query.limit(limit)
+        rows = await database.fetch_all(query)
+        return [Trash(**projected_values(r, selected)) for r in rows]
+
     async def restore(self, *, note_id: int, user_uuid: UUID) -> Optional[Note]:
         trashed = await self.get_by_id(note_id=note_id, user_uuid=user_uuid)
         if not trashed:
             return None
         # remove from trash
-        await database.execute(trash_table.delete().where(trash_table.c.id == note_id).where(trash_table.c.user_uuid == str(user_uuid)))
+        async with database.transaction():
+            await database.execute(trash_table.delete().where(trash_table.c.id == note_id).where(trash_table.c.user_uuid == str(user_uuid)))
+            await delete_note_tags(user_uuid, "trash", note_id)
+            await delete_note_filters(user_uuid, "trash", note_id)
         # construct Note from trashed
         note = Note(id=trashed.id, user_uuid=trashed.user_uuid, 
                     title=trashed.title, content=trashed.content, 
                     created_at=trashed.created_at, tags=trashed.tags, 
-                    key_private_b64=trashed.key_private_b64, public_key_b64=trashed.public_key_b64)
+                    key_private_b64=trashed.key_private_b64, public_key_b64=trashed.public_key_b64,
+                    stream_id=trashed.stream_id, title_hash=trashed.title_hash)
         return note
 
     async def delete_permanently(self, *, note_id: int, user_uuid: UUID) -> bool:
         row = await database.fetch_one(trash_table.select().where(trash_table.c.id == note_id).where(trash_table.c.user_uuid == str(user_uuid)))
         if not row:
             return False
-        await database.execute(trash_table.delete().where(trash_table.c.id == note_id).where(trash_table.c.user_uuid == str(user_uuid)))
+        async with database.transaction():
+            await database.execute(trash_table.delete().where(trash_table.c.id == note_id).where(trash_table.c.user_uuid == str(user_uuid)))
+            if row["stream_id"] is not None:
+                # kawałki treści strumieniowej nie mają FK do trash - usuwamy je razem z wierszem
+                await database.execute(note_chunks_table.delete().where(note_chunks_table.c.stream_id == row["stream_id"]))
+            # tokeny ślepego indeksu usuniętej notatki
+            await database.execute(
+                search_tokens_table.delete()
+                .where(search_tokens_table.c.user_uuid == str(user_uuid))
+                .where(search_tokens_table.c.scope == "trash")
+                .where(search_tokens_table.c.note_id == note_id)
+            )
+            await delete_note_tags(user_uuid, "trash", note_id)
+            await delete_note_filters(user_uuid, "trash", note_id)
         return True
+
+    async def update(
+        self,
+        note_id: int,
+        *,
+        user_uuid: UUID,
+        title: Optional[bytes] = None,
+        content: Optional[bytes] = None,
+        title_hash: Optional[bytes] = None,
+    ) -> Optional[Trash]:
+        values = {}
+        if content is not None:
+            values["content"] = content
+        if title is not None:
+            values["title"] = title
+        if title_hash is not None:
+            values["title_hash"] = title_hash or None
+        if not values:
+            return await self.get_by_id(note_id=note_id, user_uuid=user_uuid)
+        query = trash_table.update().where(trash_table.c.id == note_id).where(trash_table.c.user_uuid == str(user_uuid)).values(**values).returning(*trash_table.c)
+        async with database.transaction():
+            row = await database.fetch_one(query)
+            if row and title_hash is not None:
+                await refresh_note_filters(user_uuid, "trash", note_id)
+        if not row:
+            return None
+        return Trash(id=row["id"], user_uuid=row["user_uuid"],
+                    title=row["title"], content=row["content"], tags=row["tags"],
+                    created_at=row["created_at"], trashed_at=row["trashed_at"],
+                    key_private_b64=row["key_private_b64"], public_key_b64=row["public_key_b64"],
+                    stream_id=row["stream_id"], title_hash=row["title_hash"])
@@ -0,0 +1,40 @@
+from typing import List, Optional
+from uuid import UUID
+
+from domain.entities import UserKeys
+from domain.interfaces import UserKeyRepository
+from presentation.db import database, user_keys_table
+
+
+class SQLUserKeyRepository(UserKeyRepository):
+    async def add(self, keys: UserKeys) -> UserKeys:
+        query = user_keys_table.insert().values(
+            user_uuid=keys.user_uuid,
+            public_key_b64=keys.public_key_b64,
+            private_key_enc=keys.private_key_enc,
+            sealed_kek=keys.sealed_kek,
+            created_at=keys.created_at,
+        )
+        await database.execute(query)
+        return keys
+
+    async def get_by_user(self, user_uuid: UUID) -> Optional[UserKeys]:
+        query = user_keys_table.select().where(user_keys_table.c.user_uuid == str(user_uuid))
+        row = await database.fetch_one(query)
+        if not row:
+            return None
+        return UserKeys(user_uuid=row["user_uuid"], public_key_b64=row["public_key_b64"],
+                        private_key_enc=row["private_key_enc"], sealed_kek=row["sealed_kek"],
+                        created_at=row["created_at"])
+
+    async def get_all(self) -> List[UserKeys]:
+        rows = await database.fetch_all(user_keys_table.select())
+        return [
+            UserKeys(user_uuid=r["user_uuid"], public_key_b64=r["public_key_b64"],
+                     private_key_enc=r["private_key_enc"], sealed_kek=r["sealed_kek"],
+                     created_at=r["created_at"]) for r in rows
+        ]
+
+    async def update_private_key(self, user_uuid: UUID, private_key_enc: bytes) -> None:
+        query = user_keys_table.update().where(user_keys_table.c.user_uuid == str(user_uuid)).values(private_key_enc=private_key_enc)
+        await database.execute(query)
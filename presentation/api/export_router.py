@@ -1,46 +1,187 @@
-import os
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse
+from typing import Optional
+from urllib.parse import quote
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
 from uuid import UUID
 
 from presentation import dependencies as deps
 
 from application.services.exporting.export_dto import NotesExport
+from application.services.exporting.formats import EXPORT_FORMATS
+from application.services.exporting.export_jobs import ExportJobService, DONE, EXPIRED
+from domain.entities import ExportJob
 
 from application.use_cases.notes.export_note import ExportNoteUseCase
+from application.use_cases.notes.export_all import ExportAllUseCase
 
 
 router = APIRouter(prefix="/export", tags=["exporting"], dependencies=[Depends(deps.get_hardcoded_auth)])
 
 
 
+@router.get("/all")
+async def export_all_endpoint(
+    format: str = Query("zip", pattern="^(zip|markdown|ndjson|csv)$"),
+    include_trash: bool = False,
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    export_all_use_case: ExportAllUseCase = Depends(deps.get_export_all_use_case),
+):
+    """Eksportuje całe konto w jednym żądaniu, przesyłane strumieniowo.
+
+    - `zip`: archiwum z `notes/<id> <tytuł>.txt` (id wyklucza kolizje tytułów)
+    - `markdown`: archiwum plików .md z front matter (tytuł, tagi, daty, kosz)
+    - `ndjson`: obiekt JSON na linię (`id`, `scope`, `title`, `tags`,
+      `created_at`, `trashed`, `trashed_at`, `error`, `content`)
+    - `csv`: te same kolumny, tagi rozdzielone średnikiem
+    - `include_trash=true` dołącza kosz (`trash/` w archiwach, `trashed: true`)
+    - Notatki czytane są kursorem i odszyfrowywane partiami - stała pamięć,
+      bez plików tymczasowych, niezależnie od rozmiaru konta
+    - Notatki, których nie udało się odszyfrować, mają `error`
+      (w archiwach są wymienione w `errors.txt`)
+    """
+    writer = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        export_all_use_case.execute(user_uuid=user_uuid, fmt=format, include_trash=include_trash),
+        media_type=writer.media_type,
+        headers={"Content-Disposition": f"attachment; filename=notes.{writer.extension}"},
+    )
+
+
+def _job_out(job: ExportJob) -> dict:
+    def _time(value):
+        return value.isoformat() if value else None
+    return {
+        "id": str(job.id),
+        "format": job.format,
+        "include_trash": job.include_trash,
+        "status": job.status,
+        "notes_total": job.notes_total,
+        "notes_done": job.notes_done,
+        "percent": round(100.0 * job.notes_done / job.notes_total, 1) if job.notes_total else None,
+        "bytes_written": job.bytes_written,
+        "error": job.error,
+        "created_at": _time(job.created_at),
+        "started_at": _time(job.started_at),
+        "finished_at": _time(job.finished_at),
+        "expires_at": _time(job.expires_at),
+        "download": f"/export/jobs/{job.id}/download" if job.status == DONE else None,
+    }
+
+
+@router.post("/jobs", status_code=202, response_model=dict)
+async def start_export_job_endpoint(
+    format: str = Query("zip", pattern="^(zip|markdown|ndjson|csv)$"),
+    include_trash: bool = False,
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    job_service: ExportJobService = Depends(deps.get_export_job_service),
+):
+    """Zleca eksport całego konta w tle (formaty jak GET /export/all).
+
+    Eksport wykonuje osobny worker (scripts/export_worker.py) z limitem
+    zleceń na użytkownika i łącznie, więc duże konta nie zajmują workerów
+    żądań. Postęp: GET /export/jobs/{id}, wynik: GET /export/jobs/{id}/download.
+    """
+    try:
+        job = await job_service.start(user_uuid=user_uuid, fmt=format, include_trash=include_trash)
+    except OverflowError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _job_out(job)
+
+
+@router.get("/jobs", response_model=list)
+async def list_export_jobs_endpoint(
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    job_service: ExportJobService = Depends(deps.get_export_job_service),
+):
+    """Zlecenia eksportu użytkownika, najnowsze pierwsze."""
+    return [_job_out(job) for job in await job_service.get_all(user_uuid=user_uuid)]
+
+
+@router.get("/jobs/{job_id}", response_model=dict)
+async def export_job_status_endpoint(
+    job_id: UUID,
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    job_service: ExportJobService = Depends(deps.get_export_job_service),
+):
+    """Stan i postęp zlecenia (`notes_done` / `notes_total`, zapisane bajty)."""
+    job = await job_service.get(job_id=job_id, user_uuid=user_uuid)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Zlecenie eksportu nie istnieje")
+    return _job_out(job)
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_export_job_endpoint(
+    job_id: UUID,
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    job_service: ExportJobService = Depends(deps.get_export_job_service),
+):
+    """Pobiera wynik zakończonego zlecenia (strumieniowo, do `expires_at`).
+
+    - 409, gdy eksport jeszcze trwa albo się nie powiódł
+    - 410, gdy wynik wygasł
+    """
+    job = await job_service.get(job_id=job_id, user_uuid=user_uuid)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Zlecenie eksportu nie istnieje")
+    if job.status == EXPIRED:
+        raise HTTPException(status_code=410, detail="Wynik eksportu wygasł")
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Eksport nie jest gotowy (status: {job.status})")
+    writer = EXPORT_FORMATS[job.format]
+    return StreamingResponse(
+        job_service.download(job),
+        media_type=writer.media_type,
+        headers={"Content-Disposition": f"attachment; filename=notes.{writer.extension}"},
+    )
+
+
+@router.delete("/jobs/{job_id}", response_model=dict)
+async def delete_export_job_endpoint(
+    job_id: UUID,
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    job_service: ExportJobService = Depends(deps.get_export_job_service),
+):
+    """Usuwa zlecenie i jego wynik; trwający eksport zostaje przerwany."""
+    if not await job_service.delete(job_id=job_id, user_uuid=user_uuid):
+        raise HTTPException(status_code=404, detail="Zlecenie eksportu nie istnieje")
+    return {"deleted": str(job_id)}
+
+
+def _attachment(filename: str) -> str:
+    """Content-Disposition z nazwą ASCII i pełną nazwą UTF-8 (RFC 6266 / 5987)."""
+    fallback = filename.encode("ascii", "ignore").decode() or "note.txt"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
 @router.get("/export/{note_id}")
 async def export_note_endpoint(
     note_id: int,
+    if_none_match: Optional[str] = Header(None),
     user_uuid: UUID = Depends(deps.get_current_user_uuid),
     export_note_use_case: ExportNoteUseCase = Depends(deps.get_export_note_use_case),
 ):
     """Eksportuje notatkę do pliku tekstowego.
     
-    - Odszyfrowuje tytuł i zawartość notatki
-    - Tworzy plik .txt o nazwie równej tytułowi notatki
-    - Zawartość pliku to odszyfrowana treść notatki
-    - Zwraca plik do pobrania
+    - Odszyfrowuje tytuł i zawartość notatki (jeden raz)
+    - Plik .txt o nazwie równej tytułowi notatki, treść wysyłana strumieniowo
+      z pamięci - bez plików tymczasowych
+    - `ETag` liczony z szyfrogramu; przy zgodnym `If-None-Match` odpowiedź
+      to 304 bez odszyfrowywania i bez treści
     """
     try:
         export_request = NotesExport(note_id=note_id, user_uuid=user_uuid)
-        file_path, filename = await export_note_use_case.execute(export_request)
-
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=500, detail="Nie udało się utworzyć pliku")
-
-        return FileResponse(
-            path=file_path,
-            filename=filename,
-            media_type="text/plain",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        exported = await export_note_use_case.execute(export_request, if_none_match=if_none_match)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Błąd podczas eksportu: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Błąd podczas eksportu: {str(e)}")
+
+    # no-cache: przeglądarka może trzymać kopię, ale przed użyciem sprawdza ETag
+    headers = {"ETag": exported.etag, "Cache-Control": "private, no-cache"}
+    if exported.not_modified:
+        return Response(status_code=304, headers=headers)
+    headers["Content-Disposition"] = _attachment(exported.filename)
+    return StreamingResponse(exported.body, media_type="text/plain; charset=utf-8", headers=headers)
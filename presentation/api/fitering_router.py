@@ -1,6 +1,5 @@
-import base64
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Optional, cast
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional, Union, cast
 from datetime import date
 from uuid import UUID
 
@@ -8,20 +7,55 @@ from presentation import dependencies as deps
 
 from application.services.filtering.filter_dto import NotesFilter
 
-from domain.interfaces import  TrashRepository
-from domain.interfaces import NoteRepository
 from application.services.encryption_service import EncryptionService
 from application.services.filtering.filtering_service import FilteringService
-from application.common.utils import format_datetime_to_str
+from application.services.user_key_service import UserKeyService
+from application.common.utils import DATE_FMT
+from application.services.note_fields import NOTE_FIELDS, TRASH_FIELDS, parse_fields, field_columns, needs_kek, note_view
+from domain.entities import SavedFilter
 
-from application.use_cases.notes.get_note import GetNoteUseCase
 from application.use_cases.notes.notes_filtering import FilterNotesUseCase
 from application.use_cases.trashcan.filter_trash import FilterTrashUseCase
 
+
 router = APIRouter(prefix="/filtering", tags=["filtering"], dependencies=[Depends(deps.get_hardcoded_auth)])
 
-@router.post("/filter", response_model=list)
-async def filter_notes_endpoint(
+@router.get("/facets", response_model=dict)
+async def facets_endpoint(
+    scope: str = Query("notes", pattern="^(notes|trash)$"),
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    filtering_service: FilteringService = Depends(deps.get_filtering_service),
+):
+    """Liczba notatek per tag i per miesiąc utworzenia (chmura tagów, pasek boczny).
+
+    Jedno zapytanie GROUP BY GROUPING SETS po tabeli `note_tags` - bez
+    pobierania i odszyfrowywania notatek. `scope=trash` liczy kosz.
+    Tagi są znormalizowane (małe litery, bez spacji na brzegach).
+    """
+    return await filtering_service.facets(user_uuid=user_uuid, scope=scope)
+
+
+def _saved_filter_out(saved: SavedFilter) -> dict:
+    def _date(value):
+        return value.strftime(DATE_FMT) if value else None
+    return {
+        "id": saved.id,
+        "name": saved.name,
+        "scope": saved.scope,
+        "tag": saved.tag,
+        # tytuł filtra zapisany jest tylko jako skrót
+        "by_title": saved.title_hash is not None,
+        "date_eq": _date(saved.date_eq),
+        "date_from": _date(saved.date_from),
+        "date_to": _date(saved.date_to),
+        "count": saved.count,
+    }
+
+
+@router.post("/saved", response_model=dict)
+async def create_saved_filter_endpoint(
+    name: str = Query(..., min_length=1, max_length=255),
+    scope: str = Query("notes", pattern="^(notes|trash)$"),
     title: Optional[str] = None,
     tag: Optional[str] = None,
     date_eq: Optional[str] = None,
@@ -29,12 +63,12 @@ async def filter_notes_endpoint(
     date_to: Optional[str] = None,
     user_uuid: UUID = Depends(deps.get_current_user_uuid),
     filtering_service: FilteringService = Depends(deps.get_filtering_service),
-    filter_notes_use_case: FilterNotesUseCase = Depends(deps.get_filter_notes_use_case),
-    get_use_case: GetNoteUseCase = Depends(deps.get_get_note_use_case),
-    note_repo: NoteRepository = Depends(deps.get_note_repository),
-    encryption_service: EncryptionService = Depends(deps.get_encryption_service),
 ):
-    """Filtruje notatki po tytule, tagu i dacie utworzenia (dd-mm-yy)."""
+    """Zapisuje filtr jako inteligentny folder (parametry jak w POST /filtering/filter).
+
+    Członkostwo liczone jest raz przy zapisie, a potem aktualizowane przy
+    każdym zapisie notatki lub kosza - listowanie folderu to jeden odczyt.
+    """
     try:
         filters = NotesFilter(
             title=title,
@@ -44,49 +78,67 @@ async def filter_notes_endpoint(
             date_to=cast(date, date_to),
             user_uuid=user_uuid,
         )
-    except Exception as e:
+        saved = await filtering_service.save_filter(filters, name=name, scope=scope)
+    except ValueError as e:
         raise HTTPException(status_code=422, detail=f"Błędne parametry filtrów: {e}")
+    return _saved_filter_out(saved)
 
-    notes = await filtering_service.filter_notes(note_repo, filters, user_uuid)
 
-    result = []
-    for note in notes:
-        title_decrypt = await get_use_case.title_execute(note_id=note.id, user_uuid=user_uuid)
-        content_decrypt = await get_use_case.execute(note_id=note.id, user_uuid=user_uuid)
+@router.get("/saved", response_model=list)
+async def list_saved_filters_endpoint(
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    filtering_service: FilteringService = Depends(deps.get_filtering_service),
+):
+    """Zapisane filtry użytkownika z liczbą notatek."""
+    return [_saved_filter_out(saved) for saved in await filtering_service.saved_filters(user_uuid=user_uuid)]
 
-        privkey = base64.b64decode(note.key_private_b64) if note.key_private_b64 else None
 
-        decrypt_title = encryption_service.decrypt_with_private(title_decrypt.encode(), privkey) if privkey else "nie ma klucza prywatnego"
-        content_decrypt = encryption_service.decrypt_with_private(content_decrypt.encode(), privkey) if privkey else "nie ma klucza prywatnego"
-        result.append({
-            "id": note.id,
-            "title": decrypt_title,
-            "content": content_decrypt,
-            "tags": note.tags,
-            "private_key": note.key_private_b64,
-            "created_at": format_datetime_to_str(note.created_at),
-        })
+@router.get("/saved/{filter_id}", response_model=list)
+async def saved_filter_notes_endpoint(
+    filter_id: int,
+    fields: Optional[str] = None,
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    filtering_service: FilteringService = Depends(deps.get_filtering_service),
+    encryption_service: EncryptionService = Depends(deps.get_encryption_service),
+    user_key_service: UserKeyService = Depends(deps.get_user_key_service),
+):
+    """Zawartość inteligentnego folderu - bez przeglądania i filtrowania notatek konta.
 
-    return result
+    `fields` jak w /filtering/filter (dla folderu kosza dodatkowo trashed_at).
+    """
+    saved = await filtering_service.saved_filter(filter_id=filter_id, user_uuid=user_uuid)
+    if saved is None:
+        raise HTTPException(status_code=404, detail="Filtr nie istnieje")
+    try:
+        selected = parse_fields(fields, TRASH_FIELDS if saved.scope == "trash" else NOTE_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    rows = await filtering_service.saved_filter_notes(filter_id=filter_id, user_uuid=user_uuid,
+                                                      columns=field_columns(selected))
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Filtr nie istnieje")
+
+    kek = await user_key_service.get_kek(user_uuid) if rows and needs_kek(selected) else None
+    try:
+        return [note_view(encryption_service, row, selected, kek=kek, missing_key="nie ma klucza prywatnego") for row in rows]
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"odszyfrowanie nie powiodło {e}")
 
 
-@router.post("/trash/filter", response_model=list)
-async def filter_trash_endpoint(
-    title: Optional[str] = None,
-    tag: Optional[str] = None,
-    date_eq: Optional[str] = None,
-    date_from: Optional[str] = None,
-    date_to: Optional[str] = None,
+@router.delete("/saved/{filter_id}", response_model=dict)
+async def delete_saved_filter_endpoint(
+    filter_id: int,
     user_uuid: UUID = Depends(deps.get_current_user_uuid),
     filtering_service: FilteringService = Depends(deps.get_filtering_service),
-    filter_trash_use_case: FilterTrashUseCase = Depends(deps.get_filter_trash_use_case),
-    get_use_case: GetNoteUseCase = Depends(deps.get_get_note_use_case),
-    trash_repo: TrashRepository = Depends(deps.get_trash_repository),
-    encryption_service: EncryptionService = Depends(deps.get_encryption_service),
 ):
-    """Filtruje kosz po tytule, tagu i dacie utworzenia (created_at w Trash)."""
+    if not await filtering_service.delete_saved_filter(filter_id=filter_id, user_uuid=user_uuid):
+        raise HTTPException(status_code=404, detail="Filtr nie istnieje")
+    return {"deleted": filter_id}
+
+
+def _filters(title, tag, date_eq, date_from, date_to, user_uuid) -> NotesFilter:
     try:
-        filters = NotesFilter(
+        return NotesFilter(
             title=title,
             tag=tag,
             date_eq=cast(date, date_eq),
@@ -97,24 +149,67 @@ async def filter_trash_endpoint(
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Błędne parametry filtrów: {e}")
 
-    trashed = await filtering_service.filter_trash(trash_repo, filters, user_uuid)
 
-    result = []
-    for trash in trashed:
-        title_decrypt = await get_use_case.title_execute(note_id=trash.id, user_uuid=user_uuid)
-        content_decrypt = await get_use_case.execute(note_id=trash.id, user_uuid=user_uuid)
+async def _filter_page(use_case: Union[FilterNotesUseCase, FilterTrashUseCase], filters: NotesFilter, user_uuid: UUID,
+                       allowed, fields, after_id, limit, encryption_service: EncryptionService,
+                       user_key_service: UserKeyService) -> list:
+    try:
+        selected = parse_fields(fields, allowed)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    rows = await use_case.execute(filters, columns=field_columns(selected), after_id=after_id, limit=limit)
+    kek = await user_key_service.get_kek(user_uuid) if rows and needs_kek(selected) else None
+    try:
+        return [note_view(encryption_service, row, selected, kek=kek, missing_key="nie ma klucza prywatnego") for row in rows]
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"odszyfrowanie nie powiodło {e}")
+
+
+@router.post("/filter", response_model=list)
+async def filter_notes_endpoint(
+    title: Optional[str] = None,
+    tag: Optional[str] = None,
+    date_eq: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    filter_notes_use_case: FilterNotesUseCase = Depends(deps.get_filter_notes_use_case),
+    encryption_service: EncryptionService = Depends(deps.get_encryption_service),
+    user_key_service: UserKeyService = Depends(deps.get_user_key_service),
+):
+    """Filtruje notatki po tytule, tagu i dacie utworzenia (dd-mm-yy).
+
+    Tag, daty i skrót tytułu sprawdzane są w SQL; odszyfrowywane są tylko
+    pola z `fields` (jak w GET /notes/) wczytanych wierszy. `limit`
+    i `after_id` stronicują wyniki po id.
+    """
+    filters = _filters(title, tag, date_eq, date_from, date_to, user_uuid)
+    return await _filter_page(filter_notes_use_case, filters, user_uuid, NOTE_FIELDS, fields, after_id, limit,
+                              encryption_service, user_key_service)
 
-        privkey = base64.b64decode(trash.key_private_b64) if trash.key_private_b64 else None
 
-        decrypt_title = encryption_service.decrypt_with_private(title_decrypt.encode(), privkey) if privkey else "nie ma klucza prywatnego"
-        content_decrypt = encryption_service.decrypt_with_private(content_decrypt.encode(), privkey) if privkey else "nie ma klucza prywatnego"
-        result.append({
-            "id": trash.id,
-            "title": decrypt_title,
-            "content": content_decrypt,
-            "tags": trash.tags,
-            "private_key": trash.key_private_b64,
-            "created_at": format_datetime_to_str(trash.created_at),
-        })
+@router.post("/trash/filter", response_model=list)
+async def filter_trash_endpoint(
+    title: Optional[str] = None,
+    tag: Optional[str] = None,
+    date_eq: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    filter_trash_use_case: FilterTrashUseCase = Depends(deps.get_filter_trash_use_case),
+    encryption_service: EncryptionService = Depends(deps.get_encryption_service),
+    user_key_service: UserKeyService = Depends(deps.get_user_key_service),
+):
+    """Filtruje kosz po tytule, tagu i dacie utworzenia (created_at w Trash).
 
-    return result
\ No newline at end of file
+    `fields` (dodatkowo trashed_at), `limit` i `after_id` jak w /filtering/filter.
+    """
+    filters = _filters(title, tag, date_eq, date_from, date_to, user_uuid)
+    return await _filter_page(filter_trash_use_case, filters, user_uuid, TRASH_FIELDS, fields, after_id, limit,
+                              encryption_service, user_key_service)
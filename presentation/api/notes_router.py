@@ -1,5 +1,6 @@
 import base64
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional
 from uuid import UUID
 
@@ -8,11 +9,14 @@ from presentation import dependencies as deps
 
 from domain.interfaces import NoteRepository
 from application.services.encryption_service import EncryptionService
+from application.services.user_key_service import UserKeyService
 from application.common.utils import format_datetime_to_str
+from application.services.note_fields import NOTE_FIELDS, parse_fields, field_columns, needs_kek, note_view
 
 from application.use_cases.notes.create_note import CreateNoteUseCase
 from application.use_cases.notes.get_note import GetNoteUseCase
 from application.use_cases.notes.edit_note import EditNoteUseCase
+from application.use_cases.notes.stream_note import StreamNoteUseCase
 
 router = APIRouter(prefix="/notes", tags=["notes"])
 
@@ -24,18 +28,21 @@ async def create(
     user_uuid: UUID = Depends(deps.get_user_uuid_from_basic_auth),
     create_use_case: CreateNoteUseCase = Depends(deps.get_create_note_use_case),
     encryption_service: EncryptionService = Depends(deps.get_encryption_service),
+    user_key_service: UserKeyService = Depends(deps.get_user_key_service),
 ):
     """Tworzy notatkę:
     - generuje parę kluczy NaCl (prywatny i publiczny) dla klienta
     - szyfruje zawartość notatki lokalnie (hybrydowo) przy użyciu klucza publicznego klienta
+    - jeśli użytkownik ma klucze główne, klucz sesyjny jest dodatkowo opakowany jego KEK (paczka v2)
     - przekazuje zaszyfrowaną zawartość do CreateNoteUseCase wraz z kluczem prywatnym klienta (base64)
     - zwraca ID notatki, klucz prywatny klienta (base64), klucz publiczny klienta (base64), zaszyfrowaną zawartość serwera i lokalnie
     """
     client_priv, client_pub = encryption_service.generate_nacl_keypair()
     client_priv_b64 = base64.b64encode(client_priv).decode()
+    kek = await user_key_service.get_kek(user_uuid)
 
-    lokalny_pakiet_szyfrowany = encryption_service.encrypt_for_recipient(note_in.content, client_pub)
-    lokalny_title_szyfrowany = encryption_service.encrypt_for_recipient(note_in.title, client_pub)
+    lokalny_pakiet_szyfrowany = encryption_service.encrypt_for_recipient(note_in.content, client_pub, kek=kek)
+    lokalny_title_szyfrowany = encryption_service.encrypt_for_recipient(note_in.title, client_pub, kek=kek)
     lokalny_pakiet = lokalny_pakiet_szyfrowany.decode()
     lokalny_title = lokalny_title_szyfrowany.decode()
 
@@ -44,15 +51,17 @@ async def create(
         local_encrypted_content=lokalny_pakiet,
         client_private_key_b64=client_priv_b64,
         title=lokalny_title,
-        tags=[tag] if tag else None
+        tags=[tag] if tag else None,
+        plain_title=note_in.title,
+        plain_content=note_in.content,
     )
 
     return {
         "id": note.id,
         "client_private_key": client_priv_b64,
         "client_public_key": base64.b64encode(client_pub).decode(),
-        "server encrypted": note.content.decode(),
-        "title": note.title.decode(),
+        "server encrypted": encryption_service.server_token_to_str(note.content),
+        "title": encryption_service.server_token_to_str(note.title),
         "tags": note.tags,
         "local_encrypted": lokalny_pakiet,
         "created_at": format_datetime_to_str(note.created_at),
@@ -72,6 +81,7 @@ async def get(
     - Pobiera zaszyfrowaną lokalnie zawartość notatki (po odszyfrowaniu serwerowym).
     - Odszyfrowuje lokalny pakiet przy użyciu podanego `klucz_prywatny` (base64).
     - Zwraca ID notatki i odszyfrowany tekst (content).
+    - Dla notatek strumieniowych content jest pusty, a treść dostępna jest pod `content_stream`.
     """
     content = await get_use_case.execute(note_id=note_id, user_uuid=user_uuid)
     title = await get_use_case.title_execute(note_id=note_id, user_uuid=user_uuid)
@@ -80,20 +90,94 @@ async def get(
     if content is None:
         raise HTTPException(status_code=404, detail="Notatka nie istnieje")
 
+    streamed = tag is not None and tag.stream_id is not None
     bity_klucza_priv = base64.b64decode(klucz_prywatny)
     try:
-        text = encryption_service.decrypt_with_private(content.encode(), bity_klucza_priv)
+        text = None if streamed else encryption_service.decrypt_with_private(content.encode(), bity_klucza_priv)
         file_name = encryption_service.decrypt_with_private(title.encode(), bity_klucza_priv)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"odszyfrowanie nie powiodło się: {e}")
 
-    return {
+    response = {
         "id": note_id,
         "content": text,
         "title": file_name,
         "tags": tag.tags if tag is not None else None,
         "created_at": format_datetime_to_str(tag.created_at) if tag is not None else None
     }
+    if streamed:
+        response["content_stream"] = f"/notes/{note_id}/stream"
+    return response
+
+
+@router.post("/stream", response_model=dict)
+async def create_streamed(
+    request: Request,
+    title: str,
+    tag: Optional[str] = None,
+    user_uuid: UUID = Depends(deps.get_user_uuid_from_basic_auth),
+    stream_use_case: StreamNoteUseCase = Depends(deps.get_stream_note_use_case),
+    encryption_service: EncryptionService = Depends(deps.get_encryption_service),
+    user_key_service: UserKeyService = Depends(deps.get_user_key_service),
+):
+    """Tworzy dużą notatkę strumieniowo:
+    - treścią jest surowe body żądania (text/plain), czytane kawałkami
+    - każdy kawałek jest szyfrowany lokalnie (secretstream) i serwerowo, a potem zapisywany osobno
+    - pamięć procesu nie rośnie z rozmiarem notatki
+    - zwraca ID notatki, klucz prywatny i publiczny klienta (base64) oraz rozmiar treści
+    """
+    client_priv, client_pub = encryption_service.generate_nacl_keypair()
+    client_priv_b64 = base64.b64encode(client_priv).decode()
+    kek = await user_key_service.get_kek(user_uuid)
+
+    lokalny_title = encryption_service.encrypt_for_recipient(title, client_pub, kek=kek).decode()
+
+    note, size = await stream_use_case.upload(
+        user_uuid=user_uuid,
+        title=lokalny_title,
+        body=request.stream(),
+        recipient_public_key=client_pub,
+        client_private_key_b64=client_priv_b64,
+        kek=kek,
+        tags=[tag] if tag else None,
+        plain_title=title,
+    )
+
+    return {
+        "id": note.id,
+        "client_private_key": client_priv_b64,
+        "client_public_key": base64.b64encode(client_pub).decode(),
+        "title": title,
+        "tags": note.tags,
+        "size": size,
+        "created_at": format_datetime_to_str(note.created_at),
+    }
+
+
+@router.get("/{note_id}/stream")
+async def get_streamed(
+    note_id: int,
+    klucz_prywatny: str,
+    user_uuid: UUID = Depends(deps.get_user_uuid_from_basic_auth),
+    stream_use_case: StreamNoteUseCase = Depends(deps.get_stream_note_use_case),
+):
+    """Strumieniowo zwraca odszyfrowaną treść notatki (kawałek po kawałku).
+
+    Działa też dla zwykłych notatek - wtedy treść wysyłana jest w jednym kawałku.
+    """
+    try:
+        priv_bytes = base64.b64decode(klucz_prywatny)
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid base64 for klucz_prywatny")
+
+    try:
+        chunks = await stream_use_case.download(note_id=note_id, user_uuid=user_uuid, private_key=priv_bytes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"odszyfrowanie nie powiodło się: {e}")
+    if chunks is None:
+        raise HTTPException(status_code=404, detail="Notatka nie istnieje")
+
+    return StreamingResponse(chunks, media_type="text/plain; charset=utf-8")
 
 
 @router.patch("/{note_id}", response_model=dict)
@@ -108,6 +192,7 @@ async def update_note(
     edit_use_case: EditNoteUseCase = Depends(deps.get_edit_note_use_case),
     note_repo: NoteRepository = Depends(deps.get_note_repository),
     encryption_service: deps.EncryptionService = Depends(deps.get_encryption_service),
+    user_key_service: UserKeyService = Depends(deps.get_user_key_service),
 ):
     """Edit flow:
     - Pobiera zapisany lokalny pakiet (po odszyfrowaniu serwerowym).
@@ -129,7 +214,9 @@ async def update_note(
         raise HTTPException(status_code=400, detail="invalid base64 for client_private_key_b64")
 
     try:
-        _current_plain = encryption_service.decrypt_with_private(local_pkg.encode(), priv_bytes)
+        # treść strumieniowa nie jest paczką v1/v2 - klucz weryfikuje wtedy sam tytuł
+        if old_tags is None or old_tags.stream_id is None:
+            _current_plain = encryption_service.decrypt_with_private(local_pkg.encode(), priv_bytes)
         title_plain = encryption_service.decrypt_with_private(title_pkg.encode(), priv_bytes)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"tutaj się coś psuje: {e}")
@@ -140,11 +227,12 @@ async def update_note(
 
     new_priv, new_pub = encryption_service.generate_nacl_keypair()
     new_priv_b64 = base64.b64encode(new_priv).decode()
+    kek = await user_key_service.get_kek(user_uuid)
 
-    new_local_package_bytes = encryption_service.encrypt_for_recipient(new_plaintext, new_pub)
+    new_local_package_bytes = encryption_service.encrypt_for_recipient(new_plaintext, new_pub, kek=kek)
     new_local_package = new_local_package_bytes.decode()
 
-    new_local_title_bytes = encryption_service.encrypt_for_recipient(replace_title, new_pub)
+    new_local_title_bytes = encryption_service.encrypt_for_recipient(replace_title, new_pub, kek=kek)
     new_local_title = new_local_title_bytes.decode()
 
     updated_note = await edit_use_case.execute(
@@ -153,7 +241,9 @@ async def update_note(
         new_local_encrypted_content=new_local_package,
         new_client_private_key_b64=new_priv_b64,
         new_title=new_local_title,
-        new_tags=new_tag
+        new_tags=new_tag,
+        plain_title=replace_title,
+        plain_content=new_plaintext,
     )
     if updated_note is None:
         raise HTTPException(status_code=500, detail="failed to update note")
@@ -171,39 +261,38 @@ async def update_note(
 
 @router.get("/", response_model=list)
 async def get_all_notes(
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
     user_uuid: UUID = Depends(deps.get_user_uuid_from_basic_auth),
-    get_use_case: GetNoteUseCase = Depends(deps.get_get_note_use_case),
     note_repo: NoteRepository = Depends(deps.get_note_repository),
     encryption_service: EncryptionService = Depends(deps.get_encryption_service),
+    user_key_service: UserKeyService = Depends(deps.get_user_key_service),
 ):
     """Pobiera wszystkie notatki (tylko do celów testowych w produkcji będzie dozwolone ale po zalogowaniu(account locked)):
-    - Pobiera wszystkie notatki z repozytorium.
+    - Pobiera notatki z repozytorium (po id) i odszyfrowuje je z wczytanych wierszy, bez ponownego pobierania każdej.
     - Dla każdej notatki odszyfrowuje lokalny pakiet przy użyciu przechowywanego klucza prywatnego (jeśli dostępny).
-    """
-    all_notes = await note_repo.get_all(user_uuid=user_uuid)
-    result = []
-    if not all_notes:
-        raise HTTPException(status_code=404)
-
-    for note in all_notes:
-        decrypted_content = await get_use_case.execute(note_id=note.id, user_uuid=user_uuid)
-        decrypt_title = await get_use_case.title_execute(note_id=note.id, user_uuid=user_uuid)
+    - Jeśli użytkownik ma klucze główne, KEK odpieczętowywany jest raz, a paczki v2 rozpakowywane symetrycznie.
 
-        prive_key = base64.b64decode(note.key_private_b64) if note.key_private_b64 else None
-
-        try:
-            decrypted_content = encryption_service.decrypt_with_private(decrypted_content.encode(), prive_key) if prive_key else "No private key stored"
-            decrypt_title = encryption_service.decrypt_with_private(decrypt_title.encode(), prive_key) if prive_key else "No private key stored"
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"odszyfrowanie nie powiodło {e}")
+    `fields=id,title,created_at` zwraca tylko wybrane pola (id zawsze) - bez
+    `content` treść nie jest czytana z bazy ani odszyfrowywana. Dozwolone:
+    id, title, content, tags, private_key, created_at (domyślnie wszystkie).
+    Stronicowanie: `limit` notatek o id większym niż `after_id`
+    (następna strona: `after_id` = ostatnie id z poprzedniej).
+    """
+    try:
+        selected = parse_fields(fields, NOTE_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
-        result.append({
-            "id": note.id,
-            "title": decrypt_title,
-            "content": decrypted_content,
-            "tags": note.tags,
-            "private_key": note.key_private_b64,
-            "created_at": format_datetime_to_str(note.created_at),
-        })
+    notes = await note_repo.get_prefiltered(user_uuid=user_uuid, columns=field_columns(selected),
+                                            after_id=after_id, limit=limit)
+    if not notes and after_id is None:
+        raise HTTPException(status_code=404)
 
-    return result
+    kek = await user_key_service.get_kek(user_uuid) if notes and needs_kek(selected) else None
+    try:
+        # duże notatki strumieniowe nie są ładowane do listy (content None) - patrz GET /notes/{id}/stream
+        return [note_view(encryption_service, note, selected, kek=kek) for note in notes]
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"odszyfrowanie nie powiodło {e}")
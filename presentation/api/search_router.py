@@ -1,115 +1,238 @@
-import base64
-
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional, cast
+from datetime import date
 from uuid import UUID
 from presentation import dependencies as deps
 
 from application.services.search.search_dto import NotesSearchQuery
+from application.services.filtering.filter_dto import NotesFilter
+from application.services.search.result_cache import SearchResultCache
 
-from application.services.encryption_service import EncryptionService
 from application.common.utils import format_datetime_to_str
+from application.services.note_fields import NOTE_FIELDS, TRASH_FIELDS, parse_fields
 
-from application.use_cases.trashcan.trash_note_get import TrashGetterUseCase
 from application.use_cases.trashcan.search_trash import SearchTrashUseCase
 from application.use_cases.notes.search_notes import SearchNotesUseCase
+from application.use_cases.notes.suggest import SuggestUseCase
+from application.use_cases.notes.query_notes import QueryNotesUseCase
 
 
 router = APIRouter(prefix="/search", tags=["search"], dependencies=[Depends(deps.get_hardcoded_auth)])
 
 
+MISSING = "nie ma klucza prywatnego lub danych"
+
+
+def _display(value, note) -> str | None:
+    """Odszyfrowane pole albo komunikat, gdy notatka nie ma klucza (jak dotychczas)."""
+    if value is None and not note.key_private_b64:
+        return MISSING
+    return value
+
+
+def _ranked(r) -> dict:
+    """Wynik trybu rankingowego - fragment zamiast treści, więc rozmiar odpowiedzi jest ograniczony."""
+    return {
+        "id": r.note.id,
+        "title": _display(r.title, r.note),
+        "snippet": r.snippet,
+        "score": r.score,
+        "tags": r.note.tags,
+        "private_key": r.note.key_private_b64,
+        "created_at": format_datetime_to_str(r.note.created_at),
+    }
+
+
+def _project(item: dict, selected) -> dict:
+    """Tylko pola z `fields` (ranking zawsze zwraca `snippet` i `score`)."""
+    return {key: value for key, value in item.items() if key in selected or key in ("snippet", "score")}
+
+
+@router.get("/cache", response_model=dict)
+async def search_cache_stats_endpoint(
+    result_cache: Optional[SearchResultCache] = Depends(deps.get_search_result_cache),
+):
+    """Statystyki cache wyników wyszukiwania tego procesu (trafienia, chybienia, hit ratio, rozmiar)."""
+    if result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **result_cache.stats()}
+
+
+@router.get("/suggest", response_model=list)
+async def suggest_endpoint(
+    prefix: str,
+    limit: int = Query(10, ge=1, le=50),
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    suggest_use_case: SuggestUseCase = Depends(deps.get_suggest_use_case),
+):
+    """Podpowiedzi do wyszukiwania w trakcie pisania (tytuły, słowa tytułów, tagi).
+
+    Odpowiada z drzewa prefiksowego w pamięci - pierwsze wywołanie buduje je
+    z samych tytułów i tagów, treść notatek nie jest pobierana ani odszyfrowywana.
+    Wielkość liter i polskie znaki są pomijane ("zakupow" podpowie "Zakupów").
+    Każda podpowiedź: `text`, `kind` (title / word / tag), `count` (liczba notatek).
+    """
+    return await suggest_use_case.execute(user_uuid=user_uuid, prefix=prefix, limit=limit)
+
+
+@router.post("/query", response_model=dict)
+async def query_endpoint(
+    query: Optional[str] = None,
+    title: Optional[str] = None,
+    tag: Optional[str] = None,
+    date_eq: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    scope: str = Query("notes", pattern="^(notes|trash)$"),
+    whole_word: bool = False,
+    limit: Optional[int] = Query(None, ge=1),
+    ranked: bool = False,
+    explain: bool = False,
+    user_uuid: UUID = Depends(deps.get_current_user_uuid),
+    query_use_case: QueryNotesUseCase = Depends(deps.get_query_notes_use_case),
+):
+    """Filtry i wyszukiwanie w jednym zapytaniu, np. tag X z zeszłego miesiąca zawierające Y.
+
+    Tag, daty (dd-mm-yy) i skrót tytułu są sprawdzane w SQL, więc odszyfrowywane
+    są tylko notatki, które przeszły filtry; na nich działa wyszukiwanie
+    `query` (składnia, `whole_word`, `ranked` i `limit` jak w /search/).
+    Bez `query` zwracane są notatki spełniające same filtry.
+    `explain=true` dodaje `plan`: etapy (sql / title / match) z liczbą wierszy
+    na wejściu i wyjściu oraz czasem.
+    """
+    try:
+        filters = NotesFilter(
+            title=title,
+            tag=tag,
+            date_eq=cast(date, date_eq),
+            date_from=cast(date, date_from),
+            date_to=cast(date, date_to),
+            user_uuid=user_uuid,
+        )
+        search_query = None
+        if query and query.strip():
+            search_query = NotesSearchQuery(query=query, user_uuid=user_uuid, whole_word=whole_word, limit=limit, ranked=ranked)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Błędne parametry zapytania: {e}")
+
+    results, plan = await query_use_case.execute(filters, search_query, scope=scope, limit=limit)
+    if search_query is not None and ranked:
+        items = [_ranked(r) for r in results]
+    else:
+        items = [
+            {
+                "id": r.note.id,
+                "title": _display(r.title, r.note),
+                "content": None if r.note.stream_id is not None else _display(r.content, r.note),
+                "tags": r.note.tags,
+                "private_key": r.note.key_private_b64,
+                "created_at": format_datetime_to_str(r.note.created_at),
+            }
+            for r in results
+        ]
+    if scope == "trash":
+        for item, r in zip(items, results):
+            item["trashed_at"] = format_datetime_to_str(r.note.trashed_at)
+    response = {"results": items}
+    if explain:
+        response["plan"] = [stage.model_dump() for stage in plan]
+    return response
+
+
 @router.post("/", response_model=list)
 async def search_notes_endpoint(
     query: str,
+    whole_word: bool = False,
+    limit: Optional[int] = None,
+    ranked: bool = False,
+    fields: Optional[str] = None,
     user_uuid: UUID = Depends(deps.get_current_user_uuid),
     search_notes_use_case: SearchNotesUseCase = Depends(deps.get_search_notes_use_case),
-    get_use_case: deps.GetNoteUseCase = Depends(deps.get_get_note_use_case),
-    encryption_service: deps.EncryptionService = Depends(deps.get_encryption_service),
 ):
     """Wyszukuje notatki po zapytaniu (luźne dopasowanie w tytule, treści i tagach).
     
     Wyszukiwanie jest case-insensitive i częściowe - jeśli wpiszesz np. "cze",
     znajdzie wszystkie notatki zawierające "cze" w tytule, treści lub tagach
     (np. "Czech", "czekolada", "position" itp.).
+
+    Składnia: `kawa herbata` (oba), `kawa OR herbata` (dowolny), `"lista zakupów"`
+    (fraza), `kawa -mleko` (bez "mleko") - wszystkie terminy sprawdzane są
+    w jednym przebiegu, każda notatka jest odszyfrowywana raz.
+
+    `whole_word=true` szuka całych słów (wszystkich słów zapytania) w ślepym
+    indeksie - bez odszyfrowywania całego konta; odszyfrowane są tylko trafienia.
+    `limit` kończy wyszukiwanie po znalezieniu tylu notatek.
+    `ranked=true` sortuje trafienia wg trafności (BM25, tytuł ważniejszy niż treść)
+    i zwraca `limit` najlepszych (domyślnie 20) z krótkim fragmentem `snippet`
+    zamiast pełnej treści.
+    Wyniki zawierają pola odszyfrowane już przez wyszukiwarkę (bez ponownego pobierania).
+    Powtórzone zapytanie bez zmian na koncie jest obsługiwane z cache (GET /search/cache).
+    `fields` wybiera pola odpowiedzi jak w GET /notes/ - pominięta treść
+    odszyfrowywana jest tylko wtedy, gdy bez niej nie da się rozstrzygnąć dopasowania.
     """
     try:
-        search_query = NotesSearchQuery(query=query, user_uuid=user_uuid)
+        selected = parse_fields(fields, NOTE_FIELDS)
+        search_query = NotesSearchQuery(query=query, user_uuid=user_uuid, whole_word=whole_word, limit=limit, ranked=ranked,
+                                        fields=selected)
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Błędne parametry wyszukiwania: {e}")
 
-    notes = await search_notes_use_case.execute(search_query)
-
-    if not notes:
-        return []
-
-    result = []
-    for note in notes:
-        title_decrypt = await get_use_case.title_execute(note_id=note.id, user_uuid=user_uuid)
-        content_decrypt = await get_use_case.execute(note_id=note.id, user_uuid=user_uuid)
-
-        privkey = base64.b64decode(note.key_private_b64) if note.key_private_b64 else None
-
-        try:
-            decrypt_title = encryption_service.decrypt_with_private(title_decrypt.encode(), privkey) if privkey and title_decrypt else "nie ma klucza prywatnego lub danych"
-            decrypt_content = encryption_service.decrypt_with_private(content_decrypt.encode(), privkey) if privkey and content_decrypt else "nie ma klucza prywatnego lub danych"
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"odszyfrowanie nie powiodło się: {e}")
-
-        result.append({
-            "id": note.id,
-            "title": decrypt_title,
-            "content": decrypt_content,
-            "tags": note.tags,
-            "private_key": note.key_private_b64,
-            "created_at": format_datetime_to_str(note.created_at),
-        })
-
-    return result
+    results = await search_notes_use_case.execute(search_query)
+    if ranked:
+        return [_project(_ranked(r), selected) for r in results]
+
+    return [
+        _project({
+            "id": r.note.id,
+            "title": _display(r.title, r.note),
+            "content": None if r.note.stream_id is not None else _display(r.content, r.note),
+            "tags": r.note.tags,
+            "private_key": r.note.key_private_b64,
+            "created_at": format_datetime_to_str(r.note.created_at),
+        }, selected)
+        for r in results
+    ]
 
 @router.post("/trash/", response_model=list)
 async def search_trash_endpoint(
     query: str,
+    whole_word: bool = False,
+    limit: Optional[int] = None,
+    ranked: bool = False,
+    fields: Optional[str] = None,
     user_uuid: UUID = Depends(deps.get_current_user_uuid),
     search_trash_use_case: SearchTrashUseCase = Depends(deps.get_search_trash_use_case),
-    trash_getter_use_case: TrashGetterUseCase = Depends(deps.get_trash_getter_use_case),
-    encryption_service: EncryptionService = Depends(deps.get_encryption_service),
 ):
     """Wyszukuje notatki w koszu po zapytaniu (luźne dopasowanie w tytule, treści i tagach).
     
     Wyszukiwanie jest case-insensitive i częściowe - jeśli wpiszesz np. "cze",
     znajdzie wszystkie notatki w koszu zawierające "cze" w tytule, treści lub tagach
     (np. "Czech", "czekolada", "position" itp.).
+
+    Składnia zapytania jak w /search/.
+    `whole_word=true` szuka całych słów w ślepym indeksie kosza.
+    `ranked=true` i `fields` (dodatkowo trashed_at) działają jak w /search/.
     """
     try:
-        search_query = NotesSearchQuery(query=query, user_uuid=user_uuid)
+        selected = parse_fields(fields, TRASH_FIELDS)
+        search_query = NotesSearchQuery(query=query, user_uuid=user_uuid, whole_word=whole_word, limit=limit, ranked=ranked,
+                                        fields=selected)
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Błędne parametry wyszukiwania: {e}")
 
-    trashed = await search_trash_use_case.execute(search_query)
-
-    if not trashed:
-        return []
-
-    result = []
-    for trash in trashed:
-        title_decrypt = await trash_getter_use_case.execute(note_id=trash.id, user_uuid=user_uuid, field="title")
-        content_decrypt = await trash_getter_use_case.execute(note_id=trash.id, user_uuid=user_uuid, field="content")
-
-        privkey = base64.b64decode(trash.key_private_b64) if trash.key_private_b64 else None
-
-        try:
-            decrypt_title = encryption_service.decrypt_with_private(title_decrypt.encode(), privkey) if privkey and title_decrypt else "nie ma klucza prywatnego lub danych"
-            decrypt_content = encryption_service.decrypt_with_private(content_decrypt.encode(), privkey) if privkey and content_decrypt else "nie ma klucza prywatnego lub danych"
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"odszyfrowanie nie powiodło się: {e}")
-
-        result.append({
-            "id": trash.id,
-            "title": decrypt_title,
-            "content": decrypt_content,
-            "tags": trash.tags,
-            "private_key": trash.key_private_b64,
-            "created_at": format_datetime_to_str(trash.created_at),
-            "trashed_at": format_datetime_to_str(trash.trashed_at),
-        })
-
-    return result
\ No newline at end of file
+    results = await search_trash_use_case.execute(search_query)
+    if ranked:
+        return [_project({**_ranked(r), "trashed_at": format_datetime_to_str(r.note.trashed_at)}, selected) for r in results]
+
+    return [
+        _project({
+            "id": r.note.id,
+            "title": _display(r.title, r.note),
+            "content": None if r.note.stream_id is not None else _display(r.content, r.note),
+            "tags": r.note.tags,
+            "private_key": r.note.key_private_b64,
+            "created_at": format_datetime_to_str(r.note.created_at),
+            "trashed_at": format_datetime_to_str(r.note.trashed_at),
+        }, selected)
+        for r in results
+    ]
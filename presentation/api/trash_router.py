@@ -1,16 +1,15 @@
-import base64
-
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
 from uuid import UUID
 
 from presentation import dependencies as deps
 
 from domain.interfaces import  TrashRepository
 from application.services.encryption_service import EncryptionService
-from application.common.utils import format_datetime_to_str
+from application.services.user_key_service import UserKeyService
+from application.services.note_fields import TRASH_FIELDS, parse_fields, field_columns, needs_kek, note_view
 
 from application.use_cases.trashcan.trash_the_note import TrashNoteUseCase
-from application.use_cases.trashcan.trash_note_get import TrashGetterUseCase
 from application.use_cases.trashcan.trash_restore import TrashRestoreUseCase
 from application.use_cases.trashcan.trash_perament import PermamentDelitionUseCase
 
@@ -33,41 +32,36 @@ async def delete_note(
 
 @router.get("/trash/", response_model=list)
 async def get_trashed_notes(
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
     user_uuid: UUID = Depends(deps.get_current_user_uuid),
     trash_repo: TrashRepository = Depends(deps.get_trash_repository),
-    trash_getter_use_case: TrashGetterUseCase = Depends(deps.get_trash_getter_use_case),
     encryption_service: EncryptionService = Depends(deps.get_encryption_service),
+    user_key_service: UserKeyService = Depends(deps.get_user_key_service),
 ):
     """Pobiera notatki znajdujące się w koszu
-    - pobiera wszystkie notatki z repozytorium kosza
+    - pobiera notatki z repozytorium kosza (po id)
     - dla każdej notatki odszyfrowuje lokalny pakiet przy użyciu przechowywanego klucza prywatnego (jeśli dostępny)
     - zwraca listę notatek z ich ID, odszyfrowaną zawartością, czasem przeniesienia do kosza i kluczem prywatnym (base64)
-    """
-    trashed = await trash_repo.get_all(user_uuid=user_uuid)
-    result = []
-
-    for note in trashed:
-        decrypted = await trash_getter_use_case.execute(note_id=note.id, user_uuid=user_uuid, field="content")
-        decrypted_title = await trash_getter_use_case.execute(note_id=note.id, user_uuid=user_uuid, field="title")
 
-        privkey = base64.b64decode(note.key_private_b64) if note.key_private_b64 else None
-        try:
-            decrypt = encryption_service.decrypt_with_private(decrypted.encode(), privkey) if privkey and decrypted else "nie ma klucza prywatnego lub danych"
-            decrypt_title = encryption_service.decrypt_with_private(decrypted_title.encode(), privkey) if privkey and decrypted_title else "nie ma klucza prywatnego lub danych"
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"odszyfrowanie nie powiodło się: {e}")
-
-        result.append({
-            "id": note.id,
-            "title": decrypt_title,
-            "content": decrypt,
-            "created_at": format_datetime_to_str(note.created_at),
-            "tags": note.tags,
-            "trashed_at": format_datetime_to_str(note.trashed_at),
-            "private_key": note.key_private_b64
-        })
+    `fields`, `limit` i `after_id` jak w GET /notes/ (dodatkowo pole trashed_at).
+    """
+    try:
+        selected = parse_fields(fields, TRASH_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
-    return result
+    trashed = await trash_repo.get_prefiltered(user_uuid=user_uuid, columns=field_columns(selected),
+                                               after_id=after_id, limit=limit)
+    kek = await user_key_service.get_kek(user_uuid) if trashed and needs_kek(selected) else None
+    try:
+        return [
+            note_view(encryption_service, note, selected, kek=kek, missing_key="nie ma klucza prywatnego lub danych")
+            for note in trashed
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"odszyfrowanie nie powiodło się: {e}")
 
 @router.post("/trash/restore/{note_id}", response_model=str)
 async def restore_trashed(
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import Dict
+from uuid import UUID
 
 from presentation import dependencies as deps
 from presentation.schemas import UserIn, UserResponse, TokenResponse
@@ -23,3 +24,17 @@ async def token(user: UserIn, user_service=Depends(deps.get_user_service)):
         raise HTTPException(status_code=401, detail="Provided incorrect credentials")
     # token_info contains datetime for expires; convert to ISO
     return {"token_type": token_info["token_type"], "user_token": token_info["user_token"], "expires": token_info["expires"].isoformat()}
+
+
+@router.post("/keys", response_model=dict, status_code=201)
+async def create_master_keys(
+    user_uuid: UUID = Depends(deps.get_user_uuid_from_basic_auth),
+    user_key_service=Depends(deps.get_user_key_service),
+):
+    """Włącza hierarchię kluczy dla użytkownika (idempotentnie).
+
+    Nowe i edytowane notatki będą miały klucz sesyjny opakowany KEK-iem użytkownika.
+    Istniejące notatki migruje `scripts/migrate_user_keys.py`.
+    """
+    keys = await user_key_service.ensure_keys(user_uuid)
+    return {"user_uuid": str(keys.user_uuid), "public_key_b64": keys.public_key_b64}
@@ -36,6 +36,9 @@ notes_table = sqlalchemy.Table(
     sqlalchemy.Column("tags", sqlalchemy.ARRAY(VARCHAR), nullable=True),
     sqlalchemy.Column("key_private_b64", VARCHAR(255), nullable=True),
     sqlalchemy.Column("public_key_b64", VARCHAR(255), nullable=True),
+    sqlalchemy.Column("stream_id", UUID(as_uuid=True), nullable=True),
+    sqlalchemy.Column("title_hash", sqlalchemy.LargeBinary, nullable=True),
+    sqlalchemy.Index("ix_notes_title_hash", "user_uuid", "title_hash"),
 )
 
 trash_table = sqlalchemy.Table(
@@ -50,8 +53,150 @@ trash_table = sqlalchemy.Table(
     sqlalchemy.Column("trashed_at", DateTime(timezone=True), nullable=True),
     sqlalchemy.Column("key_private_b64", VARCHAR(255), nullable=True),
     sqlalchemy.Column("public_key_b64", VARCHAR(255), nullable=True),
+    sqlalchemy.Column("stream_id", UUID(as_uuid=True), nullable=True),
+    sqlalchemy.Column("title_hash", sqlalchemy.LargeBinary, nullable=True),
+    sqlalchemy.Index("ix_trash_title_hash", "user_uuid", "title_hash"),
 )
 
+user_keys_table = sqlalchemy.Table(
+    "user_keys",
+    metadata,
+    sqlalchemy.Column("user_uuid", UUID(as_uuid=True), sqlalchemy.ForeignKey("users.uuid", ondelete="CASCADE"), primary_key=True),
+    sqlalchemy.Column("public_key_b64", VARCHAR(255), nullable=False),
+    sqlalchemy.Column("private_key_enc", sqlalchemy.LargeBinary, nullable=False),
+    sqlalchemy.Column("sealed_kek", sqlalchemy.LargeBinary, nullable=False),
+    sqlalchemy.Column("created_at", DateTime(timezone=True), nullable=True),
+)
+
+note_chunks_table = sqlalchemy.Table(
+    "note_chunks",
+    metadata,
+    sqlalchemy.Column("id", Integer, autoincrement=True, primary_key=True),
+    sqlalchemy.Column("stream_id", UUID(as_uuid=True), nullable=False),
+    sqlalchemy.Column("seq", Integer, nullable=False),
+    sqlalchemy.Column("user_uuid", UUID(as_uuid=True), sqlalchemy.ForeignKey("users.uuid", ondelete="CASCADE"), nullable=False),
+    sqlalchemy.Column("data", sqlalchemy.LargeBinary, nullable=False),
+    sqlalchemy.UniqueConstraint("stream_id", "seq", name="uq_note_chunks_stream_seq"),
+)
+
+rotation_checkpoints_table = sqlalchemy.Table(
+    "key_rotation_checkpoints",
+    metadata,
+    sqlalchemy.Column("job_id", VARCHAR(64), primary_key=True),
+    sqlalchemy.Column("table_name", VARCHAR(32), primary_key=True),
+    sqlalchemy.Column("last_id", Integer, nullable=False, default=0),
+    sqlalchemy.Column("rows_scanned", Integer, nullable=False, default=0),
+    sqlalchemy.Column("rows_rotated", Integer, nullable=False, default=0),
+    sqlalchemy.Column("skipped_ids", sqlalchemy.ARRAY(Integer), nullable=False, server_default="{}"),
+    sqlalchemy.Column("finished", sqlalchemy.Boolean, nullable=False, default=False),
+    sqlalchemy.Column("updated_at", DateTime(timezone=True), nullable=True),
+)
+
+# ślepy indeks wyszukiwania: tokeny HMAC znormalizowanych słów (bez plaintextu)
+search_tokens_table = sqlalchemy.Table(
+    "search_tokens",
+    metadata,
+    sqlalchemy.Column("id", Integer, autoincrement=True, primary_key=True),
+    sqlalchemy.Column("user_uuid", UUID(as_uuid=True), sqlalchemy.ForeignKey("users.uuid", ondelete="CASCADE"), nullable=False),
+    sqlalchemy.Column("scope", VARCHAR(8), nullable=False),
+    sqlalchemy.Column("note_id", Integer, nullable=False),
+    sqlalchemy.Column("kind", VARCHAR(8), nullable=False),
+    sqlalchemy.Column("token", sqlalchemy.LargeBinary, nullable=False),
+    sqlalchemy.Index("ix_search_tokens_lookup", "user_uuid", "scope", "kind", "token"),
+    sqlalchemy.Index("ix_search_tokens_note", "user_uuid", "scope", "note_id"),
+)
+
+# znormalizowane tagi (normalize_tags) - jeden wiersz na (notatka, tag); utrzymywane
+# w tych samych transakcjach co zapis notatek/kosza, uzupełniane scripts/backfill_note_tags.py
+note_tags_table = sqlalchemy.Table(
+    "note_tags",
+    metadata,
+    sqlalchemy.Column("user_uuid", UUID(as_uuid=True), sqlalchemy.ForeignKey("users.uuid", ondelete="CASCADE"), primary_key=True),
+    sqlalchemy.Column("scope", VARCHAR(8), primary_key=True),
+    sqlalchemy.Column("tag", VARCHAR(255), primary_key=True),
+    sqlalchemy.Column("note_id", Integer, primary_key=True),
+    sqlalchemy.Index("ix_note_tags_note", "user_uuid", "scope", "note_id"),
+)
+
+# licznik zmian konta - podbijany przy każdej zmianie notatek/kosza (klucz cache wyników wyszukiwania)
+account_versions_table = sqlalchemy.Table(
+    "account_versions",
+    metadata,
+    sqlalchemy.Column("user_uuid", UUID(as_uuid=True), sqlalchemy.ForeignKey("users.uuid", ondelete="CASCADE"), primary_key=True),
+    sqlalchemy.Column("version", sqlalchemy.BigInteger, nullable=False, server_default="0"),
+)
+
+saved_filters_table = sqlalchemy.Table(
+    "saved_filters",
+    metadata,
+    sqlalchemy.Column("id", Integer, autoincrement=True, primary_key=True),
+    sqlalchemy.Column("user_uuid", UUID(as_uuid=True), sqlalchemy.ForeignKey("users.uuid", ondelete="CASCADE"), nullable=False),
+    sqlalchemy.Column("name", VARCHAR(255), nullable=False),
+    sqlalchemy.Column("scope", VARCHAR(8), nullable=False),
+    sqlalchemy.Column("tag", VARCHAR(255), nullable=True),
+    sqlalchemy.Column("title_hash", sqlalchemy.LargeBinary, nullable=True),
+    sqlalchemy.Column("date_eq", sqlalchemy.Date, nullable=True),
+    sqlalchemy.Column("date_from", sqlalchemy.Date, nullable=True),
+    sqlalchemy.Column("date_to", sqlalchemy.Date, nullable=True),
+    sqlalchemy.Column("created_at", DateTime(timezone=True), nullable=True),
+    sqlalchemy.Index("ix_saved_filters_user", "user_uuid", "scope"),
+)
+
+# członkostwo notatek w zapisanych filtrach - utrzymywane przez repozytoria notatek i kosza
+saved_filter_members_table = sqlalchemy.Table(
+    "saved_filter_members",
+    metadata,
+    sqlalchemy.Column("filter_id", Integer, sqlalchemy.ForeignKey("saved_filters.id", ondelete="CASCADE"), primary_key=True),
+    sqlalchemy.Column("note_id", Integer, primary_key=True),
+)
+
+# zlecenia eksportu w tle - wykonuje je scripts/export_worker.py
+export_jobs_table = sqlalchemy.Table(
+    "export_jobs",
+    metadata,
+    sqlalchemy.Column("id", UUID(as_uuid=True), primary_key=True),
+    sqlalchemy.Column("user_uuid", UUID(as_uuid=True), sqlalchemy.ForeignKey("users.uuid", ondelete="CASCADE"), nullable=False),
+    sqlalchemy.Column("format", VARCHAR(16), nullable=False),
+    sqlalchemy.Column("include_trash", sqlalchemy.Boolean, nullable=False, default=False),
+    sqlalchemy.Column("status", VARCHAR(16), nullable=False),
+    sqlalchemy.Column("notes_total", Integer, nullable=True),
+    sqlalchemy.Column("notes_done", Integer, nullable=False, default=0),
+    sqlalchemy.Column("bytes_written", sqlalchemy.BigInteger, nullable=False, default=0),
+    sqlalchemy.Column("error", VARCHAR(255), nullable=True),
+    sqlalchemy.Column("created_at", DateTime(timezone=True), nullable=True),
+    sqlalchemy.Column("started_at", DateTime(timezone=True), nullable=True),
+    sqlalchemy.Column("updated_at", DateTime(timezone=True), nullable=True),
+    sqlalchemy.Column("finished_at", DateTime(timezone=True), nullable=True),
+    sqlalchemy.Column("expires_at", DateTime(timezone=True), nullable=True),
+    sqlalchemy.Index("ix_export_jobs_status", "status", "created_at"),
+    sqlalchemy.Index("ix_export_jobs_user", "user_uuid", "status"),
+)
+
+# wynik zlecenia eksportu - kawałki zaszyfrowane kluczem serwera (plaintext nie leży w bazie)
+export_job_chunks_table = sqlalchemy.Table(
+    "export_job_chunks",
+    metadata,
+    sqlalchemy.Column("job_id", UUID(as_uuid=True), sqlalchemy.ForeignKey("export_jobs.id", ondelete="CASCADE"), primary_key=True),
+    sqlalchemy.Column("seq", Integer, primary_key=True),
+    sqlalchemy.Column("data", sqlalchemy.LargeBinary, nullable=False),
+    # id do stronicowania rotacji klucza serwera (klucz główny jest złożony)
+    sqlalchemy.Column("id", Integer, sqlalchemy.Identity(), nullable=False),
+    sqlalchemy.Index("ux_export_job_chunks_id", "id", unique=True),
+)
+
+# create_all nie dodaje kolumn do istniejących tabel - uzupełniamy je tutaj
+SCHEMA_UPGRADES = [
+    "ALTER TABLE notes ADD COLUMN IF NOT EXISTS stream_id UUID",
+    "ALTER TABLE trash ADD COLUMN IF NOT EXISTS stream_id UUID",
+    "ALTER TABLE notes ADD COLUMN IF NOT EXISTS title_hash BYTEA",
+    "ALTER TABLE trash ADD COLUMN IF NOT EXISTS title_hash BYTEA",
+    "CREATE INDEX IF NOT EXISTS ix_notes_title_hash ON notes (user_uuid, title_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_trash_title_hash ON trash (user_uuid, title_hash)",
+    "ALTER TABLE key_rotation_checkpoints ADD COLUMN IF NOT EXISTS skipped_ids INTEGER[] NOT NULL DEFAULT '{}'",
+    "ALTER TABLE export_job_chunks ADD COLUMN IF NOT EXISTS id INTEGER GENERATED BY DEFAULT AS IDENTITY",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_export_job_chunks_id ON export_job_chunks (id)",
+]
+
 DATABASE_URL = f"postgresql+asyncpg://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}/{config.DB_NAME}"#dla databases
 SYNC_DATABASE_URL = f"postgresql+psycopg2://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}/{config.DB_NAME}"#dla engine
 
@@ -70,6 +215,9 @@ async def create_tables(database):
         try:
             # Create all tables - metadata.create_all handles connections internally
             metadata.create_all(engine, checkfirst=True)
+            with engine.begin() as conn:
+                for statement in SCHEMA_UPGRADES:
+                    conn.execute(text(statement))
             print("Tabele zostały utworzone w bazie danych.")
             
             # Verify tables were created by querying information_schema
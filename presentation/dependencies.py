@@ -4,7 +4,7 @@ This module provides dependency functions for repositories, services, and use ca
 """
 
 from functools import lru_cache
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from fastapi import Depends
 from fastapi import HTTPException, status
@@ -13,24 +13,46 @@ from fastapi.security import OAuth2PasswordBearer, HTTPBasic, HTTPBasicCredentia
 from infrastructure.repositories.sql_note_repo import SQLNoteRepository
 from infrastructure.repositories.sql_trash_repo import SQLTrashRepository
 from infrastructure.config.settings import settings
-from domain.interfaces import NoteRepository, TrashRepository, UserRepository
+from domain.interfaces import NoteRepository, TrashRepository, UserRepository, UserKeyRepository, NoteChunkRepository, SearchIndexRepository, NoteIndexer, AccountVersionRepository, TagRepository, SavedFilterRepository, ExportJobRepository
 from domain.entities import User
 from uuid import UUID
 
 from application.services.encryption_service import EncryptionService
+from application.services.compression import Compressor
 from application.services.filtering.filtering_service import FilteringService
+from application.services.filtering.title_hash import TitleHasher
 from application.services.search.search_service import SearchService
+from application.services.search.blind_index import BlindIndexService
+from application.services.search.memory_index import InMemorySearchIndex, IndexedAccountVersions
+from application.services.search.suggest_index import SuggestIndex
+from application.services.search.result_cache import SearchResultCache
+from application.services.search.indexers import NoteIndexers
+from application.services.search.query_planner import QueryPlanner
 from application.services.exporting.export_service import ExportingService
+from application.services.exporting.export_jobs import ExportJobService
 from application.services.self_delete_x_time import DeleteXTime
 from infrastructure.repositories.sql_user_repo import SQLUserRepository
+from infrastructure.repositories.sql_user_key_repo import SQLUserKeyRepository
+from infrastructure.repositories.sql_chunk_repo import SQLNoteChunkRepository
+from infrastructure.repositories.sql_search_index_repo import SQLSearchIndexRepository
+from infrastructure.repositories.sql_account_version_repo import SQLAccountVersionRepository
+from infrastructure.repositories.sql_tag_repo import SQLTagRepository
+from infrastructure.repositories.sql_saved_filter_repo import SQLSavedFilterRepository
+from infrastructure.repositories.sql_export_job_repo import SQLExportJobRepository
 from application.services.user_service import UserService
+from application.services.user_key_service import UserKeyService
+from application.services.note_stream_service import NoteStreamService
 
 from application.use_cases.notes.create_note import CreateNoteUseCase
 from application.use_cases.notes.get_note import GetNoteUseCase
 from application.use_cases.notes.edit_note import EditNoteUseCase
 from application.use_cases.notes.notes_filtering import FilterNotesUseCase
 from application.use_cases.notes.search_notes import SearchNotesUseCase
+from application.use_cases.notes.suggest import SuggestUseCase
+from application.use_cases.notes.query_notes import QueryNotesUseCase
 from application.use_cases.notes.export_note import ExportNoteUseCase
+from application.use_cases.notes.export_all import ExportAllUseCase
+from application.use_cases.notes.stream_note import StreamNoteUseCase
 
 from application.use_cases.trashcan.trash_the_note import TrashNoteUseCase
 from application.use_cases.trashcan.trash_note_get import TrashGetterUseCase
@@ -56,53 +78,198 @@ def get_trash_repository() -> TrashRepository:
     return SQLTrashRepository()
 
 
+@lru_cache()
+def get_chunk_repository() -> NoteChunkRepository:
+    """Get note chunk repository instance (singleton)."""
+    return SQLNoteChunkRepository()
+
+
+@lru_cache()
+def get_search_index_repository() -> SearchIndexRepository:
+    """Get blind search index repository instance (singleton)."""
+    return SQLSearchIndexRepository()
+
+
+@lru_cache()
+def get_tag_repository() -> TagRepository:
+    """Get normalized tag repository instance (singleton)."""
+    return SQLTagRepository()
+
+
+@lru_cache()
+def get_saved_filter_repository() -> SavedFilterRepository:
+    """Get saved filter (smart folder) repository instance (singleton)."""
+    return SQLSavedFilterRepository()
+
+
+@lru_cache()
+def get_export_job_repository() -> ExportJobRepository:
+    """Get background export job repository instance (singleton)."""
+    return SQLExportJobRepository()
+
+
+@lru_cache()
+def get_account_version_repository() -> AccountVersionRepository:
+    """Get account version counter repository instance (singleton).
+
+    Local bumps are reported to the in-process indexes (suggestions, optional in-memory index)
+    so they are not rebuilt after every change.
+    """
+    indexes = [index for index in (get_suggest_index(), get_memory_search_index()) if index is not None]
+    return IndexedAccountVersions(SQLAccountVersionRepository(), *indexes)
+
+
 # Service dependencies
 @lru_cache()
 def get_encryption_service() -> EncryptionService:
     """Get encryption service instance (singleton)."""
-    return EncryptionService(settings.SERVER_KEY)
+    compressor = Compressor(settings.COMPRESSION_ALGORITHM, settings.COMPRESSION_THRESHOLD,
+                            max_size=settings.NOTE_MAX_BYTES)
+    return EncryptionService(settings.SERVER_KEYS, settings.SERVER_CIPHER, compressor)
+
+
+@lru_cache()
+def get_user_key_repository() -> UserKeyRepository:
+    """Get user key repository instance (singleton)."""
+    return SQLUserKeyRepository()
+
+
+def get_user_key_service(
+    repo: UserKeyRepository = Depends(get_user_key_repository),
+    encryption: EncryptionService = Depends(get_encryption_service),
+) -> UserKeyService:
+    """Get user key hierarchy service instance."""
+    return UserKeyService(repo, encryption)
+
+
+@lru_cache()
+def get_blind_index_service() -> BlindIndexService:
+    """Get blind keyword index service instance (singleton)."""
+    return BlindIndexService(get_search_index_repository(), settings.SEARCH_INDEX_KEY)
+
+
+@lru_cache()
+def get_title_hasher() -> TitleHasher:
+    """Get keyed title hasher for exact-title filtering (singleton)."""
+    return TitleHasher(settings.SEARCH_INDEX_KEY)
+
+
+@lru_cache()
+def get_memory_search_index() -> Optional[InMemorySearchIndex]:
+    """Get the in-process search index (singleton), None unless SEARCH_MEMORY_INDEX is enabled."""
+    if not settings.SEARCH_MEMORY_INDEX:
+        return None
+    return InMemorySearchIndex(settings.SEARCH_MEMORY_INDEX_MB * 1024 * 1024, settings.SEARCH_MEMORY_INDEX_TTL)
+
+
+@lru_cache()
+def get_suggest_index() -> SuggestIndex:
+    """Get the in-process title/tag trie for search suggestions (singleton)."""
+    return SuggestIndex(settings.SEARCH_SUGGEST_MB * 1024 * 1024, settings.SEARCH_SUGGEST_TTL)
+
+
+@lru_cache()
+def get_search_result_cache() -> Optional[SearchResultCache]:
+    """Get the search result cache (singleton), None when SEARCH_RESULT_CACHE_MB is 0."""
+    if settings.SEARCH_RESULT_CACHE_MB <= 0:
+        return None
+    return SearchResultCache(settings.SEARCH_RESULT_CACHE_MB * 1024 * 1024)
+
+
+@lru_cache()
+def get_note_indexer() -> NoteIndexer:
+    """Get the indexer notified by note use cases (blind index, suggestions, optional in-memory index)."""
+    indexers = [get_blind_index_service(), get_suggest_index(), get_memory_search_index()]
+    return NoteIndexers([indexer for indexer in indexers if indexer is not None])
+
+
+def get_note_stream_service(
+    chunk_repo: NoteChunkRepository = Depends(get_chunk_repository),
+    encryption: EncryptionService = Depends(get_encryption_service),
+) -> NoteStreamService:
+    """Get chunked note content service instance."""
+    return NoteStreamService(chunk_repo, encryption)
 
 
 def get_filtering_service(
     encryption: EncryptionService = Depends(get_encryption_service),
     note_repo: NoteRepository = Depends(get_note_repository),
     trash_repo: TrashRepository = Depends(get_trash_repository),
+    user_keys: UserKeyService = Depends(get_user_key_service),
+    tags: TagRepository = Depends(get_tag_repository),
+    title_hasher: TitleHasher = Depends(get_title_hasher),
+    saved: SavedFilterRepository = Depends(get_saved_filter_repository),
 ) -> FilteringService:
     """Get filtering service instance."""
-    return FilteringService(encryption, note_repo, trash_repo)
+    return FilteringService(encryption, note_repo, trash_repo, user_keys, tags, title_hasher, saved)
 
 
 def get_search_service(
     encryption: EncryptionService = Depends(get_encryption_service),
     note_repo: NoteRepository = Depends(get_note_repository),
     trash_repo: TrashRepository = Depends(get_trash_repository),
+    user_keys: UserKeyService = Depends(get_user_key_service),
+    blind_index: BlindIndexService = Depends(get_blind_index_service),
+    memory_index: Optional[InMemorySearchIndex] = Depends(get_memory_search_index),
+    suggest_index: SuggestIndex = Depends(get_suggest_index),
+    versions: AccountVersionRepository = Depends(get_account_version_repository),
+    result_cache: Optional[SearchResultCache] = Depends(get_search_result_cache),
 ) -> SearchService:
     """Get search service instance."""
-    return SearchService(encryption, note_repo, trash_repo)
+    return SearchService(encryption, note_repo, trash_repo, user_keys, blind_index, memory_index,
+                         settings.SEARCH_CONCURRENCY, suggest_index, versions, result_cache)
+
+
+def get_query_planner(
+    note_repo: NoteRepository = Depends(get_note_repository),
+    trash_repo: TrashRepository = Depends(get_trash_repository),
+    search_service: SearchService = Depends(get_search_service),
+    filtering_service: FilteringService = Depends(get_filtering_service),
+    title_hasher: TitleHasher = Depends(get_title_hasher),
+) -> QueryPlanner:
+    """Get unified filter + search query planner."""
+    return QueryPlanner(note_repo, trash_repo, search_service, filtering_service, title_hasher)
 
 
 def get_export_service(
     note_repo: NoteRepository = Depends(get_note_repository),
     encryption: EncryptionService = Depends(get_encryption_service),
+    streams: NoteStreamService = Depends(get_note_stream_service),
+    user_keys: UserKeyService = Depends(get_user_key_service),
+    trash_repo: TrashRepository = Depends(get_trash_repository),
 ) -> ExportingService:
     """Get export service instance."""
-    return ExportingService(note_repo, encryption)
+    return ExportingService(note_repo, encryption, streams, user_keys, trash_repo)
+
+
+def get_export_job_service(
+    jobs: ExportJobRepository = Depends(get_export_job_repository),
+    export_service: ExportingService = Depends(get_export_service),
+    encryption: EncryptionService = Depends(get_encryption_service),
+) -> ExportJobService:
+    """Get background export job service instance."""
+    return ExportJobService(jobs, export_service, encryption, max_active=settings.EXPORT_JOBS_MAX_ACTIVE,
+                            ttl_seconds=settings.EXPORT_JOB_TTL_SECONDS)
 
 
 def get_self_delete_service(
     trash_repo: TrashRepository = Depends(get_trash_repository),
+    versions: AccountVersionRepository = Depends(get_account_version_repository),
 ) -> DeleteXTime:
     """Get self-delete service instance."""
-    return DeleteXTime(trash_repo)
+    return DeleteXTime(trash_repo, versions=versions)
 
 
 # Use case dependencies - Notes
 def get_create_note_use_case(
     note_repo: NoteRepository = Depends(get_note_repository),
     encryption: EncryptionService = Depends(get_encryption_service),
+    index: NoteIndexer = Depends(get_note_indexer),
+    versions: AccountVersionRepository = Depends(get_account_version_repository),
+    title_hasher: TitleHasher = Depends(get_title_hasher),
 ) -> CreateNoteUseCase:
     """Get create note use case."""
-    return CreateNoteUseCase(note_repo, encryption)
+    return CreateNoteUseCase(note_repo, encryption, index, versions, title_hasher)
 
 
 def get_get_note_use_case(
@@ -116,9 +283,25 @@ def get_get_note_use_case(
 def get_edit_note_use_case(
     note_repo: NoteRepository = Depends(get_note_repository),
     encryption: EncryptionService = Depends(get_encryption_service),
+    streams: NoteStreamService = Depends(get_note_stream_service),
+    index: NoteIndexer = Depends(get_note_indexer),
+    versions: AccountVersionRepository = Depends(get_account_version_repository),
+    title_hasher: TitleHasher = Depends(get_title_hasher),
 ) -> EditNoteUseCase:
     """Get edit note use case."""
-    return EditNoteUseCase(note_repo, encryption)
+    return EditNoteUseCase(note_repo, encryption, streams, index, versions, title_hasher)
+
+
+def get_stream_note_use_case(
+    note_repo: NoteRepository = Depends(get_note_repository),
+    streams: NoteStreamService = Depends(get_note_stream_service),
+    encryption: EncryptionService = Depends(get_encryption_service),
+    index: NoteIndexer = Depends(get_note_indexer),
+    versions: AccountVersionRepository = Depends(get_account_version_repository),
+    title_hasher: TitleHasher = Depends(get_title_hasher),
+) -> StreamNoteUseCase:
+    """Get streamed (chunked) note use case."""
+    return StreamNoteUseCase(note_repo, streams, encryption, index, versions, title_hasher)
 
 
 def get_filter_notes_use_case(
@@ -129,6 +312,20 @@ def get_filter_notes_use_case(
     return FilterNotesUseCase(note_repo, filtering_service)
 
 
+def get_suggest_use_case(
+    search_service: SearchService = Depends(get_search_service),
+) -> SuggestUseCase:
+    """Get search suggestions use case."""
+    return SuggestUseCase(search_service)
+
+
+def get_query_notes_use_case(
+    planner: QueryPlanner = Depends(get_query_planner),
+) -> QueryNotesUseCase:
+    """Get unified filter + search query use case."""
+    return QueryNotesUseCase(planner)
+
+
 def get_search_notes_use_case(
     note_repo: NoteRepository = Depends(get_note_repository),
     search_service: SearchService = Depends(get_search_service),
@@ -145,13 +342,22 @@ def get_export_note_use_case(
     return ExportNoteUseCase(note_repo, export_service)
 
 
+def get_export_all_use_case(
+    export_service: ExportingService = Depends(get_export_service),
+) -> ExportAllUseCase:
+    """Get whole-account ZIP export use case."""
+    return ExportAllUseCase(export_service)
+
+
 # Use case dependencies - Trash
 def get_trash_note_use_case(
     note_repo: NoteRepository = Depends(get_note_repository),
     trash_repo: TrashRepository = Depends(get_trash_repository),
+    index: NoteIndexer = Depends(get_note_indexer),
+    versions: AccountVersionRepository = Depends(get_account_version_repository),
 ) -> TrashNoteUseCase:
     """Get trash note use case."""
-    return TrashNoteUseCase(note_repo, trash_repo)
+    return TrashNoteUseCase(note_repo, trash_repo, index, versions)
 
 
 def get_trash_getter_use_case(
@@ -165,16 +371,20 @@ def get_trash_getter_use_case(
 def get_trash_restore_use_case(
     note_repo: NoteRepository = Depends(get_note_repository),
     trash_repo: TrashRepository = Depends(get_trash_repository),
+    index: NoteIndexer = Depends(get_note_indexer),
+    versions: AccountVersionRepository = Depends(get_account_version_repository),
 ) -> TrashRestoreUseCase:
     """Get trash restore use case."""
-    return TrashRestoreUseCase(note_repo, trash_repo)
+    return TrashRestoreUseCase(note_repo, trash_repo, index, versions)
 
 
 def get_permanent_delete_use_case(
     trash_repo: TrashRepository = Depends(get_trash_repository),
+    index: NoteIndexer = Depends(get_note_indexer),
+    versions: AccountVersionRepository = Depends(get_account_version_repository),
 ) -> PermamentDelitionUseCase:
     """Get permanent delete use case."""
-    return PermamentDelitionUseCase(trash_repo)
+    return PermamentDelitionUseCase(trash_repo, index, versions)
 
 
 def get_filter_trash_use_case(
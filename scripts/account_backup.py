@@ -0,0 +1,99 @@
+"""Kopia zapasowa i odtwarzanie konta (przeniesienie między wdrożeniami).
+
+Archiwum zawiera szyfrogram notatek, kosza, kawałków treści i kluczy
+użytkownika z warstwą serwerową zamienioną na klucz BACKUP_KEY - notatki
+nie są odszyfrowywane. Odtworzenie wymaga tego samego BACKUP_KEY (klucz
+serwera docelowego wdrożenia może być inny).
+
+Uruchomienie (z katalogu repozytorium):
+    BACKUP_MODE=backup BACKUP_USER_UUID=<uuid> BACKUP_FILE=konto.bak PYTHONPATH=. python scripts/account_backup.py
+    BACKUP_MODE=restore BACKUP_FILE=konto.bak PYTHONPATH=. python scripts/account_backup.py
+
+Zmienne środowiskowe:
+    BACKUP_MODE       backup / restore
+    BACKUP_FILE       ścieżka archiwum
+    BACKUP_USER_UUID  konto do skopiowania; przy restore - konto docelowe (domyślnie UUID z archiwum)
+    BACKUP_REPLACE    true: restore najpierw usuwa notatki, kosz i klucze konta docelowego
+
+Po odtworzeniu uruchom scripts/backfill_search_index.py (skróty tytułów
+i ślepy indeks są kluczowane kluczem wdrożenia i nie trafiają do kopii).
+"""
+
+import asyncio
+import os
+from typing import AsyncIterator
+from uuid import UUID
+
+from presentation.db import database, create_tables
+from infrastructure.config.settings import settings
+from infrastructure.repositories.sql_note_repo import SQLNoteRepository
+from infrastructure.repositories.sql_trash_repo import SQLTrashRepository
+from infrastructure.repositories.sql_chunk_repo import SQLNoteChunkRepository
+from infrastructure.repositories.sql_user_repo import SQLUserRepository
+from infrastructure.repositories.sql_user_key_repo import SQLUserKeyRepository
+from infrastructure.repositories.sql_account_version_repo import SQLAccountVersionRepository
+from infrastructure.repositories.sql_backup_repo import SQLAccountRestoreRepository
+from application.services.backup_service import AccountBackupService, BackupStats
+from application.services.encryption_service import EncryptionService
+from application.services.server_cipher import ServerCipher
+
+
+READ_SIZE = 1024 * 1024
+
+
+async def _read(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            data = await asyncio.to_thread(f.read, READ_SIZE)
+            if not data:
+                break
+            yield data
+
+
+def _report(mode: str, stats: BackupStats) -> None:
+    records = ", ".join(f"{name} {count}" for name, count in stats.records.items())
+    print(f"{mode}: {records}; {stats.bytes_total / 1_000_000:.1f} MB in {stats.seconds:.1f}s "
+          f"({stats.mb_per_s:.1f} MB/s)")
+
+
+async def main():
+    mode = os.getenv("BACKUP_MODE", "").strip().lower()
+    path = os.getenv("BACKUP_FILE")
+    user_uuid = os.getenv("BACKUP_USER_UUID", "").strip()
+    if mode not in ("backup", "restore") or not path or (mode == "backup" and not user_uuid):
+        raise SystemExit("Ustaw BACKUP_MODE=backup|restore, BACKUP_FILE i (dla backup) BACKUP_USER_UUID")
+    if settings.BACKUP_KEY is None:
+        raise SystemExit("Brak BACKUP_KEY")
+
+    await database.connect()
+    await create_tables(database)
+
+    encryption = EncryptionService(settings.SERVER_KEYS, settings.SERVER_CIPHER)
+    service = AccountBackupService(
+        encryption,
+        ServerCipher(settings.BACKUP_KEY, settings.SERVER_CIPHER),
+        users=SQLUserRepository(),
+        user_keys=SQLUserKeyRepository(),
+        note_repo=SQLNoteRepository(),
+        trash_repo=SQLTrashRepository(),
+        chunks=SQLNoteChunkRepository(),
+        restore_repo=SQLAccountRestoreRepository(),
+        versions=SQLAccountVersionRepository(),
+    )
+    stats = BackupStats()
+    try:
+        if mode == "backup":
+            with open(path, "wb") as f:
+                async for data in service.backup(UUID(user_uuid), stats):
+                    await asyncio.to_thread(f.write, data)
+        else:
+            replace = os.getenv("BACKUP_REPLACE", "false").strip().lower() in ("1", "true", "yes")
+            await service.restore(_read(path), user_uuid=UUID(user_uuid) if user_uuid else None, replace=replace,
+                                  stats=stats)
+        _report(mode, stats)
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+"""Wypełnienie tabeli `note_tags` dla notatek zapisanych przed jej wprowadzeniem.
+
+Dla każdego użytkownika (lub tylko wskazanych przez BACKFILL_USER_UUIDS)
+zastępuje wiersze `note_tags` wszystkich notatek z `notes` i `trash`
+tagami z kolumny `tags` (po normalizacji). Treść nie jest pobierana.
+
+Skrypt jest idempotentny; nowe i zmieniane notatki utrzymują tabelę same.
+"""
+
+import asyncio
+import os
+from uuid import UUID
+
+from presentation.db import database, create_tables
+from infrastructure.repositories.sql_note_repo import SQLNoteRepository
+from infrastructure.repositories.sql_trash_repo import SQLTrashRepository
+from infrastructure.repositories.sql_user_repo import SQLUserRepository
+from infrastructure.repositories.sql_tag_repo import replace_note_tags
+
+
+async def backfill_user(user_uuid: UUID) -> int:
+    rows = [("notes", note) for note in await SQLNoteRepository().get_headers(user_uuid=user_uuid)]
+    rows += [("trash", trash) for trash in await SQLTrashRepository().get_headers(user_uuid=user_uuid)]
+    async with database.transaction():
+        for scope, row in rows:
+            await replace_note_tags(user_uuid, scope, row.id, row.tags)
+    return len(rows)
+
+
+async def main():
+    await database.connect()
+    await create_tables(database)
+
+    only = {UUID(u.strip()) for u in os.getenv("BACKFILL_USER_UUIDS", "").split(",") if u.strip()}
+
+    try:
+        for user in await SQLUserRepository().get_all():
+            if only and user.uuid not in only:
+                continue
+            count = await backfill_user(user.uuid)
+            print(f"User {user.uuid}: tagged {count} notes")
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""Budowa (lub przebudowa) ślepego indeksu wyszukiwania dla istniejących notatek.
+
+Dla każdego użytkownika (lub tylko wskazanych przez BACKFILL_USER_UUIDS)
+odszyfrowuje tytuł, treść i tagi notatek z `notes` i `trash` (z zapisanym
+kluczem prywatnym) i zastępuje ich wpisy w `search_tokens`. Treść notatek
+strumieniowych nie jest indeksowana - tylko tytuł i tagi. Przy okazji
+uzupełnia `title_hash` (skrót tytułu używany przez filtr po tytule).
+
+Skrypt jest idempotentny; uruchom go po wdrożeniu indeksu oraz po zmianie
+SEARCH_INDEX_KEY. Rotacja SERVER_KEY (scripts/rotate_server_key.py) nie wymaga
+przebudowy. Wdrożenia, w których klucz indeksu był dawniej wyprowadzany
+z SERVER_KEY, po ustawieniu SEARCH_INDEX_KEY muszą uruchomić ten skrypt raz.
+"""
+
+import asyncio
+import base64
+import os
+from typing import Optional
+from uuid import UUID
+
+from presentation.db import database, create_tables
+from infrastructure.config.settings import settings
+from infrastructure.repositories.sql_note_repo import SQLNoteRepository
+from infrastructure.repositories.sql_trash_repo import SQLTrashRepository
+from infrastructure.repositories.sql_user_repo import SQLUserRepository
+from infrastructure.repositories.sql_user_key_repo import SQLUserKeyRepository
+from infrastructure.repositories.sql_search_index_repo import SQLSearchIndexRepository
+from application.services.encryption_service import EncryptionService
+from application.services.user_key_service import UserKeyService
+from application.services.search.blind_index import BlindIndexService, NOTES, TRASH
+from application.services.filtering.title_hash import TitleHasher
+
+
+def _open(encryption: EncryptionService, value: bytes, private_key: bytes, kek: Optional[bytes]) -> str:
+    return encryption.decrypt_package(encryption.decrypt_server(value).encode(), private_key=private_key, kek=kek)
+
+
+async def backfill_user(user_uuid: UUID, encryption: EncryptionService, key_service: UserKeyService,
+                        index: BlindIndexService, hasher: TitleHasher) -> tuple[int, int]:
+    kek = await key_service.get_kek(user_uuid)
+    repos = {NOTES: SQLNoteRepository(), TRASH: SQLTrashRepository()}
+    rows = [(NOTES, note) for note in await repos[NOTES].get_all(user_uuid=user_uuid)]
+    rows += [(TRASH, trash) for trash in await repos[TRASH].get_all(user_uuid=user_uuid)]
+
+    indexed = failed = 0
+    for scope, row in rows:
+        if not row.key_private_b64:
+            continue
+        try:
+            private_key = base64.b64decode(row.key_private_b64)
+            title = _open(encryption, row.title, private_key, kek)
+            content = None if row.stream_id is not None else _open(encryption, row.content, private_key, kek)
+        except ValueError as e:
+            print(f"  {scope} {row.id}: pominięto ({e})")
+            failed += 1
+            continue
+        await index.index_note(user_uuid=user_uuid, note_id=row.id, title=title, content=content,
+                               tags=row.tags, scope=scope)
+        title_hash = hasher.digest(user_uuid, title)
+        if title_hash != row.title_hash:
+            await repos[scope].update(row.id, user_uuid=user_uuid, title_hash=title_hash or b"")
+        indexed += 1
+    return indexed, failed
+
+
+async def main():
+    await database.connect()
+    await create_tables(database)
+
+    encryption = EncryptionService(settings.SERVER_KEYS, settings.SERVER_CIPHER)
+    key_service = UserKeyService(SQLUserKeyRepository(), encryption)
+    index = BlindIndexService(SQLSearchIndexRepository(), settings.SEARCH_INDEX_KEY)
+    hasher = TitleHasher(settings.SEARCH_INDEX_KEY)
+
+    only = {UUID(u.strip()) for u in os.getenv("BACKFILL_USER_UUIDS", "").split(",") if u.strip()}
+
+    try:
+        for user in await SQLUserRepository().get_all():
+            if only and user.uuid not in only:
+                continue
+            indexed, failed = await backfill_user(user.uuid, encryption, key_service, index, hasher)
+            print(f"User {user.uuid}: indexed {indexed} notes, failed {failed}")
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""Raport skuteczności kompresji treści notatek.
+
+Dla każdej notatki (z zapisanym kluczem prywatnym) odszyfrowuje treść
+i porównuje:
+- rozmiar plaintextu
+- rozmiar przechowywany teraz w `notes.content`
+- rozmiar po kompresji każdym dostępnym algorytmem (zlib, zstd jeśli zainstalowany)
+
+Notatki strumieniowe (`stream_id`) są pomijane. Zakres można zawęzić
+zmienną REPORT_USER_UUIDS (lista oddzielona przecinkami).
+"""
+
+import asyncio
+import base64
+import json
+import os
+from uuid import UUID
+
+from presentation.db import database, create_tables
+from infrastructure.config.settings import settings
+from infrastructure.repositories.sql_note_repo import SQLNoteRepository
+from infrastructure.repositories.sql_user_repo import SQLUserRepository
+from infrastructure.repositories.sql_user_key_repo import SQLUserKeyRepository
+from application.services.compression import Compressor, available_algorithms
+from application.services.encryption_service import EncryptionService
+from application.services.user_key_service import UserKeyService
+
+
+def _ratio(original: int, compressed: int) -> str:
+    return f"{original / compressed:.2f}x" if compressed else "-"
+
+
+async def main():
+    await database.connect()
+    await create_tables(database)
+
+    encryption = EncryptionService(settings.SERVER_KEYS, settings.SERVER_CIPHER)
+    key_service = UserKeyService(SQLUserKeyRepository(), encryption)
+    note_repo = SQLNoteRepository()
+    # threshold=0: liczymy zysk dla każdej notatki, próg oceniamy osobno w raporcie
+    compressors = {name: Compressor(name, threshold=0) for name in available_algorithms()}
+
+    only = {UUID(u.strip()) for u in os.getenv("REPORT_USER_UUIDS", "").split(",") if u.strip()}
+
+    notes = skipped = already_compressed = below_threshold = 0
+    plain_total = stored_total = 0
+    compressed_total = {name: 0 for name in compressors}
+
+    try:
+        for user in await SQLUserRepository().get_all():
+            if only and user.uuid not in only:
+                continue
+            kek = await key_service.get_kek(user.uuid)
+            for note in await note_repo.get_all(user_uuid=user.uuid):
+                if note.stream_id is not None or not note.key_private_b64:
+                    skipped += 1
+                    continue
+                try:
+                    package = encryption.decrypt_server(note.content)
+                    plaintext = encryption.decrypt_package(
+                        package.encode(), private_key=base64.b64decode(note.key_private_b64), kek=kek
+                    ).encode()
+                except ValueError:
+                    skipped += 1
+                    continue
+
+                notes += 1
+                plain_total += len(plaintext)
+                stored_total += len(note.content)
+                if json.loads(package).get("compression"):
+                    already_compressed += 1
+                if len(plaintext) < settings.COMPRESSION_THRESHOLD:
+                    below_threshold += 1
+                for name, compressor in compressors.items():
+                    data, _ = compressor.compress(plaintext)
+                    compressed_total[name] += len(data)
+    finally:
+        await database.disconnect()
+
+    print(f"notes analysed: {notes} (skipped {skipped})")
+    print(f"already compressed: {already_compressed}, below threshold ({settings.COMPRESSION_THRESHOLD} B): {below_threshold}")
+    print(f"plaintext bytes: {plain_total}")
+    print(f"stored bytes (notes.content): {stored_total}")
+    for name, total in compressed_total.items():
+        print(f"{name}: {total} bytes, ratio {_ratio(plain_total, total)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""Worker wykonujący zlecenia eksportu z POST /export/jobs.
+
+Przejmuje zlecenia z kolejki (tabela export_jobs) z limitem na użytkownika
+(EXPORT_JOBS_PER_USER) i łącznym dla wszystkich workerów (EXPORT_JOBS_GLOBAL);
+w jednym procesie działa najwyżej EXPORT_WORKER_CONCURRENCY eksportów naraz.
+Co EXPORT_EXPIRE_INTERVAL_SECONDS usuwa przeterminowane wyniki.
+"""
+
+import asyncio
+import os
+import signal
+import time
+from typing import Dict
+
+from presentation.db import database, create_tables
+from infrastructure.config.settings import settings
+from infrastructure.repositories.sql_note_repo import SQLNoteRepository
+from infrastructure.repositories.sql_trash_repo import SQLTrashRepository
+from infrastructure.repositories.sql_chunk_repo import SQLNoteChunkRepository
+from infrastructure.repositories.sql_user_key_repo import SQLUserKeyRepository
+from infrastructure.repositories.sql_export_job_repo import SQLExportJobRepository
+from application.services.compression import Compressor
+from application.services.encryption_service import EncryptionService
+from application.services.note_stream_service import NoteStreamService
+from application.services.user_key_service import UserKeyService
+from application.services.exporting.export_service import ExportingService
+from application.services.exporting.export_jobs import ExportJobService, FAILED
+from domain.entities import ExportJob
+
+
+POLL_SECONDS = float(os.getenv("EXPORT_WORKER_POLL_SECONDS", "2"))
+CONCURRENCY = int(os.getenv("EXPORT_WORKER_CONCURRENCY", "2"))
+EXPIRE_INTERVAL_SECONDS = float(os.getenv("EXPORT_EXPIRE_INTERVAL_SECONDS", "300"))
+
+
+async def _run_job(service: ExportJobService, job: ExportJob) -> None:
+    started = time.perf_counter()
+    result = await service.run(job)
+    print(f"Export {job.id} ({job.format}): {result.status}, {result.notes_done} notes "
+          f"in {time.perf_counter() - started:.1f}s" + (f" - {result.error}" if result.error else ""))
+
+
+async def run_worker():
+    await database.connect()
+    await create_tables(database)
+
+    encryption = EncryptionService(settings.SERVER_KEYS, settings.SERVER_CIPHER,
+                                   Compressor(settings.COMPRESSION_ALGORITHM, settings.COMPRESSION_THRESHOLD,
+                                              max_size=settings.NOTE_MAX_BYTES))
+    exporting = ExportingService(
+        SQLNoteRepository(),
+        encryption,
+        NoteStreamService(SQLNoteChunkRepository(), encryption),
+        UserKeyService(SQLUserKeyRepository(), encryption),
+        SQLTrashRepository(),
+    )
+    jobs = SQLExportJobRepository()
+    service = ExportJobService(jobs, exporting, encryption, ttl_seconds=settings.EXPORT_JOB_TTL_SECONDS)
+
+    running: Dict[asyncio.Task, ExportJob] = {}
+    last_expire = 0.0
+    try:
+        while True:
+            try:
+                if time.monotonic() - last_expire >= EXPIRE_INTERVAL_SECONDS:
+                    removed = await service.expire(stale_seconds=settings.EXPORT_JOB_STALE_SECONDS)
+                    if removed:
+                        print(f"Export: expired {removed} jobs")
+                    last_expire = time.monotonic()
+
+                while len(running) < CONCURRENCY:
+                    job = await jobs.claim(per_user=settings.EXPORT_JOBS_PER_USER, global_limit=settings.EXPORT_JOBS_GLOBAL)
+                    if job is None:
+                        break
+                    task = asyncio.create_task(_run_job(service, job))
+                    running[task] = job
+                    task.add_done_callback(lambda finished: running.pop(finished, None))
+            except Exception as e:
+                print("Error during export run:", e)
+
+            await asyncio.sleep(POLL_SECONDS)
+    finally:
+        # przerwane eksporty nie zostawiają niepełnego wyniku ani statusu running
+        interrupted = [job for task, job in running.items() if not task.done()]
+        tasks = list(running)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in interrupted:
+            await jobs.finish(job_id=job.id, status=FAILED, error="worker_stopped")
+        await database.disconnect()
+
+
+async def _handle_signals():
+    loop = asyncio.get_running_loop()
+    stop = loop.create_future()
+
+    def _handle(sig, frame):
+        stop.set_result(sig)
+
+    signal.signal(signal.SIGTERM, _handle)
+    signal.signal(signal.SIGINT, _handle)
+    return await stop
+
+async def main():
+    # Run the worker as a task and wait for signals
+    worker_task = asyncio.create_task(run_worker())
+    signal_future = await _handle_signals()
+    worker_task.cancel()
+    try:
+        await worker_task
+    except asyncio.CancelledError:
+        pass
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""Migracja istniejących notatek do hierarchii kluczy użytkownika.
+
+Dla każdego użytkownika (lub tylko wskazanych przez MIGRATE_USER_UUIDS):
+- tworzy główną parę kluczy i KEK (jeśli ich jeszcze nie ma)
+- dla każdej notatki w `notes` i `trash` z zapisanym kluczem prywatnym
+  dodaje do paczek title/content klucz sesyjny opakowany KEK (v1 -> v2);
+  ciphertext treści nie jest ponownie szyfrowany
+"""
+
+import asyncio
+import base64
+import os
+from uuid import UUID
+
+from presentation.db import database, create_tables
+from infrastructure.config.settings import settings
+from infrastructure.repositories.sql_note_repo import SQLNoteRepository
+from infrastructure.repositories.sql_trash_repo import SQLTrashRepository
+from infrastructure.repositories.sql_user_repo import SQLUserRepository
+from infrastructure.repositories.sql_user_key_repo import SQLUserKeyRepository
+from infrastructure.repositories.sql_account_version_repo import SQLAccountVersionRepository
+from application.services.encryption_service import EncryptionService
+from application.services.user_key_service import UserKeyService
+
+
+def _rewrap_field(encryption: EncryptionService, value: bytes, private_key: bytes, kek: bytes) -> bytes | None:
+    """Zwraca nowy ciphertext pola albo None, jeśli pole jest już w formacie v2."""
+    package = encryption.decrypt_server(value)
+    if '"kek_key"' in package:
+        return None
+    rewrapped = encryption.rewrap_with_kek(package.encode(), private_key, kek)
+    return encryption.encrypt_server(rewrapped.decode())
+
+
+async def migrate_user(user_uuid: UUID, encryption: EncryptionService, key_service: UserKeyService,
+                       note_repo: SQLNoteRepository, trash_repo: SQLTrashRepository) -> tuple[int, int]:
+    await key_service.ensure_keys(user_uuid)
+    kek = await key_service.get_kek(user_uuid)
+    assert kek is not None
+
+    migrated = failed = 0
+    rows = [(note_repo, note) for note in await note_repo.get_all(user_uuid=user_uuid)]
+    rows += [(trash_repo, trash) for trash in await trash_repo.get_all(user_uuid=user_uuid)]
+
+    for repo, row in rows:
+        if not row.key_private_b64:
+            continue
+        try:
+            private_key = base64.b64decode(row.key_private_b64)
+            title = _rewrap_field(encryption, row.title, private_key, kek)
+            content = _rewrap_field(encryption, row.content, private_key, kek)
+        except ValueError as e:
+            print(f"  note {row.id}: pominięto ({e})")
+            failed += 1
+            continue
+        if title is None and content is None:
+            continue
+        await repo.update(row.id, user_uuid=user_uuid, title=title, content=content)
+        migrated += 1
+
+    return migrated, failed
+
+
+async def main():
+    await database.connect()
+    await create_tables(database)
+
+    encryption = EncryptionService(settings.SERVER_KEYS, settings.SERVER_CIPHER)
+    key_service = UserKeyService(SQLUserKeyRepository(), encryption)
+    note_repo = SQLNoteRepository()
+    trash_repo = SQLTrashRepository()
+    versions = SQLAccountVersionRepository()
+
+    only = {UUID(u.strip()) for u in os.getenv("MIGRATE_USER_UUIDS", "").split(",") if u.strip()}
+
+    try:
+        users = await SQLUserRepository().get_all()
+        for user in users:
+            if only and user.uuid not in only:
+                continue
+            migrated, failed = await migrate_user(user.uuid, encryption, key_service, note_repo, trash_repo)
+            if migrated:
+                # zmienione paczki - unieważnia cache wyników wyszukiwania
+                await versions.bump(user.uuid)
+            print(f"User {user.uuid}: migrated {migrated} notes, failed {failed}")
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
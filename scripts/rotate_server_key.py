@@ -0,0 +1,67 @@
+"""Rotacja klucza warstwy serwerowej bez przestoju.
+
+Procedura:
+1. Wygeneruj nowy klucz: `python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"`
+2. Ustaw SERVER_KEY=<nowy> oraz SERVER_KEYS_PREVIOUS=<stary> i zrestartuj aplikację
+   (nowe zapisy używają nowego klucza, stare wiersze są nadal czytelne)
+3. Uruchom ten skrypt; przerwany wznawia się od checkpointu (ROTATION_JOB_ID)
+4. Gdy wszystkie tabele (także `export_job_chunks` - wyniki eksportów) są `finished`,
+   usuń stary klucz z SERVER_KEYS_PREVIOUS.
+   Tabela z nieczytelnymi wierszami (skipped) nie jest finished - dodaj brakujący
+   klucz do SERVER_KEYS_PREVIOUS i uruchom skrypt ponownie (pominięte są ponawiane)
+
+SEARCH_INDEX_KEY (ślepy indeks, skróty tytułów) jest niezależny od SERVER_KEY
+i pozostaje bez zmian - indeks wyszukiwania nie wymaga przebudowy.
+"""
+
+import asyncio
+import os
+
+from presentation.db import database, create_tables
+from infrastructure.config.settings import settings
+from infrastructure.repositories.sql_rotation_repo import SQLKeyRotationRepository
+from infrastructure.repositories.sql_user_key_repo import SQLUserKeyRepository
+from application.services.encryption_service import EncryptionService
+from application.services.key_rotation import ServerKeyRotationService
+
+
+def _report(checkpoint, total: int) -> None:
+    percent = 100.0 * checkpoint.rows_scanned / total if total else 100.0
+    print(f"rotation[{checkpoint.job_id}] {checkpoint.table_name}: "
+          f"{checkpoint.rows_scanned}/{total} ({percent:.1f}%), rotated {checkpoint.rows_rotated}, "
+          f"skipped {checkpoint.rows_skipped}, last id {checkpoint.last_id}")
+
+
+def _skipped(table_name: str, row_id: int, error: Exception) -> None:
+    print(f"rotation: {table_name} id={row_id} skipped ({error})")
+
+
+async def main():
+    await database.connect()
+    await create_tables(database)
+
+    encryption = EncryptionService(settings.SERVER_KEYS, settings.SERVER_CIPHER)
+    # domyślny job id zależy od klucza głównego i algorytmu - nowa rotacja startuje od zera
+    default_job = f"{encryption.server_cipher.primary_key_id.hex()}-{settings.SERVER_CIPHER}"
+    job_id = os.getenv("ROTATION_JOB_ID", default_job)
+
+    service = ServerKeyRotationService(
+        SQLKeyRotationRepository(),
+        encryption,
+        batch_size=settings.ROTATION_BATCH_SIZE,
+        rows_per_second=settings.ROTATION_ROWS_PER_SECOND,
+        progress=_report,
+        skipped=_skipped,
+        user_keys=SQLUserKeyRepository(),
+    )
+    try:
+        result = await service.run(job_id)
+        for table, checkpoint in result.items():
+            state = "finished" if checkpoint.finished else f"NOT finished, {checkpoint.rows_skipped} unreadable rows {checkpoint.skipped_ids}"
+            print(f"rotation[{job_id}] {table}: {state}, scanned {checkpoint.rows_scanned}, rotated {checkpoint.rows_rotated}")
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
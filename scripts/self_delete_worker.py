@@ -6,21 +6,25 @@ from presentation.db import database, create_tables
 print("create_tables imported")
 from infrastructure.repositories.sql_trash_repo import SQLTrashRepository
 from infrastructure.repositories.sql_user_repo import SQLUserRepository
+from infrastructure.repositories.sql_account_version_repo import SQLAccountVersionRepository
 from application.services.self_delete_x_time import DeleteXTime
 
 
 INTERVAL_SECONDS = int(os.getenv("SELF_DELETE_INTERVAL_SECONDS", "86400"))  # default once per day
 
 
+def build_deleter(user_repo: SQLUserRepository) -> DeleteXTime:
+    ttl_days = int(os.getenv("SELF_DELETE_TTL_DAYS", "30"))
+    # podbicie wersji konta unieważnia wyniki wyszukiwania z cache, które zawierały usunięte notatki
+    return DeleteXTime(SQLTrashRepository(), ttl_days, user_repo, versions=SQLAccountVersionRepository())
+
+
 async def run_worker():
     await database.connect()
     await create_tables(database)
 
-    repo = SQLTrashRepository()
     user_repo = SQLUserRepository()
-
-    ttl_days = int(os.getenv("SELF_DELETE_TTL_DAYS", "30"))
-    deleter = DeleteXTime(repo, ttl_days,user_repo)
+    deleter = build_deleter(user_repo)
 
     try:
         while True:
@@ -0,0 +1,6 @@
+"""Zmienne środowiska wymagane przy imporcie warstwy prezentacji (bez połączenia z bazą)."""
+
+import os
+
+for name in ("DB_HOST", "DB_NAME", "DB_USER", "DB_PASSWORD"):
+    os.environ.setdefault(name, "test")
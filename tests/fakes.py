@@ -0,0 +1,173 @@
+"""Repozytoria i szyfrowanie w pamięci do testów serwisów (bez bazy danych)."""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from domain.entities import CipherRow, ExportJob, Note, NoteChunk, RotationCheckpoint, SavedFilter, Trash
+from application.services.exporting.export_jobs import DONE, FAILED
+
+
+class PlainEncryption:
+    """Zamiast szyfrowania: "szyfrogram" to bajty plaintextu (wystarcza SearchService)."""
+
+    def encrypt_server(self, data: str) -> bytes:
+        return data.encode()
+
+    def decrypt_server(self, data: bytes) -> str:
+        return data.decode()
+
+    def decrypt_package(self, package_bytes: bytes, *, private_key=None, kek=None) -> str:
+        return package_bytes.decode()
+
+
+def note(note_id: int, title: str, user_uuid: UUID, content: str = "") -> Note:
+    """Notatka czytelna przez `PlainEncryption`."""
+    return Note(id=note_id, user_uuid=user_uuid, title=title.encode(), content=content.encode(), key_private_b64="a2V5")
+
+
+def trashed(note_id: int, title: str, user_uuid: UUID, trashed_at: datetime, content: str = "") -> Trash:
+    return Trash(id=note_id, user_uuid=user_uuid, title=title.encode(), content=content.encode(),
+                 key_private_b64="a2V5", trashed_at=trashed_at)
+
+
+class MemoryNoteRepository:
+    def __init__(self, rows: Optional[List[Note]] = None):
+        self.rows: Dict[int, Note] = {row.id: row for row in rows or []}
+        # argumenty kolejnych `get_prefiltered` (co trafiłoby do SQL)
+        self.calls: List[dict] = []
+
+    async def get_all(self, *, user_uuid: UUID) -> List[Note]:
+        return [row for row in self.rows.values() if row.user_uuid == user_uuid]
+
+    async def get_headers(self, *, user_uuid: UUID) -> List[Note]:
+        return [row.model_copy(update={"content": b""}) for row in await self.get_all(user_uuid=user_uuid)]
+
+    async def get_prefiltered(self, *, user_uuid: UUID, tag=None, date_from=None, date_to=None, title_hash=None,
+                              columns: Optional[Set[str]] = None, after_id: Optional[int] = None,
+                              limit: Optional[int] = None) -> List[Note]:
+        self.calls.append({"columns": columns, "after_id": after_id, "limit": limit})
+        rows = sorted((row for row in await self.get_all(user_uuid=user_uuid) if after_id is None or row.id > after_id),
+                      key=lambda row: row.id)
+        return rows[:limit] if limit else rows
+
+
+class MemoryTrashRepository(MemoryNoteRepository):
+    rows: Dict[int, Trash]
+
+    async def get_by_id(self, *, note_id: int, user_uuid: UUID) -> Optional[Trash]:
+        row = self.rows.get(note_id)
+        return row if row is not None and row.user_uuid == user_uuid else None
+
+    async def delete_permanently(self, *, note_id: int, user_uuid: UUID) -> bool:
+        if await self.get_by_id(note_id=note_id, user_uuid=user_uuid) is None:
+            return False
+        del self.rows[note_id]
+        return True
+
+
+class MemoryAccountVersions:
+    def __init__(self):
+        self.versions: Dict[UUID, int] = {}
+
+    async def get(self, user_uuid: UUID) -> int:
+        return self.versions.get(user_uuid, 0)
+
+    async def bump(self, user_uuid: UUID) -> int:
+        self.versions[user_uuid] = self.versions.get(user_uuid, 0) + 1
+        return self.versions[user_uuid]
+
+
+class MemorySavedFilters:
+    def __init__(self, saved: SavedFilter, rows):
+        self.saved = saved
+        self.rows = rows
+        self.columns = None
+
+    async def get(self, *, filter_id, user_uuid):
+        return self.saved if filter_id == self.saved.id else None
+
+    async def notes(self, *, filter_id, user_uuid, columns=None):
+        self.columns = columns
+        return self.rows if filter_id == self.saved.id else None
+
+
+class MemoryChunkRepository:
+    def __init__(self):
+        self.rows: Dict[Tuple[UUID, int], NoteChunk] = {}
+
+    async def add(self, chunk: NoteChunk, *, user_uuid: UUID) -> None:
+        self.rows[(chunk.stream_id, chunk.seq)] = chunk
+
+    async def delete_stream(self, *, stream_id: UUID, user_uuid: UUID) -> int:
+        keys = [key for key in self.rows if key[0] == stream_id]
+        for key in keys:
+            del self.rows[key]
+        return len(keys)
+
+
+class MemoryExportJobs:
+    """Jak SQLExportJobRepository: postęp i zakończenie tylko dla zleceń running."""
+
+    def __init__(self):
+        self.jobs: Dict[UUID, ExportJob] = {}
+        self.chunks: Dict[UUID, List[bytes]] = {}
+        self.progress: List[int] = []
+        self.reap_before_finish = False
+
+    async def count_active(self, *, user_uuid: UUID) -> int:
+        return 0
+
+    async def add(self, job: ExportJob) -> ExportJob:
+        self.jobs[job.id] = job
+        return job
+
+    async def add_chunk(self, *, job_id: UUID, seq: int, data: bytes) -> None:
+        self.chunks.setdefault(job_id, []).append(data)
+
+    async def update_progress(self, *, job_id: UUID, notes_done: int, bytes_written: int) -> bool:
+        self.progress.append(notes_done)
+        return self.jobs[job_id].status == "running"
+
+    async def finish(self, *, job_id: UUID, status: str, error: Optional[str] = None, expires_at=None) -> bool:
+        if self.reap_before_finish:
+            self.reap(job_id)
+        job = self.jobs[job_id]
+        updated = job.status == "running"
+        if updated:
+            job.status, job.error = status, error
+        if not updated or status != DONE:
+            self.chunks.pop(job_id, None)
+        return updated
+
+    def reap(self, job_id: UUID) -> None:
+        # `expire`: zlecenie bez heartbeatu
+        self.jobs[job_id].status, self.jobs[job_id].error = FAILED, "worker_lost"
+        self.chunks.pop(job_id, None)
+
+
+class MemoryRotationRepository:
+    def __init__(self, rows: Dict[int, bytes]):
+        self.rows = rows
+        self.checkpoints: Dict[Tuple[str, str], RotationCheckpoint] = {}
+
+    async def count_rows(self, table_name: str, *, after_id: int = 0) -> int:
+        return sum(1 for row_id in self.rows if row_id > after_id)
+
+    async def fetch_batch(self, table_name: str, *, after_id: int, limit: int) -> List[CipherRow]:
+        ids = sorted(row_id for row_id in self.rows if row_id > after_id)[:limit]
+        return await self.fetch_rows(table_name, ids=ids)
+
+    async def fetch_rows(self, table_name: str, *, ids: List[int]) -> List[CipherRow]:
+        return [CipherRow(id=row_id, fields={"data": self.rows[row_id]}) for row_id in sorted(ids) if row_id in self.rows]
+
+    async def swap_ciphertext(self, table_name: str, row: CipherRow, new_fields: Dict[str, bytes]) -> bool:
+        self.rows[row.id] = new_fields["data"]
+        return True
+
+    async def get_checkpoint(self, job_id: str, table_name: str) -> Optional[RotationCheckpoint]:
+        checkpoint = self.checkpoints.get((job_id, table_name))
+        return checkpoint.model_copy(deep=True) if checkpoint else None
+
+    async def save_checkpoint(self, checkpoint: RotationCheckpoint) -> None:
+        self.checkpoints[(checkpoint.job_id, checkpoint.table_name)] = checkpoint.model_copy(deep=True)
@@ -0,0 +1,35 @@
+import zlib
+
+import pytest
+from cryptography.fernet import Fernet
+
+from application.services.compression import Compressor, ZLIB, decompress
+from application.services.encryption_service import EncryptionService
+
+
+def test_decompression_is_capped_at_the_note_size_limit():
+    bomb = zlib.compress(b"\0" * (4 * 1024 * 1024))
+    assert len(bomb) < 8 * 1024
+
+    with pytest.raises(ValueError):
+        decompress(bomb, ZLIB, max_size=1024 * 1024)
+    assert len(decompress(bomb, ZLIB, max_size=4 * 1024 * 1024)) == 4 * 1024 * 1024
+    with pytest.raises(ValueError):
+        decompress(bomb[:-4], ZLIB)
+
+
+def test_package_over_the_limit_is_rejected_and_large_notes_stay_readable():
+    compressor = Compressor(ZLIB, threshold=0, max_size=1024)
+    encryption = EncryptionService(Fernet.generate_key(), compressor=compressor)
+    private_key, public_key = encryption.generate_nacl_keypair()
+
+    # ponad limit - zapisane bez kompresji, więc odczyt nie podlega limitowi
+    large = "a" * 4096
+    assert compressor.compress(large.encode()) == (large.encode(), None)
+    assert encryption.decrypt_package(encryption.encrypt_for_recipient(large, public_key), private_key=private_key) == large
+
+    # paczka skompresowana gdzie indziej z wyższym limitem
+    writer = EncryptionService(Fernet.generate_key(), compressor=Compressor(ZLIB, threshold=0))
+    package = writer.encrypt_for_recipient(large, public_key)
+    with pytest.raises(ValueError):
+        encryption.decrypt_package(package, private_key=private_key)
@@ -0,0 +1,66 @@
+import asyncio
+from uuid import uuid4
+
+from cryptography.fernet import Fernet
+
+from domain.entities import ExportJob
+from application.services.encryption_service import EncryptionService
+from application.services.exporting import export_jobs
+from application.services.exporting.export_jobs import ExportJobService, DONE, FAILED
+
+from tests.fakes import MemoryExportJobs
+
+
+class FakeExporting:
+    def __init__(self, notes: int, on_note=None):
+        self.notes = notes
+        self.on_note = on_note
+
+    async def export_all(self, user_uuid, fmt, include_trash, progress=None):
+        for i in range(self.notes):
+            if self.on_note:
+                self.on_note(i)
+            yield b"x" * 10
+            progress(1)
+            await asyncio.sleep(0)
+
+
+def _run(exporting, jobs: MemoryExportJobs) -> ExportJob:
+    service = ExportJobService(jobs, exporting, EncryptionService(Fernet.generate_key()))
+
+    async def run():
+        job = await service.start(user_uuid=uuid4(), fmt="ndjson")
+        job.status = "running"
+        return await service.run(job)
+
+    return asyncio.run(run())
+
+
+def test_reaped_job_is_not_revived_by_finish():
+    jobs = MemoryExportJobs()
+    jobs.reap_before_finish = True
+    result = _run(FakeExporting(3), jobs)
+    assert result.status == FAILED
+    assert jobs.jobs[result.id].status == FAILED
+    assert result.id not in jobs.chunks
+
+
+def test_reaped_job_stops_and_drops_late_chunks():
+    jobs = MemoryExportJobs()
+    # reaper działa w trakcie eksportu - kolejny zapis postępu przerywa zlecenie
+    exporting = FakeExporting(3, on_note=lambda i: i == 2 and jobs.reap(next(iter(jobs.jobs))))
+    result = _run(exporting, jobs)
+    assert result.status == FAILED
+    assert jobs.jobs[result.id].error == "worker_lost"
+    assert result.id not in jobs.chunks
+
+
+def test_progress_reported_without_filling_a_chunk():
+    jobs = MemoryExportJobs()
+    notes = export_jobs.PROGRESS_NOTES * 3
+    result = _run(FakeExporting(notes), jobs)
+    assert result.status == DONE
+    # całość mieści się w jednym kawałku, a postęp był zapisywany w trakcie
+    assert len(jobs.chunks[result.id]) == 1
+    assert len(jobs.progress) > 2 and jobs.progress[0] < notes
+    assert jobs.progress[-1] == notes
@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from domain.entities import SavedFilter
+from application.services.filtering.filter_dto import NotesFilter
+from application.services.filtering.filtering_service import FilteringService
+from application.use_cases.notes.notes_filtering import FilterNotesUseCase
+from presentation.api.fitering_router import saved_filter_notes_endpoint
+
+from tests.fakes import MemoryNoteRepository, MemorySavedFilters, PlainEncryption, note, trashed
+
+
+def test_title_filter_pages_after_matching():
+    user = uuid4()
+    repo = MemoryNoteRepository([note(1, "Kawa", user), note(2, "Herbata", user), note(3, "kawa", user),
+                             note(4, "KAWA", user)])
+    use_case = FilterNotesUseCase(repo, FilteringService(PlainEncryption(), repo, None))
+
+    page = asyncio.run(use_case.execute(NotesFilter(title="kawa", user_uuid=user), columns={"id", "created_at"},
+                                        after_id=1, limit=2))
+
+    assert [note.id for note in page] == [3, 4]
+    # tytuł sprawdzany po SQL - limit nie może obciąć wierszy przed dopasowaniem
+    assert repo.calls[-1]["limit"] is None
+    assert {"title", "key_private_b64"} <= repo.calls[-1]["columns"]
+
+
+def test_filter_without_title_pushes_limit_to_sql():
+    user = uuid4()
+    repo = MemoryNoteRepository([note(i, "x", user) for i in range(1, 6)])
+    use_case = FilterNotesUseCase(repo, FilteringService(PlainEncryption(), repo, None))
+
+    page = asyncio.run(use_case.execute(NotesFilter(user_uuid=user), columns={"id"}, limit=2))
+
+    assert [note.id for note in page] == [1, 2]
+    assert repo.calls[-1] == {"columns": {"id"}, "after_id": None, "limit": 2}
+
+
+class NoKeys:
+    async def get_kek(self, user_uuid):
+        raise AssertionError("KEK niepotrzebny bez tytułu i treści")
+
+
+def test_saved_folder_listing_honours_fields():
+    user = uuid4()
+    row = trashed(7, "x", user, datetime(2024, 5, 1, 12, 0))
+    saved = MemorySavedFilters(SavedFilter(id=1, user_uuid=user, name="kosz", scope="trash"), [row])
+    service = FilteringService(PlainEncryption(), None, None, saved=saved)
+
+    async def listing(fields):
+        return await saved_filter_notes_endpoint(1, fields=fields, user_uuid=user, filtering_service=service,
+                                                 encryption_service=PlainEncryption(), user_key_service=NoKeys())
+
+    rows = asyncio.run(listing("trashed_at"))
+    assert list(rows[0]) == ["id", "trashed_at"]
+    # treść i tytuł nie są nawet czytane z bazy
+    assert "content" not in saved.columns and "title" not in saved.columns
+
+    saved.saved.scope = "notes"
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(listing("trashed_at"))
+    assert error.value.status_code == 422
@@ -0,0 +1,51 @@
+import asyncio
+from typing import Optional
+
+from application.services.key_rotation import ServerKeyRotationService
+
+from tests.fakes import MemoryRotationRepository
+
+
+class Rotator:
+    """`old:` -> `new:`; wiersze `lost:` są czytelne dopiero po "dodaniu" klucza."""
+
+    def __init__(self):
+        self.known = {b"old:", b"new:"}
+
+    def rotate_server(self, value: bytes) -> Optional[bytes]:
+        key, data = value.split(b":", 1)
+        if key + b":" == b"new:":
+            return None
+        if key + b":" not in self.known:
+            raise ValueError("no key")
+        return b"new:" + data
+
+
+def test_unreadable_rows_keep_table_unfinished_until_retried():
+    repo = MemoryRotationRepository({1: b"old:a", 2: b"lost:b", 3: b"old:c"})
+    rotator = Rotator()
+    reported = []
+    service = ServerKeyRotationService(repo, rotator, batch_size=2, rows_per_second=0,
+                                       skipped=lambda table, row_id, e: reported.append((table, row_id)))
+
+    checkpoint = asyncio.run(service.rotate_table("job", "note_chunks"))
+    assert not checkpoint.finished
+    assert checkpoint.skipped_ids == [2] and checkpoint.rows_skipped == 1
+    assert reported == [("note_chunks", 2)]
+    assert repo.checkpoints[("job", "note_chunks")].skipped_ids == [2]
+
+    # operator dodaje brakujący klucz i uruchamia rotację ponownie
+    rotator.known.add(b"lost:")
+    checkpoint = asyncio.run(service.rotate_table("job", "note_chunks"))
+    assert checkpoint.finished and checkpoint.skipped_ids == []
+    assert repo.rows == {1: b"new:a", 2: b"new:b", 3: b"new:c"}
+
+
+def test_export_results_are_rotated_with_the_note_tables():
+    repo = MemoryRotationRepository({1: b"old:a"})
+    service = ServerKeyRotationService(repo, Rotator(), rows_per_second=0)
+
+    result = asyncio.run(service.run("job"))
+    # stary klucz można usunąć dopiero, gdy wyniki eksportów też są na nowym
+    assert "export_job_chunks" in result and all(c.finished for c in result.values())
+    assert ("job", "export_job_chunks") in repo.checkpoints
@@ -0,0 +1,41 @@
+import asyncio
+from uuid import uuid4
+
+from application.services.search.memory_index import InMemorySearchIndex, IndexedAccountVersions
+from application.services.search.search_dto import NotesSearchQuery
+from application.services.search.search_service import SearchService
+
+from tests.fakes import MemoryAccountVersions, MemoryNoteRepository, MemoryTrashRepository, PlainEncryption, note
+
+
+def test_memory_index_follows_account_version():
+    user = uuid4()
+    notes = MemoryNoteRepository([note(1, "kawa", user)])
+    index = InMemorySearchIndex(1024 * 1024)
+    shared = MemoryAccountVersions()
+    # ten proces podbija wersję przez IndexedAccountVersions, "inny proces" bezpośrednio
+    local = IndexedAccountVersions(shared, index)
+    search = SearchService(PlainEncryption(), notes, MemoryTrashRepository(), memory_index=index, versions=local)
+    query = NotesSearchQuery(query="kawa", user_uuid=user)
+    loads = []
+    load = index.load
+    index.load = lambda *args, **kwargs: (loads.append(args[0]), load(*args, **kwargs))
+
+    async def run():
+        assert [r.note.id for r in await search.search_notes(notes, query, user)] == [1]
+
+        # zmiana w tym procesie: naniesiona przyrostowo, bez przebudowy
+        notes.rows[2] = note(2, "kawa", user)
+        await index.index_note(user_uuid=user, note_id=2, title="kawa", content="")
+        await local.bump(user)
+        assert [r.note.id for r in await search.search_notes(notes, query, user)] == [1, 2]
+        assert len(loads) == 1
+
+        # zmiana z innego procesu: indeks jej nie zna, inna wersja wymusza przebudowę
+        del notes.rows[1]
+        notes.rows[3] = note(3, "kawa", user)
+        await shared.bump(user)
+        assert [r.note.id for r in await search.search_notes(notes, query, user)] == [2, 3]
+        assert len(loads) == 2
+
+    asyncio.run(run())
@@ -0,0 +1,50 @@
+import asyncio
+from typing import List, Tuple
+from uuid import uuid4
+
+import pytest
+from cryptography.fernet import Fernet
+
+from application.services.encryption_service import EncryptionService
+from application.services.note_stream_service import NoteStreamService
+from application.use_cases.notes.stream_note import StreamNoteUseCase
+
+from tests.fakes import MemoryChunkRepository
+
+
+class FailingNoteRepository:
+    async def add(self, note):
+        raise RuntimeError("insert failed")
+
+
+async def _body(pieces: List[bytes], fail_after: int):
+    for i, piece in enumerate(pieces):
+        if i == fail_after:
+            raise ConnectionError("client disconnected")
+        yield piece
+
+
+def _service() -> Tuple[NoteStreamService, MemoryChunkRepository, EncryptionService, bytes]:
+    encryption = EncryptionService(Fernet.generate_key())
+    _, public_key = encryption.generate_nacl_keypair()
+    chunks = MemoryChunkRepository()
+    return NoteStreamService(chunks, encryption, chunk_size=16), chunks, encryption, public_key
+
+
+def test_interrupted_write_removes_stored_chunks():
+    service, chunks, _, public_key = _service()
+    body = _body([b"x" * 40, b"y" * 40, b"z" * 40], fail_after=2)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(service.write(user_uuid=uuid4(), body=body, recipient_public_key=public_key))
+    assert chunks.rows == {}
+
+
+def test_failed_note_insert_removes_stored_chunks():
+    service, chunks, encryption, public_key = _service()
+    use_case = StreamNoteUseCase(FailingNoteRepository(), service, encryption)
+    body = _body([b"x" * 40], fail_after=-1)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(use_case.upload(user_uuid=uuid4(), title="tytuł", body=body, recipient_public_key=public_key))
+    assert chunks.rows == {}
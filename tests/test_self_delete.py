@@ -0,0 +1,44 @@
+import asyncio
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from application.services.self_delete_x_time import DeleteXTime
+from application.services.search.search_dto import NotesSearchQuery
+from application.services.search.search_service import SearchService
+from application.services.search.result_cache import SearchResultCache
+from infrastructure.repositories.sql_account_version_repo import SQLAccountVersionRepository
+from infrastructure.repositories.sql_user_repo import SQLUserRepository
+from scripts.self_delete_worker import build_deleter
+
+from tests.fakes import MemoryAccountVersions, MemoryNoteRepository, MemoryTrashRepository, PlainEncryption, trashed
+
+
+def test_purge_invalidates_cached_trash_search():
+    user = uuid4()
+    trash = MemoryTrashRepository([
+        trashed(1, "kawa", user, datetime.utcnow() - timedelta(days=40), "stara notatka"),
+        trashed(2, "kawa", user, datetime.utcnow(), "nowa notatka"),
+    ])
+    versions = MemoryAccountVersions()
+    cache = SearchResultCache(1024 * 1024)
+    search = SearchService(PlainEncryption(), MemoryNoteRepository(), trash, versions=versions, result_cache=cache)
+    query = NotesSearchQuery(query="kawa", user_uuid=user)
+
+    async def run():
+        first = await search.search_trash(trash, query, user)
+        assert [r.note.id for r in first] == [1, 2]
+        assert cache.misses == 1
+
+        deleted = await DeleteXTime(trash, 30, versions=versions).execute_all(user)
+        assert deleted == 1
+
+        after = await search.search_trash(trash, query, user)
+        assert [r.note.id for r in after] == [2]
+        assert cache.hits == 0
+
+    asyncio.run(run())
+
+
+def test_worker_bumps_account_versions():
+    deleter = build_deleter(SQLUserRepository())
+    assert isinstance(deleter._versions, SQLAccountVersionRepository)
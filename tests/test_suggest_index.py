@@ -0,0 +1,49 @@
+import asyncio
+from uuid import uuid4
+
+from application.services.search.blind_index import NOTES
+from application.services.search.memory_index import IndexedAccountVersions
+from application.services.search.search_service import SearchService
+from application.services.search.suggest_index import MAX_KEY_LENGTH, SuggestIndex, TITLE
+
+from tests.fakes import MemoryAccountVersions, MemoryNoteRepository, MemoryTrashRepository, PlainEncryption, note
+
+
+def _titles(index: SuggestIndex, user, prefix: str):
+    return [(s["text"], s["count"]) for s in index.suggest(user, prefix) if s["kind"] == TITLE]
+
+
+def test_titles_sharing_a_node_keep_their_own_text():
+    user = uuid4()
+    base = "a" * MAX_KEY_LENGTH
+    index = SuggestIndex(1024 * 1024)
+    index.load(user, {NOTES: [(1, base + " pierwszy", []), (2, base + " drugi", []), (3, "Zakupy", [])]})
+
+    assert sorted(_titles(index, user, "aaa")) == [(base + " drugi", 1), (base + " pierwszy", 1)]
+
+    asyncio.run(index.remove(user_uuid=user, note_id=1))
+    assert _titles(index, user, "aaa") == [(base + " drugi", 1)]
+
+    # warianty zapisu tego samego tytułu - jedna podpowiedź, tekst nie zostaje po usuniętej notatce
+    asyncio.run(index.index_note(user_uuid=user, note_id=4, title="zakupy", content=None))
+    assert [count for _, count in _titles(index, user, "zak")] == [2]
+    asyncio.run(index.remove(user_uuid=user, note_id=3))
+    assert _titles(index, user, "zak") == [("zakupy", 1)]
+
+
+def test_trie_is_rebuilt_after_a_change_from_another_process():
+    user = uuid4()
+    notes = MemoryNoteRepository([note(1, "Zakupy", user)])
+    index = SuggestIndex(1024 * 1024)
+    shared = MemoryAccountVersions()
+    search = SearchService(PlainEncryption(), notes, MemoryTrashRepository(), suggest_index=index,
+                           versions=IndexedAccountVersions(shared, index))
+
+    async def run():
+        assert [s["text"] for s in await search.suggest(user, "zak") if s["kind"] == TITLE] == ["Zakupy"]
+        # worker kosza / inny worker API usuwa notatkę - ten proces nie dostaje remove()
+        del notes.rows[1]
+        await shared.bump(user)
+        assert await search.suggest(user, "zak") == []
+
+    asyncio.run(run())